@@ -10,8 +10,14 @@ class LLMClient(abc.ABC):
     LLMクライアントの抽象基底クラス (Interface)。
     全ての具体的なクライアント（Gemini, Ollama等）はこのクラスを継承し、
     定義されたメソッドを実装する必要があります。
+
+    Attributes:
+        enforces_schema (bool): generate_json のスキーマ（各項目の説明を含む）をAPIでモデルに渡すか。
+            True の場合、プロンプトには出力形式の一覧を載せません（説明文を二重に送らないため）。
     """
 
+    enforces_schema: bool = False
+
     @abc.abstractmethod
     async def generate_text(self, prompt: str) -> str:
         """
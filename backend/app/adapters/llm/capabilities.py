@@ -0,0 +1,103 @@
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class ModelCapability:
+    """
+    モデルごとの性能プロファイル。生成単位（グループの分割・統合）の決定に使用します。
+
+    Attributes:
+        context_window (int): 入力+出力で扱えるトークン数の上限。
+        decode_tps (float): おおよその出力速度（tokens/sec）。所要時間の見積もりに使用します。
+        max_schema_fields (int): 1回の呼び出しで安定して生成できる項目数の上限。
+        merge_groups (bool): 上限内であれば複数の生成グループを1回の呼び出しにまとめるか。
+        input_cost_per_mtok (float): 入力100万トークンあたりの料金（USD）。ローカルモデルは0。
+        output_cost_per_mtok (float): 出力100万トークンあたりの料金（USD）。ローカルモデルは0。
+    """
+    context_window: int
+    decode_tps: float
+    max_schema_fields: int
+    merge_groups: bool = False
+    input_cost_per_mtok: float = 0.0
+    output_cost_per_mtok: float = 0.0
+
+
+# 既定値: 既存の GENERATION_GROUPS（最大14項目）をそのまま1グループ1呼び出しで生成する
+DEFAULT_CAPABILITY = ModelCapability(
+    context_window=32768, decode_tps=50.0, max_schema_fields=14,
+)
+
+# モデル名の前方一致で参照するレジストリ（最も長く一致したものを採用）
+MODEL_CAPABILITIES: Dict[str, ModelCapability] = {
+    # --- クラウド (Gemini): 大きなスキーマも安定して扱えるため、全項目を1回で生成する ---
+    "gemini": ModelCapability(
+        context_window=1_048_576, decode_tps=150.0, max_schema_fields=64, merge_groups=True,
+        input_cost_per_mtok=0.10, output_cost_per_mtok=0.40,
+    ),
+    "gemini-2.5-pro": ModelCapability(
+        context_window=1_048_576, decode_tps=80.0, max_schema_fields=64, merge_groups=True,
+        input_cost_per_mtok=1.25, output_cost_per_mtok=10.0,
+    ),
+    "gemini-2.5-flash": ModelCapability(
+        context_window=1_048_576, decode_tps=200.0, max_schema_fields=64, merge_groups=True,
+        input_cost_per_mtok=0.30, output_cost_per_mtok=2.50,
+    ),
+    "gemini-2.5-flash-lite": ModelCapability(
+        context_window=1_048_576, decode_tps=250.0, max_schema_fields=64, merge_groups=True,
+        input_cost_per_mtok=0.10, output_cost_per_mtok=0.40,
+    ),
+    # --- ローカル (Ollama): 小さなモデルほど1回あたりの項目数を絞り、並列呼び出しで補う ---
+    "qwen3:0.6b": ModelCapability(
+        context_window=40960, decode_tps=60.0, max_schema_fields=1,
+    ),
+    "qwen3:1.7b": ModelCapability(
+        context_window=40960, decode_tps=45.0, max_schema_fields=3,
+    ),
+    "qwen3:4b": ModelCapability(
+        context_window=40960, decode_tps=30.0, max_schema_fields=6,
+    ),
+    "qwen3:8b": ModelCapability(
+        context_window=40960, decode_tps=20.0, max_schema_fields=10,
+    ),
+    "qwen3": ModelCapability(
+        context_window=40960, decode_tps=20.0, max_schema_fields=6,
+    ),
+    "gemma3:1b": ModelCapability(
+        context_window=32768, decode_tps=60.0, max_schema_fields=2,
+    ),
+    "gemma3": ModelCapability(
+        context_window=131072, decode_tps=25.0, max_schema_fields=8,
+    ),
+    "llama3.2": ModelCapability(
+        context_window=131072, decode_tps=45.0, max_schema_fields=4,
+    ),
+}
+
+
+def get_model_capability(model_name: Optional[str]) -> ModelCapability:
+    """
+    モデル名から性能プロファイルを取得します。
+
+    レジストリに該当しないモデルは DEFAULT_CAPABILITY を返します。
+    環境変数 LLM_MAX_SCHEMA_FIELDS が設定されている場合は、1回あたりの項目数上限を上書きします。
+
+    Args:
+        model_name (Optional[str]): LLMクライアントの model_name
+
+    Returns:
+        ModelCapability: 該当するプロファイル
+    """
+    capability = DEFAULT_CAPABILITY
+    if isinstance(model_name, str):
+        name = model_name.lower()
+        matches = [prefix for prefix in MODEL_CAPABILITIES if name.startswith(prefix)]
+        if matches:
+            capability = MODEL_CAPABILITIES[max(matches, key=len)]
+
+    override = os.getenv("LLM_MAX_SCHEMA_FIELDS")
+    if override:
+        capability = replace(capability, max_schema_fields=max(1, int(override)))
+
+    return capability
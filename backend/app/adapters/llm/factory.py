@@ -28,4 +28,23 @@ def get_llm_client() -> LLMClient:
     else:
         # 想定外の値が設定されている場合は、安全のためデフォルト(Gemini)にフォールバックします
         print(f"[LLM Factory] Warning: Unknown provider '{provider}'. Falling back to Gemini.")
-        return GeminiClient()
\ No newline at end of file
+        return GeminiClient()
+
+
+@lru_cache()
+def create_llm_client(provider: str, model_name: str) -> LLMClient:
+    """
+    プロバイダーとモデル名を指定してLLMクライアントを生成します（モデル振り分け用）。
+    同じ組み合わせのクライアントはキャッシュして再利用します。
+
+    Raises:
+        ValueError: 未対応のプロバイダーが指定された場合
+    """
+    provider = provider.lower()
+    print(f"[LLM Factory] Creating client for route: {provider}:{model_name}")
+
+    if provider == "gemini":
+        return GeminiClient(model_name=model_name)
+    if provider == "ollama":
+        return OllamaClient(model_name=model_name)
+    raise ValueError(f"Unknown LLM provider: {provider}")
\ No newline at end of file
@@ -1,13 +1,23 @@
 import asyncio
 import json
 import os
-from typing import Any, Dict, Type
+from typing import Any, Dict, Optional, Type
 
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from pydantic import BaseModel
 
+from app.core.request_context import remaining
+from app.usecases.utils.token_counter import get_token_calibrator
+
 from .base import LLMClient
+from .json_repair import PartialJSONError, parse_llm_json
+from .key_pool import ApiKeyPool, parse_quota_ids, parse_retry_delay
+from .thinking import get_thinking_budget, get_thinking_channel, get_thinking_label
+
+# 思考を無効化できない (thinking_budget=0 を受け付けない) モデルと、その最小予算
+_THINKING_REQUIRED_PREFIXES = ("gemini-2.5-pro",)
+_MIN_THINKING_BUDGET = 128
 
 
 class GeminiClient(LLMClient):
@@ -15,24 +25,117 @@ class GeminiClient(LLMClient):
     Google Gemini (新ライブラリ google-genai) 用のLLMクライアント実装。
 
     Attributes:
-        client (genai.Client): Google GenAI SDKのクライアントインスタンス。
+        client (genai.Client): Google GenAI SDKのクライアントインスタンス（プールの先頭のキー）。
         model_name (str): 使用するモデル名 (デフォルト: gemini-2.5-flash-lite)。
+        key_pool (ApiKeyPool): APIキー（プロジェクト）ごとのクライアントのプール。
     """
 
-    def __init__(self):
+    # response_json_schema の description はモデルに渡されるため、プロンプトに出力形式の一覧は不要
+    enforces_schema = True
+
+    def __init__(self, model_name: Optional[str] = None):
         """
         環境変数からAPIキーとモデル名を取得して初期化します。
+
+        ENV Variables:
+            GEMINI_API_KEYS: カンマ区切りの複数キー（プロジェクトごとのクォータ枠に分散）。未設定なら GEMINI_API_KEY
+            GEMINI_KEY_RPM: キーごとの1分あたりのリクエスト上限 (default: 未設定。429 の発生時点から推定)
+            GEMINI_KEY_COOLDOWN_SEC: 429 に retryDelay が含まれない場合のクールダウン秒数 (default: 60)
+            GEMINI_POOL_MAX_WAIT_SEC: 全キーがクールダウン中の場合に待機する上限秒数 (default: 30)
+
+        Args:
+            model_name (Optional[str]): 使用するモデル名。省略時は環境変数 GEMINI_MODEL（モデル振り分け時に指定）。
         """
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        api_keys = [key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",") if key.strip()]
+        if not api_keys and os.getenv("GEMINI_API_KEY"):
+            api_keys = [os.getenv("GEMINI_API_KEY")]
+        if not api_keys:
             # 開発時の警告用（本番ではログ出力を推奨）
             print("[GeminiClient] Warning: GEMINI_API_KEY is not set.")
 
-        self.client = genai.Client(api_key=api_key)
-
         # 指定されたモデル名を使用 (デフォルトは gemini-2.5-flash-lite)
-        self.model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite")
-        print(f"[GeminiClient] Initialized with model: {self.model_name} (google-genai)")
+        self.model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite")
+
+        # クォータはモデルごとに管理されるため、プールもクライアント（モデル）ごとに持つ
+        rpm_limit = os.getenv("GEMINI_KEY_RPM")
+        self.key_pool = ApiKeyPool(
+            name=self.model_name,
+            keys=api_keys,
+            client_factory=lambda key: genai.Client(api_key=key),
+            rpm_limit=int(rpm_limit) if rpm_limit else None,
+            default_cooldown_sec=float(os.getenv("GEMINI_KEY_COOLDOWN_SEC", "60")),
+            max_wait_sec=float(os.getenv("GEMINI_POOL_MAX_WAIT_SEC", "30")),
+        )
+        self.client = self.key_pool.keys[0].client
+        print(f"[GeminiClient] Initialized with model: {self.model_name} (google-genai, {len(self.key_pool)} keys)")
+
+    async def _generate_content(self, **kwargs: Any) -> Any:
+        """
+        キープールから残りクォータの多いキーを選んで generate_content を実行します。
+        429 (RESOURCE_EXHAUSTED) の場合はそのキーをクールダウンさせ、別のキーで再試行します。
+        """
+        attempts = len(self.key_pool)
+        for attempt in range(attempts):
+            key = await self.key_pool.acquire()
+            try:
+                # 同期メソッドを別スレッドで実行し、イベントループをブロックしないようにする
+                return await asyncio.to_thread(key.client.models.generate_content, **kwargs)
+            except errors.APIError as e:
+                if e.code != 429:
+                    raise
+                self.key_pool.report_rate_limited(key, parse_retry_delay(e.details), parse_quota_ids(e.details))
+                if attempt == attempts - 1:
+                    raise
+            finally:
+                self.key_pool.release(key)
+
+    @staticmethod
+    def _http_options() -> Optional[types.HttpOptions]:
+        """
+        リクエストの締め切りが設定されている場合、残り時間をAPI呼び出しのタイムアウトにします。
+        （スレッドで実行中の同期呼び出しはキャンセルできないため、HTTP側で打ち切る）
+        """
+        left = remaining()
+        if left is None:
+            return None
+        return types.HttpOptions(timeout=max(1, int(left * 1000)))
+
+    def _thinking_config(self) -> Optional[types.ThinkingConfig]:
+        """
+        生成単位ごとの思考トークンの予算 (thinking_scope) を ThinkingConfig に変換します。
+        予算が設定されていない場合はモデルの既定動作に任せます。
+        """
+        budget = get_thinking_budget()
+        if budget is None:
+            return None
+        if budget == 0 and self.model_name.startswith(_THINKING_REQUIRED_PREFIXES):
+            # 思考を無効化できないモデルは最小の予算にする
+            budget = _MIN_THINKING_BUDGET
+        return types.ThinkingConfig(
+            thinking_budget=budget,
+            include_thoughts=budget > 0 and get_thinking_channel() is not None,
+        )
+
+    @staticmethod
+    def _capture_thoughts(response: Any) -> None:
+        """レスポンスに含まれる思考の要約 (thought パート) を ThinkingChannel に渡します。"""
+        channel = get_thinking_channel()
+        if channel is None:
+            return
+        for candidate in getattr(response, "candidates", None) or []:
+            content = getattr(candidate, "content", None)
+            for part in getattr(content, "parts", None) or []:
+                if getattr(part, "thought", False) and isinstance(part.text, str):
+                    channel.write(get_thinking_label(), part.text)
+        usage = getattr(response, "usage_metadata", None)
+        thoughts_tokens = getattr(usage, "thoughts_token_count", None)
+        if isinstance(thoughts_tokens, int) and thoughts_tokens:
+            channel.write(get_thinking_label(), "", tokens=thoughts_tokens)
+
+    def _observe_prompt_tokens(self, prompt: str, response: Any) -> None:
+        """応答に含まれる実際のプロンプトトークン数で、推定値の補正係数を更新します。"""
+        usage = getattr(response, "usage_metadata", None)
+        get_token_calibrator().observe(self.model_name, prompt, getattr(usage, "prompt_token_count", None))
 
     async def generate_text(self, prompt: str) -> str:
         """
@@ -48,15 +151,18 @@ class GeminiClient(LLMClient):
         print(f"[GeminiClient] Generating text with {self.model_name}...")
 
         try:
-            # 同期メソッドを別スレッドで実行し、イベントループをブロックしないようにする
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
+            # キープール経由で別スレッドで実行し、イベントループをブロックしないようにする
+            response = await self._generate_content(
                 model=self.model_name,
                 contents=prompt,
                 config=types.GenerateContentConfig(
-                    temperature=0.7
+                    temperature=0.7,
+                    http_options=self._http_options(),
+                    thinking_config=self._thinking_config(),
                 ),
             )
+            self._capture_thoughts(response)
+            self._observe_prompt_tokens(prompt, response)
             return response.text
 
         except Exception as e:
@@ -87,20 +193,27 @@ class GeminiClient(LLMClient):
                 response_mime_type="application/json",
                 response_json_schema=schema.model_json_schema(),
                 temperature=0.7,
+                http_options=self._http_options(),
+                thinking_config=self._thinking_config(),
             )
 
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
+            response = await self._generate_content(
                 model=self.model_name,
                 contents=prompt,
                 config=config,
             )
+            self._capture_thoughts(response)
+            self._observe_prompt_tokens(prompt, response)
 
             # レスポンスがJSON文字列として返ってくるため、パースして辞書で返す
             # Pydanticモデルでのバリデーションは呼び出し元で行う想定だが、
             # ここでは純粋なDictを返す契約とする
             try:
-                return json.loads(response.text)
+                return parse_llm_json(response.text, schema)
+            except PartialJSONError as e:
+                # 出力が途中で切れた場合など。取り出せた項目は例外に含めて呼び出し元へ渡す
+                print(f"[GeminiClient] Salvaged partial JSON. Missing: {e.missing}")
+                raise
             except json.JSONDecodeError:
                 # 万が一JSON以外が返ってきた場合のフェイルセーフ
                 # Pydanticの `model_validate_json` を使う手もあるが、
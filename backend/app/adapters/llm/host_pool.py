@@ -0,0 +1,250 @@
+import asyncio
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+import httpx
+
+# レイテンシの指数移動平均の重み（直近の1回の比重）
+LATENCY_EWMA_ALPHA = 0.3
+
+# 有効なホストプール（メトリクス表示・ドレイン操作用）。クライアントの破棄とともに自動的に外れる
+_active_pools: "weakref.WeakSet[OllamaHostPool]" = weakref.WeakSet()
+
+
+class NoHostAvailableError(RuntimeError):
+    """割り当て可能なホストがない場合（全ホストがドレイン中、または再試行で使い切った場合）に送出される例外。"""
+
+
+class OllamaHost:
+    """
+    1台の Ollama サーバーの状態。
+
+    Attributes:
+        url (str): 接続先 (例: http://gpu-1:11434)
+        client (Any): このホストに接続する ollama.Client
+        healthy (bool): 直近のヘルスチェック・リクエストが成功しているか
+        draining (bool): ドレイン中か（新しいリクエストを割り当てず、実行中のものは完了させる）
+        loaded_models (Set[str]): メモリにロード済みのモデル名（ヘルスチェック時に /api/ps で取得）
+    """
+
+    def __init__(self, url: str, client: Any):
+        self.url = url
+        self.client = client
+        self.healthy = True
+        self.draining = False
+        self.loaded_models: Set[str] = set()
+        self.in_flight = 0
+        self.total_requests = 0
+        self.failures = 0
+        self.latency_ewma_sec: Optional[float] = None
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def has_model(self, model_name: str) -> bool:
+        return model_name in self.loaded_models or f"{model_name}:latest" in self.loaded_models
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "total_requests": self.total_requests,
+            "failures": self.failures,
+            "latency_ewma_sec": round(self.latency_ewma_sec, 3) if self.latency_ewma_sec is not None else None,
+            "loaded_models": sorted(self.loaded_models),
+            "last_error": self.last_error,
+        }
+
+
+class OllamaHostPool:
+    """
+    複数の Ollama サーバーにリクエストを分散するプール。
+
+    - 実行中のリクエストが最も少ないホストを選ぶ (least outstanding requests)
+    - 対象モデルがロード済みのホストを優先する（未ロードのホストは cold_penalty 件分の実行中リクエストとみなす）
+    - 同じ場合はレイテンシの移動平均が小さいホスト
+    - 接続に失敗したホストは次のヘルスチェックで復旧するまで割り当てない
+    - ドレイン中のホストには新しいリクエストを割り当てない（実行中のものはそのまま完了させる）
+
+    リクエスト自体はワーカースレッドから実行されるため、状態の更新はロックで保護します。
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        client_factory: Callable[[str], Any],
+        health_check_interval_sec: float = 15.0,
+        cold_penalty: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.hosts: List[OllamaHost] = [OllamaHost(url, client_factory(url)) for url in urls]
+        self.health_check_interval_sec = health_check_interval_sec
+        self.cold_penalty = cold_penalty
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._health_task: Optional[asyncio.Task] = None
+        _active_pools.add(self)
+
+    def __len__(self) -> int:
+        return len(self.hosts)
+
+    def get_host(self, url: str) -> Optional[OllamaHost]:
+        return next((host for host in self.hosts if host.url == url.rstrip("/")), None)
+
+    def _select(self, model_name: str, exclude: Set[str]) -> Optional[OllamaHost]:
+        candidates = [host for host in self.hosts if not host.draining and host.url not in exclude]
+        # 全ホストが異常と判定されている場合も、復旧している可能性があるため試行する
+        healthy = [host for host in candidates if host.healthy] or candidates
+        if not healthy:
+            return None
+        return min(healthy, key=lambda h: (
+            h.in_flight + (0 if h.has_model(model_name) else self.cold_penalty),
+            h.latency_ewma_sec or 0.0,
+        ))
+
+    @contextmanager
+    def lease(self, model_name: str, exclude: Optional[Set[str]] = None) -> Iterator[OllamaHost]:
+        """
+        リクエストに使用するホストを選び、実行中として記録します（任意のスレッドから呼び出し可能）。
+        正常に終了した場合はレイテンシを、接続エラーの場合はホストの異常を記録します。
+
+        Raises:
+            NoHostAvailableError: 割り当て可能なホストがない場合（全ホストがドレイン中など）
+        """
+        with self._lock:
+            host = self._select(model_name, exclude or set())
+            if host is None:
+                raise NoHostAvailableError("No Ollama host available (all hosts are draining or excluded)")
+            host.in_flight += 1
+            host.total_requests += 1
+        started = self._clock()
+        try:
+            yield host
+        except Exception as e:
+            with self._lock:
+                host.failures += 1
+                if is_connection_error(e):
+                    host.healthy = False
+                    host.last_error = str(e)
+                    print(f"[OllamaHostPool] Host {host.url} marked unhealthy: {e}")
+            raise
+        else:
+            elapsed = self._clock() - started
+            with self._lock:
+                host.healthy = True
+                host.loaded_models.add(model_name)
+                host.latency_ewma_sec = elapsed if host.latency_ewma_sec is None else (
+                    LATENCY_EWMA_ALPHA * elapsed + (1 - LATENCY_EWMA_ALPHA) * host.latency_ewma_sec
+                )
+        finally:
+            with self._lock:
+                host.in_flight = max(0, host.in_flight - 1)
+
+    def probe(self, host: OllamaHost) -> None:
+        """
+        ホストの死活とロード済みモデルを /api/ps で確認します（同期。スレッドから呼び出してください）。
+        """
+        try:
+            response = host.client.ps()
+            loaded = {model.model or model.name for model in response.models if (model.model or model.name)}
+        except Exception as e:
+            with self._lock:
+                if host.healthy:
+                    print(f"[OllamaHostPool] Health check failed for {host.url}: {e}")
+                host.healthy = False
+                host.last_error = str(e)
+                host.last_checked = self._clock()
+            return
+
+        with self._lock:
+            if not host.healthy:
+                print(f"[OllamaHostPool] Host {host.url} recovered.")
+            host.healthy = True
+            host.last_error = None
+            host.loaded_models = loaded
+            host.last_checked = self._clock()
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(asyncio.to_thread(self.probe, host) for host in self.hosts))
+
+    def ensure_health_checks(self) -> None:
+        """
+        定期ヘルスチェックのタスクを（未起動なら）現在のイベントループで起動します。
+        ホストが1台の場合は振り分け先がないため起動しません。
+        """
+        if len(self.hosts) <= 1 or self.health_check_interval_sec <= 0:
+            return
+        if self._health_task is not None and not self._health_task.done():
+            return
+        self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    async def _health_loop(self) -> None:
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.health_check_interval_sec)
+
+    def set_draining(self, url: str, draining: bool = True) -> Optional[OllamaHost]:
+        """ホストのドレイン状態を切り替えます。該当するホストがない場合は None を返します。"""
+        host = self.get_host(url)
+        if host is None:
+            return None
+        with self._lock:
+            host.draining = draining
+        print(f"[OllamaHostPool] Host {host.url} {'draining' if draining else 'back in rotation'} "
+              f"(in_flight={host.in_flight})")
+        return host
+
+    async def wait_drained(self, url: str, timeout_sec: float = 60.0, poll_sec: float = 0.5) -> bool:
+        """ドレイン中のホストの実行中リクエストが0件になるまで待ちます。完了したら True を返します。"""
+        host = self.get_host(url)
+        if host is None:
+            return False
+        deadline = self._clock() + timeout_sec
+        while host.in_flight > 0:
+            left = deadline - self._clock()
+            if left <= 0:
+                return False
+            await asyncio.sleep(min(poll_sec, left))
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "healthy_hosts": sum(1 for host in self.hosts if host.healthy and not host.draining),
+                "hosts": [host.snapshot() for host in self.hosts],
+            }
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """ホスト自体に接続できない（別のホストで再試行すべき）エラーかを判定します。"""
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+def parse_host_urls(value: str) -> List[str]:
+    """カンマ区切りの接続先を、重複と末尾の "/" を除いたリストに変換します。"""
+    urls: List[str] = []
+    for url in (part.strip().rstrip("/") for part in value.split(",")):
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def active_host_pools() -> List[Dict[str, Any]]:
+    """生存しているホストプールの状態を返します（メトリクス表示用）。"""
+    return [pool.snapshot() for pool in list(_active_pools)]
+
+
+def set_host_draining(url: str, draining: bool = True) -> List[OllamaHost]:
+    """全てのホストプールで、指定した接続先のドレイン状態を切り替えます。"""
+    return [host for pool in list(_active_pools) if (host := pool.set_draining(url, draining)) is not None]
+
+
+async def wait_host_drained(url: str, timeout_sec: float) -> bool:
+    """全てのホストプールで、指定した接続先の実行中リクエストが0件になるまで待ちます。完了したら True を返します。"""
+    pools = [pool for pool in list(_active_pools) if pool.get_host(url) is not None]
+    results = await asyncio.gather(*(pool.wait_drained(url, timeout_sec) for pool in pools))
+    return all(results)
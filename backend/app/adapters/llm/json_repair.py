@@ -0,0 +1,199 @@
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
+
+from app.core import json_codec
+
+# 思考プロセスのタグ (Thinking Models が本文に含めて出力する場合がある)
+_THINK_BLOCK = re.compile(r"<think(?:ing)?>.*?</think(?:ing)?>", re.DOTALL | re.IGNORECASE)
+_THINK_CLOSE = re.compile(r"</think(?:ing)?>", re.IGNORECASE)
+# ```json ... ``` のコードフェンス（閉じていない場合も含む）
+_CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class PartialJSONError(ValueError):
+    """
+    LLMの出力が壊れたJSONで、一部の項目だけを取り出せた場合に送出される例外。
+
+    Attributes:
+        partial (Dict[str, Any]): スキーマに適合した（完全な）項目
+        missing (List[str]): 取り出せなかった、または不正な値だった項目
+    """
+
+    def __init__(self, partial: Dict[str, Any], missing: List[str]):
+        super().__init__(f"Malformed JSON output. Salvaged {len(partial)} fields, missing: {missing}")
+        self.partial = partial
+        self.missing = missing
+
+
+def _strip_wrappers(text: str) -> str:
+    """思考タグとコードフェンスを取り除き、最初の { または [ から始まる文字列を返す。"""
+    text = _THINK_BLOCK.sub("", text)
+    # 開始タグが出力されず、閉じタグだけが残っている場合はそれ以前を捨てる
+    closing = list(_THINK_CLOSE.finditer(text))
+    if closing:
+        text = text[closing[-1].end():]
+
+    fence = _CODE_FENCE.search(text)
+    if fence:
+        text = fence.group(1)
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    return text[min(starts):] if starts else ""
+
+
+def _scan(text: str) -> Tuple[str, List[str], bool, List[Tuple[int, List[str]]]]:
+    """
+    JSON文字列を1文字ずつ走査し、末尾カンマを除いた文字列と閉じていない括弧を返す。
+
+    Returns:
+        (整形済みの文字列, 閉じていない括弧のスタック, 文字列の途中で終わったか,
+         値の区切り位置（カンマ・開き括弧の直後）とその時点のスタック)
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, List[str]]] = []
+    in_string = escape = False
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+            out.append(ch)
+            cuts.append((len(out), list(stack)))
+            continue
+        elif ch in "}]":
+            # 末尾カンマ ({"a": 1,} など) を取り除く
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack and stack[-1] == ch:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                # トップレベルの値が閉じたら、それ以降（説明文など）は無視する
+                return "".join(out), [], False, cuts
+            continue
+        elif ch == ",":
+            cuts.append((len(out), list(stack)))
+        out.append(ch)
+
+    return "".join(out), stack, in_string, cuts
+
+
+def repair_json(text: str) -> Any:
+    """
+    壊れたJSON文字列を可能な範囲で修復してパースする。
+
+    - 思考タグ (<think>...</think>) とコードフェンスを取り除く
+    - 末尾カンマを取り除く
+    - 途中で切れた出力は、閉じていない括弧を補って閉じる
+      （途中で切れた文字列や値のない項目は不完全な値として、直前の区切りまで捨てる）
+
+    Raises:
+        json.JSONDecodeError: 修復してもパースできない場合
+    """
+    body = _strip_wrappers(text)
+    cleaned, stack, in_string, cuts = _scan(body)
+
+    candidates = []
+    if not stack:
+        candidates.append(cleaned)
+    elif not in_string:
+        candidates.append(cleaned.rstrip().rstrip(",") + "".join(reversed(stack)))
+    # 末尾から区切り位置まで戻して閉じる（不完全な最後の項目を捨てる）
+    for position, open_stack in reversed(cuts):
+        candidates.append(cleaned[:position].rstrip().rstrip(",") + "".join(reversed(open_stack)))
+
+    for candidate in candidates:
+        try:
+            return json_codec.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    # 修復できなかった場合は元の文字列でのエラーを送出する
+    return json_codec.loads(text)
+
+
+@lru_cache(maxsize=512)
+def _field_adapter(schema: Type[BaseModel], field: str) -> TypeAdapter:
+    return TypeAdapter(schema.model_fields[field].annotation)
+
+
+def salvage_fields(data: Any, schema: Type[BaseModel]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    スキーマの項目ごとに値を検証し、完全な項目と不足している項目に分ける。
+
+    Returns:
+        Tuple[Dict[str, Any], List[str]]: (検証を通った項目, 不足・不正な必須項目)
+    """
+    if not isinstance(data, dict):
+        data = {}
+
+    salvaged: Dict[str, Any] = {}
+    missing: List[str] = []
+    for field, info in schema.model_fields.items():
+        if field not in data:
+            if info.is_required():
+                missing.append(field)
+            continue
+        try:
+            salvaged[field] = _field_adapter(schema, field).validate_python(data[field])
+        except ValidationError:
+            missing.append(field)
+    return salvaged, missing
+
+
+def parse_llm_json(text: str, schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    LLMの出力をJSONとしてパースし、スキーマの項目ごとに検証する。通常のパースに失敗した場合は修復を試みる。
+
+    JSONとして正しくても、必須項目の欠落や型の合わない値は修復した場合と同じく不足項目として扱う。
+
+    Raises:
+        PartialJSONError: 一部の項目だけが取り出せた場合（JSONとして正しく、項目が欠けている場合を含む）
+        json.JSONDecodeError: 修復しても1項目も取り出せなかった場合
+    """
+    error = None
+    try:
+        data = json_codec.loads(text)
+    except json.JSONDecodeError as original:
+        error = original
+        try:
+            data = repair_json(text)
+        except json.JSONDecodeError:
+            raise error
+
+    salvaged, missing = salvage_fields(data, schema)
+    if not salvaged and error is not None:
+        raise error
+    if missing:
+        raise PartialJSONError(salvaged, missing)
+    return salvaged
+
+
+def missing_fields_schema(schema: Type[BaseModel], fields: List[str]) -> Type[BaseModel]:
+    """不足している項目だけを生成し直すためのスキーマを作成する（Field定義はそのまま引き継ぐ）。"""
+    definitions: Dict[str, Any] = {
+        field: (schema.model_fields[field].annotation, schema.model_fields[field])
+        for field in fields
+        if field in schema.model_fields
+    }
+    return create_model(f"{schema.__name__}Missing", **definitions)
+
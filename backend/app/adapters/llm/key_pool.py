@@ -0,0 +1,253 @@
+import asyncio
+import re
+import time
+import weakref
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+# 1分あたりのリクエスト数を数える時間窓（秒）
+QUOTA_WINDOW_SEC = 60.0
+
+# 学習した上限は、クールダウン解除後に 429 のない時間窓ごとに2倍に戻す。
+# 設定された上限がない場合は、この回数の時間窓が経過したら学習値を破棄する
+RECOVERY_WINDOWS = 5
+
+# 有効なキープール（メトリクス表示用）。クライアントの破棄とともに自動的に外れる
+_active_pools: "weakref.WeakSet[ApiKeyPool]" = weakref.WeakSet()
+
+_RETRY_DELAY = re.compile(r"^(\d+(?:\.\d+)?)s$")
+
+
+class AllKeysRateLimitedError(RuntimeError):
+    """プール内の全てのキーがレート制限のクールダウン中の場合に送出される例外。"""
+
+    def __init__(self, retry_after_sec: float):
+        super().__init__(f"All API keys are rate limited. Retry after {retry_after_sec:.1f}s")
+        self.retry_after_sec = retry_after_sec
+
+
+class ApiKeyState:
+    """
+    1つのAPIキー（= 1つのクォータ枠。プロジェクトごとに発行したキーなど）の状態。
+
+    Attributes:
+        label (str): ログ・メトリクス表示用の識別名（キーの末尾4文字）
+        client (Any): このキーで初期化したSDKクライアント
+        rpm_limit (Optional[int]): 設定された1分あたりのリクエスト上限（None は不明）
+        learned_rpm_limit (Optional[int]): 429 の発生時点の実績から推定した上限。クールダウン解除後に徐々に戻す
+    """
+
+    def __init__(self, label: str, client: Any, rpm_limit: Optional[int] = None):
+        self.label = label
+        self.client = client
+        self.rpm_limit = rpm_limit
+        self.learned_rpm_limit: Optional[int] = None
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.total_requests = 0
+        self.rate_limited = 0
+        self.last_used = 0.0
+        self._recent: Deque[float] = deque()
+
+    def used_in_window(self, now: float) -> int:
+        while self._recent and now - self._recent[0] > QUOTA_WINDOW_SEC:
+            self._recent.popleft()
+        return len(self._recent)
+
+    def effective_rpm_limit(self, now: float) -> Optional[int]:
+        """
+        現在の1分あたりの上限。学習した上限はクールダウン解除後、429 のない時間窓ごとに2倍にし、
+        設定された上限に達したら（設定がなければ RECOVERY_WINDOWS の経過後に）学習値を破棄する。
+        """
+        if self.learned_rpm_limit is None:
+            return self.rpm_limit
+        windows = int(max(0.0, now - self.cooldown_until) // QUOTA_WINDOW_SEC)
+        probe = self.learned_rpm_limit * 2 ** windows
+        if (self.rpm_limit is not None and probe >= self.rpm_limit) or \
+                (self.rpm_limit is None and windows >= RECOVERY_WINDOWS):
+            self.learned_rpm_limit = None
+            return self.rpm_limit
+        return probe
+
+    def remaining_quota(self, now: float) -> float:
+        """時間窓内の残りリクエスト数。上限が不明な場合は無制限として扱う。"""
+        limit = self.effective_rpm_limit(now)
+        if limit is None:
+            return float("inf")
+        return limit - self.used_in_window(now)
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "key": self.label,
+            "available": self.is_available(now),
+            "cooldown_remaining_sec": round(max(0.0, self.cooldown_until - now), 1),
+            "requests_last_minute": self.used_in_window(now),
+            "rpm_limit": self.effective_rpm_limit(now),
+            "in_flight": self.in_flight,
+            "total_requests": self.total_requests,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class ApiKeyPool:
+    """
+    複数のAPIキー（プロジェクト）にリクエストを分散するプール。
+
+    - 残りクォータ（1分あたりの上限 - 直近1分の使用数）が最も多いキーを選ぶ
+      （同じ場合は実行中のリクエストが少なく、最も長く使われていないキー）
+    - 429 を受けたキーは、レスポンスの retryDelay（なければ既定値）の間クールダウンさせる。
+      retryDelay も1分あたりのリクエスト数以外のクォータ名もない場合は、その時点の使用数を上限として学習し、
+      クールダウン解除後に徐々に戻す。残りのキーはそのまま処理を続ける
+    - 全てのキーがクールダウン中の場合は、最も早く解除されるまで待つ（max_wait_sec を超える場合は例外）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        keys: List[str],
+        client_factory: Callable[[str], Any],
+        rpm_limit: Optional[int] = None,
+        default_cooldown_sec: float = 60.0,
+        max_wait_sec: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.default_cooldown_sec = default_cooldown_sec
+        self.max_wait_sec = max_wait_sec
+        self._clock = clock
+        # キーが未設定でも1つの（キーなし）クライアントで動作させる
+        self.keys: List[ApiKeyState] = [
+            ApiKeyState(label=f"...{key[-4:]}" if key else "(unset)", client=client_factory(key), rpm_limit=rpm_limit)
+            for key in (keys or [None])
+        ]
+        _active_pools.add(self)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _select(self, now: float) -> Optional[ApiKeyState]:
+        candidates = [key for key in self.keys if key.is_available(now) and key.remaining_quota(now) > 0]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda k: (k.remaining_quota(now), -k.in_flight, -k.last_used))
+
+    async def acquire(self) -> ApiKeyState:
+        """
+        リクエストに使用するキーを選び、使用数を記録します。
+        使用後は必ず release() を呼び出してください。
+
+        Raises:
+            AllKeysRateLimitedError: 全てのキーが max_wait_sec 以上使用できない場合
+        """
+        while True:
+            now = self._clock()
+            key = self._select(now)
+            if key is not None:
+                key.in_flight += 1
+                key.total_requests += 1
+                key.last_used = now
+                key._recent.append(now)
+                return key
+
+            wait = min(self._available_at(key, now) for key in self.keys) - now
+            if wait > self.max_wait_sec:
+                raise AllKeysRateLimitedError(wait)
+            print(f"[ApiKeyPool:{self.name}] All keys are rate limited. Waiting {wait:.1f}s")
+            await asyncio.sleep(max(wait, 0.01))
+
+    def _available_at(self, key: ApiKeyState, now: float) -> float:
+        available_at = key.cooldown_until
+        if key.remaining_quota(now) <= 0 and key._recent:
+            available_at = max(available_at, key._recent[0] + QUOTA_WINDOW_SEC)
+        return available_at
+
+    def release(self, key: ApiKeyState) -> None:
+        key.in_flight = max(0, key.in_flight - 1)
+
+    def report_rate_limited(
+        self,
+        key: ApiKeyState,
+        retry_after_sec: Optional[float] = None,
+        quota_ids: Optional[Sequence[str]] = None,
+    ) -> None:
+        """
+        429 を受けたキーをクールダウンさせます。
+
+        retryDelay がなく、超過したクォータが1分あたりのリクエスト数（または不明）の場合に限り、
+        直近1分の使用数からクォータを学習します（トークン数や1日の上限による 429 から RPM を推定しない）。
+
+        Args:
+            key (ApiKeyState): 429 を受けたキー
+            retry_after_sec (Optional[float]): レスポンスの retryDelay（秒）
+            quota_ids (Optional[Sequence[str]]): レスポンスの QuotaFailure に含まれる quotaId
+        """
+        now = self._clock()
+        cooldown = retry_after_sec if retry_after_sec is not None else self.default_cooldown_sec
+        key.cooldown_until = max(key.cooldown_until, now + cooldown)
+        key.rate_limited += 1
+        if retry_after_sec is None and all(is_rpm_quota(quota_id) for quota_id in quota_ids or ()):
+            observed = max(1, key.used_in_window(now) - 1)
+            current = key.effective_rpm_limit(now)
+            key.learned_rpm_limit = observed if current is None else min(current, observed)
+        print(f"[ApiKeyPool:{self.name}] Key {key.label} rate limited. Cooling down {cooldown:.1f}s "
+              f"(learned rpm_limit={key.learned_rpm_limit})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "name": self.name,
+            "available_keys": sum(1 for key in self.keys if key.is_available(now)),
+            "keys": [key.snapshot(now) for key in self.keys],
+        }
+
+
+def parse_retry_delay(details: Any) -> Optional[float]:
+    """
+    429 エラーのレスポンス (google.rpc.RetryInfo) から retryDelay（"31s" など）を秒数で取り出します。
+    """
+    stack = [details]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            delay = node.get("retryDelay")
+            if isinstance(delay, str):
+                match = _RETRY_DELAY.match(delay.strip())
+                if match:
+                    return float(match.group(1))
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+def parse_quota_ids(details: Any) -> List[str]:
+    """
+    429 エラーのレスポンス (google.rpc.QuotaFailure) から、超過したクォータの quotaId
+    （"GenerateRequestsPerMinutePerProjectPerModel-FreeTier" など）を取り出します。
+    """
+    quota_ids = []
+    stack = [details]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            quota_id = node.get("quotaId")
+            if isinstance(quota_id, str):
+                quota_ids.append(quota_id)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return quota_ids
+
+
+def is_rpm_quota(quota_id: str) -> bool:
+    """quotaId が1分あたりのリクエスト数のクォータかどうか（トークン数や1日の上限は False）。"""
+    name = quota_id.lower()
+    return "requests" in name and "perminute" in name
+
+
+def active_key_pools() -> List[Dict[str, Any]]:
+    """生存しているキープールの状態を返します（メトリクス表示用）。"""
+    return [pool.snapshot() for pool in list(_active_pools)]
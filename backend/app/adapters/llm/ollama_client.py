@@ -1,99 +1,226 @@
 import asyncio
 import json
 import os
-import sys
-from typing import Any, Dict, Type
+import threading
+from typing import Any, Dict, Optional, Set, Type
 
 from ollama import Client
 from pydantic import BaseModel
 
+from app.core import json_codec
+from app.usecases.utils.token_counter import get_token_calibrator
+
 from .base import LLMClient
+from .host_pool import OllamaHostPool, is_connection_error, parse_host_urls
+from .json_repair import PartialJSONError, parse_llm_json
+from .thinking import get_thinking_budget, get_thinking_channel, get_thinking_label
 
 
 class OllamaClient(LLMClient):
     """
     Ollama (公式Pythonライブラリ) 用のLLMクライアント実装。
-    Thinking Models (思考プロセス) のストリーミング表示や、
+    Thinking Models (思考プロセス) のストリーミング記録と思考トークンの予算制御や、
     構造化出力 (Structured Outputs) のオンオフ制御に対応しています。
 
     Attributes:
-        client (ollama.Client): Ollamaクライアントインスタンス。
+        client (ollama.Client): Ollamaクライアントインスタンス（プールの先頭のホスト）。
+        host_pool (OllamaHostPool): 接続先のOllamaサーバーのプール。
         model_name (str): 使用するモデル名。
-        enable_thinking (bool): Thinking機能（思考プロセスの表示）を有効にするか。
+        enable_thinking (bool): Thinking機能（思考プロセスの記録）を有効にするか。
         enable_structured_output (bool): JSON Schemaによる厳格な構造化出力を有効にするか。
+        num_ctx (int): コンテキスト長（入力+出力のトークン数の上限）。プロンプトの予算管理にも使用します。
     """
 
-    def __init__(self):
+    # format のJSON Schemaは出力の文法制約にだけ使われ、description はモデルに渡らない。
+    # そのため構造化出力が有効でも、プロンプトには出力形式の一覧（項目の説明）を載せる
+    enforces_schema = False
+
+    def __init__(self, model_name: Optional[str] = None):
         """
         環境変数から設定を取得して初期化します。
+        model_name を指定した場合は OLLAMA_MODEL より優先します（モデル振り分け時に指定）。
         
         ENV Variables:
+            OLLAMA_BASE_URLS: カンマ区切りの複数の接続先（実行中のリクエストが少ないホストに分散）。未設定なら OLLAMA_BASE_URL
             OLLAMA_BASE_URL: 接続先 (default: http://localhost:11434)
+            OLLAMA_HEALTH_CHECK_INTERVAL_SEC: 複数ホスト時のヘルスチェック間隔 (default: 15)
             OLLAMA_MODEL: モデル名 (default: qwen3:0.6b)
-            OLLAMA_ENABLE_THINKING: "true"で思考プロセスを表示 (default: false)
+            OLLAMA_ENABLE_THINKING: "true"で思考プロセスを記録 (default: false)
             OLLAMA_ENABLE_STRUCTURED_OUTPUT: "true"でSchema強制モード有効 (default: true)
+            OLLAMA_NUM_CTX: コンテキスト長 (default: 8192)。超えた分はプロンプトの先頭から切り捨てられるため明示的に指定する
         """
-        host = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-        self.client = Client(host=host)
+        hosts = parse_host_urls(os.getenv("OLLAMA_BASE_URLS", "")) or parse_host_urls(
+            os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        )
+        self.host_pool = OllamaHostPool(
+            urls=hosts,
+            client_factory=lambda url: Client(host=url),
+            health_check_interval_sec=float(os.getenv("OLLAMA_HEALTH_CHECK_INTERVAL_SEC", "15")),
+        )
+        self.client = self.host_pool.hosts[0].client
         
-        self.model_name = os.getenv("OLLAMA_MODEL", "qwen3:0.6b")
+        self.model_name = model_name or os.getenv("OLLAMA_MODEL", "qwen3:0.6b")
         
         # 機能トグル (文字列判定)
         self.enable_thinking = os.getenv("OLLAMA_ENABLE_THINKING", "false").lower() == "true"
         self.enable_structured_output = os.getenv("OLLAMA_ENABLE_STRUCTURED_OUTPUT", "true").lower() == "true"
+        self.num_ctx = int(os.getenv("OLLAMA_NUM_CTX", "8192"))
+
+        print(f"[OllamaClient] Initialized: {self.model_name} @ {', '.join(hosts)}")
+        print(f"               Thinking: {self.enable_thinking}, StructuredOutput: {self.enable_structured_output}, num_ctx: {self.num_ctx}")
 
-        print(f"[OllamaClient] Initialized: {self.model_name} @ {host}")
-        print(f"               Thinking: {self.enable_thinking}, StructuredOutput: {self.enable_structured_output}")
+    def _options(self) -> Dict[str, Any]:
+        return {"temperature": 0.7, "num_ctx": self.num_ctx}
+
+    def _observe_prompt_tokens(self, messages: list, response: Any) -> None:
+        """応答に含まれる実際のプロンプトトークン数で、推定値の補正係数を更新します。"""
+        prompt = "\n".join(m.get("content", "") for m in messages if isinstance(m, dict))
+        get_token_calibrator().observe(self.model_name, prompt, getattr(response, "prompt_eval_count", None))
+
+    def _run_chat_stream(
+        self,
+        messages: list,
+        format_schema: Any = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> str:
+        """
+        ホストプールから接続先を選んでチャット処理を実行します。
+        ホストに接続できない場合は、そのホストを除外して別のホストで再試行します。
+        """
+        tried: Set[str] = set()
+        while True:
+            current = None
+            try:
+                with self.host_pool.lease(self.model_name, exclude=tried) as host:
+                    current = host.url
+                    return self._chat_on_host(host.client, messages, format_schema, cancel_event)
+            except Exception as e:
+                if current is None or not is_connection_error(e) or len(tried) + 1 >= len(self.host_pool):
+                    raise
+                tried.add(current)
+                print(f"[OllamaClient] Host {current} unreachable. Retrying on another host...")
 
-    def _run_chat_stream(self, messages: list, format_schema: Any = None) -> str:
+    def _chat_on_host(
+        self,
+        client: Client,
+        messages: list,
+        format_schema: Any = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> str:
         """
-        同期的なチャット処理を実行する内部メソッド。
-        Thinking機能が有効な場合はストリーミングで思考を表示します。
+        1台のホストで同期的なチャット処理を実行する内部メソッド。
+        Thinking機能が有効な場合はストリーミングで受信し、思考プロセスを ThinkingChannel に渡します。
+
+        思考トークンの予算 (thinking_scope) が設定されている場合:
+            - 0: 思考させずに回答させる
+            - 正の値: 思考が予算を超えた時点でストリームを打ち切り、
+              そこまでの思考を引き継いで思考なし（回答モード）で回答を生成させる
         
         Args:
+            client: 接続先ホストの ollama.Client
             messages: チャットメッセージリスト
             format_schema: JSON Schema (Structured Output用) または 'json' 文字列
+            cancel_event: セットされたらストリーミングを打ち切るイベント（呼び出し元のキャンセル・切断時）
 
         Returns:
             str: 最終的な生成コンテンツ
         """
-        # Thinking有効時はストリーミングを強制
-        stream = self.enable_thinking
-        
+        budget = get_thinking_budget()
+        # Thinking有効時はストリーミングを強制（予算0のグループは思考させない）
+        stream = self.enable_thinking and budget != 0
+
+        kwargs: Dict[str, Any] = {}
+        if self.enable_thinking and budget == 0:
+            kwargs["think"] = False
+
         # Thinkingに対応していないモデルでstream=Trueにしてもエラーにはならない
         # API呼び出し
-        response_iter = self.client.chat(
+        response_iter = client.chat(
             model=self.model_name,
             messages=messages,
             format=format_schema,
             stream=stream,
-            options={"temperature": 0.7}
+            options=self._options(),
+            **kwargs
         )
 
         if not stream:
             # ストリーミングしない場合は一括取得 (.message.content)
+            self._observe_prompt_tokens(messages, response_iter)
             return response_iter.message.content
 
-        # ストリーミング処理 (思考ログ表示 + コンテンツ蓄積)
+        # ストリーミング処理 (思考の記録 + コンテンツ蓄積)
+        # 標準出力への書き込みはワーカースレッドをブロックするため、思考は非同期のチャネルへ渡す
+        channel = get_thinking_channel()
+        label = get_thinking_label()
         final_content = []
-        print("\n[Thinking] ", end="", flush=True)
+        thinking = []
 
-        try:
-            for chunk in response_iter:
-                # 思考プロセスの表示 (Thinking Models support)
-                # chunk.message.thinking が存在すれば出力
-                if hasattr(chunk.message, 'thinking') and chunk.message.thinking:
-                    sys.stdout.write(chunk.message.thinking)
-                    sys.stdout.flush()
-                
-                # 最終回答の蓄積
-                if chunk.message.content:
-                    final_content.append(chunk.message.content)
-        finally:
-            print("\n[Thinking End]\n", flush=True)
+        for chunk in response_iter:
+            # 呼び出し元がキャンセルされた場合は、残りの生成を受け取らずに接続を閉じる
+            if cancel_event is not None and cancel_event.is_set():
+                if hasattr(response_iter, "close"):
+                    response_iter.close()
+                raise asyncio.CancelledError("Ollama stream cancelled by caller")
+
+            # 思考プロセス (Thinking Models support)
+            # ストリーミングでは1チャンクがおおよそ1トークン
+            if getattr(chunk.message, "thinking", None):
+                thinking.append(chunk.message.thinking)
+                if channel is not None:
+                    channel.write(label, chunk.message.thinking, tokens=1)
+
+                if budget is not None and not final_content and len(thinking) >= budget:
+                    if hasattr(response_iter, "close"):
+                        response_iter.close()
+                    if channel is not None:
+                        channel.mark_budget_exceeded(label)
+                    print(f"[OllamaClient] Thinking budget ({budget} tokens) exceeded for {label}. Switching to answer mode.")
+                    return self._answer_without_thinking(client, messages, format_schema, "".join(thinking))
+            
+            # 最終回答の蓄積
+            if chunk.message.content:
+                final_content.append(chunk.message.content)
+
+            # 最後のチャンクにはプロンプトのトークン数などの統計が含まれる
+            if getattr(chunk, "done", False):
+                self._observe_prompt_tokens(messages, chunk)
 
         return "".join(final_content)
 
+    def _answer_without_thinking(self, client: Client, messages: list, format_schema: Any, thinking: str) -> str:
+        """
+        打ち切った思考を assistant メッセージとして引き継ぎ、思考なしで回答だけを生成させます。
+        """
+        response = client.chat(
+            model=self.model_name,
+            messages=list(messages) + [{"role": "assistant", "content": "", "thinking": thinking}],
+            format=format_schema,
+            stream=False,
+            options=self._options(),
+            think=False
+        )
+        return response.message.content
+
+    async def _run_in_thread(self, messages: list, format_schema: Any = None) -> str:
+        """
+        _run_chat_stream をスレッドプールで実行します。
+        呼び出し元のタスクがキャンセルされた場合（クライアント切断・締め切り超過）は、
+        キャンセルイベントでスレッド側のストリーミングも打ち切ります。
+        """
+        self.host_pool.ensure_health_checks()
+        cancel_event = threading.Event()
+        try:
+            return await asyncio.to_thread(
+                self._run_chat_stream,
+                messages=messages,
+                format_schema=format_schema,
+                cancel_event=cancel_event
+            )
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+
     async def generate_text(self, prompt: str) -> str:
         """
         Ollamaを用いてテキストを生成します。
@@ -104,11 +231,7 @@ class OllamaClient(LLMClient):
         
         try:
             # スレッドプールで実行して非同期化
-            content = await asyncio.to_thread(
-                self._run_chat_stream, 
-                messages=messages, 
-                format_schema=None
-            )
+            content = await self._run_in_thread(messages=messages, format_schema=None)
             return content
 
         except Exception as e:
@@ -131,7 +254,7 @@ class OllamaClient(LLMClient):
             # 汎用JSONモード + プロンプトエンジニアリング
             format_arg = "json"
             # スキーマ情報をプロンプトに注入して指示
-            schema_json = json.dumps(schema.model_json_schema(), ensure_ascii=False)
+            schema_json = json_codec.dumps(schema.model_json_schema())
             final_prompt = (
                 f"{prompt}\n\n"
                 f"IMPORTANT: Output strictly in JSON format following this schema:\n"
@@ -142,15 +265,14 @@ class OllamaClient(LLMClient):
 
         try:
             # スレッドプールで実行
-            json_str = await asyncio.to_thread(
-                self._run_chat_stream,
-                messages=messages,
-                format_schema=format_arg
-            )
+            json_str = await self._run_in_thread(messages=messages, format_schema=format_arg)
             
-            # JSONパース
+            # JSONパース（壊れている場合は修復し、取り出せた項目だけでも返す）
             try:
-                return json.loads(json_str)
+                return parse_llm_json(json_str, schema)
+            except PartialJSONError as e:
+                print(f"[OllamaClient] Salvaged partial JSON. Missing: {e.missing}")
+                raise
             except json.JSONDecodeError:
                 print(f"[OllamaClient] JSON Decode Error. Response: {json_str[:200]}...")
                 raise
@@ -0,0 +1,179 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, create_model
+
+from app.schemas.legacy_schemas import field_complexity
+
+from .base import LLMClient
+from .capabilities import get_model_capability
+from .factory import create_llm_client
+
+# 振り分け先が設定されていない項目が使う経路の名前（LLM_PROVIDER の既定クライアント）
+DEFAULT_ROUTE = "default"
+
+
+@dataclass(frozen=True)
+class Route:
+    """
+    生成項目の振り分け先。
+
+    Attributes:
+        name (str): 経路名（難易度クラス名、または "default"）。統計の集計単位になります。
+        provider (Optional[str]): "gemini" / "ollama"。None は既定クライアントを使う。
+        model_name (Optional[str]): 使用するモデル名。None は既定クライアントを使う。
+    """
+    name: str
+    provider: Optional[str] = None
+    model_name: Optional[str] = None
+
+    def client(self, default: LLMClient) -> LLMClient:
+        if self.provider is None or self.model_name is None:
+            return default
+        return create_llm_client(self.provider, self.model_name)
+
+
+class RouteStats:
+    """経路ごとの呼び出し回数・レイテンシ・推定トークン数・推定料金の累計。"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.failures = 0
+        self.fields = 0
+        self.latency_sec = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.models: Dict[str, int] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        succeeded = self.calls - self.failures
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "fields": self.fields,
+            "avg_latency_sec": round(self.latency_sec / succeeded, 3) if succeeded else 0.0,
+            "avg_latency_per_field_sec": round(self.latency_sec / self.fields, 3) if self.fields else 0.0,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "models": dict(self.models),
+        }
+
+
+class LLMRouter:
+    """
+    生成項目の難易度クラス（legacy_schemas.field_complexity）に応じて、使用するモデルを振り分けるルーター。
+
+    例えば、20文字程度の所見 (func_*_txt) は小さなローカルモデル、
+    複数文の方針・計画 (policy_*, goal_*_action_plan_txt) は大きなモデルで生成します。
+    経路が設定されていない難易度クラスは既定のクライアントで生成します。
+
+    Attributes:
+        routes (Dict[str, Route]): 難易度クラス -> 振り分け先
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Route]] = None):
+        self.routes = routes or {}
+        self._stats: Dict[str, RouteStats] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.routes)
+
+    def route_for_field(self, field: str, description: Optional[str] = None) -> Route:
+        return self.routes.get(field_complexity(field, description), Route(DEFAULT_ROUTE))
+
+    def split(self, schema: Type[BaseModel]) -> List[Tuple[Route, Type[BaseModel]]]:
+        """
+        スキーマの項目を振り分け先ごとに分割します。
+        全項目が同じ振り分け先の場合は、元のスキーマをそのまま返します。
+
+        Returns:
+            List[Tuple[Route, Type[BaseModel]]]: (振り分け先, その経路で生成するスキーマ) のリスト（項目の定義順）
+        """
+        grouped: Dict[str, Tuple[Route, List[str]]] = {}
+        for field, info in schema.model_fields.items():
+            route = self.route_for_field(field, info.description)
+            grouped.setdefault(route.name, (route, []))[1].append(field)
+
+        if len(grouped) <= 1:
+            route = next(iter(grouped.values()))[0] if grouped else Route(DEFAULT_ROUTE)
+            return [(route, schema)]
+
+        return [
+            (route, create_model(
+                f"{schema.__name__}_{route.name}",
+                **{field: (schema.model_fields[field].annotation, schema.model_fields[field]) for field in fields},
+            ))
+            for route, fields in grouped.values()
+        ]
+
+    def record(
+        self,
+        route: Route,
+        model_name: Optional[str],
+        n_fields: int,
+        latency_sec: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        succeeded: bool = True,
+    ) -> None:
+        """1回の生成呼び出しの結果を経路ごとの統計に加算します。"""
+        stats = self._stats.setdefault(route.name, RouteStats())
+        stats.calls += 1
+        name = model_name if isinstance(model_name, str) else "unknown"
+        stats.models[name] = stats.models.get(name, 0) + 1
+        if not succeeded:
+            stats.failures += 1
+            return
+
+        capability = get_model_capability(model_name)
+        stats.fields += n_fields
+        stats.latency_sec += latency_sec
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        stats.cost_usd += (
+            input_tokens * capability.input_cost_per_mtok + output_tokens * capability.output_cost_per_mtok
+        ) / 1_000_000
+
+    def snapshot(self) -> Dict[str, Any]:
+        """振り分け設定と経路ごとの統計を返します（メトリクス表示用）。"""
+        return {
+            "routes": {
+                complexity: f"{route.provider}:{route.model_name}" for complexity, route in self.routes.items()
+            },
+            "stats": {name: stats.snapshot() for name, stats in self._stats.items()},
+        }
+
+
+def parse_routes(value: str) -> Dict[str, Route]:
+    """
+    "short=ollama:qwen3:1.7b,narrative=gemini:gemini-2.5-flash" 形式の設定を解析します。
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    routes: Dict[str, Route] = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        complexity, sep, target = item.partition("=")
+        provider, sep2, model_name = target.partition(":")
+        if not (sep and sep2 and complexity.strip() and provider.strip() and model_name.strip()):
+            raise ValueError(f"Invalid LLM route: '{item}' (expected <complexity>=<provider>:<model>)")
+        name = complexity.strip()
+        routes[name] = Route(name=name, provider=provider.strip().lower(), model_name=model_name.strip())
+    return routes
+
+
+@lru_cache()
+def get_llm_router() -> LLMRouter:
+    """
+    アプリケーション全体で共有するルーターを返します。
+    振り分け設定は環境変数 LLM_ROUTES で指定します (default: 振り分けなし)。
+        例: LLM_ROUTES="short=ollama:qwen3:1.7b,narrative=gemini:gemini-2.5-flash"
+    """
+    routes = parse_routes(os.getenv("LLM_ROUTES", ""))
+    print(f"[LLM Router] Initialized with routes: { {k: f'{r.provider}:{r.model_name}' for k, r in routes.items()} }")
+    return LLMRouter(routes)
@@ -0,0 +1,119 @@
+import asyncio
+import heapq
+import itertools
+import os
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List
+
+
+class Priority(IntEnum):
+    """
+    LLM呼び出しの優先度。値が小さいほど先にスロットを獲得します。
+    """
+    INTERACTIVE = 0   # 画面操作からの生成（療法士が待っている）
+    BATCH = 10        # 病棟単位の一括生成など
+    PREFETCH = 20     # 投機的な先読み生成
+
+
+class LLMScheduler:
+    """
+    LLM呼び出しの同時実行数を制限し、優先度順にスロットを割り当てるスケジューラ。
+
+    空きスロットがない場合、呼び出し元は優先度付きキューで待機します。
+    同じ優先度同士は到着順(FIFO)で処理されるため、一括生成が大量に並んでいても
+    後から来た対話的な生成リクエストが先に実行されます。
+
+    Attributes:
+        max_concurrency (int): 同時にLLMへ送信できるリクエスト数の上限。
+    """
+
+    def __init__(self, max_concurrency: int = 4):
+        self.max_concurrency = max(1, max_concurrency)
+        self._active = 0
+        # [priority, seq, future] のヒープ
+        self._waiters: List[list] = []
+        self._counter = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE) -> AsyncIterator[None]:
+        """
+        スロットを獲得してから処理を実行するための非同期コンテキストマネージャ。
+        処理終了時（例外・キャンセル時を含む）に必ずスロットを解放します。
+        """
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: Priority) -> None:
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [int(priority), next(self._counter), future]
+        heapq.heappush(self._waiters, entry)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # スロットを譲り受けた直後にキャンセルされた場合は次の待機者へ渡す
+                self._release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _release(self) -> None:
+        self._active -= 1
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            # スロットを待機者へ直接引き渡す（activeは減らさずに済ませる）
+            self._active += 1
+            future.set_result(True)
+            break
+
+    def is_busy(self) -> bool:
+        """空きスロットがない、または待機者がいる場合に True を返します。"""
+        return self._active >= self.max_concurrency or bool(self._waiters)
+
+    def has_waiters_above(self, priority: Priority) -> bool:
+        """指定した優先度より高い（値が小さい）待機者がいる場合に True を返します。"""
+        return any(
+            entry_priority < priority and not future.done()
+            for entry_priority, _, future in self._waiters
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        現在のスケジューラの状態を返します（メトリクス表示用）。
+        """
+        waiting: Dict[str, int] = {}
+        for priority, _, future in self._waiters:
+            if future.done():
+                continue
+            name = Priority(priority).name.lower()
+            waiting[name] = waiting.get(name, 0) + 1
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "waiting": waiting,
+        }
+
+
+@lru_cache()
+def get_llm_scheduler() -> LLMScheduler:
+    """
+    アプリケーション全体で共有するスケジューラを返します。
+    同時実行数は環境変数 LLM_MAX_CONCURRENCY で指定します (default: 4)。
+    """
+    max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    print(f"[LLM Scheduler] Initialized with max_concurrency={max_concurrency}")
+    return LLMScheduler(max_concurrency=max_concurrency)
@@ -0,0 +1,141 @@
+import asyncio
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+# 1ラベル（生成グループ）あたりに保存する思考テキストの上限（文字数）
+THINKING_CAPTURE_MAX_CHARS = int(os.getenv("LLM_THINKING_CAPTURE_MAX_CHARS", "8000"))
+# UIへのストリーミング用キューの上限。あふれた場合は古いイベントから捨てる
+THINKING_STREAM_QUEUE_SIZE = 256
+
+
+class ThinkingChannel:
+    """
+    思考プロセス (Thinking Models の thinking 出力) を受け取る非同期のサイドチャネル。
+
+    LLMクライアントのワーカースレッドからは write() で書き込むだけで、
+    実際の蓄積・配信はイベントループ側で行うため、生成スレッドをブロックしません。
+    保存するテキストはラベルごとに上限で打ち切り、購読者（UIへのストリーミング）への配信キューも有界です。
+    """
+
+    def __init__(self, max_chars: int = THINKING_CAPTURE_MAX_CHARS):
+        self._loop = asyncio.get_running_loop()
+        self.max_chars = max_chars
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: List[asyncio.Queue] = []
+        self.closed = False
+
+    def write(self, label: str, text: str, tokens: int = 0) -> None:
+        """思考テキストを書き込みます（任意のスレッドから呼び出し可能）。"""
+        self._loop.call_soon_threadsafe(self._append, label, text, tokens)
+
+    def mark_budget_exceeded(self, label: str) -> None:
+        """思考トークンの予算を超えて回答モードへ切り替えたことを記録します（任意のスレッドから呼び出し可能）。"""
+        self._loop.call_soon_threadsafe(self._set_budget_exceeded, label)
+
+    def _record(self, label: str) -> Dict[str, Any]:
+        return self._records.setdefault(
+            label, {"text": "", "tokens": 0, "truncated": False, "budget_exceeded": False}
+        )
+
+    def _append(self, label: str, text: str, tokens: int) -> None:
+        record = self._record(label)
+        record["tokens"] += tokens
+        room = self.max_chars - len(record["text"])
+        if room > 0:
+            record["text"] += text[:room]
+        if len(text) > room:
+            record["truncated"] = True
+        self._publish({"event": "thinking", "label": label, "text": text})
+
+    def _set_budget_exceeded(self, label: str) -> None:
+        self._record(label)["budget_exceeded"] = True
+        self._publish({"event": "budget_exceeded", "label": label})
+
+    def _publish(self, event: Optional[Dict[str, Any]]) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        以降の思考イベントを受け取るキューを返します。チャネルが閉じられると None が届きます。
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=THINKING_STREAM_QUEUE_SIZE)
+        if self.closed:
+            queue.put_nowait(None)
+        else:
+            self._subscribers.append(queue)
+        return queue
+
+    def close(self) -> None:
+        # スレッドから書き込まれた未反映のイベントより後に終了を通知する
+        self._loop.call_soon_threadsafe(self._close)
+
+    def _close(self) -> None:
+        self.closed = True
+        self._publish(None)
+        self._subscribers.clear()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """生成結果と一緒に保存するための、ラベルごとの思考の記録を返します。"""
+        return {label: dict(record) for label, record in self._records.items()}
+
+
+# 現在の生成処理が使うチャネル、生成単位のラベル、思考トークンの予算
+# (None は予算なし＝モデルの既定動作、0 は思考しない)
+_channel: ContextVar[Optional[ThinkingChannel]] = ContextVar("thinking_channel", default=None)
+_label: ContextVar[str] = ContextVar("thinking_label", default="default")
+_budget: ContextVar[Optional[int]] = ContextVar("thinking_budget", default=None)
+
+# UIから購読できるよう、実行中の生成のチャネルをキー（患者のハッシュIDなど）で公開する
+_live_channels: Dict[str, ThinkingChannel] = {}
+
+
+@contextmanager
+def capture_thinking(key: Optional[str] = None) -> Iterator[ThinkingChannel]:
+    """
+    このコンテキスト内のLLM呼び出しの思考プロセスを、新しいチャネルに記録します。
+    key を指定した場合、実行中は get_live_channel(key) で購読できます。
+    """
+    channel = ThinkingChannel()
+    token = _channel.set(channel)
+    if key is not None:
+        _live_channels[key] = channel
+    try:
+        yield channel
+    finally:
+        _channel.reset(token)
+        if key is not None and _live_channels.get(key) is channel:
+            del _live_channels[key]
+        channel.close()
+
+
+@contextmanager
+def thinking_scope(label: str, budget: Optional[int] = None) -> Iterator[None]:
+    """このコンテキスト内のLLM呼び出しのラベルと思考トークンの予算を設定します。"""
+    label_token = _label.set(label)
+    budget_token = _budget.set(budget)
+    try:
+        yield
+    finally:
+        _label.reset(label_token)
+        _budget.reset(budget_token)
+
+
+def get_thinking_channel() -> Optional[ThinkingChannel]:
+    return _channel.get()
+
+
+def get_thinking_label() -> str:
+    return _label.get()
+
+
+def get_thinking_budget() -> Optional[int]:
+    return _budget.get()
+
+
+def get_live_channel(key: str) -> Optional[ThinkingChannel]:
+    return _live_channels.get(key)
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.json_io import ORJSONResponse
+from app.api.request_control import DISCONNECT_POLL_INTERVAL, HTTP_CLIENT_CLOSED_REQUEST
+from app.core.request_context import deadline_expired, set_deadline
+from app.infrastructure.db.database import AsyncSessionLocal
+from app.infrastructure.repositories.idempotency_repository import (
+    IDEMPOTENCY_LOCK_TIMEOUT_SEC,
+    STATUS_COMPLETED,
+    IdempotencyRepository,
+)
+
+# 冪等性キーを指定するリクエストヘッダー
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# 保存済みの結果を返した場合に付与するレスポンスヘッダー
+REPLAYED_HEADER = "Idempotent-Replayed"
+# 他のワーカーで処理中の場合に、再送までの待機を促す秒数
+RETRY_AFTER_SEC = 5
+
+# このプロセスで実行中のジョブ: キー -> (リクエストのフィンガープリント, タスク)
+_jobs: Dict[str, Tuple[str, asyncio.Task]] = {}
+
+IdempotentJob = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def request_fingerprint(method: str, path: str, query: str, body: bytes) -> str:
+    """
+    同じキーが別の内容のリクエストに使い回されていないかを判定するためのハッシュを返します。
+    """
+    digest = hashlib.sha256()
+    for part in (method.upper().encode(), path.encode(), query.encode(), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+async def run_idempotent(
+    request: Request,
+    key: str,
+    job: IdempotentJob,
+    response_model: Type[BaseModel],
+    status_code: int = 200,
+) -> JSONResponse:
+    """
+    Idempotency-Key 付きのリクエストを実行します。
+
+    - 初回: ジョブを専用のDBセッションで実行し、結果を保存してから返す
+    - 同じキーのジョブがこのプロセスで実行中: 新たに実行せず、そのジョブの完了を待って同じ結果を返す
+    - 同じキーの結果が保存済み: 保存済みの結果をそのまま返す（Idempotent-Replayed: true）
+
+    ジョブは元のリクエストから切り離されて実行されるため、クライアントが切断しても中断されず、
+    再送されたリクエストが結果を受け取れます。ジョブが失敗した場合はキーを解放し、
+    同じキーでの再送は再実行されます。
+
+    Args:
+        request (Request): 元のリクエスト（フィンガープリントの計算と切断の監視に使用）
+        key (str): Idempotency-Key ヘッダーの値
+        job (IdempotentJob): DBセッションを受け取り、レスポンスとなるオブジェクトを返すコルーチン関数
+        response_model (Type[BaseModel]): ジョブの戻り値を検証・シリアライズするモデル
+        status_code (int): 成功時のステータスコード
+
+    Raises:
+        HTTPException: 422（キーが別の内容のリクエストに使われている）, 409（他のワーカーで処理中）,
+            499（待機中に切断）, 504（待機中に締め切り超過）
+    """
+    if not key or len(key) > 128:
+        raise HTTPException(status_code=400, detail=f"Invalid {IDEMPOTENCY_HEADER} header")
+
+    body = await request.body()
+    fingerprint = request_fingerprint(request.method, request.url.path, request.url.query, body)
+
+    task = _attach(key, fingerprint)
+    if task is None:
+        async with AsyncSessionLocal() as session:
+            record, claimed = await IdempotencyRepository(session).claim(key, fingerprint)
+
+        if claimed:
+            task = asyncio.ensure_future(_run_job(key, job, response_model, status_code))
+            _jobs[key] = (fingerprint, task)
+            task.add_done_callback(lambda t: _forget(key, t))
+        else:
+            if record.request_fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"{IDEMPOTENCY_HEADER} was already used for a different request",
+                )
+            if record.status == STATUS_COMPLETED:
+                print(f"[API] Replaying stored response for idempotency key: {key}")
+                return ORJSONResponse(
+                    content=record.response_body,
+                    status_code=record.response_status or status_code,
+                    headers={REPLAYED_HEADER: "true"},
+                )
+            # 獲得に失敗した間に同じプロセスでジョブが開始された可能性がある
+            task = _attach(key, fingerprint)
+            if task is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": str(RETRY_AFTER_SEC)},
+                )
+
+    content = await _wait(request, task)
+    return ORJSONResponse(content=content, status_code=status_code)
+
+
+def _attach(key: str, fingerprint: str) -> Optional[asyncio.Task]:
+    running = _jobs.get(key)
+    if running is None:
+        return None
+    running_fingerprint, task = running
+    if running_fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{IDEMPOTENCY_HEADER} was already used for a different request",
+        )
+    print(f"[API] Attaching to in-flight job for idempotency key: {key}")
+    return task
+
+
+def _forget(key: str, task: asyncio.Task) -> None:
+    running = _jobs.get(key)
+    if running is not None and running[1] is task:
+        del _jobs[key]
+
+
+async def _run_job(key: str, job: IdempotentJob, response_model: Type[BaseModel], status_code: int) -> Any:
+    # 元のリクエストの締め切りではなく、処理中ロックの有効期間を上限にする
+    # (ロックが期限切れで他のリクエストに引き継がれた後も処理が続くことを防ぐ)
+    set_deadline(IDEMPOTENCY_LOCK_TIMEOUT_SEC)
+    async with AsyncSessionLocal() as session:
+        repo = IdempotencyRepository(session)
+        try:
+            result = await job(session)
+            content = response_model.model_validate(result, from_attributes=True).model_dump(mode="json")
+        except BaseException:
+            await session.rollback()
+            await asyncio.shield(repo.release(key))
+            raise
+        await repo.complete(key, status_code, content)
+        return content
+
+
+async def _wait(request: Request, task: asyncio.Task) -> Any:
+    """
+    ジョブの完了を待ちます。クライアントの切断や締め切り超過では待機だけを打ち切り、
+    ジョブ自体はキャンセルしません（再送されたリクエストが結果を受け取るため）。
+    """
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            print(f"[API] Client disconnected. Idempotent job continues: {request.url.path}")
+            raise HTTPException(status_code=HTTP_CLIENT_CLOSED_REQUEST, detail="Client closed request")
+        if deadline_expired():
+            raise HTTPException(status_code=504, detail="Request deadline exceeded")
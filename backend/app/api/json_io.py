@@ -0,0 +1,139 @@
+import copy
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Iterator, Type, TypeVar
+
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from pydantic import BaseModel, ValidationError
+
+from app.core import json_codec
+
+M = TypeVar("M", bound=BaseModel)
+
+# FastAPI 0.13x 以降は、レスポンスクラスが既定のままであれば response_model のあるルートを
+# Pydantic で直接JSONバイト列に変換する（dict を経由しないため orjson より速い）
+FASTAPI_DUMPS_RESPONSE_MODELS = "dump_json" in inspect.signature(serialize_response).parameters
+
+# json_body_openapi で登録したボディのスキーマ（OpenAPI の components/schemas に追加する）
+OPENAPI_REF_TEMPLATE = "#/components/schemas/{model}"
+_openapi_schemas: Dict[str, Dict[str, Any]] = {}
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    orjson で本文を生成するJSONレスポンス。
+    FastAPI 付属の ORJSONResponse は新しいバージョンで非推奨になったため、json_codec を使う独自のクラスとします。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_codec.dumps_bytes(content)
+
+
+def default_response_class_options() -> Dict[str, Any]:
+    """
+    FastAPI() に渡す既定のレスポンスクラスの指定を返します。
+
+    Pydantic による直接変換がない FastAPI では ORJSONResponse を既定にします。
+    直接変換がある場合は、既定のまま（JSONResponse）にしておかないと response_model のあるルートが
+    dict 経由の変換に戻って遅くなるため、何も指定しません。
+    その場合も、dict を返すルート（response_model のないルート）は jsonable_encoder と json.dumps を
+    経由しないよう、ORJSONResponse を明示的に返してください。
+    """
+    if FASTAPI_DUMPS_RESPONSE_MODELS:
+        return {}
+    return {"default_response_class": ORJSONResponse}
+
+
+def json_body(model: Type[M], untyped: bool = False) -> Callable[[Request], Awaitable[M]]:
+    """
+    FastAPIのDependency: リクエストボディのバイト列を、FastAPI の既定の処理（json.loads で dict にしてから検証）を
+    経由せずに検証します。検証エラーは通常のボディと同じ 422 (RequestValidationError) になります。
+
+    - 既定: model_validate_json でバイト列から直接検証する（PatientExtractionSchema など型の決まったボディ向け）
+    - untyped=True: orjson で dict にしてから検証する。Univer のスナップショットのように
+      Dict[str, Any] の大きな値が中心のボディでは、model_validate_json より速い
+
+    OpenAPI にボディのスキーマを載せるには、ルートに json_body_openapi(model) を指定し、
+    アプリに install_openapi_schemas(app) を適用してください。
+
+    使用例:
+        patient_data: PatientExtractionSchema = Depends(json_body(PatientExtractionSchema))
+    """
+    async def parse(request: Request) -> M:
+        body = await request.body()
+        try:
+            if untyped:
+                return model.model_validate(json_codec.loads(body))
+            return model.model_validate_json(body)
+        except json_codec.JSONDecodeError as e:
+            # FastAPI が不正なJSONに返すエラーと同じ形式
+            raise RequestValidationError(
+                [{"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error",
+                  "input": {}, "ctx": {"error": e.msg}}],
+                body=body,
+            )
+        except ValidationError as e:
+            errors = [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            raise RequestValidationError(errors, body=body)
+
+    return parse
+
+
+def json_body_openapi(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    json_body で受け取るボディのスキーマを、ルートの openapi_extra に指定するための辞書を返します。
+
+    ボディは components/schemas への参照とし、モデルとネストしたモデル ($defs) のスキーマを登録しておきます
+    （install_openapi_schemas で OpenAPI の components/schemas に追加されます）。
+    """
+    schema = model.model_json_schema(ref_template=OPENAPI_REF_TEMPLATE)
+    _openapi_schemas.update(schema.pop("$defs", {}))
+    _openapi_schemas[model.__name__] = schema
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {"$ref": OPENAPI_REF_TEMPLATE.format(model=model.__name__)}}},
+        }
+    }
+
+
+def _schema_refs(node: Any) -> Iterator[str]:
+    """スキーマに含まれる components/schemas への参照（モデル名）を列挙する。"""
+    prefix = OPENAPI_REF_TEMPLATE.format(model="")
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith(prefix):
+                yield ref[len(prefix):]
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def install_openapi_schemas(app: FastAPI) -> None:
+    """
+    app.openapi を置き換え、json_body_openapi で登録したスキーマのうち、
+    ドキュメントから参照されているもの（とその参照先）を components/schemas に追加します。
+    FastAPI が生成した同名のスキーマがある場合はそちらを優先します。
+    """
+    generate = app.openapi
+
+    def openapi() -> Dict[str, Any]:
+        if app.openapi_schema:
+            return app.openapi_schema
+        document = generate()
+        components = document.setdefault("components", {}).setdefault("schemas", {})
+        pending = list(_schema_refs(document))
+        while pending:
+            name = pending.pop()
+            if name in components or name not in _openapi_schemas:
+                continue
+            components[name] = copy.deepcopy(_openapi_schemas[name])
+            pending.extend(_schema_refs(components[name]))
+        return document
+
+    app.openapi = openapi
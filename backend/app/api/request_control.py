@@ -0,0 +1,89 @@
+import asyncio
+from typing import Awaitable, Dict, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+
+from app.core.request_context import (
+    DEFAULT_REQUEST_TIMEOUT_SEC,
+    DeadlineExceeded,
+    deadline_expired,
+    set_deadline,
+)
+
+T = TypeVar("T")
+
+# 締め切りを指定するリクエストヘッダー（ミリ秒）
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+# クライアント切断の確認間隔（秒）
+DISCONNECT_POLL_INTERVAL = 0.5
+# クライアントが切断した場合のステータスコード（nginxの慣例）
+HTTP_CLIENT_CLOSED_REQUEST = 499
+
+# 同じ対象（例: 同じ患者の計画書生成）に対して実行中の処理
+_in_flight: Dict[str, asyncio.Task] = {}
+
+
+async def apply_request_deadline(request: Request) -> None:
+    """
+    FastAPIのDependency: リクエストの締め切りをコンテキストに設定します。
+    X-Request-Timeout-Ms ヘッダー、なければ環境変数 REQUEST_TIMEOUT_SEC を使用します。
+    設定した締め切りは UseCase や LLMクライアントの呼び出しまで引き継がれます。
+    """
+    timeout_sec = DEFAULT_REQUEST_TIMEOUT_SEC
+    header = request.headers.get(DEADLINE_HEADER)
+    if header:
+        try:
+            timeout_sec = int(header) / 1000
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid {DEADLINE_HEADER} header: {header}")
+    set_deadline(timeout_sec)
+
+
+async def run_cancellable(request: Request, awaitable: Awaitable[T], supersede_key: Optional[str] = None) -> T:
+    """
+    クライアントの切断を監視しながら処理を実行します。
+
+    - クライアントが切断したら処理をキャンセルする（LLMの待機スロットも解放される）
+    - supersede_key が同じ新しいリクエストが来たら、古い処理をキャンセルする（生成ボタンの連打など）
+    - 締め切りを過ぎた場合は 504 を返す
+
+    Raises:
+        HTTPException: 499（切断）, 409（新しいリクエストに置き換えられた）, 504（締め切り超過）
+    """
+    task = asyncio.ensure_future(awaitable)
+
+    if supersede_key is not None:
+        previous = _in_flight.get(supersede_key)
+        if previous is not None and not previous.done():
+            print(f"[API] Superseding in-flight request: {supersede_key}")
+            previous.cancel()
+        _in_flight[supersede_key] = task
+
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                break
+            if await request.is_disconnected():
+                print(f"[API] Client disconnected. Cancelling: {request.url.path}")
+                task.cancel()
+                raise HTTPException(status_code=HTTP_CLIENT_CLOSED_REQUEST, detail="Client closed request")
+
+        if task.cancelled():
+            raise HTTPException(status_code=409, detail="Superseded by a newer request")
+        try:
+            return task.result()
+        except DeadlineExceeded as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except HTTPException:
+            raise
+        except Exception as e:
+            # UseCase側で例外がラップされている場合も、締め切り超過なら 504 とする
+            if deadline_expired():
+                raise HTTPException(status_code=504, detail=f"Request deadline exceeded: {e}")
+            raise
+    finally:
+        if not task.done():
+            task.cancel()
+        if supersede_key is not None and _in_flight.get(supersede_key) is task:
+            del _in_flight[supersede_key]
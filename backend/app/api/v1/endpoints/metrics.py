@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.adapters.llm.host_pool import active_host_pools, set_host_draining, wait_host_drained
+from app.adapters.llm.key_pool import active_key_pools
+from app.api.json_io import ORJSONResponse
+from app.adapters.llm.router import get_llm_router
+from app.adapters.llm.scheduler import get_llm_scheduler
+from app.usecases.utils.token_counter import get_token_calibrator
+
+router = APIRouter()
+
+@router.get("/llm", response_class=ORJSONResponse)
+async def read_llm_metrics():
+    """
+    LLM呼び出しの状況を返します。
+    - scheduler: 同時実行スロットの使用状況と優先度ごとの待機数
+    - routing: 難易度クラスごとの振り分け先と、経路ごとのレイテンシ・推定トークン数・推定料金
+    - gemini_keys: モデルごとのAPIキープールの状態（残りクォータ・クールダウン・429の回数）
+    - ollama_hosts: Ollamaサーバーごとの死活・実行中のリクエスト数・レイテンシ・ロード済みモデル
+    - token_calibration: モデルごとのトークン数推定の補正係数（実際のプロンプトトークン数との比）
+    """
+    print("[API] GET /metrics/llm Request received.")
+
+    return ORJSONResponse({
+        "scheduler": get_llm_scheduler().snapshot(),
+        "routing": get_llm_router().snapshot(),
+        "gemini_keys": active_key_pools(),
+        "ollama_hosts": active_host_pools(),
+        "token_calibration": get_token_calibrator().snapshot(),
+    })
+
+
+@router.post("/ollama/hosts/drain", response_class=ORJSONResponse)
+async def drain_ollama_host(host: str, draining: bool = True, wait_sec: float = Query(default=0, ge=0, le=600)):
+    """
+    Ollamaサーバーをドレイン（新しいリクエストの割り当てを停止）します。
+    実行中のリクエストはそのまま完了させるため、in_flight が 0 (drained=true) になってから停止・再起動してください。
+    wait_sec を指定すると、実行中のリクエストが完了するまで最大その秒数だけ待ってから応答します。
+    draining=false で割り当てを再開します。
+    """
+    print(f"[API] POST /metrics/ollama/hosts/drain Request received. host={host}, draining={draining}, "
+          f"wait_sec={wait_sec}")
+
+    hosts = set_host_draining(host, draining)
+    if not hosts:
+        raise HTTPException(status_code=404, detail=f"Ollama host not found: {host}")
+    if draining and wait_sec > 0:
+        await wait_host_drained(host, wait_sec)
+
+    in_flight = sum(h.in_flight for h in hosts)
+    return ORJSONResponse({
+        "host": hosts[0].url,
+        "draining": draining,
+        "in_flight": in_flight,
+        "drained": draining and in_flight == 0,
+    })
@@ -3,9 +3,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.api.dependencies import get_db
+from app.api.json_io import ORJSONResponse
 from app.schemas.schemas import PatientCreate, PatientRead
 from app.schemas.extraction_schemas import PatientExtractionSchema
 from app.infrastructure.repositories.patient_repository import PatientRepository
+from app.usecases.prefetch import get_draft_prefetcher
 
 # Routerの定義
 router = APIRouter()
@@ -72,9 +74,23 @@ async def read_patient(
             status_code=404,
             detail="Patient not found"
         )
+
+    # 患者を開いた直後に生成されることが多いため、ドラフトを先読みしておく (PLAN_PREFETCH_ENABLED=true の場合のみ)
+    if get_draft_prefetcher().schedule(hash_id):
+        print(f"[API] Draft prefetch scheduled for {hash_id}")
         
     return patient
 
+
+@router.delete("/{hash_id}/prefetch", response_class=ORJSONResponse)
+async def cancel_patient_prefetch(hash_id: str):
+    """
+    患者が閉じられたときに、実行中のドラフト先読みを中断します。
+    """
+    print(f"[API] DELETE /patients/{hash_id}/prefetch Request received.")
+    cancelled = get_draft_prefetcher().cancel(hash_id)
+    return ORJSONResponse({"hash_id": hash_id, "cancelled": cancelled})
+
 @router.get("/{hash_id}/latest-state", response_model=PatientExtractionSchema)
 async def read_patient_latest_state(
     hash_id: str,
@@ -1,32 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
+from app.adapters.llm.thinking import get_live_channel
 from app.api.dependencies import get_db
-from app.schemas.schemas import PlanCreate, PlanRead, PlanUpdate, PlanCustomGenerate, PlanBatchGenerate
+from app.api.idempotency import IDEMPOTENCY_HEADER, run_idempotent
+from app.api.json_io import ORJSONResponse, json_body, json_body_openapi
+from app.api.request_control import apply_request_deadline, run_cancellable
+from app.core import json_codec
+from app.schemas.schemas import (
+    PlanCreate, PlanRead, PlanUpdate, PlanCustomGenerate, PlanBatchGenerate, PlanBulkGenerate,
+    PlanIncrementalGenerate, PlanItemRegenerate, PlanAdaptResult
+)
 from app.infrastructure.repositories.plan_repository import PlanRepository
 
 from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.usecases.bulk_generation import BulkPlanGenerationUseCase
+from app.usecases.plan_adaptation import PlanAdaptationUseCase
 from app.usecases.plan_generation import PlanGenerationUseCase
+from app.usecases.two_phase_generation import TwoPhasePlanGenerationUseCase, run_llm_upgrade
 
 router = APIRouter()
 
-@router.post("/", response_model=PlanRead, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=PlanRead, status_code=status.HTTP_201_CREATED,
+             openapi_extra=json_body_openapi(PlanCreate))
 async def create_plan(
-    plan_in: PlanCreate,
+    http_request: Request,
+    plan_in: PlanCreate = Depends(json_body(PlanCreate)),
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
     db: AsyncSession = Depends(get_db)
 ):
     """
     計画書を新規作成します。
+    Idempotency-Key ヘッダーを指定した場合、同じキーでの再送では新たに作成せず前回の結果を返します。
     """
     print(f"[API] POST /plans/ Request received. Patient: {plan_in.hash_id}")
     
     repo = PlanRepository(db)
     
     try:
+        if idempotency_key:
+            return await run_idempotent(
+                http_request, idempotency_key,
+                lambda session: PlanRepository(session).create(plan_in),
+                PlanRead, status_code=status.HTTP_201_CREATED
+            )
         # DBに保存
         new_plan = await repo.create(plan_in)
         return new_plan
+    except HTTPException:
+        raise
     except Exception as e:
         # 外部キー制約違反（存在しない患者IDを指定した場合など）
         print(f"[API] Error creating plan: {e}")
@@ -69,10 +94,11 @@ async def read_plan(
         
     return plan
 
-@router.put("/{plan_id}", response_model=PlanRead)
+@router.put("/{plan_id}", response_model=PlanRead,
+            openapi_extra=json_body_openapi(PlanUpdate))
 async def update_plan(
     plan_id: int,
-    plan_in: PlanUpdate,
+    plan_in: PlanUpdate = Depends(json_body(PlanUpdate)),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -90,9 +116,11 @@ async def update_plan(
     return updated_plan
 
 
-@router.post("/generate/custom", response_model=dict)
+@router.post("/generate/custom", response_class=ORJSONResponse, dependencies=[Depends(apply_request_deadline)],
+             openapi_extra=json_body_openapi(PlanCustomGenerate))
 async def generate_custom_part(
-    request: PlanCustomGenerate,
+    http_request: Request,
+    request: PlanCustomGenerate = Depends(json_body(PlanCustomGenerate)),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -103,11 +131,13 @@ async def generate_custom_part(
     
     usecase = PlanGenerationUseCase(db)
     try:
-        result_text = await usecase.execute_custom(
+        result_text = await run_cancellable(http_request, usecase.execute_custom(
             patient_data=request.patient_data,
             prompt=request.prompt
-        )
-        return {"result": result_text}
+        ))
+        return ORJSONResponse({"result": result_text})
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[API] Error during custom generation: {e}")
         raise HTTPException(
@@ -115,9 +145,53 @@ async def generate_custom_part(
             detail=f"Failed to generate content: {str(e)}"
         )
     
-@router.post("/generate/batch", response_model=dict)
+@router.post("/generate/item", response_class=ORJSONResponse, dependencies=[Depends(apply_request_deadline)],
+             openapi_extra=json_body_openapi(PlanItemRegenerate))
+async def regenerate_plan_item(
+    http_request: Request,
+    request: PlanItemRegenerate = Depends(json_body(PlanItemRegenerate)),
+    benchmark: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    計画書の1項目を修正指示に従って書き直します。
+    対象項目に関係する事実情報・関連項目だけをプロンプトに含めます。
+    結果はJSONで {"result": "書き直したテキスト", "metrics": {...}} として返します。
+    benchmark=true の場合、全データを渡す従来のプロンプトとのトークン数の比較を metrics に含めます。
+    """
+    print(f"[API] POST /plans/generate/item Request received. Target: {request.target_key}")
+
+    try:
+        patient_data = PatientExtractionSchema.model_validate(request.patient_data)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    usecase = PlanGenerationUseCase(db)
+    try:
+        result = await run_cancellable(http_request, usecase.execute_item_regeneration(
+            patient_data=patient_data,
+            target_key=request.target_key,
+            current_text=request.current_text,
+            instruction=request.instruction,
+            current_plan=request.current_plan,
+            rag_context=request.rag_context,
+            benchmark=benchmark
+        ))
+        return ORJSONResponse(result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[API] Error during item regeneration: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to regenerate item: {str(e)}"
+        )
+
+@router.post("/generate/batch", response_class=ORJSONResponse, dependencies=[Depends(apply_request_deadline)],
+             openapi_extra=json_body_openapi(PlanBatchGenerate))
 async def generate_batch_parts(
-    request: PlanBatchGenerate,
+    http_request: Request,
+    request: PlanBatchGenerate = Depends(json_body(PlanBatchGenerate)),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -127,11 +201,17 @@ async def generate_batch_parts(
     
     usecase = PlanGenerationUseCase(db)
     try:
-        result_dict = await usecase.execute_batch(
+        result_dict = await run_cancellable(http_request, usecase.execute_batch(
             patient_data=request.patient_data,
-            items=request.items
-        )
-        return result_dict
+            items=request.items,
+            current_plan=request.current_plan
+        ))
+        return ORJSONResponse(result_dict)
+    except ValueError as e:
+        # 循環依存などリクエスト内容の不備
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[API] Error during batch generation: {e}")
         raise HTTPException(
@@ -139,14 +219,79 @@ async def generate_batch_parts(
             detail=f"Failed to generate batch content: {str(e)}"
         )
 
-@router.post("/generate/{hash_id}", response_model=PlanRead)
+@router.post("/generate/incremental", response_class=ORJSONResponse, dependencies=[Depends(apply_request_deadline)],
+             openapi_extra=json_body_openapi(PlanIncrementalGenerate))
+async def generate_incremental(
+    http_request: Request,
+    request: PlanIncrementalGenerate = Depends(json_body(PlanIncrementalGenerate)),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    患者データの変更前後を比較し、影響を受ける項目だけを再生成します。
+    結果は {"stale_fields": [...], "changed_fact_keys": [...], "regenerated": {...}, "plan": {...}} で返します。
+    """
+    print(f"[API] POST /plans/generate/incremental Request received. Patient: {request.hash_id}")
+
+    try:
+        old_patient_data = PatientExtractionSchema.model_validate(request.old_patient_data)
+        new_patient_data = PatientExtractionSchema.model_validate(request.new_patient_data)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    usecase = PlanGenerationUseCase(db)
+    try:
+        result = await run_cancellable(http_request, usecase.execute_incremental(
+            hash_id=request.hash_id,
+            old_patient_data=old_patient_data,
+            new_patient_data=new_patient_data,
+            current_plan=request.current_plan,
+            therapist_notes=request.therapist_notes
+        ))
+        return ORJSONResponse(result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[API] Error during incremental generation: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to regenerate content: {str(e)}"
+        )
+
+@router.post("/generate/bulk", openapi_extra=json_body_openapi(PlanBulkGenerate))
+async def generate_bulk_drafts(
+    request: PlanBulkGenerate = Depends(json_body(PlanBulkGenerate)),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    複数患者の計画書ドラフトを一括生成・保存します（病棟単位の月次カンファレンス準備用）。
+    進捗は NDJSON (1行1イベント) でストリーミングし、最終行にスループットと失敗一覧のサマリを返します。
+    """
+    print(f"[API] POST /plans/generate/bulk Request received. Patients: {len(request.hash_ids)}")
+
+    usecase = BulkPlanGenerationUseCase(db)
+
+    async def event_stream():
+        async for event in usecase.run(
+            hash_ids=request.hash_ids,
+            therapist_notes=request.therapist_notes,
+            max_concurrency=request.max_concurrency,
+        ):
+            yield json_codec.dumps_bytes(event) + b"\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.post("/generate/{hash_id}", response_model=PlanRead, dependencies=[Depends(apply_request_deadline)],
+             openapi_extra=json_body_openapi(PatientExtractionSchema))
 async def generate_plan_draft(
+    http_request: Request,
     hash_id: str,
-    patient_data: PatientExtractionSchema,
+    patient_data: PatientExtractionSchema = Depends(json_body(PatientExtractionSchema)),
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Frontendから送られた患者データ(Extract済)を元に、AIを使って計画書ドラフトを生成・保存する。
+    Idempotency-Key ヘッダーを指定した場合、同じキーでの再送は実行中の生成に合流するか、保存済みの結果を返す。
     """
     print(f"[API] POST /plans/generate/{hash_id} Request received.")
 
@@ -154,18 +299,173 @@ async def generate_plan_draft(
     usecase = PlanGenerationUseCase(db)
     
     try:
+        if idempotency_key:
+            # 通信断による再送で生成をやり直さないよう、切断されても生成は継続する
+            return await run_idempotent(
+                http_request, idempotency_key,
+                lambda session: PlanGenerationUseCase(session).execute(
+                    hash_id=hash_id, patient_data=patient_data, therapist_notes=""
+                ),
+                PlanRead
+            )
         # 生成プロセスを実行 (内部でLLM呼び出し -> DB保存まで行う)
         # 必要であれば body に therapist_notes を含めて渡す設計も可能
-        created_plan = await usecase.execute(
+        # 同じ患者への生成が再度要求された場合（生成ボタンの連打など）は古い処理を打ち切る
+        created_plan = await run_cancellable(http_request, usecase.execute(
             hash_id=hash_id, 
             patient_data=patient_data,
             therapist_notes="" # 現状は空文字、必要に応じて拡張
-        )
+        ), supersede_key=f"generate:{hash_id}")
         return created_plan
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[API] Error during plan generation: {e}")
         raise HTTPException(
             status_code=500, 
             detail=f"Failed to generate plan: {str(e)}"
+        )
+
+@router.get("/generate/{hash_id}/thinking")
+async def stream_generation_thinking(hash_id: str):
+    """
+    実行中の計画書生成の思考プロセスを NDJSON でストリーミングします（思考が有効なモデルのみ）。
+    生成が完了すると {"event": "end"} を送って終了します。
+    完了後の思考の記録は計画書の generation_meta に保存されます。
+    """
+    print(f"[API] GET /plans/generate/{hash_id}/thinking Request received.")
+
+    channel = get_live_channel(hash_id)
+    if channel is None:
+        raise HTTPException(status_code=404, detail="No generation in progress for this patient")
+    queue = channel.subscribe()
+
+    async def event_stream():
+        while True:
+            event = await queue.get()
+            if event is None:
+                yield json_codec.dumps_bytes({"event": "end"}) + b"\n"
+                break
+            yield json_codec.dumps_bytes(event) + b"\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.post("/generate/{hash_id}/delta", response_model=PlanRead, dependencies=[Depends(apply_request_deadline)],
+             openapi_extra=json_body_openapi(PatientExtractionSchema))
+async def generate_plan_delta(
+    http_request: Request,
+    hash_id: str,
+    patient_data: PatientExtractionSchema = Depends(json_body(PatientExtractionSchema)),
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    再評価用: 前回の計画書をベースに、前回から変化した入力に関係する項目だけを修正して新しい計画書を保存する。
+    前回の計画書（または生成時スナップショット）がない場合は通常の全項目生成と同じ動作になる。
+    """
+    print(f"[API] POST /plans/generate/{hash_id}/delta Request received.")
+
+    usecase = PlanGenerationUseCase(db)
+
+    try:
+        if idempotency_key:
+            return await run_idempotent(
+                http_request, idempotency_key,
+                lambda session: PlanGenerationUseCase(session).execute_delta(
+                    hash_id=hash_id, patient_data=patient_data, therapist_notes=""
+                ),
+                PlanRead
+            )
+        created_plan = await run_cancellable(http_request, usecase.execute_delta(
+            hash_id=hash_id,
+            patient_data=patient_data,
+            therapist_notes=""
+        ), supersede_key=f"generate:{hash_id}")
+        return created_plan
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[API] Error during delta plan generation: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate plan: {str(e)}"
+        )
+
+
+@router.post("/generate/{hash_id}/two-phase", response_model=PlanRead, status_code=status.HTTP_201_CREATED,
+             openapi_extra=json_body_openapi(PatientExtractionSchema))
+async def generate_plan_two_phase(
+    hash_id: str,
+    background_tasks: BackgroundTasks,
+    patient_data: PatientExtractionSchema = Depends(json_body(PatientExtractionSchema)),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    ルールベースの暫定ドラフト (status="provisional") を即座に保存して返し、
+    LLMによる生成はバックグラウンドで行う。生成が完了した項目から順に置き換えられ、
+    全て完了すると status="final" になる（GET /plans/{plan_id} で確認できる）。
+    """
+    print(f"[API] POST /plans/generate/{hash_id}/two-phase Request received.")
+
+    usecase = TwoPhasePlanGenerationUseCase(db)
+    try:
+        provisional_plan = await usecase.create_provisional(
+            hash_id=hash_id,
+            patient_data=patient_data,
+            therapist_notes=""
+        )
+    except Exception as e:
+        print(f"[API] Error during provisional plan creation: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create provisional plan: {str(e)}"
+        )
+
+    background_tasks.add_task(
+        run_llm_upgrade, provisional_plan.plan_id, hash_id, patient_data, ""
+    )
+    return provisional_plan
+
+
+@router.post("/generate/{hash_id}/adapt", response_model=PlanAdaptResult, dependencies=[Depends(apply_request_deadline)],
+             openapi_extra=json_body_openapi(PatientExtractionSchema))
+async def generate_plan_by_adaptation(
+    http_request: Request,
+    hash_id: str,
+    patient_data: PatientExtractionSchema = Depends(json_body(PatientExtractionSchema)),
+    benchmark: bool = False,
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    最も類似した過去患者の計画書を下書きにし、対象患者に合わない部分だけをAIに修正させて保存する。
+    benchmark=true の場合、通常の全項目生成（保存しない）と所要時間・出力トークン数を比較する。
+    """
+    print(f"[API] POST /plans/generate/{hash_id}/adapt Request received. benchmark={benchmark}")
+
+    usecase = PlanAdaptationUseCase(db)
+    try:
+        if idempotency_key:
+            return await run_idempotent(
+                http_request, idempotency_key,
+                lambda session: PlanAdaptationUseCase(session).execute(
+                    hash_id=hash_id, patient_data=patient_data, therapist_notes="", benchmark=benchmark
+                ),
+                PlanAdaptResult
+            )
+        return await run_cancellable(http_request, usecase.execute(
+            hash_id=hash_id,
+            patient_data=patient_data,
+            therapist_notes="",
+            benchmark=benchmark
+        ), supersede_key=f"generate:{hash_id}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[API] Error during plan adaptation: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate plan: {str(e)}"
         )
\ No newline at end of file
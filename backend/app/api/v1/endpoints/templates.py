@@ -4,14 +4,16 @@ from sqlalchemy import select
 from typing import List
 
 from app.api.dependencies import get_db
+from app.api.json_io import json_body, json_body_openapi
 from app.infrastructure.db.models import PlanTemplate
 from app.schemas.schemas import TemplateCreate, TemplateRead
 
 router = APIRouter()
 
-@router.post("/", response_model=TemplateRead, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=TemplateRead, status_code=status.HTTP_201_CREATED,
+             openapi_extra=json_body_openapi(TemplateCreate))
 async def create_template(
-    template_in: TemplateCreate,
+    template_in: TemplateCreate = Depends(json_body(TemplateCreate, untyped=True)),
     db: AsyncSession = Depends(get_db)
 ):
     """
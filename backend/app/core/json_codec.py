@@ -0,0 +1,44 @@
+from typing import Any, Union
+
+import orjson
+
+# orjson.JSONDecodeError は json.JSONDecodeError のサブクラスのため、標準の json の例外として捕捉できる
+JSONDecodeError = orjson.JSONDecodeError
+
+# dict のキーに str 以外（int など）を許可する（標準の json.dumps と同じく文字列に変換される）
+_BASE_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> str:
+    # orjson が直接扱えない型は、標準の json.dumps(default=str) と同じく文字列にする
+    return str(value)
+
+
+def dumps_bytes(data: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    orjson でJSONのバイト列（UTF-8）に変換します。レスポンスの本文など、バイト列のまま使う場合に使用します。
+
+    出力は json.dumps(data, ensure_ascii=False, separators=(",", ":")) と同じ形式です
+    （indent=True なら indent=2 と同じ形式）。datetime は ISO 8601 形式 (T区切り) になります。
+    """
+    option = _BASE_OPTIONS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(data, default=_default, option=option)
+
+
+def dumps(data: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """orjson でJSON文字列に変換します（プロンプトへの埋め込み、ハッシュ計算、NDJSON など）。"""
+    return dumps_bytes(data, indent=indent, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    orjson でJSONをパースします。
+
+    Raises:
+        JSONDecodeError: JSONとして不正な場合（json.JSONDecodeError として捕捉可能）
+    """
+    return orjson.loads(data)
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+from contextvars import ContextVar, Token
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# リクエスト単位の締め切り (time.monotonic() 基準の絶対時刻)。None は締め切りなし
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# ヘッダーで締め切りが指定されない場合の既定値（秒）。0以下なら締め切りなし
+DEFAULT_REQUEST_TIMEOUT_SEC = float(os.getenv("REQUEST_TIMEOUT_SEC", "0"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """リクエストの締め切りを過ぎた場合に送出される例外。"""
+
+
+def set_deadline(timeout_sec: Optional[float]) -> Token:
+    """
+    現在のコンテキスト（リクエスト）に締め切りを設定します。
+
+    Args:
+        timeout_sec: 現在時刻からの猶予（秒）。None または 0 以下の場合は締め切りなし
+
+    Returns:
+        Token: reset_deadline で元に戻すためのトークン
+    """
+    deadline = time.monotonic() + timeout_sec if timeout_sec and timeout_sec > 0 else None
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """締め切りまでの残り時間（秒）を返します。締め切りがない場合は None。"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def deadline_expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline(operation: str = "operation") -> None:
+    """締め切りを過ぎていれば DeadlineExceeded を送出します（DB書き込み前などの確認用）。"""
+    if deadline_expired():
+        raise DeadlineExceeded(f"Request deadline exceeded before {operation}")
+
+
+async def with_deadline(awaitable: Awaitable[T], operation: str = "operation") -> T:
+    """
+    締め切りまでの残り時間を上限として awaitable を実行します。
+    時間切れの場合は処理をキャンセルし、DeadlineExceeded を送出します。
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(f"Request deadline exceeded before {operation}")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded(f"Request deadline exceeded during {operation}") from e
@@ -95,6 +95,28 @@ class PlanDataStore(Base):
     
     # 【重要】様式23の全項目（テキスト、数値、チェックボックス）をJSONとして格納
     raw_data: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+
+    # 生成時にLLMへ渡した事実情報のスナップショット（フラットキー -> 整形済みの値）
+    # 再評価時の差分生成で、前回から変化した入力を特定するために使用
+    facts_snapshot: Mapped[Optional[dict[str, Any]]] = mapped_column(
+        JSONB, nullable=True, comment="生成時の事実情報スナップショット(差分生成用)"
+    )
+
+    # 生成時の患者データの内容ハッシュ (facts_content_hash)
+    # 前回の計画書と入力が同一かを、スナップショットを比較せずに判定するために使用
+    facts_hash: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, comment="生成時の患者データの内容ハッシュ(差分生成用)"
+    )
+
+    # 生成時のメタ情報（グループごとの思考プロセスの記録など）
+    generation_meta: Mapped[Optional[dict[str, Any]]] = mapped_column(
+        JSONB, nullable=True, comment="生成時のメタ情報(思考プロセスの記録など)"
+    )
+
+    # 計画書の状態: "provisional"（ルールベースの暫定ドラフト、LLMで更新中） / "final"
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default="final", server_default="final", comment="計画書の状態(provisional/final)"
+    )
     
     created_at: Mapped[datetime.datetime] = mapped_column(default=func.now())
     updated_at: Mapped[datetime.datetime] = mapped_column(default=func.now(), onupdate=func.now())
@@ -173,6 +195,30 @@ class PlanTemplate(Base):
     created_at: Mapped[datetime.datetime] = mapped_column(default=func.now())
     updated_at: Mapped[datetime.datetime] = mapped_column(default=func.now(), onupdate=func.now())
 
+
+# ----------------------------------------------------------------
+# 5. 冪等性キー (Idempotency Keys)
+# ----------------------------------------------------------------
+class IdempotencyKey(Base):
+    """
+    Idempotency-Key ヘッダー付きで受け付けた生成・作成リクエストの処理状態。
+    通信断などによる再送時に、実行中の処理へ合流するか保存済みの結果を返すために使用する。
+    """
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String(128), primary_key=True, comment="クライアントが指定した冪等性キー")
+    request_fingerprint: Mapped[str] = mapped_column(
+        String(64), nullable=False, comment="メソッド・パス・ボディのSHA-256(キーの使い回し検出用)"
+    )
+    # "in_progress"（処理中） / "completed"（結果保存済み）
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="in_progress", comment="処理状態")
+
+    response_status: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    response_body: Mapped[Optional[Any]] = mapped_column(JSONB, nullable=True)
+
+    created_at: Mapped[datetime.datetime] = mapped_column(default=func.now())
+    updated_at: Mapped[datetime.datetime] = mapped_column(default=func.now(), onupdate=func.now())
+
 """
 副作用・デメリット (Trade-offs)
     この設計はメリットが大きい反面、以下の副作用（注意点）があります。
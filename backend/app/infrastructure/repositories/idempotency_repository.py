@@ -0,0 +1,115 @@
+import datetime
+import os
+from typing import Any, Tuple
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.db.models import IdempotencyKey
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+
+# 完了済みの結果を再送に対して返す期間（時間）。これを過ぎたキーは新しいリクエストとして扱う
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+# 処理中のまま更新がないキーを放棄されたとみなすまでの時間（秒）。プロセスの異常終了対策
+IDEMPOTENCY_LOCK_TIMEOUT_SEC = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SEC", "600"))
+
+
+class IdempotencyRepository:
+    """
+    冪等性キー (IdempotencyKey) へのアクセスを担当するクラス
+    """
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def claim(self, key: str, fingerprint: str) -> Tuple[IdempotencyKey, bool]:
+        """
+        キーの処理権を獲得します。
+
+        未使用のキー、期限切れの完了済みキー、放棄された処理中キーの場合は
+        status="in_progress" で登録し直して処理権を獲得します。
+
+        Returns:
+            Tuple[IdempotencyKey, bool]: (キーのレコード, 処理権を獲得したか)
+                獲得できなかった場合は既存のレコード（処理中または完了済み）を返します。
+        """
+        stmt = (
+            pg_insert(IdempotencyKey)
+            .values(key=key, request_fingerprint=fingerprint, status=STATUS_IN_PROGRESS)
+            .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+            .returning(IdempotencyKey)
+        )
+        record = await self.db.scalar(stmt)
+        if record is not None:
+            await self.db.commit()
+            print(f"[IdempotencyRepository] Claimed new key: {key}")
+            return record, True
+
+        # 期限切れ・放棄されたキーは同時に1リクエストだけが引き継げるよう、条件付きUPDATEで獲得する
+        # created_at / updated_at はDBの now() で記録されるため、判定もDBの時計で行う（アプリとの時刻ずれ対策）
+        now = func.now()
+        takeover = (
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.key == key,
+                or_(
+                    and_(
+                        IdempotencyKey.status == STATUS_COMPLETED,
+                        IdempotencyKey.created_at < now - datetime.timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+                    ),
+                    and_(
+                        IdempotencyKey.status == STATUS_IN_PROGRESS,
+                        IdempotencyKey.updated_at < now - datetime.timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT_SEC),
+                    ),
+                ),
+            )
+            .values(
+                request_fingerprint=fingerprint,
+                status=STATUS_IN_PROGRESS,
+                response_status=None,
+                response_body=None,
+                created_at=func.now(),
+                updated_at=func.now(),
+            )
+            .returning(IdempotencyKey)
+        )
+        record = await self.db.scalar(takeover)
+        if record is not None:
+            await self.db.commit()
+            print(f"[IdempotencyRepository] Took over expired key: {key}")
+            return record, True
+
+        existing = await self.db.scalar(select(IdempotencyKey).where(IdempotencyKey.key == key))
+        await self.db.commit()
+        if existing is None:
+            # 判定の間に削除された（失敗による解放）場合は、もう一度獲得を試みる
+            return await self.claim(key, fingerprint)
+        return existing, False
+
+    async def complete(self, key: str, response_status: int, response_body: Any) -> None:
+        """
+        処理結果を保存し、キーを完了済みにします。
+        """
+        print(f"[IdempotencyRepository] Completing key: {key} (status={response_status})")
+        await self.db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key)
+            .values(
+                status=STATUS_COMPLETED,
+                response_status=response_status,
+                response_body=response_body,
+                updated_at=func.now(),
+            )
+        )
+        await self.db.commit()
+
+    async def release(self, key: str) -> None:
+        """
+        処理に失敗したキーを削除します。同じキーでの再送は新しいリクエストとして再実行されます。
+        """
+        print(f"[IdempotencyRepository] Releasing key: {key}")
+        await self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+        await self.db.commit()
+
@@ -1,8 +1,8 @@
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, exists, func, or_
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from app.infrastructure.db.models import PatientsView, DocumentsView
+from app.infrastructure.db.models import PatientsView, DocumentsView, PlanDataStore
 from app.schemas.schemas import PatientCreate
 
 class PatientRepository:
@@ -97,6 +97,33 @@ class PatientRepository:
         print(f"[PatientRepository] No latest state found for {hash_id}")
         return None
 
+    async def get_latest_states(self, hash_ids: List[str]) -> Dict[str, dict]:
+        """
+        複数患者の最新の状態（entities）を1回のクエリでまとめて取得する。
+
+        Returns:
+            Dict[str, dict]: hash_id をキーとした entities の辞書（存在しない患者は含まれない）
+        """
+        print(f"[PatientRepository] Fetching latest states for {len(hash_ids)} patients")
+
+        if not hash_ids:
+            return {}
+
+        query = select(DocumentsView).where(
+            (DocumentsView.hash_id.in_(hash_ids)) &
+            (DocumentsView.doc_type == "latest_state")
+        )
+        result = await self.db.execute(query)
+
+        states: Dict[str, dict] = {}
+        for doc in result.scalars().all():
+            # 同一患者に複数行ある場合は最初の1件を採用（get_latest_state と同じ挙動）
+            if doc.entities and doc.hash_id not in states:
+                states[doc.hash_id] = doc.entities
+
+        print(f"[PatientRepository] Latest states found: {len(states)}/{len(hash_ids)}")
+        return states
+
     # -------------------------------------------------------
     # Hybrid Search Implementation (SQL + Vector)
     # -------------------------------------------------------
@@ -104,7 +131,9 @@ class PatientRepository:
         self, 
         target_vector: List[float], 
         filters: dict, 
-        limit: int = 3
+        limit: int = 3,
+        exclude_hash_id: Optional[str] = None,
+        with_plan_only: bool = False
     ) -> List[PatientsView]:
         """
         Hybrid Searchを実行し、類似患者を返却します。
@@ -113,6 +142,8 @@ class PatientRepository:
             target_vector: 検索対象(ターゲット患者)の社会背景ベクトル
             filters: SQLで絞り込むための条件 (diagnosis_code, age_range, fim_range等)
             limit: 取得件数
+            exclude_hash_id: 検索結果から除外する患者（ターゲット患者自身）
+            with_plan_only: 計画書（plan_text または plan_data_store）を持つ患者に限定する
         
         Returns:
             類似度の高い順にソートされたPatientsViewのリスト
@@ -141,6 +172,16 @@ class PatientRepository:
             target_fim = filters["total_fim_admission"]
             conditions.append(PatientsView.total_fim_admission.between(target_fim - 15, target_fim + 15))
 
+        if exclude_hash_id:
+            conditions.append(PatientsView.hash_id != exclude_hash_id)
+
+        # 計画書を下書きとして使うため、過去の計画書がある患者に限定
+        if with_plan_only:
+            conditions.append(or_(
+                PatientsView.plan_text.isnot(None),
+                exists().where(PlanDataStore.hash_id == PatientsView.hash_id)
+            ))
+
         # フィルタ適用
         if conditions:
             stmt = stmt.where(and_(*conditions))
@@ -148,7 +189,7 @@ class PatientRepository:
         # 3. Soft Rerank (Vector Similarity)
         # pgvectorの L2 distance ( <-> 演算子 ) または cosine distance ( <=> ) を使用
         # 近い順（距離が小さい順）にソート
-        if target_vector:
+        if target_vector is not None and len(target_vector) > 0:
             stmt = stmt.order_by(PatientsView.social_vector.l2_distance(target_vector))
         
         stmt = stmt.limit(limit)
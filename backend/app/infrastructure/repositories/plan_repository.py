@@ -1,5 +1,6 @@
-from typing import List, Optional
-from sqlalchemy import select, update
+from typing import Any, Dict, List, Optional
+from sqlalchemy import cast, insert, select, update
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.infrastructure.db.models import PlanDataStore
 from app.schemas.schemas import PlanCreate, PlanUpdate
@@ -21,7 +22,11 @@ class PlanRepository:
             hash_id=plan.hash_id,
             doc_date=plan.doc_date,
             format_version=plan.format_version,
-            raw_data=plan.raw_data  # JSONデータはそのまま辞書として渡せます
+            raw_data=plan.raw_data,  # JSONデータはそのまま辞書として渡せます
+            facts_snapshot=plan.facts_snapshot,
+            facts_hash=plan.facts_hash,
+            generation_meta=plan.generation_meta,
+            status=plan.status
         )
         
         self.db.add(db_plan)
@@ -31,6 +36,42 @@ class PlanRepository:
         print(f"[PlanRepository] Plan created successfully. ID: {db_plan.plan_id}")
         return db_plan
 
+    async def bulk_create(self, plans: List[PlanCreate]) -> List[PlanDataStore]:
+        """
+        複数の計画書を1回のINSERT文でまとめて作成します。
+        一括生成のように大量の計画書を保存する場合に、コミット回数とラウンドトリップを削減します。
+
+        Returns:
+            List[PlanDataStore]: 作成された計画書（引数の順序と同じ並び）
+        """
+        if not plans:
+            return []
+
+        print(f"[PlanRepository] Bulk creating {len(plans)} plans.")
+
+        stmt = insert(PlanDataStore).returning(PlanDataStore, sort_by_parameter_order=True)
+        result = await self.db.scalars(
+            stmt,
+            [
+                {
+                    "hash_id": plan.hash_id,
+                    "doc_date": plan.doc_date,
+                    "format_version": plan.format_version,
+                    "raw_data": plan.raw_data,
+                    "facts_snapshot": plan.facts_snapshot,
+                    "facts_hash": plan.facts_hash,
+                    "generation_meta": plan.generation_meta,
+                    "status": plan.status,
+                }
+                for plan in plans
+            ],
+        )
+        created_plans = list(result.all())
+        await self.db.commit()
+
+        print(f"[PlanRepository] Bulk created plan IDs: {[p.plan_id for p in created_plans]}")
+        return created_plans
+
     async def get_by_patient(self, hash_id: str) -> List[PlanDataStore]:
         """
         特定の患者の計画書一覧を取得します（日付の新しい順）。
@@ -47,6 +88,21 @@ class PlanRepository:
         
         return plans
 
+    async def get_latest(self, hash_id: str) -> Optional[PlanDataStore]:
+        """
+        特定の患者の最新の計画書を1件取得します（存在しない場合は None）。
+        """
+        print(f"[PlanRepository] Fetching latest plan for patient: {hash_id}")
+
+        query = (
+            select(PlanDataStore)
+            .where(PlanDataStore.hash_id == hash_id)
+            .order_by(PlanDataStore.doc_date.desc(), PlanDataStore.plan_id.desc())
+            .limit(1)
+        )
+        result = await self.db.execute(query)
+        return result.scalars().first()
+
     async def get_by_id(self, plan_id: int) -> Optional[PlanDataStore]:
         """
         ID指定で計画書を取得します。
@@ -59,6 +115,31 @@ class PlanRepository:
         
         return plan
 
+    async def merge_raw_data(
+        self,
+        plan_id: int,
+        fields: Dict[str, Any],
+        status: Optional[str] = None,
+        facts_snapshot: Optional[Dict[str, Any]] = None,
+        facts_hash: Optional[str] = None,
+    ) -> None:
+        """
+        raw_data の一部の項目だけを上書きします（JSONBの || 演算子によるDB側でのマージ）。
+        LLMの生成結果を項目単位で暫定ドラフトに反映する場合に使用します。
+        """
+        print(f"[PlanRepository] Merging {len(fields)} fields into plan ID: {plan_id}")
+
+        values: Dict[str, Any] = {"raw_data": PlanDataStore.raw_data.op("||")(cast(fields, JSONB))}
+        if status is not None:
+            values["status"] = status
+        if facts_snapshot is not None:
+            values["facts_snapshot"] = facts_snapshot
+        if facts_hash is not None:
+            values["facts_hash"] = facts_hash
+
+        await self.db.execute(update(PlanDataStore).where(PlanDataStore.plan_id == plan_id).values(**values))
+        await self.db.commit()
+
     async def update(self, plan_id: int, plan_in: PlanUpdate) -> Optional[PlanDataStore]:
         """
         計画書の内容を更新します。
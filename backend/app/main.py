@@ -1,13 +1,28 @@
 # backend/app/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # 作成したルーターをインポート
-from app.api.v1.endpoints import patients, plans, templates
+from app.api.json_io import default_response_class_options, install_openapi_schemas
+from app.api.v1.endpoints import metrics, patients, plans, templates
+from app.usecases.utils.prompt_manager import get_prompt_registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # プロンプトテンプレートを起動時に一括で読み込み・解析しておく
+    get_prompt_registry()
+    yield
+
 
 app = FastAPI(
     title="Rehab Plan Generator API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
+    # 応答のJSON変換を orjson で行う（FastAPI が Pydantic で直接変換する場合はそちらを使う）
+    **default_response_class_options(),
 )
 
 # CORS設定
@@ -30,6 +45,10 @@ app.include_router(patients.router, prefix="/api/v1/patients", tags=["patients"]
 app.include_router(plans.router, prefix="/api/v1/plans", tags=["plans"])
 # テンプレート用ルーターを登録
 app.include_router(templates.router, prefix="/api/v1/templates", tags=["templates"])
+# LLM呼び出しのメトリクス（スケジューラ・モデル振り分け）
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["metrics"])
+# json_body で受け取るボディのスキーマを OpenAPI の components/schemas に追加する
+install_openapi_schemas(app)
 
 # 既存のエンドポイント
 @app.get("/api/")
@@ -1,4 +1,5 @@
-from typing import List, Type
+import re
+from typing import Dict, List, Optional, Type
 
 from pydantic import BaseModel, Field
 
@@ -95,6 +96,50 @@ class RehabPlanSchema(BaseModel):
     )
 
 
+# --- 項目ごとの生成の難易度（モデルの振り分けに使用） ---
+# "short": 20文字程度の所見（チェック項目の補足など）
+# "medium": 50文字程度の考察・目標
+# "narrative": 複数文で構成する方針・計画（臨床推論と他項目との整合が必要）
+COMPLEXITY_SHORT = "short"
+COMPLEXITY_MEDIUM = "medium"
+COMPLEXITY_NARRATIVE = "narrative"
+
+FIELD_COMPLEXITY: Dict[str, str] = {
+    "main_risks_txt": COMPLEXITY_MEDIUM,
+    "main_contraindications_txt": COMPLEXITY_MEDIUM,
+    "goals_1_month_txt": COMPLEXITY_MEDIUM,
+    "goals_at_discharge_txt": COMPLEXITY_MEDIUM,
+    "adl_equipment_and_assistance_details_txt": COMPLEXITY_NARRATIVE,
+    "policy_treatment_txt": COMPLEXITY_NARRATIVE,
+    "policy_content_txt": COMPLEXITY_NARRATIVE,
+    "goal_a_action_plan_txt": COMPLEXITY_NARRATIVE,
+    "goal_s_env_action_plan_txt": COMPLEXITY_NARRATIVE,
+    "goal_p_action_plan_txt": COMPLEXITY_NARRATIVE,
+    "goal_s_psychological_action_plan_txt": COMPLEXITY_NARRATIVE,
+    "goal_s_3rd_party_action_plan_txt": COMPLEXITY_NARRATIVE,
+}
+
+_LENGTH_HINT = re.compile(r"(\d+)文字程度")
+
+
+def field_complexity(field: str, description: Optional[str] = None) -> str:
+    """
+    生成項目の難易度を返す。FIELD_COMPLEXITY にない項目（func_*_txt など）は
+    description の文字数の目安（「20文字程度」など）から判定する。
+    """
+    if field in FIELD_COMPLEXITY:
+        return FIELD_COMPLEXITY[field]
+    if description is None and field in RehabPlanSchema.model_fields:
+        description = RehabPlanSchema.model_fields[field].description
+    hint = _LENGTH_HINT.search(description or "")
+    if hint is None or "文で構成" in (description or ""):
+        return COMPLEXITY_NARRATIVE
+    length = int(hint.group(1))
+    if length <= 30:
+        return COMPLEXITY_SHORT
+    return COMPLEXITY_MEDIUM if length <= 60 else COMPLEXITY_NARRATIVE
+
+
 # --- グループ化された生成のためのスキーマ定義 ---
 class RisksAndPrecautions(BaseModel):
     main_risks_txt: str = RehabPlanSchema.model_fields['main_risks_txt']
@@ -0,0 +1,653 @@
+"""
+PatientExtractionSchema（ネストした構造化データ）と旧フラット形式（Excelのセルマッピング用のキー体系）の対応表。
+
+対応は宣言的なルールの並びとして定義し、起動時に両方向の変換へコンパイルします。
+- 構造化 -> フラット: 「フラットキー -> 値の取り出し関数」の列。フラットな辞書を作らずに必要な値だけを
+  順に取り出せるため、事実情報の構築などで辞書の生成とキー名の再解析を省略できます。
+  ルールの順序がフラットな辞書のキーの順序になります。to_flat はルール列を1つの関数に展開してコンパイルします。
+- フラット -> 構造化: 「フラットな辞書 -> ネストした辞書への書き込み関数」の列。
+  集計値（any_of）や表示用の値は元に戻せないため、逆変換を持ちません。
+"""
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+Getter = Callable[[Any], Any]
+# フラットな辞書から値を読み取り、ネストした辞書（セクション -> 項目 -> 値）に書き込む関数
+Putter = Callable[[Mapping[str, Any], Dict[str, Any]], None]
+
+
+class CompiledRule(NamedTuple):
+    """コンパイル済みの1キー分のルール。"""
+    key: str
+    get: Getter
+
+
+class MappingRule(NamedTuple):
+    """
+    対応表の1エントリ（1つ以上のフラットキーと、その逆変換。逆変換できないものは None）。
+    source は to_flat に展開するコード（flat に書き込む文の列）で、None なら rules の取り出し関数を呼び出します。
+    """
+    rules: Tuple[CompiledRule, ...]
+    put: Optional[Putter]
+    source: Optional[Tuple[str, ...]] = None
+
+
+def _is_checked(value: Any) -> bool:
+    # 文字列の 'true' や 'on' も考慮してBoolean判定（Excelやフォームから読み込んだ値）
+    return value is True or str(value).lower() in ("true", "1", "on")
+
+
+def _assign(path: str) -> Callable[[Dict[str, Any], Any], None]:
+    """ドット区切りのパスに値を書き込む関数を返す（途中の辞書は必要に応じて作成）。"""
+    *parents, leaf = path.split(".")
+
+    def assign(nested: Dict[str, Any], value: Any) -> None:
+        for part in parents:
+            nested = nested.setdefault(part, {})
+        nested[leaf] = value
+
+    return assign
+
+
+def attr(key: str, path: str, invertible: bool = True) -> List[MappingRule]:
+    """
+    属性の値をそのまま出力する（例: attr("name", "basic.name")）。
+    invertible=False は算出プロパティなど、フラット形式から書き戻さない値に指定します。
+    """
+    put = None
+    if invertible:
+        assign = _assign(path)
+
+        def put(flat: Mapping[str, Any], nested: Dict[str, Any]) -> None:
+            if key in flat:
+                assign(nested, flat[key])
+
+    return [MappingRule((CompiledRule(key, attrgetter(path)),), put, (f"flat[{key!r}] = {path}",))]
+
+
+def literal_flags(path: str, mapping: Dict[str, str]) -> List[MappingRule]:
+    """
+    選択肢の値を、選択肢ごとのチェックボックス（bool）に展開する。値が None なら全て None。
+    """
+    return choice_flags(path, {key: (value,) for value, key in mapping.items()})
+
+
+def choice_flags(
+    path: str, mapping: Dict[str, Union[str, Tuple[str, ...]]], otherwise: Optional[str] = None
+) -> List[MappingRule]:
+    """
+    選択肢の値が、キーごとに指定した選択肢のいずれかに当てはまるかを bool で出力する。値が None なら全て None。
+
+    逆変換では、チェックされたキーの選択肢の共通部分が1つに絞れた場合にその値を書き戻します
+    （例: 「要支援」と「要支援1」がチェックされていれば support_1）。
+    otherwise は、どのキーの選択肢にも当てはまらない値で、全てのキーが明示的に未チェックの場合に書き戻します。
+    """
+    getter = attrgetter(path)
+    compiled = [
+        (key, (choices,) if isinstance(choices, str) else tuple(choices))
+        for key, choices in mapping.items()
+    ]
+
+    def flag(choices: Tuple[str, ...]) -> Getter:
+        def get(model: Any) -> Any:
+            value = getter(model)
+            return None if value is None else value in choices
+        return get
+
+    assign = _assign(path)
+
+    def put(flat: Mapping[str, Any], nested: Dict[str, Any]) -> None:
+        candidates: Optional[set] = None
+        all_unchecked = True
+        for key, choices in compiled:
+            value = flat.get(key)
+            if value is None:
+                all_unchecked = False
+            elif _is_checked(value):
+                all_unchecked = False
+                candidates = set(choices) if candidates is None else candidates & set(choices)
+        if candidates is not None and len(candidates) == 1:
+            assign(nested, next(iter(candidates)))
+        elif all_unchecked and otherwise is not None:
+            assign(nested, otherwise)
+
+    source = (f"value = {path}",) + tuple(
+        f"flat[{key!r}] = None if value is None else value in {choices!r}" for key, choices in compiled
+    )
+    return [MappingRule(tuple(CompiledRule(key, flag(choices)) for key, choices in compiled), put, source)]
+
+
+def any_of(key: str, paths: List[str]) -> List[MappingRule]:
+    """いずれかの属性が真なら True を出力する（集計用のチェックボックス。逆変換はしない）。"""
+    getters = [attrgetter(path) for path in paths]
+    return [MappingRule((CompiledRule(key, lambda model: any([get(model) for get in getters])),), None)]
+
+
+def adl_scores(field: str, prefix: str, with_bi: bool) -> List[MappingRule]:
+    """ADL項目1つ分のFIM（と身体項目のBI）の開始時・現在値を出力する。"""
+    rules = attr(f"{prefix}_fim_start_val", f"adl.{field}.fim_start") + \
+        attr(f"{prefix}_fim_current_val", f"adl.{field}.fim_current")
+    if with_bi:
+        rules += attr(f"{prefix}_bi_start_val", f"adl.{field}.bi_start") + \
+            attr(f"{prefix}_bi_current_val", f"adl.{field}.bi_current")
+    return rules
+
+
+# ADL項目 -> (旧キーのプレフィックス, 個別のBIキーを出力するか)
+# 更衣(上/下)・移乗(ベッド/トイレ/浴槽)のBIは、旧スキーマでは 'adl_dressing_bi_...' / 'adl_transfer_bi_...' に
+# まとめて管理されていたため個別には出力しない。認知項目はBIを持たない。
+ADL_ITEMS: Dict[str, Tuple[str, bool]] = {
+    "eating": ("adl_eating", True),
+    "grooming": ("adl_grooming", True),
+    "bathing": ("adl_bathing", True),
+    "dressing_upper": ("adl_dressing_upper", False),
+    "dressing_lower": ("adl_dressing_lower", False),
+    "toileting": ("adl_toileting", True),
+    "bladder": ("adl_bladder_management", True),
+    "bowel": ("adl_bowel_management", True),
+    "transfer_bed": ("adl_transfer_bed_chair_wc", False),
+    "transfer_toilet": ("adl_transfer_toilet", False),
+    "transfer_tub": ("adl_transfer_tub_shower", False),
+    "locomotion_walk": ("adl_locomotion_walk_walkingAids_wc", True),
+    "locomotion_stairs": ("adl_locomotion_stairs", True),
+    "comprehension": ("adl_comprehension", False),
+    "expression": ("adl_expression", False),
+    "social": ("adl_social_interaction", False),
+    "problem_solving": ("adl_problem_solving", False),
+    "memory": ("adl_memory", False),
+}
+
+_RISK_FACTORS = [
+    "medical.hypertension", "medical.dyslipidemia", "medical.diabetes", "medical.ckd",
+    "medical.angina", "medical.omi", "medical.smoking", "medical.obesity",
+    "medical.hyperuricemia", "medical.family_history", "medical.other_risk",
+]
+_MOTOR_DYSFUNCTIONS = [
+    "function.paralysis", "function.involuntary_movement", "function.ataxia", "function.parkinsonism",
+]
+
+MAPPING_SPEC: List[List[MappingRule]] = [
+    # --- 1. Basic ---
+    attr("name", "basic.name"),
+    attr("age", "basic.age"),
+    attr("age_display", "basic.age_display", invertible=False),
+    attr("gender", "basic.gender"),
+    attr("header_evaluation_date", "basic.evaluation_date"),
+    attr("header_disease_name_txt", "basic.disease_name"),
+    attr("header_treatment_details_txt", "basic.treatment_details"),
+    attr("header_onset_date", "basic.onset_date"),
+    attr("header_rehab_start_date", "basic.rehab_start_date"),
+    attr("header_therapy_pt_chk", "basic.therapy_pt"),
+    attr("header_therapy_ot_chk", "basic.therapy_ot"),
+    attr("header_therapy_st_chk", "basic.therapy_st"),
+
+    # --- 2. Medical ---
+    attr("main_comorbidities_txt", "medical.comorbidities"),
+    attr("main_risks_txt", "medical.risks"),
+    attr("main_contraindications_txt", "medical.contraindications"),
+    attr("func_risk_hypertension_chk", "medical.hypertension"),
+    attr("func_risk_dyslipidemia_chk", "medical.dyslipidemia"),
+    attr("func_risk_diabetes_chk", "medical.diabetes"),
+    attr("func_risk_ckd_chk", "medical.ckd"),
+    attr("func_risk_angina_chk", "medical.angina"),
+    attr("func_risk_omi_chk", "medical.omi"),
+    attr("func_risk_smoking_chk", "medical.smoking"),
+    attr("func_risk_obesity_chk", "medical.obesity"),
+    attr("func_risk_hyperuricemia_chk", "medical.hyperuricemia"),
+    attr("func_risk_family_history_chk", "medical.family_history"),
+    attr("func_risk_other_chk", "medical.other_risk"),
+    attr("func_risk_other_txt", "medical.other_risk_txt"),
+    # いずれかの危険因子があれば 'func_risk_factors_chk' は True
+    any_of("func_risk_factors_chk", _RISK_FACTORS),
+
+    # --- 3. Function ---
+    attr("func_consciousness_disorder_chk", "function.consciousness_disorder"),
+    attr("func_consciousness_disorder_jcs_gcs_txt", "function.jcs_gcs"),
+    attr("func_disorientation_chk", "function.disorientation"),
+    attr("func_disorientation_txt", "function.disorientation_detail"),
+    attr("func_pain_chk", "function.pain"),
+    attr("func_pain_txt", "function.pain_detail"),
+    attr("func_rom_limitation_chk", "function.rom_limitation"),
+    attr("func_rom_limitation_txt", "function.rom_detail"),
+    attr("func_muscle_weakness_chk", "function.muscle_weakness"),
+    attr("func_muscle_weakness_txt", "function.muscle_detail"),
+    attr("func_contracture_deformity_chk", "function.contracture"),
+    attr("func_contracture_deformity_txt", "function.contracture_detail"),
+    attr("func_motor_paralysis_chk", "function.paralysis"),
+    attr("func_motor_involuntary_movement_chk", "function.involuntary_movement"),
+    attr("func_motor_ataxia_chk", "function.ataxia"),
+    attr("func_motor_parkinsonism_chk", "function.parkinsonism"),
+    attr("func_motor_muscle_tone_abnormality_chk", "function.muscle_tone_abnormality"),
+    attr("func_motor_muscle_tone_abnormality_txt", "function.muscle_tone_detail"),
+    attr("func_sensory_hearing_chk", "function.hearing_disorder"),
+    attr("func_sensory_vision_chk", "function.vision_disorder"),
+    attr("func_sensory_superficial_chk", "function.sensory_superficial"),
+    attr("func_sensory_deep_chk", "function.sensory_deep"),
+    attr("func_sensory_dysfunction_chk", "function.sensory_dysfunction"),
+    attr("func_speech_disorder_chk", "function.speech_disorder"),
+    attr("func_speech_articulation_chk", "function.articulation_disorder"),
+    attr("func_speech_aphasia_chk", "function.aphasia"),
+    attr("func_speech_stuttering_chk", "function.stuttering"),
+    attr("func_speech_other_chk", "function.speech_other"),
+    attr("func_speech_other_txt", "function.speech_other_detail"),
+    attr("func_swallowing_disorder_chk", "function.swallowing_disorder"),
+    attr("func_swallowing_disorder_txt", "function.swallowing_detail"),
+    attr("func_behavioral_psychiatric_disorder_chk", "function.psychiatric_disorder"),
+    attr("func_behavioral_psychiatric_disorder_txt", "function.psychiatric_detail"),
+    attr("func_higher_brain_dysfunction_chk", "function.higher_brain_dysfunction"),
+    attr("func_higher_brain_memory_chk", "function.higher_brain_memory"),
+    attr("func_higher_brain_attention_chk", "function.higher_brain_attention"),
+    attr("func_higher_brain_apraxia_chk", "function.higher_brain_apraxia"),
+    attr("func_higher_brain_agnosia_chk", "function.higher_brain_agnosia"),
+    attr("func_higher_brain_executive_chk", "function.higher_brain_executive"),
+    attr("func_memory_disorder_chk", "function.memory_disorder"),
+    attr("func_memory_disorder_txt", "function.memory_detail"),
+    attr("func_developmental_disorder_chk", "function.developmental_disorder"),
+    attr("func_developmental_asd_chk", "function.developmental_asd"),
+    attr("func_developmental_ld_chk", "function.developmental_ld"),
+    attr("func_developmental_adhd_chk", "function.developmental_adhd"),
+    attr("func_respiratory_disorder_chk", "function.respiratory_disorder"),
+    attr("func_respiratory_o2_therapy_chk", "function.respiratory_o2"),
+    attr("func_respiratory_o2_therapy_l_min_txt", "function.respiratory_o2_flow"),
+    attr("func_respiratory_tracheostomy_chk", "function.respiratory_tracheostomy"),
+    attr("func_respiratory_ventilator_chk", "function.respiratory_ventilator"),
+    attr("func_circulatory_disorder_chk", "function.circulatory_disorder"),
+    attr("func_circulatory_ef_chk", "function.circulatory_ef_check"),
+    attr("func_circulatory_ef_val", "function.circulatory_ef_val"),
+    attr("func_circulatory_arrhythmia_chk", "function.circulatory_arrhythmia"),
+    attr("func_circulatory_arrhythmia_status_slct", "function.circulatory_arrhythmia_detail"),
+    attr("func_excretory_disorder_chk", "function.excretory_disorder"),
+    attr("func_excretory_disorder_txt", "function.excretory_detail"),
+    attr("func_pressure_ulcer_chk", "function.pressure_ulcer"),
+    attr("func_pressure_ulcer_txt", "function.pressure_ulcer_detail"),
+    attr("func_nutritional_disorder_chk", "function.nutritional_disorder"),
+    attr("func_nutritional_disorder_txt", "function.nutritional_detail"),
+    attr("func_other_chk", "function.other_disorder"),
+    attr("func_other_txt", "function.other_detail"),
+    any_of("func_motor_dysfunction_chk", _MOTOR_DYSFUNCTIONS),
+
+    # --- 4. Basic Movements (Literal Mapping) ---
+    attr("func_basic_rolling_chk", "basic_movement.rolling_evaluation"),
+    literal_flags("basic_movement.rolling_level", {
+        "independent": "func_basic_rolling_independent_chk",
+        "partial_assistance": "func_basic_rolling_partial_assistance_chk",
+        "assistance": "func_basic_rolling_assistance_chk",
+        "not_performed": "func_basic_rolling_not_performed_chk",
+    }),
+    attr("func_basic_getting_up_chk", "basic_movement.getting_up_evaluation"),
+    literal_flags("basic_movement.getting_up_level", {
+        "independent": "func_basic_getting_up_independent_chk",
+        "partial_assistance": "func_basic_getting_up_partial_assistance_chk",
+        "assistance": "func_basic_getting_up_assistance_chk",
+        "not_performed": "func_basic_getting_up_not_performed_chk",
+    }),
+    attr("func_basic_standing_up_chk", "basic_movement.standing_up_evaluation"),
+    literal_flags("basic_movement.standing_up_level", {
+        "independent": "func_basic_standing_up_independent_chk",
+        "partial_assistance": "func_basic_standing_up_partial_assistance_chk",
+        "assistance": "func_basic_standing_up_assistance_chk",
+        "not_performed": "func_basic_standing_up_not_performed_chk",
+    }),
+    attr("func_basic_sitting_balance_chk", "basic_movement.sitting_balance_evaluation"),
+    literal_flags("basic_movement.sitting_balance_level", {
+        "independent": "func_basic_sitting_balance_independent_chk",
+        "partial_assistance": "func_basic_sitting_balance_partial_assistance_chk",
+        "assistance": "func_basic_sitting_balance_assistance_chk",
+        "not_performed": "func_basic_sitting_balance_not_performed_chk",
+    }),
+    attr("func_basic_standing_balance_chk", "basic_movement.standing_balance_evaluation"),
+    literal_flags("basic_movement.standing_balance_level", {
+        "independent": "func_basic_standing_balance_independent_chk",
+        "partial_assistance": "func_basic_standing_balance_partial_assistance_chk",
+        "assistance": "func_basic_standing_balance_assistance_chk",
+        "not_performed": "func_basic_standing_balance_not_performed_chk",
+    }),
+    attr("func_basic_other_chk", "basic_movement.other_basic"),
+    attr("func_basic_other_txt", "basic_movement.other_basic_detail"),
+
+    # --- 5. ADL ---
+    *(adl_scores(field, prefix, with_bi) for field, (prefix, with_bi) in ADL_ITEMS.items()),
+    # 旧スキーマの更衣・移乗のBIは、上衣の更衣・ベッド移乗の値で代表させる
+    attr("adl_dressing_bi_start_val", "adl.dressing_upper.bi_start"),
+    attr("adl_dressing_bi_current_val", "adl.dressing_upper.bi_current"),
+    attr("adl_transfer_bi_start_val", "adl.transfer_bed.bi_start"),
+    attr("adl_transfer_bi_current_val", "adl.transfer_bed.bi_current"),
+    attr("adl_equipment_and_assistance_details_txt", "adl.equipment_detail"),
+
+    # --- 6. Nutrition ---
+    attr("nutrition_height_chk", "nutrition.height_check"),
+    attr("nutrition_height_val", "nutrition.height"),
+    attr("nutrition_weight_chk", "nutrition.weight_check"),
+    attr("nutrition_weight_val", "nutrition.weight"),
+    attr("nutrition_bmi_chk", "nutrition.bmi_check"),
+    attr("nutrition_bmi_val", "nutrition.bmi"),
+    attr("nutrition_method_oral_chk", "nutrition.method_oral"),
+    attr("nutrition_method_oral_meal_chk", "nutrition.method_oral_meal"),
+    attr("nutrition_method_oral_supplement_chk", "nutrition.method_oral_supplement"),
+    attr("nutrition_method_tube_chk", "nutrition.method_tube"),
+    attr("nutrition_method_peg_chk", "nutrition.method_peg"),
+    attr("nutrition_method_iv_chk", "nutrition.method_iv"),
+    attr("nutrition_method_iv_peripheral_chk", "nutrition.method_iv_peripheral"),
+    attr("nutrition_method_iv_central_chk", "nutrition.method_iv_central"),
+    attr("nutrition_swallowing_diet_slct", "nutrition.swallowing_diet_selection"),
+    attr("nutrition_swallowing_diet_code_txt", "nutrition.diet_code"),
+    attr("nutrition_status_assessment_slct", "nutrition.status_selection"),
+    attr("nutrition_status_assessment_other_txt", "nutrition.status_other"),
+    attr("nutrition_required_energy_val", "nutrition.required_energy"),
+    attr("nutrition_required_protein_val", "nutrition.required_protein"),
+    attr("nutrition_total_intake_energy_val", "nutrition.total_energy"),
+    attr("nutrition_total_intake_protein_val", "nutrition.total_protein"),
+
+    # --- 7. Social ---
+    attr("social_care_level_status_chk", "social.care_level_status"),
+    choice_flags("social.care_level", {
+        "social_care_level_applying_chk": "applying",
+        "social_care_level_support_chk": ("support_1", "support_2"),
+        "social_care_level_support_num1_slct": "support_1",
+        "social_care_level_support_num2_slct": "support_2",
+        "social_care_level_care_slct": ("care_1", "care_2", "care_3", "care_4", "care_5"),
+        "social_care_level_care_num1_slct": "care_1",
+        "social_care_level_care_num2_slct": "care_2",
+        "social_care_level_care_num3_slct": "care_3",
+        "social_care_level_care_num4_slct": "care_4",
+        "social_care_level_care_num5_slct": "care_5",
+    }, otherwise="none"),
+    attr("social_disability_certificate_physical_chk", "social.physical_cert_check"),
+    attr("social_disability_certificate_physical_txt", "social.physical_cert_detail"),
+    attr("social_disability_certificate_physical_rank_val", "social.physical_cert_rank"),
+    attr("social_disability_certificate_physical_type_txt", "social.physical_cert_type"),
+    attr("social_disability_certificate_mental_chk", "social.mental_cert_check"),
+    attr("social_disability_certificate_mental_rank_val", "social.mental_cert_rank"),
+    attr("social_disability_certificate_intellectual_chk", "social.intellectual_cert_check"),
+    attr("social_disability_certificate_intellectual_txt", "social.intellectual_cert_detail"),
+    attr("social_disability_certificate_intellectual_grade_txt", "social.intellectual_cert_grade"),
+    attr("social_disability_certificate_other_chk", "social.other_cert_check"),
+    attr("social_disability_certificate_other_txt", "social.other_cert_detail"),
+
+    # --- 8. Goals ---
+    attr("goals_1_month_txt", "goals.short_term_goal"),
+    attr("goals_at_discharge_txt", "goals.long_term_goal"),
+    attr("goals_planned_hospitalization_period_chk", "goals.planned_hospitalization_check"),
+    attr("goals_planned_hospitalization_period_txt", "goals.planned_hospitalization_txt"),
+    attr("goals_discharge_destination_chk", "goals.discharge_destination_check"),
+    attr("goals_discharge_destination_txt", "goals.discharge_destination_txt"),
+    attr("goals_long_term_care_needed_chk", "goals.long_term_care_needed"),
+    attr("policy_treatment_txt", "goals.treatment_policy"),
+    attr("policy_content_txt", "goals.policy_content"),
+    attr("goal_a_driving_chk", "goals.driving_check"),
+    literal_flags("goals.driving_status", {
+        "independent": "goal_a_driving_independent_chk",
+        "assistance": "goal_a_driving_assistance_chk",
+        "not_performed": "goal_a_driving_not_performed_chk",
+    }),
+    attr("goal_a_driving_modification_chk", "goals.driving_modification"),
+    attr("goal_a_driving_modification_txt", "goals.driving_modification_detail"),
+    attr("goal_a_public_transport_chk", "goals.transport_check"),
+    literal_flags("goals.transport_status", {
+        "independent": "goal_a_public_transport_independent_chk",
+        "assistance": "goal_a_public_transport_assistance_chk",
+        "not_performed": "goal_a_public_transport_not_performed_chk",
+    }),
+    attr("goal_a_public_transport_type_chk", "goals.transport_type"),
+    attr("goal_a_public_transport_type_txt", "goals.transport_type_detail"),
+    attr("goal_a_toileting_chk", "goals.toileting_check"),
+    literal_flags("goals.toileting_status", {
+        "independent": "goal_a_toileting_independent_chk",
+        "assistance": "goal_a_toileting_assistance_chk",
+    }),
+    attr("goal_a_toileting_assistance_clothing_chk", "goals.toileting_clothing"),
+    attr("goal_a_toileting_assistance_wiping_chk", "goals.toileting_wiping"),
+    attr("goal_a_toileting_assistance_catheter_chk", "goals.toileting_catheter"),
+    attr("goal_a_toileting_type_chk", "goals.toileting_type_check"),
+    attr("goal_a_toileting_type_western_chk", "goals.toileting_western"),
+    attr("goal_a_toileting_type_japanese_chk", "goals.toileting_japanese"),
+    attr("goal_a_toileting_type_other_chk", "goals.toileting_other"),
+    attr("goal_a_toileting_type_other_txt", "goals.toileting_other_detail"),
+    attr("goal_a_eating_chk", "goals.eating_check"),
+    literal_flags("goals.eating_status", {
+        "independent": "goal_a_eating_independent_chk",
+        "assistance": "goal_a_eating_assistance_chk",
+        "not_performed": "goal_a_eating_not_performed_chk",
+    }),
+    attr("goal_a_eating_method_chopsticks_chk", "goals.eating_chopsticks"),
+    attr("goal_a_eating_method_fork_etc_chk", "goals.eating_fork"),
+    attr("goal_a_eating_method_tube_feeding_chk", "goals.eating_tube"),
+    attr("goal_a_eating_diet_form_txt", "goals.eating_diet_form"),
+    attr("goal_a_bathing_chk", "goals.bathing_check"),
+    literal_flags("goals.bathing_status", {
+        "independent": "goal_a_bathing_independent_chk",
+        "assistance": "goal_a_bathing_assistance_chk",
+    }),
+    attr("goal_a_bathing_type_tub_chk", "goals.bathing_tub"),
+    attr("goal_a_bathing_type_shower_chk", "goals.bathing_shower"),
+    attr("goal_a_bathing_assistance_body_washing_chk", "goals.bathing_washing"),
+    attr("goal_a_bathing_assistance_transfer_chk", "goals.bathing_transfer"),
+    attr("goal_a_grooming_chk", "goals.grooming_check"),
+    literal_flags("goals.grooming_status", {
+        "independent": "goal_a_grooming_independent_chk",
+        "assistance": "goal_a_grooming_assistance_chk",
+    }),
+    attr("goal_a_dressing_chk", "goals.dressing_check"),
+    literal_flags("goals.dressing_status", {
+        "independent": "goal_a_dressing_independent_chk",
+        "assistance": "goal_a_dressing_assistance_chk",
+    }),
+    attr("goal_a_housework_meal_chk", "goals.housework_check"),
+    literal_flags("goals.housework_status", {
+        "all": "goal_a_housework_meal_all_chk",
+        "partial": "goal_a_housework_meal_partial_chk",
+        "not_performed": "goal_a_housework_meal_not_performed_chk",
+    }),
+    attr("goal_a_housework_meal_partial_txt", "goals.housework_detail"),
+    attr("goal_a_writing_chk", "goals.writing_check"),
+    literal_flags("goals.writing_status", {
+        "independent": "goal_a_writing_independent_chk",
+        "independent_hand_change": "goal_a_writing_independent_after_hand_change_chk",
+        "other": "goal_a_writing_other_chk",
+    }),
+    attr("goal_a_writing_other_txt", "goals.writing_other_detail"),
+    attr("goal_a_ict_chk", "goals.ict_check"),
+    literal_flags("goals.ict_status", {
+        "independent": "goal_a_ict_independent_chk",
+        "assistance": "goal_a_ict_assistance_chk",
+    }),
+    attr("goal_a_communication_chk", "goals.communication_check"),
+    literal_flags("goals.communication_status", {
+        "independent": "goal_a_communication_independent_chk",
+        "assistance": "goal_a_communication_assistance_chk",
+    }),
+    attr("goal_a_communication_device_chk", "goals.communication_device"),
+    attr("goal_a_communication_letter_board_chk", "goals.communication_letter_board"),
+    attr("goal_a_communication_cooperation_chk", "goals.communication_cooperation"),
+    attr("goal_a_bed_mobility_chk", "goals.bed_mobility_check"),
+    literal_flags("goals.bed_mobility_status", {
+        "independent": "goal_a_bed_mobility_independent_chk",
+        "assistance": "goal_a_bed_mobility_assistance_chk",
+        "not_performed": "goal_a_bed_mobility_not_performed_chk",
+    }),
+    attr("goal_a_bed_mobility_equipment_chk", "goals.bed_mobility_equipment"),
+    attr("goal_a_bed_mobility_environment_setup_chk", "goals.bed_mobility_env"),
+    attr("goal_a_indoor_mobility_chk", "goals.indoor_mobility_check"),
+    literal_flags("goals.indoor_mobility_status", {
+        "independent": "goal_a_indoor_mobility_independent_chk",
+        "assistance": "goal_a_indoor_mobility_assistance_chk",
+        "not_performed": "goal_a_indoor_mobility_not_performed_chk",
+    }),
+    attr("goal_a_indoor_mobility_equipment_chk", "goals.indoor_mobility_equipment"),
+    attr("goal_a_indoor_mobility_equipment_txt", "goals.indoor_mobility_equipment_detail"),
+    attr("goal_a_outdoor_mobility_chk", "goals.outdoor_mobility_check"),
+    literal_flags("goals.outdoor_mobility_status", {
+        "independent": "goal_a_outdoor_mobility_independent_chk",
+        "assistance": "goal_a_outdoor_mobility_assistance_chk",
+        "not_performed": "goal_a_outdoor_mobility_not_performed_chk",
+    }),
+    attr("goal_a_outdoor_mobility_equipment_chk", "goals.outdoor_mobility_equipment"),
+    attr("goal_a_outdoor_mobility_equipment_txt", "goals.outdoor_mobility_equipment_detail"),
+    attr("goal_p_residence_chk", "goals.residence_check"),
+    attr("goal_p_residence_slct", "goals.residence_slct"),
+    attr("goal_p_residence_other_txt", "goals.residence_other"),
+    attr("goal_p_return_to_work_chk", "goals.return_to_work_check"),
+    attr("goal_p_return_to_work_status_slct", "goals.return_to_work_status"),
+    attr("goal_p_return_to_work_status_other_txt", "goals.return_to_work_other"),
+    attr("goal_p_return_to_work_commute_change_chk", "goals.return_to_work_commute"),
+    attr("goal_p_schooling_chk", "goals.schooling_check"),
+    literal_flags("goals.schooling_status", {
+        "possible": "goal_p_schooling_status_possible_chk",
+        "consideration": "goal_p_schooling_status_needs_consideration_chk",
+        "change": "goal_p_schooling_status_change_course_chk",
+        "impossible": "goal_p_schooling_status_not_possible_chk",
+        "other": "goal_p_schooling_status_other_chk",
+    }),
+    attr("goal_p_schooling_status_other_txt", "goals.schooling_other_detail"),
+    attr("goal_p_schooling_destination_chk", "goals.schooling_destination_check"),
+    attr("goal_p_schooling_destination_txt", "goals.schooling_destination"),
+    attr("goal_p_schooling_commute_change_chk", "goals.schooling_commute"),
+    attr("goal_p_schooling_commute_change_txt", "goals.schooling_commute_detail"),
+    attr("goal_p_household_role_chk", "goals.household_role_check"),
+    attr("goal_p_household_role_txt", "goals.household_role_detail"),
+    attr("goal_p_social_activity_chk", "goals.social_activity_check"),
+    attr("goal_p_social_activity_txt", "goals.social_activity_detail"),
+    attr("goal_p_hobby_chk", "goals.hobby_check"),
+    attr("goal_p_hobby_txt", "goals.hobby_detail"),
+    attr("goal_a_action_plan_txt", "goals.goal_a_action_plan"),
+    attr("goal_s_env_action_plan_txt", "goals.goal_s_env_action_plan"),
+    attr("goal_p_action_plan_txt", "goals.goal_p_action_plan"),
+    attr("goal_s_psychological_action_plan_txt", "goals.goal_s_psychological_action_plan"),
+    attr("goal_s_3rd_party_action_plan_txt", "goals.goal_s_3rd_party_action_plan"),
+    attr("goal_s_psychological_support_chk", "goals.psychological_support_check"),
+    attr("goal_s_psychological_support_txt", "goals.psychological_support_detail"),
+    attr("goal_s_disability_acceptance_chk", "goals.disability_acceptance_check"),
+    attr("goal_s_disability_acceptance_txt", "goals.disability_acceptance_detail"),
+    attr("goal_s_psychological_other_chk", "goals.psychological_other_check"),
+    attr("goal_s_psychological_other_txt", "goals.psychological_other_detail"),
+    attr("goal_s_env_home_modification_chk", "goals.env_home_mod_check"),
+    attr("goal_s_env_home_modification_txt", "goals.env_home_mod_detail"),
+    attr("goal_s_env_assistive_device_chk", "goals.env_assistive_dev_check"),
+    attr("goal_s_env_assistive_device_txt", "goals.env_assistive_dev_detail"),
+    attr("goal_s_env_social_security_chk", "goals.env_social_sec_check"),
+    attr("goal_s_env_social_security_physical_disability_cert_chk", "goals.env_social_sec_phys_cert"),
+    attr("goal_s_env_social_security_disability_pension_chk", "goals.env_social_sec_pension"),
+    attr("goal_s_env_social_security_intractable_disease_cert_chk", "goals.env_social_sec_disease"),
+    attr("goal_s_env_social_security_other_chk", "goals.env_social_sec_other"),
+    attr("goal_s_env_social_security_other_txt", "goals.env_social_sec_other_detail"),
+    attr("goal_s_env_care_insurance_chk", "goals.env_care_ins_check"),
+    attr("goal_s_env_care_insurance_details_txt", "goals.env_care_ins_detail"),
+    attr("goal_s_env_care_insurance_outpatient_rehab_chk", "goals.env_care_ins_outpatient"),
+    attr("goal_s_env_care_insurance_home_rehab_chk", "goals.env_care_ins_home_rehab"),
+    attr("goal_s_env_care_insurance_day_care_chk", "goals.env_care_ins_day_care"),
+    attr("goal_s_env_care_insurance_home_nursing_chk", "goals.env_care_ins_nursing"),
+    attr("goal_s_env_care_insurance_home_care_chk", "goals.env_care_ins_home_care"),
+    attr("goal_s_env_care_insurance_health_facility_chk", "goals.env_care_ins_health_facility"),
+    attr("goal_s_env_care_insurance_nursing_home_chk", "goals.env_care_ins_nursing_home"),
+    attr("goal_s_env_care_insurance_care_hospital_chk", "goals.env_care_ins_care_hospital"),
+    attr("goal_s_env_care_insurance_other_chk", "goals.env_care_ins_other"),
+    attr("goal_s_env_care_insurance_other_txt", "goals.env_care_ins_other_detail"),
+    attr("goal_s_env_disability_welfare_chk", "goals.env_welfare_check"),
+    attr("goal_s_env_disability_welfare_after_school_day_service_chk", "goals.env_welfare_after_school"),
+    attr("goal_s_env_disability_welfare_child_development_support_chk", "goals.env_welfare_child_dev"),
+    attr("goal_s_env_disability_welfare_life_care_chk", "goals.env_welfare_life_care"),
+    attr("goal_s_env_disability_welfare_other_chk", "goals.env_welfare_other"),
+    attr("goal_s_env_other_chk", "goals.env_other_check"),
+    attr("goal_s_env_other_txt", "goals.env_other_detail"),
+    attr("goal_s_3rd_party_main_caregiver_chk", "goals.party_caregiver_check"),
+    attr("goal_s_3rd_party_main_caregiver_txt", "goals.party_caregiver_detail"),
+    attr("goal_s_3rd_party_family_structure_change_chk", "goals.party_family_struct_check"),
+    attr("goal_s_3rd_party_family_structure_change_txt", "goals.party_family_struct_detail"),
+    attr("goal_s_3rd_party_household_role_change_chk", "goals.party_role_change_check"),
+    attr("goal_s_3rd_party_household_role_change_txt", "goals.party_role_change_detail"),
+    attr("goal_s_3rd_party_family_activity_change_chk", "goals.party_activity_change_check"),
+    attr("goal_s_3rd_party_family_activity_change_txt", "goals.party_activity_change_detail"),
+
+    # --- 9. Signatures ---
+    attr("signature_primary_doctor_txt", "signature.primary_doctor"),
+    attr("signature_rehab_doctor_txt", "signature.rehab_doctor"),
+    attr("signature_pt_txt", "signature.pt"),
+    attr("signature_ot_txt", "signature.ot"),
+    attr("signature_st_txt", "signature.st"),
+    attr("signature_nurse_txt", "signature.nurse"),
+    attr("signature_dietitian_txt", "signature.dietitian"),
+    attr("signature_social_worker_txt", "signature.social_worker"),
+    attr("signature_explained_to_txt", "signature.explained_to"),
+    attr("signature_explanation_date", "signature.explanation_date"),
+    attr("signature_explainer_txt", "signature.explainer"),
+]
+
+# コンパイル済みのルール列（フラットな辞書のキー順）
+COMPILED_RULES: Tuple[CompiledRule, ...] = tuple(
+    rule for entries in MAPPING_SPEC for entry in entries for rule in entry.rules
+)
+
+FLAT_KEYS: Tuple[str, ...] = tuple(rule.key for rule in COMPILED_RULES)
+
+# コンパイル済みの逆変換の列
+INVERSE_RULES: Tuple[Putter, ...] = tuple(
+    entry.put for entries in MAPPING_SPEC for entry in entries if entry.put is not None
+)
+
+# 構造化データのトップレベルのセクション（PatientExtractionSchema のフィールド）
+SECTIONS: Tuple[str, ...] = (
+    "basic", "medical", "function", "basic_movement", "adl", "nutrition", "social", "goals", "signature",
+)
+
+
+def iter_flat_items(model: Any) -> Iterator[Tuple[str, Any]]:
+    """
+    構造化データから (フラットキー, 値) を対応表の順に取り出します（辞書は作りません）。
+
+    Args:
+        model: PatientExtractionSchema のインスタンス
+    """
+    for key, get in COMPILED_RULES:
+        yield key, get(model)
+
+
+def _compile_to_flat() -> Callable[[Any], Dict[str, Any]]:
+    """
+    対応表を、属性を直接参照する1つの関数のソースに展開してコンパイルします（起動時に1回だけ実行）。
+    セクションはローカル変数に取り出し、選択肢の値は1回だけ読み取るため、ルールごとに関数を呼び出すより高速です。
+    """
+    lines = ["def to_flat(model):"]
+    lines += [f"    {section} = model.{section}" for section in SECTIONS]
+    lines.append("    flat = {}")
+    getters: Dict[str, Getter] = {}
+    for entries in MAPPING_SPEC:
+        for entry in entries:
+            if entry.source is not None:
+                lines += [f"    {line}" for line in entry.source]
+                continue
+            for key, get in entry.rules:
+                name = f"_get_{len(getters)}"
+                getters[name] = get
+                lines.append(f"    flat[{key!r}] = {name}(model)")
+    lines.append("    return flat")
+
+    namespace: Dict[str, Any] = dict(getters)
+    exec(compile("\n".join(lines), f"<{__name__}.to_flat>", "exec"), namespace)
+    return namespace["to_flat"]
+
+
+_to_flat = _compile_to_flat()
+
+
+def to_flat(model: Any) -> Dict[str, Any]:
+    """構造化データを旧フラット形式の辞書に変換します（セルマッピングなど、辞書が必要な場合に使用）。"""
+    return _to_flat(model)
+
+
+def from_flat(flat: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    旧フラット形式の辞書を、構造化データのネストした辞書に変換します（model_validate に渡す形式）。
+
+    フラットな辞書にないキーは書き込まないため、スキーマの既定値になります。
+    集計値（func_risk_factors_chk など）や age_display は無視されます。
+
+    Args:
+        flat: 旧フラット形式の辞書（to_flat の出力や、セルマッピングから読み込んだ値）
+
+    Returns:
+        Dict[str, Any]: セクション -> 項目 -> 値 のネストした辞書（全セクションを含む）
+    """
+    nested: Dict[str, Any] = {section: {} for section in SECTIONS}
+    for put in INVERSE_RULES:
+        put(flat, nested)
+    return nested
@@ -1,7 +1,7 @@
 # backend/app/schemas/schemas.py
 from datetime import date, datetime
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Any, Literal
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 # ----------------------------------------------------------------
 # 1. 患者 (Patient) スキーマ
@@ -51,13 +51,31 @@ class PlanBase(BaseModel):
     format_version: str = "v1.0"
     # 様式23の全データを格納する自由な辞書
     raw_data: Dict[str, Any] = {}
+    # "provisional": ルールベースの暫定ドラフト（LLMによる更新中）, "final": 確定
+    status: Literal["provisional", "final"] = "final"
 
 class PlanCreate(PlanBase):
     hash_id: str
+    # AI生成時の事実情報スナップショット（差分生成用、手動作成時は不要）
+    facts_snapshot: Optional[Dict[str, Any]] = None
+    # AI生成時の患者データの内容ハッシュ（前回の計画書と入力が同じかの判定用）
+    facts_hash: Optional[str] = None
+    # AI生成時のメタ情報（生成グループごとの思考プロセスの記録など）
+    generation_meta: Optional[Dict[str, Any]] = None
 
 class PlanUpdate(BaseModel):
     # 部分更新用
     raw_data: Dict[str, Any]
+    # 暫定ドラフトを確認して確定する場合などに指定（省略時は変更しない。null は受け付けない）
+    status: Optional[Literal["provisional", "final"]] = None
+
+    @field_validator("status")
+    @classmethod
+    def _status_not_null(cls, value):
+        # 明示的な null は NOT NULL の status 列にそのまま書き込まれてしまうため拒否する
+        if value is None:
+            raise ValueError("status cannot be null; omit it to keep the current status")
+        return value
 
 class PlanRead(PlanBase):
     plan_id: int
@@ -68,6 +86,18 @@ class PlanRead(PlanBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PlanAdaptResult(BaseModel):
+    # 類似患者の計画書を下書きにした生成の結果
+    plan: PlanRead
+    # "adapt": 類似患者の計画書を修正, "full": 類似患者が見つからず通常生成
+    mode: Literal["adapt", "full"]
+    reference_hash_id: Optional[str] = None
+    edited_fields: List[str] = []
+    kept_fields: List[str] = []
+    # 所要時間・出力トークン数（benchmark=true の場合は通常生成との比較を含む）
+    metrics: Dict[str, Any] = {}
+
+
 # ----------------------------------------------------------------
 # 3. ドキュメント (Document / RAG source) スキーマ
 # ----------------------------------------------------------------
@@ -111,15 +141,43 @@ class PlanCustomGenerate(BaseModel):
     target_key: Optional[str] = None
     current_plan: Optional[Dict[str, Any]] = None
 
+class PlanItemRegenerate(BaseModel):
+    # 計画書の1項目だけを修正指示に従って書き直す
+    # 厳密な検証はエンドポイント側で PatientExtractionSchema により行う
+    patient_data: Dict[str, Any]
+    target_key: str
+    current_text: str = ""
+    instruction: str
+    current_plan: Optional[Dict[str, Any]] = None
+    rag_context: Optional[str] = None
+
 class BatchGenerateItem(BaseModel):
     target_key: str
     prompt: str
+    # 先に生成しておく必要がある他の項目の target_key（その生成結果を文脈として利用する）
+    depends_on: List[str] = Field(default_factory=list)
 
 class PlanBatchGenerate(BaseModel):
     patient_data: Dict[str, Any]
     items: List[BatchGenerateItem]
     current_plan: Optional[Dict[str, Any]] = None
 
+class PlanBulkGenerate(BaseModel):
+    # 病棟単位の一括生成。各患者の latest_state を元にドラフトを作成する
+    hash_ids: List[str] = Field(min_length=1)
+    therapist_notes: str = ""
+    # 同時に生成する患者数の上限（LLMの同時実行数はスケジューラ側でも制限される）
+    max_concurrency: int = Field(default=2, ge=1, le=16)
+
+class PlanIncrementalGenerate(BaseModel):
+    # 患者データの変更点に依存する項目だけを再生成する（シミュレーション用）
+    hash_id: str
+    # 厳密な検証はUseCase側で PatientExtractionSchema により行う
+    old_patient_data: Dict[str, Any]
+    new_patient_data: Dict[str, Any]
+    current_plan: Dict[str, Any]
+    therapist_notes: str = ""
+
 # ----------------------------------------------------------------
 # 6. テンプレート管理用 (Template Management)
 # ----------------------------------------------------------------
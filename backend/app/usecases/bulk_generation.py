@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.llm.scheduler import Priority
+from app.infrastructure.repositories.patient_repository import PatientRepository
+from app.infrastructure.repositories.plan_repository import PlanRepository
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.schemas.schemas import PlanCreate
+from app.usecases.plan_generation import PlanGenerationUseCase
+
+logger = logging.getLogger(__name__)
+
+
+class BulkPlanGenerationUseCase:
+    """
+    病棟単位で複数患者の計画書ドラフトをまとめて生成するユースケース。
+
+    各患者の latest_state (DocumentsView.entities) を一括取得し、
+    PlanGenerationUseCase によるLLM生成を同時実行数を制限しながら並列実行します。
+    LLM呼び出しは BATCH 優先度でスケジューリングされるため、
+    一括生成中でも画面からの通常生成が待たされにくくなります。
+    生成結果は最後に1回のバルクINSERTで plan_data_store に保存します。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.patient_repo = PatientRepository(db)
+        self.plan_repo = PlanRepository(db)
+        # 生成処理自体はDBに触れないため、同じユースケースを並列に使い回せる
+        self.generator = PlanGenerationUseCase(db, priority=Priority.BATCH)
+
+    async def run(
+        self,
+        hash_ids: List[str],
+        therapist_notes: str = "",
+        max_concurrency: int = 2,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        一括生成を実行し、進捗イベントを逐次返す非同期ジェネレータ。
+
+        Args:
+            hash_ids (List[str]): 対象患者のハッシュIDリスト
+            therapist_notes (str): 全患者共通の申し送り事項
+            max_concurrency (int): 同時に生成する患者数の上限
+
+        Yields:
+            Dict[str, Any]: 進捗イベント。
+                - {"event": "start", ...}: 開始時
+                - {"event": "progress", ...}: 患者1名の生成完了（成功/失敗）ごと
+                - {"event": "summary", ...}: 保存完了後のスループット・失敗一覧
+        """
+        # 重複指定は1回だけ生成する（順序は維持）
+        unique_ids = list(dict.fromkeys(hash_ids))
+        total = len(unique_ids)
+        started_at = time.perf_counter()
+
+        yield {"event": "start", "total": total, "max_concurrency": max_concurrency}
+
+        states = await self.patient_repo.get_latest_states(unique_ids)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        drafts: Dict[str, PlanCreate] = {}
+        failures: List[Dict[str, str]] = []
+        latencies: List[float] = []
+
+        async def generate_one(hash_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                t0 = time.perf_counter()
+                entities = states.get(hash_id)
+                if entities is None:
+                    return {"hash_id": hash_id, "error": "latest_state not found", "elapsed_sec": 0.0}
+                try:
+                    patient_data = PatientExtractionSchema.model_validate(entities)
+                    draft = await self.generator.generate_plan_create(
+                        hash_id=hash_id,
+                        patient_data=patient_data,
+                        therapist_notes=therapist_notes,
+                    )
+                    return {"hash_id": hash_id, "draft": draft, "elapsed_sec": time.perf_counter() - t0}
+                except ValidationError as e:
+                    return {"hash_id": hash_id, "error": f"invalid latest_state: {e.error_count()} errors",
+                            "elapsed_sec": time.perf_counter() - t0}
+                except Exception as e:
+                    logger.error(f"Bulk generation failed for {hash_id}: {e}", exc_info=True)
+                    return {"hash_id": hash_id, "error": str(e), "elapsed_sec": time.perf_counter() - t0}
+
+        tasks = [asyncio.create_task(generate_one(hash_id)) for hash_id in unique_ids]
+        try:
+            for completed, task in enumerate(asyncio.as_completed(tasks), start=1):
+                outcome = await task
+                hash_id = outcome["hash_id"]
+                elapsed = round(outcome["elapsed_sec"], 3)
+
+                if "draft" in outcome:
+                    drafts[hash_id] = outcome["draft"]
+                    latencies.append(outcome["elapsed_sec"])
+                    yield {"event": "progress", "hash_id": hash_id, "status": "succeeded",
+                           "completed": completed, "total": total, "elapsed_sec": elapsed}
+                else:
+                    failures.append({"hash_id": hash_id, "error": outcome["error"]})
+                    yield {"event": "progress", "hash_id": hash_id, "status": "failed",
+                           "completed": completed, "total": total, "elapsed_sec": elapsed,
+                           "error": outcome["error"]}
+        finally:
+            # クライアント切断などでジェネレータが途中終了した場合に残りの生成を止める
+            for task in tasks:
+                task.cancel()
+
+        # 入力順を保ったまま1回のバルクINSERTで保存
+        plan_ids: Dict[str, int] = {}
+        ordered_ids = [hash_id for hash_id in unique_ids if hash_id in drafts]
+        if ordered_ids:
+            try:
+                created = await self.plan_repo.bulk_create([drafts[hash_id] for hash_id in ordered_ids])
+                plan_ids = {plan.hash_id: plan.plan_id for plan in created}
+            except Exception as e:
+                logger.error(f"Bulk insert failed: {e}", exc_info=True)
+                failures.extend({"hash_id": hash_id, "error": f"save failed: {e}"} for hash_id in ordered_ids)
+
+        elapsed_total = time.perf_counter() - started_at
+        succeeded = len(plan_ids)
+        yield {
+            "event": "summary",
+            "total": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "plan_ids": plan_ids,
+            "failures": failures,
+            "elapsed_sec": round(elapsed_total, 3),
+            "throughput_per_min": round(succeeded / elapsed_total * 60, 2) if elapsed_total > 0 else 0.0,
+            "avg_patient_latency_sec": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        }
@@ -0,0 +1,214 @@
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, Field, create_model
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import json_codec
+from app.infrastructure.repositories.patient_repository import PatientRepository
+from app.infrastructure.repositories.plan_repository import PlanRepository
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.schemas.legacy_schemas import RehabPlanSchema
+from app.schemas.schemas import PlanCreate
+from app.usecases.plan_generation import PlanGenerationUseCase
+from app.usecases.utils.dependency_map import GENERATED_FIELDS
+from app.usecases.utils.facts_cache import get_facts_cache
+from app.usecases.utils.prompt_manager import load_prompt
+from app.usecases.utils.serializers import serialize_context
+from app.usecases.utils.prompts import FIM_GUIDELINES, render_schema_section
+from app.usecases.utils.token_counter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# PatientsView.plan_text（自由記述の過去計画書）の見出しと生成項目の対応
+PLAN_TEXT_SECTIONS: Dict[str, str] = {
+    "長期目標": "goals_at_discharge_txt",
+    "短期目標": "goals_1_month_txt",
+    "リスク": "main_risks_txt",
+    "禁忌": "main_contraindications_txt",
+    "治療方針": "policy_treatment_txt",
+    "治療内容": "policy_content_txt",
+}
+_SECTION_PATTERN = re.compile(r"【([^】]+)】([^【]*)")
+
+
+def parse_plan_text(plan_text: Optional[str]) -> Dict[str, str]:
+    """
+    「【長期目標】…【短期目標】…」形式の自由記述の計画書を、生成項目の辞書に変換する。
+    対応する見出しがない部分は無視します。
+    """
+    sections: Dict[str, str] = {}
+    for heading, body in _SECTION_PATTERN.findall(plan_text or ""):
+        field = PLAN_TEXT_SECTIONS.get(heading.strip())
+        if field and body.strip():
+            sections[field] = body.strip()
+    return sections
+
+
+def build_edit_schema(reference_fields: List[str]) -> Type[BaseModel]:
+    """
+    下書きを修正するための動的スキーマを作成する。
+    下書きにある項目は任意（null = 下書きのまま）、下書きにない項目は必須とする。
+    """
+    definitions: Dict[str, Tuple[Any, Any]] = {}
+    for field in GENERATED_FIELDS:
+        info = RehabPlanSchema.model_fields[field]
+        if field in reference_fields:
+            definitions[field] = (Optional[str], Field(default=None, description=info.description))
+        else:
+            definitions[field] = (str, info)
+    return create_model("PlanEditSchema", **definitions)
+
+
+class PlanAdaptationUseCase:
+    """
+    最も類似した過去患者の計画書を下書きにして、差分だけをLLMに修正させるユースケース。
+
+    自由生成では全項目の文章を出力する必要がありますが、この方式では変更が必要な項目だけを
+    出力させるため、出力トークン数と待ち時間を削減できます。
+    下書きに使える類似患者が見つからない場合は、通常の全項目生成 (execute) を行います。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.patient_repo = PatientRepository(db)
+        self.plan_repo = PlanRepository(db)
+        self.generator = PlanGenerationUseCase(db)
+
+    async def find_reference_plan(self, hash_id: str, patient_data: PatientExtractionSchema) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        最も類似した患者の計画書（生成項目のみ）を取得する。
+
+        社会背景ベクトルがない場合や、条件（診断・年齢・入院時FIM）に合う患者がいない場合は、
+        無関係な患者の計画書を下書きにしないよう (None, {}) を返す。
+
+        Returns:
+            Tuple[Optional[str], Dict[str, Any]]: (類似患者のhash_id, 下書きの項目辞書)。見つからない場合は (None, {})
+        """
+        patient = await self.patient_repo.get(hash_id)
+        target_vector = patient.social_vector if patient is not None else None
+        if target_vector is None:
+            return None, {}
+
+        filters = {
+            "diagnosis_code": patient.diagnosis_code if patient else None,
+            "age": (patient.age if patient else None) or (patient_data.basic.age if patient_data.basic else None),
+            "total_fim_admission": patient.total_fim_admission if patient else None,
+        }
+        neighbours = await self.patient_repo.search_similar_patients(
+            target_vector, filters, limit=1, exclude_hash_id=hash_id, with_plan_only=True
+        )
+        if not neighbours:
+            return None, {}
+
+        neighbour = neighbours[0]
+        reference = parse_plan_text(neighbour.plan_text)
+        latest = await self.plan_repo.get_latest(neighbour.hash_id)
+        if latest is not None and latest.raw_data:
+            reference.update({
+                field: latest.raw_data[field] for field in GENERATED_FIELDS
+                if isinstance(latest.raw_data.get(field), str) and latest.raw_data[field].strip()
+            })
+        return neighbour.hash_id, reference
+
+    async def execute(
+        self,
+        hash_id: str,
+        patient_data: PatientExtractionSchema,
+        therapist_notes: str = "",
+        benchmark: bool = False
+    ) -> Dict[str, Any]:
+        """
+        類似患者の計画書を下書きにして計画書を作成・保存します。
+
+        Args:
+            hash_id (str): 対象患者のハッシュID
+            patient_data (PatientExtractionSchema): 抽出済み患者データ
+            therapist_notes (str): 療法士による特記事項・申し送り
+            benchmark (bool): True の場合、比較のため通常の全項目生成も行い（保存はしない）所要時間と出力量を計測する
+
+        Returns:
+            Dict[str, Any]: plan, reference_hash_id, edited_fields, kept_fields, metrics
+        """
+        reference_hash_id, reference = await self.find_reference_plan(hash_id, patient_data)
+
+        if not reference:
+            logger.info(f"No reference plan found for {hash_id}. Falling back to full generation.")
+            started = time.perf_counter()
+            plan = await self.generator.execute(hash_id, patient_data, therapist_notes)
+            return {
+                "plan": plan, "mode": "full", "reference_hash_id": None,
+                "edited_fields": list(GENERATED_FIELDS), "kept_fields": [],
+                "metrics": {"adapt_sec": round(time.perf_counter() - started, 3)},
+            }
+
+        patient_data = self.generator._scrub_name(hash_id, patient_data)
+        prepared = get_facts_cache().prepare(patient_data, therapist_notes)
+
+        edit_schema = build_edit_schema(list(reference))
+        prompt = load_prompt(
+            "plan_adaptation",
+            patient_facts=prepared.facts_str,
+            reference_plan=serialize_context(reference),
+            fim_guidelines=FIM_GUIDELINES,
+            schema_section=render_schema_section(
+                edit_schema, getattr(self.generator.llm_client, "enforces_schema", False) is True
+            ),
+        )
+
+        started = time.perf_counter()
+        try:
+            response = await self.generator._generate_json(prompt, edit_schema)
+        except Exception as e:
+            logger.error(f"Plan adaptation failed: {e}", exc_info=True)
+            raise RuntimeError(f"Failed to adapt reference plan: {e}") from e
+        adapt_sec = time.perf_counter() - started
+
+        edits = {k: v for k, v in response.items() if k in GENERATED_FIELDS and isinstance(v, str) and v.strip()}
+        adapted = {field: edits.get(field, reference.get(field, "")) for field in GENERATED_FIELDS}
+        edited_fields = [field for field in GENERATED_FIELDS if field in edits]
+
+        metrics: Dict[str, Any] = {
+            "adapt_sec": round(adapt_sec, 3),
+            "adapt_output_tokens": estimate_tokens(json_codec.dumps(edits)),
+        }
+        if benchmark:
+            metrics.update(await self._benchmark_full_generation(hash_id, patient_data, therapist_notes))
+
+        logger.info(
+            f"Adapted plan for {hash_id} from {reference_hash_id}: "
+            f"{len(edited_fields)}/{len(GENERATED_FIELDS)} fields edited, metrics={metrics}"
+        )
+
+        plan = await self.generator._save_plan(PlanCreate(
+            hash_id=hash_id,
+            raw_data=adapted,
+            facts_snapshot=prepared.snapshot,
+            facts_hash=prepared.facts_hash,
+        ))
+        return {
+            "plan": plan,
+            "mode": "adapt",
+            "reference_hash_id": reference_hash_id,
+            "edited_fields": edited_fields,
+            "kept_fields": [field for field in GENERATED_FIELDS if field not in edits],
+            "metrics": metrics,
+        }
+
+    async def _benchmark_full_generation(
+        self,
+        hash_id: str,
+        patient_data: PatientExtractionSchema,
+        therapist_notes: str
+    ) -> Dict[str, Any]:
+        """比較用に通常の全項目生成を行い（保存しない）、所要時間と出力トークン数を返す。"""
+        started = time.perf_counter()
+        full = await self.generator.generate_plan_create(
+            hash_id, patient_data, therapist_notes, use_draft_cache=False
+        )
+        return {
+            "full_sec": round(time.perf_counter() - started, 3),
+            "full_output_tokens": estimate_tokens(json_codec.dumps(full.raw_data)),
+        }
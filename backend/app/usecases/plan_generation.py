@@ -1,31 +1,130 @@
-import json
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Type
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import create_model, Field
+from pydantic import BaseModel, create_model, Field
 
+from app.adapters.llm.base import LLMClient
+from app.adapters.llm.capabilities import get_model_capability
 from app.adapters.llm.factory import get_llm_client
+from app.adapters.llm.json_repair import PartialJSONError, missing_fields_schema
+from app.adapters.llm.router import DEFAULT_ROUTE, Route, get_llm_router
+from app.adapters.llm.scheduler import Priority, get_llm_scheduler
+from app.adapters.llm.thinking import capture_thinking, thinking_scope
+from app.core import json_codec
 from app.core.constants import PATIENT_FIELD_LABELS
+from app.core.request_context import check_deadline, with_deadline
 from app.infrastructure.repositories.plan_repository import PlanRepository
 from app.schemas.extraction_schemas import PatientExtractionSchema
-from app.schemas.legacy_schemas import GENERATION_GROUPS
+from app.schemas.legacy_schemas import GENERATION_GROUPS, RehabPlanSchema
 from app.schemas.schemas import PlanCreate
+from app.usecases.utils.batch_planner import plan_batch_waves
 from app.usecases.utils.context_builder import prepare_patient_facts
+from app.usecases.utils.dependency_map import (
+    GENERATED_FIELDS,
+    affected_fields,
+    select_facts_for_field,
+    select_related_plan,
+)
+from app.usecases.utils.draft_cache import get_draft_cache
+from app.usecases.utils.fact_snapshot import diff_fact_snapshots
+from app.usecases.utils.facts_cache import get_facts_cache
+from app.usecases.utils.generation_planner import (
+    chunk_schema,
+    estimate_stage_seconds,
+    plan_generation_stages,
+    thinking_budget_for,
+)
 # プロンプト構築ロジックをインポート（utils/prompts.py が存在することを前提）
-from app.usecases.utils.prompts import build_group_prompt
+from app.usecases.utils.prompt_budget import fit_group_prompt
+from app.usecases.utils.prompts import build_regeneration_prompt
+from app.usecases.utils.serializers import serialize_context
+from app.usecases.utils.token_counter import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+# 生成の途中結果（スキーマ単位の項目辞書）を受け取るコールバック
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
 class PlanGenerationUseCase:
     """
     LLMを使用してリハビリテーション総合実施計画書（様式23）のドラフトを生成するユースケース。
     """
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, priority: Priority = Priority.INTERACTIVE):
         self.db = db
         self.plan_repo = PlanRepository(db)
         self.llm_client = get_llm_client()
+        # 項目の難易度に応じたモデルの振り分け（LLM_ROUTES 未設定時は全て既定のクライアント）
+        self.router = get_llm_router()
+        # モデルの性能に応じて生成単位（グループの分割・統合）を決める
+        self.capability = get_model_capability(getattr(self.llm_client, "model_name", None))
+        # LLM呼び出しはスケジューラ経由で行い、一括生成などは低い優先度で実行する
+        self.scheduler = get_llm_scheduler()
+        self.priority = priority
+
+    async def _generate_json(
+        self, prompt: str, schema: Type[BaseModel], client: Optional[LLMClient] = None
+    ) -> Dict[str, Any]:
+        """
+        スケジューラのスロットを獲得してから構造化生成を行います。
+        リクエストの締め切りを過ぎた場合は、スロット待ち・生成中のどちらでも打ち切ります。
+
+        出力JSONが壊れていて一部の項目しか取り出せなかった場合は、取り出せた項目を残し、
+        不足した項目だけを1回だけ追加で生成します（スキーマ全体はやり直さない）。
+        client を指定した場合は、既定のクライアントの代わりにそのクライアントで生成します（モデル振り分け）。
+        """
+        client = client or self.llm_client
+        try:
+            return await with_deadline(self._call_llm(client.generate_json, prompt, schema), "LLM call")
+        except PartialJSONError as e:
+            logger.warning(f"Partial JSON for {schema.__name__}. Requesting missing fields: {e.missing}")
+            follow_up_prompt = (
+                f"{prompt}\n\n"
+                f"# 追加指示\n"
+                f"前回の出力は途中で途切れました。以下の項目だけを出力してください: {', '.join(e.missing)}"
+            )
+            follow_up_schema = missing_fields_schema(schema, e.missing)
+            follow_up = await with_deadline(
+                self._call_llm(client.generate_json, follow_up_prompt, follow_up_schema), "LLM call"
+            )
+            return {**e.partial, **follow_up}
+
+    async def _generate_text(self, prompt: str) -> str:
+        """スケジューラのスロットを獲得してからテキスト生成を行います（締め切りは _generate_json と同様）。"""
+        return await with_deadline(self._call_llm(self.llm_client.generate_text, prompt), "LLM call")
+
+    async def _call_llm(self, method: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        async with self.scheduler.slot(self.priority):
+            return await method(*args)
+
+    @staticmethod
+    def _scrub_name(hash_id: str, patient_data: PatientExtractionSchema) -> PatientExtractionSchema:
+        """
+        氏名をハッシュIDに置換した構造化データを返します。
+        """
+        # =========================================================================
+        # [Privacy Protection] PII Scrubbing
+        # システム側に個人情報を残さないため、処理開始直後に氏名をハッシュIDに置換し、
+        # メモリ上の実名情報を破棄する。
+        # これにより、以降の事実情報の構築やLLMプロンプトには実名が含まれなくなる。
+        # =========================================================================
+        if patient_data.basic:
+            # 実名をログに出力しないよう注意しながら、ハッシュIDで上書き
+            patient_data.basic.name = hash_id
+        return patient_data
+
+    @staticmethod
+    def _export_flat(hash_id: str, patient_data: PatientExtractionSchema) -> Dict[str, Any]:
+        """
+        氏名をハッシュIDに置換したうえで、構造化データをフラットな辞書に変換します。
+        事実情報・スナップショットの構築には不要で、フラットなキーで値を参照する処理（暫定ドラフトなど）でのみ使用します。
+        """
+        # ネストされた構造をフラットな形式に変換
+        # ※ここで変換されるデータも、置換したハッシュIDとなる
+        return PlanGenerationUseCase._scrub_name(hash_id, patient_data).export_to_mapping_format()
 
     async def execute(
         self, 
@@ -44,111 +143,417 @@ class PlanGenerationUseCase:
         Returns:
             Dict[str, Any]: 生成・保存された計画書データ（PlanDataStoreのインスタンス辞書表現など）
         """
+        plan_in = await self.generate_plan_create(hash_id, patient_data, therapist_notes)
+
+        # 4. DBへの保存
+        return await self._save_plan(plan_in)
+
+    async def _save_plan(self, plan_in: PlanCreate) -> Any:
+        """
+        生成した計画書をDBに保存します。
+        ※ PlanRepository.create 内で commit されるため、ここでは明示的なトランザクションブロックは不要
+        """
+        # 締め切りを過ぎた（クライアントが結果を待っていない）場合は保存しない
+        check_deadline("saving plan")
+        try:
+            created_plan = await self.plan_repo.create(plan_in)
+                
+            logger.info(f"Plan generation completed and saved. Plan ID: {created_plan.plan_id}")
+            return created_plan
+
+        except Exception as e:
+            logger.error(f"Database save failed: {e}", exc_info=True)
+            raise RuntimeError("Failed to save generated plan to database.") from e
+
+    async def generate_draft(
+        self,
+        hash_id: str,
+        patient_data: PatientExtractionSchema,
+        therapist_notes: str = ""
+    ) -> Dict[str, Any]:
+        """
+        LLMを用いて計画書ドラフトを生成します（DBへの保存は行いません）。
+
+        Args:
+            hash_id (str): 対象患者のハッシュID
+            patient_data (PatientExtractionSchema): 抽出済み患者データ
+            therapist_notes (str): 療法士による特記事項・申し送り
+
+        Returns:
+            Dict[str, Any]: 生成された計画書データ（raw_data形式）
+        """
+        plan_in = await self.generate_plan_create(hash_id, patient_data, therapist_notes)
+        return plan_in.raw_data
+
+    async def generate_plan_create(
+        self,
+        hash_id: str,
+        patient_data: PatientExtractionSchema,
+        therapist_notes: str = "",
+        use_draft_cache: bool = True,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> PlanCreate:
+        """
+        計画書ドラフトを生成し、保存用の PlanCreate（事実情報スナップショット付き）を返します。
+        一括生成のように、保存をまとめて行いたい呼び出し元から利用されます。
+
+        Args:
+            hash_id (str): 対象患者のハッシュID
+            patient_data (PatientExtractionSchema): 抽出済み患者データ
+            therapist_notes (str): 療法士による特記事項・申し送り
+            use_draft_cache (bool): 同じ事実情報で先読み生成されたドラフトがあれば再利用するか
+            on_progress (Optional[ProgressCallback]): 生成単位（スキーマ）ごとの結果を受け取るコールバック
+
+        Returns:
+            PlanCreate: 生成結果と facts_snapshot を含む保存用データ
+        """
         logger.info(f"Starting plan generation for patient: {hash_id}")
 
-        # =========================================================================
-        # [Privacy Protection] PII Scrubbing
-        # システム側に個人情報を残さないため、処理開始直後に氏名をハッシュIDに置換し、
-        # メモリ上の実名情報を破棄する。
-        # これにより、以降の export_to_mapping_format や LLMプロンプトには実名が含まれなくなる。
-        # =========================================================================
-        if patient_data.basic:
-            # 実名をログに出力しないよう注意しながら、ハッシュIDで上書き
-            patient_data.basic.name = hash_id
-        
-        # 1. データの正規化 (Pydantic -> Flat Dict)
-        # ネストされた構造を、context_builderが処理しやすいフラットな形式に変換
-        # ※ここで変換されるデータも、上記で置換したハッシュIDとなる
-        flat_data = patient_data.export_to_mapping_format()
+        # 1. 氏名の置換（フラットな辞書は作らず、構造化データから直接変換する）
+        patient_data = self._scrub_name(hash_id, patient_data)
 
         # 2. 事実情報の構築 (Context Builder)
-        # LLMへの入力用に、コード値や数値を自然言語に近い形に整形
-        facts = prepare_patient_facts(flat_data, therapist_notes)
-        facts_str = json.dumps(facts, ensure_ascii=False, indent=2)
-        
+        # LLMへの入力用に、コード値や数値を自然言語に近い形に整形（同じ内容の患者データならキャッシュを再利用）
+        prepared = get_facts_cache().prepare(patient_data, therapist_notes)
+
+        # 患者を開いた時点で先読み生成されたドラフトがあれば、そのまま返す
+        if use_draft_cache:
+            cached = await get_draft_cache().claim(hash_id, prepared.facts_hash)
+            if cached is not None:
+                logger.info(f"Using prefetched draft for patient: {hash_id}")
+                return PlanCreate(
+                    hash_id=hash_id, raw_data=cached,
+                    facts_snapshot=prepared.snapshot, facts_hash=prepared.facts_hash
+                )
+
         # デバッグ用: 生成の根拠となる事実情報をログ出力
-        logger.debug(f"Patient Facts prepared: {len(facts_str)} chars")
+        logger.debug(f"Patient Facts prepared: {len(prepared.facts_str)} chars")
+
+        # 思考プロセスは生成結果と一緒に保存し、生成中は患者単位でUIから購読できるようにする
+        # プロンプトの予算の割り当て（削った事実情報・文脈を含む）もスキーマごとに記録する
+        budget_reports: Dict[str, Any] = {}
+        with capture_thinking(key=hash_id) as thinking:
+            generated_plan = await self._generate_groups(
+                prepared.facts_str, on_progress, facts=prepared.facts, budget_reports=budget_reports
+            )
+        thinking_summary = thinking.summary()
 
+        generation_meta: Dict[str, Any] = {}
+        if thinking_summary:
+            generation_meta["thinking"] = thinking_summary
+        if budget_reports:
+            generation_meta["prompt_budget"] = budget_reports
+
+        return PlanCreate(
+            hash_id=hash_id,
+            raw_data=generated_plan,
+            facts_snapshot=prepared.snapshot,
+            facts_hash=prepared.facts_hash,
+            generation_meta=generation_meta or None
+        )
+
+    async def _generate_groups(
+        self,
+        facts_str: str,
+        on_progress: Optional[ProgressCallback] = None,
+        facts: Optional[Dict[str, Any]] = None,
+        budget_reports: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        GENERATION_GROUPS の順に、グループ単位で計画書を段階的に生成します。
+        グループの分割・統合はモデルの性能プロファイル (ModelCapability) に従います。
+        on_progress が指定された場合、各スキーマの生成が完了するたびにその結果を渡します。
+        facts（事実情報の辞書）を渡すと、コンテキスト長を超える場合に優先度の低い事実情報から削ります。
+        budget_reports を渡すと、スキーマ名ごとのプロンプト予算の割り当て結果が格納されます。
+        """
         # 生成結果を蓄積する辞書
         generated_plan: Dict[str, Any] = {}
 
         # 3. 段階的生成 (Generation Loop)
-        # 情報を一度に生成すると整合性が取れないため、依存関係順にグループごとに生成する
+        # 情報を一度に生成すると整合性が取れないため、依存関係順にステージごとに生成する
         # (例: 現状評価 -> 目標 -> 具体的アプローチ)
-        for group_schema in GENERATION_GROUPS:
-            schema_name = group_schema.__name__
-            logger.info(f"Generating group: {schema_name}")
+        # 小さなモデルではグループを分割して並列に、大きなモデルでは複数グループをまとめて生成する
+        stages = plan_generation_stages(GENERATION_GROUPS, self.capability, estimate_tokens(facts_str))
+        logger.info(
+            f"Generation plan: {[[s.__name__ for s in stage] for stage in stages]} "
+            f"(est. {estimate_stage_seconds(stages, self.capability, self.scheduler.max_concurrency)}s)"
+        )
 
-            try:
-                # プロンプト作成
-                # これまでの生成結果(generated_plan)を渡すことで、文脈を踏まえた一貫性のある生成が可能
-                prompt = build_group_prompt(
-                    group_schema=group_schema,
-                    patient_facts_str=facts_str,
-                    generated_plan_so_far=generated_plan
+        for stage in stages:
+            context_plan = dict(generated_plan)
+
+            async def run(schema: Type[BaseModel], route: Route) -> Dict[str, Any]:
+                result = await self._generate_group(
+                    schema, facts_str, context_plan, route, facts=facts, budget_reports=budget_reports
                 )
-                logger.info(f"\n{'='*20} PROMPT FOR {schema_name} {'='*20}\n{prompt}\n{'='*60}")
+                if on_progress is not None:
+                    await on_progress(result)
+                return result
 
-                # LLM実行 (Structured Output)
-                # 指定したPydanticスキーマに準拠したJSONが返される
-                response_dict = await self.llm_client.generate_json(prompt, group_schema)
-                
+            # 項目の難易度ごとにモデルを振り分ける場合は、スキーマを振り分け先ごとに分割して並列に生成する
+            results = await asyncio.gather(*(
+                run(sub_schema, route)
+                for schema in stage
+                for route, sub_schema in self._route_schemas(schema)
+            ))
+            for response_dict in results:
                 # 結果を統合
                 generated_plan.update(response_dict)
 
-            except Exception as e:
-                logger.error(f"Error generating {schema_name}: {e}", exc_info=True)
-                # 一部の生成に失敗しても、そこまでの結果で保存するか、エラーとして中断するか。
-                # ここでは安全のため中断し、上位にエラーを通知する方針とする。
-                raise RuntimeError(f"Failed to generate plan part '{schema_name}': {e}") from e
+        return generated_plan
+
+    def _route_schemas(self, schema: Type[BaseModel]) -> List[Tuple[Route, Type[BaseModel]]]:
+        """
+        スキーマを振り分け先ごとに分割し、さらに振り分け先のモデルの max_schema_fields を超えないように分割します。
+        ステージは既定のモデルの上限で分割済みのため、上限の小さいモデルへ振り分けた項目だけが再分割されます。
+        """
+        routed = []
+        for route, sub_schema in self.router.split(schema):
+            model_name = getattr(route.client(self.llm_client), "model_name", None)
+            limit = get_model_capability(model_name).max_schema_fields
+            routed.extend((route, chunk) for chunk in chunk_schema(sub_schema, limit))
+        return routed
+
+    async def _generate_group(
+        self,
+        group_schema: Type[BaseModel],
+        facts_str: str,
+        generated_plan_so_far: Dict[str, Any],
+        route: Optional[Route] = None,
+        facts: Optional[Dict[str, Any]] = None,
+        budget_reports: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        1つのスキーマ分の項目を生成します。
+        route が指定された場合はその振り分け先のモデルで生成し、経路ごとのレイテンシ・料金を記録します。
+        プロンプトは振り分け先のモデルのコンテキスト長に収まるように構築します (fit_group_prompt)。
+        """
+        route = route or Route(DEFAULT_ROUTE)
+        client = route.client(self.llm_client)
+        schema_name = group_schema.__name__
+        logger.info(f"Generating group: {schema_name}")
 
-        # 4. DBへの保存
-        # 生成プロセスが完了した後、DBに保存する
-        # ※ PlanRepository.create 内で commit されるため、ここでは明示的なトランザクションブロックは不要
         try:
-            plan_in = PlanCreate(
-                hash_id=hash_id,
-                raw_data=generated_plan
+            # プロンプト作成
+            # これまでの生成結果(generated_plan)を渡すことで、文脈を踏まえた一貫性のある生成が可能
+            prompt, budget = fit_group_prompt(
+                group_schema, facts_str, generated_plan_so_far, client, facts=facts
             )
-            created_plan = await self.plan_repo.create(plan_in)
-                
-            logger.info(f"Plan generation completed and saved. Plan ID: {created_plan.plan_id}")
-            return created_plan
+            logger.info(f"Prompt budget for {schema_name}: {budget.as_dict()}")
+            if budget_reports is not None:
+                budget_reports[schema_name] = budget.as_dict()
+            logger.info(f"\n{'='*20} PROMPT FOR {schema_name} {'='*20}\n{prompt}\n{'='*60}")
+
+            # LLM実行 (Structured Output)
+            # 指定したPydanticスキーマに準拠したJSONが返される
+            # 思考の量はグループごとの予算で制限する（現状評価などは思考させない）
+            started_at = time.perf_counter()
+            try:
+                with thinking_scope(schema_name, thinking_budget_for(group_schema)):
+                    result = await self._generate_json(prompt, group_schema, client)
+            except Exception:
+                self.router.record(route, getattr(client, "model_name", None), len(group_schema.model_fields),
+                                   time.perf_counter() - started_at, succeeded=False)
+                raise
+            self.router.record(
+                route, getattr(client, "model_name", None), len(group_schema.model_fields),
+                time.perf_counter() - started_at,
+                input_tokens=estimate_tokens(prompt),
+                output_tokens=estimate_tokens(json_codec.dumps(result)),
+            )
+            return result
 
         except Exception as e:
-            logger.error(f"Database save failed: {e}", exc_info=True)
-            raise RuntimeError("Failed to save generated plan to database.") from e
+            logger.error(f"Error generating {schema_name}: {e}", exc_info=True)
+            # 一部の生成に失敗しても、そこまでの結果で保存するか、エラーとして中断するか。
+            # ここでは安全のため中断し、上位にエラーを通知する方針とする。
+            raise RuntimeError(f"Failed to generate plan part '{schema_name}': {e}") from e
 
-    async def execute_custom(
+    async def execute_delta(
+        self,
+        hash_id: str,
+        patient_data: PatientExtractionSchema,
+        therapist_notes: str = ""
+    ) -> Any:
+        """
+        前回の計画書 (PlanDataStore) を元に、入力が変化した項目だけを修正した再評価用の計画書を作成します。
+
+        前回の計画書に保存された facts_snapshot と今回の事実情報を比較し、
+        変化した入力に依存する項目だけをLLMに修正させます。それ以外の項目は前回の文章を
+        そのまま引き継ぐため、毎月の再評価では出力トークンと待ち時間を大幅に削減できます。
+        前回の計画書（またはスナップショット）がない場合は通常の全項目生成を行います。
+
+        Args:
+            hash_id (str): 対象患者のハッシュID
+            patient_data (PatientExtractionSchema): 今回の抽出済み患者データ
+            therapist_notes (str): 療法士による特記事項・申し送り
+
+        Returns:
+            PlanDataStore: 新たに保存された計画書
+        """
+        previous_plan = await self.plan_repo.get_latest(hash_id)
+        if previous_plan is None or not previous_plan.facts_snapshot:
+            logger.info(f"No previous plan snapshot for {hash_id}. Falling back to full generation.")
+            return await self.execute(hash_id, patient_data, therapist_notes)
+
+        patient_data = self._scrub_name(hash_id, patient_data)
+        prepared = get_facts_cache().prepare(patient_data, therapist_notes)
+
+        previous_raw = previous_plan.raw_data or {}
+        # 患者データの内容ハッシュが前回と同じなら、スナップショットを比較するまでもなく入力は変化していない
+        if previous_plan.facts_hash == prepared.facts_hash:
+            changed_keys: Set[str] = set()
+        else:
+            changed_keys = diff_fact_snapshots(previous_plan.facts_snapshot, prepared.snapshot)
+        # 前回の計画書に存在しない生成項目は、入力の変化に関係なく生成が必要
+        changed_fields = set(affected_fields(changed_keys))
+        stale_fields = [
+            field for field in GENERATED_FIELDS
+            if field in changed_fields or field not in previous_raw
+        ]
+
+        logger.info(
+            f"Delta generation for {hash_id} (base plan {previous_plan.plan_id}): "
+            f"{len(stale_fields)}/{len(GENERATED_FIELDS)} fields to revise, changed facts={sorted(changed_keys)}"
+        )
+
+        revised: Dict[str, Any] = {}
+        if stale_fields:
+            revised = await self._regenerate_fields(
+                stale_fields, prepared.facts_str, previous_raw,
+                previous_texts={k: previous_raw[k] for k in stale_fields if k in previous_raw}
+            )
+
+        # 変化のない項目は前回の文章をそのまま再利用する
+        plan_in = PlanCreate(
+            hash_id=hash_id,
+            raw_data={**previous_raw, **revised},
+            facts_snapshot=prepared.snapshot,
+            facts_hash=prepared.facts_hash
+        )
+        return await self._save_plan(plan_in)
+
+    async def execute_incremental(
         self,
+        hash_id: str,
+        old_patient_data: PatientExtractionSchema,
+        new_patient_data: PatientExtractionSchema,
+        current_plan: Dict[str, Any],
+        therapist_notes: str = ""
+    ) -> Dict[str, Any]:
+        """
+        患者データの変更点に依存する項目だけを再生成します（「FIMが〇点だったら？」シミュレーション用）。
+
+        新旧の患者データから事実情報を構築して差分を取り、依存関係マップ
+        (FIELD_FACT_DEPENDENCIES) で影響を受ける項目を特定したうえで、
+        それらの項目だけを1回のLLM呼び出しで再生成します。DBへの保存は行いません。
+
+        Args:
+            hash_id (str): 対象患者のハッシュID
+            old_patient_data (PatientExtractionSchema): 変更前の患者データ
+            new_patient_data (PatientExtractionSchema): 変更後の患者データ
+            current_plan (Dict[str, Any]): 変更前の患者データで生成済みの計画書
+            therapist_notes (str): 療法士による特記事項・申し送り
+
+        Returns:
+            Dict[str, Any]: {
+                "stale_fields": 再生成した（古くなった）項目,
+                "changed_fact_keys": 変化した事実情報のフラットキー,
+                "regenerated": 再生成された項目の値,
+                "plan": 再生成結果を反映した計画書全体
+            }
+        """
+        old_patient_data = self._scrub_name(hash_id, old_patient_data)
+        new_patient_data = self._scrub_name(hash_id, new_patient_data)
+
+        facts_cache = get_facts_cache()
+        old_prepared = facts_cache.prepare(old_patient_data, therapist_notes)
+        new_prepared = facts_cache.prepare(new_patient_data, therapist_notes)
+
+        changed_keys: List[str] = []
+        stale_fields: List[str] = []
+        # 患者データの内容、またはLLMに渡る事実情報が変わっていなければ、再生成は不要
+        if old_prepared.facts_hash != new_prepared.facts_hash and old_prepared.facts != new_prepared.facts:
+            changed_keys = sorted(diff_fact_snapshots(old_prepared.snapshot, new_prepared.snapshot))
+            stale_fields = affected_fields(changed_keys)
+
+        logger.info(f"Incremental regeneration for {hash_id}: changed={changed_keys}, stale={stale_fields}")
+
+        regenerated: Dict[str, Any] = {}
+        if stale_fields:
+            regenerated = await self._regenerate_fields(stale_fields, new_prepared.facts_str, current_plan)
+
+        return {
+            "stale_fields": stale_fields,
+            "changed_fact_keys": changed_keys,
+            "regenerated": regenerated,
+            "plan": {**current_plan, **regenerated},
+        }
+
+    async def _regenerate_fields(
+        self,
+        fields: List[str],
+        facts_str: str,
+        base_plan: Dict[str, Any],
+        previous_texts: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        指定された項目だけを含む動的スキーマを作成し、1回のLLM呼び出しで再生成します。
+        再生成しない項目は文脈として渡し、既存の内容との整合性を保ちます。
+
+        Args:
+            previous_texts: 修正対象項目の前回の文章。指定時は新規作成ではなく「修正」を指示します。
+        """
+        field_definitions = {
+            field: (str, RehabPlanSchema.model_fields[field])
+            for field in fields
+        }
+        PartialPlanSchema = create_model('PartialPlanSchema', **field_definitions)
+
+        context_plan = {k: v for k, v in base_plan.items() if k not in field_definitions}
+        suffix = ""
+        if previous_texts:
+            previous_str = serialize_context(previous_texts)
+            suffix = (
+                "\n\n# 前回の計画書の記載（修正対象）\n"
+                "以下は前回の計画書の該当項目です。患者データの変化に合わせて必要な箇所のみを修正し、"
+                "変更が不要な表現はそのまま残してください。\n"
+                f"  ```json\n{previous_str}\n  ```\n"
+            )
+        # 計画書全体を文脈として渡すため、コンテキスト長を超える場合は関連の薄い項目から削る
+        prompt, budget = fit_group_prompt(PartialPlanSchema, facts_str, context_plan, self.llm_client, suffix=suffix)
+        logger.info(f"Prompt budget for partial regeneration: {budget.as_dict()}")
+
+        try:
+            response_dict = await self._generate_json(prompt, PartialPlanSchema)
+        except Exception as e:
+            logger.error(f"Partial regeneration failed: {e}", exc_info=True)
+            raise RuntimeError(f"Failed to regenerate fields {fields}: {e}") from e
+
+        return {k: v for k, v in response_dict.items() if k in field_definitions}
+
+    @staticmethod
+    def _build_custom_prompt(
         patient_data: Dict[str, Any],
         prompt: str,
         current_plan: Optional[Dict[str, Any]] = None
     ) -> str:
         """
-        カスタムプロンプトによる部分生成を実行します。
-        
-        Args:
-            patient_data (Dict): 患者データ（辞書形式）
-            prompt (str): ユーザー定義のプロンプト
-            current_plan (Optional[Dict]): 既に生成済みの計画書データ（文脈用）
-
-        Returns:
-            str: 生成されたテキスト
+        カスタム生成用のプロンプトを構築します（患者データと既存計画をそのまま埋め込む）。
         """
         # 簡易的に事実情報を構築（Validationなしでdictをそのまま使用する簡易版）
         # 注意: export_to_mapping_formatを通していないため、patient_dataの構造に依存します。
         # 本格運用時はPatientExtractionSchemaでバリデーションしてから変換推奨。
         
-        facts_str = json.dumps(patient_data, ensure_ascii=False, indent=2)
+        facts_str = get_facts_cache().prepare(patient_data).facts_str
         
         # 既存計画のコンテキスト化
         plan_context_str = ""
         if current_plan:
-            plan_str = json.dumps(current_plan, ensure_ascii=False, indent=2)
+            plan_str = serialize_context(current_plan)
             plan_context_str = f"\n【既存の計画書データ (参考)】\nすでに決定している以下の計画内容と整合性が取れるように生成してください。\n{plan_str}\n"
 
-        full_prompt = f"""
+        return f"""
 あなたはリハビリテーション計画書の作成支援AIです。
 以下の患者データを参照し、ユーザーの指示に従って計画書の一部を作成してください。
 
@@ -160,13 +565,96 @@ class PlanGenerationUseCase:
 
 出力は指示された内容のみをテキストで返してください。余計な挨拶は不要です。
 """
+
+    async def execute_custom(
+        self,
+        patient_data: Dict[str, Any],
+        prompt: str,
+        current_plan: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        カスタムプロンプトによる部分生成を実行します。
+        
+        Args:
+            patient_data (Dict): 患者データ（辞書形式）
+            prompt (str): ユーザー定義のプロンプト
+            current_plan (Optional[Dict]): 既に生成済みの計画書データ（文脈用）
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        full_prompt = self._build_custom_prompt(patient_data, prompt, current_plan)
         logger.info(f"Executing Custom Generation Prompt: {prompt[:50]}...")
         
         # テキスト生成としてLLMを呼び出し
-        response_text = await self.llm_client.generate_text(full_prompt)
+        response_text = await self._generate_text(full_prompt)
         
         return response_text
 
+    async def execute_item_regeneration(
+        self,
+        patient_data: PatientExtractionSchema,
+        target_key: str,
+        current_text: str,
+        instruction: str,
+        current_plan: Optional[Dict[str, Any]] = None,
+        rag_context: Optional[str] = None,
+        benchmark: bool = False
+    ) -> Dict[str, Any]:
+        """
+        計画書の1項目だけを、修正指示に従って書き直します。
+
+        患者データ・計画書の全体ではなく、対象項目が依存する事実情報と、
+        整合性確認に必要な関連項目だけをプロンプトに含めることで入力トークンを削減します。
+
+        Args:
+            patient_data (PatientExtractionSchema): 抽出済み患者データ
+            target_key (str): 書き直す項目のキー（例: "goals_1_month_txt"）
+            current_text (str): 現在の文章
+            instruction (str): 修正指示
+            current_plan (Optional[Dict]): 現在の計画書データ（関連項目の抽出元）
+            rag_context (Optional[str]): 参考情報（専門知識）
+            benchmark (bool): True の場合、従来の経路（全データを渡すプロンプト）のトークン数も計測して比較する
+
+        Returns:
+            Dict[str, Any]: {"result": 書き直した文章, "metrics": プロンプトのトークン数（benchmark 時は比較を含む）}
+        """
+        current_plan = current_plan or {}
+
+        # 依存する事実情報だけに絞り込む（氏名は依存先に含まれないため匿名のまま）
+        flat_data = select_facts_for_field(target_key, patient_data.export_to_mapping_format())
+        flat_data.pop("name", None)
+        facts = prepare_patient_facts(flat_data)
+        facts_str = serialize_context(facts)
+
+        prompt = build_regeneration_prompt(
+            patient_facts_str=facts_str,
+            generated_plan_so_far=select_related_plan(target_key, current_plan),
+            item_key_to_regenerate=target_key,
+            current_text=current_text,
+            instruction=instruction,
+            rag_context=rag_context
+        )
+
+        prompt_tokens = estimate_tokens(prompt)
+        metrics: Dict[str, Any] = {"prompt_tokens": prompt_tokens}
+        if benchmark:
+            # 従来の経路（execute_custom に全データを渡す方法）とのプロンプト量の比較
+            baseline_prompt = self._build_custom_prompt(
+                patient_data.model_dump(mode="json"),
+                f"{target_key} を次の指示に従って書き直してください: {instruction}\n現在の文章:\n{current_text}",
+                current_plan
+            )
+            baseline_tokens = estimate_tokens(baseline_prompt)
+            metrics.update({
+                "baseline_prompt_tokens": baseline_tokens,
+                "reduction_ratio": round(1 - prompt_tokens / baseline_tokens, 3) if baseline_tokens else 0.0,
+            })
+        logger.info(f"Item regeneration for {target_key}: {metrics}")
+
+        result_text = await self._generate_text(prompt)
+        return {"result": result_text.strip(), "metrics": metrics}
+
     async def execute_batch(
         self,
         patient_data: Dict[str, Any],
@@ -175,11 +663,45 @@ class PlanGenerationUseCase:
     ) -> Dict[str, Any]:
         """
         指定された複数の項目(キーとプロンプト)に基づいて一括生成を行う。
+
+        項目は depends_on に従ってウェーブに分割され、ウェーブ内の独立した項目は
+        チャンク単位で並列に生成されます。前のウェーブの生成結果は current_plan に加えて
+        後続ウェーブの文脈として渡されます。
+
+        Raises:
+            ValueError: 項目間に循環依存がある場合
         """
-        # 1. 事実情報の構築 (簡易版)
-        facts_str = json.dumps(patient_data, ensure_ascii=False, indent=2)
+        # 1. 事実情報の構築 (簡易版、同じ患者データならキャッシュを再利用)
+        facts_str = get_facts_cache().prepare(patient_data).facts_str
 
-        # 2. 動的なPydanticモデルの生成
+        # 2. 依存関係順のウェーブ・チャンクへの分割（チャンクの大きさはモデルが安定して生成できる項目数まで）
+        waves = plan_batch_waves(items, max_chunk_size=self.capability.max_schema_fields)
+        logger.info(
+            f"Executing Batch Generation for keys: {[i.target_key for i in items]} "
+            f"({len(waves)} waves, {sum(len(w) for w in waves)} calls)"
+        )
+
+        results: Dict[str, Any] = {}
+        for wave in waves:
+            context_plan = {**(current_plan or {}), **results}
+            chunk_results = await asyncio.gather(
+                *(self._generate_batch_chunk(facts_str, chunk, context_plan) for chunk in wave)
+            )
+            for chunk_result in chunk_results:
+                results.update(chunk_result)
+
+        return results
+
+    async def _generate_batch_chunk(
+        self,
+        facts_str: str,
+        items: List[Any],
+        current_plan: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        チャンク内の項目を1つの動的スキーマにまとめ、1回のLLM呼び出しで生成する。
+        """
+        # 動的なPydanticモデルの生成
         # itemsの内容に基づいて、{ "risk_txt": (str, Field(...)), "goal_txt": ... } という定義を作る
         field_definitions = {
             item.target_key: (str, Field(description=item.prompt))
@@ -188,11 +710,11 @@ class PlanGenerationUseCase:
         # モデル名は動的に生成
         DynamicBatchSchema = create_model('DynamicBatchSchema', **field_definitions)
 
-        # 3. プロンプト作成
+        # プロンプト作成
         # 既存計画のコンテキスト化
         plan_context_str = ""
         if current_plan:
-            plan_str = json.dumps(current_plan, ensure_ascii=False, indent=2)
+            plan_str = serialize_context(current_plan)
             plan_context_str = f"\n【既存の計画書データ (参考)】\nすでに決定している以下の計画内容と整合性が取れるように生成してください。\n{plan_str}\n"
 
         prompt = f"""
@@ -206,11 +728,9 @@ class PlanGenerationUseCase:
 各項目について、それぞれのdescription（指示）に従って適切な内容を生成してください。
 JSON形式で出力してください。
 """
-        logger.info(f"Executing Batch Generation for keys: {[i.target_key for i in items]}")
-
-        # 4. LLM実行 (Structured Output)
+        # LLM実行 (Structured Output)
         try:
-            response_dict = await self.llm_client.generate_json(prompt, DynamicBatchSchema)
+            response_dict = await self._generate_json(prompt, DynamicBatchSchema)
             return response_dict
         except Exception as e:
             logger.error(f"Batch generation failed: {e}", exc_info=True)
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from app.adapters.llm.scheduler import LLMScheduler, Priority, get_llm_scheduler
+from app.core.request_context import set_deadline
+from app.infrastructure.db.database import AsyncSessionLocal
+from app.infrastructure.repositories.patient_repository import PatientRepository
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.usecases.plan_generation import PlanGenerationUseCase
+from app.usecases.utils.draft_cache import DraftCache, get_draft_cache
+from app.usecases.utils.facts_cache import get_facts_cache
+
+logger = logging.getLogger(__name__)
+
+
+class DraftPrefetcher:
+    """
+    患者が開かれた時点で、計画書ドラフトを低優先度で先読み生成するユースケース。
+
+    療法士は患者を開いた数秒後に生成ボタンを押すことが多いため、その間に
+    latest_state を元にドラフトを生成して DraftCache に入れておきます。
+    同じ事実情報での生成要求はキャッシュ（または生成中の先読み）の結果を即座に受け取れます。
+
+    先読みは PREFETCH 優先度で実行され、次の場合は開始しない・中断します。
+    - スケジューラが混雑している（空きスロットがない、待機者がいる）
+    - より優先度の高いLLM呼び出しが待機し始めた
+    - 患者が閉じられた (cancel)
+    """
+
+    def __init__(
+        self,
+        cache: DraftCache,
+        scheduler: LLMScheduler,
+        enabled: bool = False,
+        poll_interval: float = 0.5,
+    ):
+        self.cache = cache
+        self.scheduler = scheduler
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def schedule(self, hash_id: str) -> bool:
+        """
+        先読み生成をバックグラウンドで開始します。
+
+        Returns:
+            bool: 新たに先読みを開始した場合に True
+        """
+        if not self.enabled:
+            return False
+        if self.scheduler.is_busy():
+            logger.info(f"Prefetch skipped for {hash_id}: scheduler is busy")
+            return False
+        running = self._tasks.get(hash_id)
+        if running is not None and not running.done():
+            return False
+
+        task = asyncio.create_task(self._run(hash_id))
+        self._tasks[hash_id] = task
+        task.add_done_callback(lambda t: self._tasks.pop(hash_id, None) if self._tasks.get(hash_id) is t else None)
+        return True
+
+    def cancel(self, hash_id: str) -> bool:
+        """
+        患者が閉じられた場合などに、実行中の先読みを中断します。
+
+        Returns:
+            bool: 実行中の先読みを中断した場合に True
+        """
+        task = self._tasks.pop(hash_id, None)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        logger.info(f"Prefetch cancelled for {hash_id}")
+        return True
+
+    async def _load_patient_data(self, hash_id: str) -> Optional[PatientExtractionSchema]:
+        # リクエストのセッションは応答後に閉じられるため、独立したセッションを使用する
+        async with AsyncSessionLocal() as db:
+            entities = await PatientRepository(db).get_latest_state(hash_id)
+        if not entities:
+            return None
+        return PatientExtractionSchema.model_validate(entities)
+
+    async def _run(self, hash_id: str) -> None:
+        # 先読みは患者を開いたリクエストとは独立して実行する
+        set_deadline(None)
+        try:
+            patient_data = await self._load_patient_data(hash_id)
+            if patient_data is None:
+                return
+
+            # 生成要求側と同じ手順で患者データの内容ハッシュを計算しておく（事実情報もキャッシュされる）
+            patient_data = PlanGenerationUseCase._scrub_name(hash_id, patient_data)
+            key = get_facts_cache().prepare(patient_data).facts_hash
+
+            # 生成処理はDBに触れないため、セッションは渡さない
+            usecase = PlanGenerationUseCase(None, priority=Priority.PREFETCH)
+            generation = asyncio.create_task(self._generate_and_store(usecase, hash_id, patient_data, key))
+            self.cache.register_pending(hash_id, key, generation)
+            await self._watch(hash_id, generation)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Prefetch failed for {hash_id}: {e}")
+
+    async def _generate_and_store(
+        self,
+        usecase: PlanGenerationUseCase,
+        hash_id: str,
+        patient_data: PatientExtractionSchema,
+        key: str,
+    ) -> Dict[str, Any]:
+        plan_in = await usecase.generate_plan_create(hash_id, patient_data, use_draft_cache=False)
+        self.cache.put(hash_id, key, plan_in.raw_data)
+        logger.info(f"Prefetched draft cached for {hash_id}")
+        return plan_in.raw_data
+
+    async def _watch(self, hash_id: str, generation: asyncio.Task) -> None:
+        """
+        生成の完了を待ちながら、優先度の高い要求が待機し始めたら先読みを中断する。
+        """
+        try:
+            while not generation.done():
+                await asyncio.wait({generation}, timeout=self.poll_interval)
+                if not generation.done() and self.scheduler.has_waiters_above(Priority.PREFETCH):
+                    logger.info(f"Prefetch preempted for {hash_id}: higher priority requests are waiting")
+                    generation.cancel()
+                    return
+            generation.result()
+        finally:
+            if not generation.done():
+                generation.cancel()
+
+
+@lru_cache()
+def get_draft_prefetcher() -> DraftPrefetcher:
+    """
+    アプリケーション全体で共有する先読みマネージャを返します。
+    環境変数 PLAN_PREFETCH_ENABLED が "true" の場合のみ有効になります (default: false)。
+    """
+    enabled = os.getenv("PLAN_PREFETCH_ENABLED", "false").lower() == "true"
+    print(f"[Draft Prefetcher] Initialized (enabled={enabled})")
+    return DraftPrefetcher(get_draft_cache(), get_llm_scheduler(), enabled=enabled)
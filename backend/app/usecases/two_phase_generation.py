@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.request_context import set_deadline
+from app.infrastructure.db.database import AsyncSessionLocal
+from app.infrastructure.repositories.plan_repository import PlanRepository
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.schemas.schemas import PlanCreate
+from app.usecases.plan_generation import PlanGenerationUseCase
+from app.usecases.utils.context_builder import prepare_patient_facts
+from app.usecases.utils.rule_based_draft import build_rule_based_draft
+
+logger = logging.getLogger(__name__)
+
+
+class TwoPhasePlanGenerationUseCase:
+    """
+    2段階で計画書を作成するユースケース。
+
+    1. ルールベースの暫定ドラフトを即座に作成し、status="provisional" で保存する
+    2. LLMによる生成をバックグラウンドで行い、完了したスキーマから順に項目を置き換え、
+       全て完了したら status="final" にする
+
+    LLMのキューが混雑していても、利用者は数ミリ秒で使える下書きを受け取れます。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.plan_repo = PlanRepository(db)
+
+    async def create_provisional(
+        self,
+        hash_id: str,
+        patient_data: PatientExtractionSchema,
+        therapist_notes: str = ""
+    ) -> Any:
+        """
+        LLMを使わずに暫定ドラフトを作成して保存します。
+
+        Returns:
+            PlanDataStore: status="provisional" で保存された計画書
+        """
+        flat_data = PlanGenerationUseCase._export_flat(hash_id, patient_data)
+        facts = prepare_patient_facts(flat_data, therapist_notes)
+        draft = build_rule_based_draft(flat_data, facts)
+
+        plan = await self.plan_repo.create(
+            PlanCreate(hash_id=hash_id, raw_data=draft, status="provisional")
+        )
+        logger.info(f"Provisional plan created for {hash_id}. Plan ID: {plan.plan_id}")
+        return plan
+
+    async def upgrade(
+        self,
+        plan_id: int,
+        hash_id: str,
+        patient_data: PatientExtractionSchema,
+        therapist_notes: str = ""
+    ) -> None:
+        """
+        LLMで計画書を生成し、暫定ドラフトの項目を完了したものから順に置き換えます。
+        """
+        generator = PlanGenerationUseCase(self.db)
+        # 並列に完了したスキーマの結果を、同じセッションで順番に書き込む
+        lock = asyncio.Lock()
+
+        async def on_progress(fields: Dict[str, Any]) -> None:
+            async with lock:
+                await self.plan_repo.merge_raw_data(plan_id, fields)
+
+        plan_in = await generator.generate_plan_create(
+            hash_id, patient_data, therapist_notes, on_progress=on_progress
+        )
+        async with lock:
+            await self.plan_repo.merge_raw_data(
+                plan_id, plan_in.raw_data, status="final",
+                facts_snapshot=plan_in.facts_snapshot, facts_hash=plan_in.facts_hash
+            )
+        logger.info(f"Plan {plan_id} upgraded by LLM and finalized.")
+
+
+async def run_llm_upgrade(
+    plan_id: int,
+    hash_id: str,
+    patient_data: PatientExtractionSchema,
+    therapist_notes: str = ""
+) -> None:
+    """
+    バックグラウンドタスク用: 独立したDBセッションで暫定ドラフトをLLMの生成結果に置き換えます。
+    失敗した場合、計画書は暫定ドラフト (provisional) のまま残ります。
+    """
+    # 応答後に実行されるため、元のリクエストの締め切りは適用しない
+    set_deadline(None)
+    async with AsyncSessionLocal() as db:
+        try:
+            await TwoPhasePlanGenerationUseCase(db).upgrade(plan_id, hash_id, patient_data, therapist_notes)
+        except Exception as e:
+            logger.error(f"LLM upgrade failed for plan {plan_id}: {e}", exc_info=True)
@@ -0,0 +1,51 @@
+from typing import Any, Dict, List, Sequence
+
+# 1回のLLM呼び出しで生成する項目数の既定の上限。
+# 実際の生成ではモデルの性能表 (ModelCapability.max_schema_fields) の値を渡す
+DEFAULT_MAX_CHUNK_SIZE = 8
+
+
+def plan_batch_waves(items: Sequence[Any], max_chunk_size: int = DEFAULT_MAX_CHUNK_SIZE) -> List[List[List[Any]]]:
+    """
+    生成カード(BatchGenerateItem)を依存関係順の「ウェーブ」に分割し、各ウェーブをチャンクに分ける。
+
+    同じウェーブ内の項目は互いに依存しないため並列に生成でき、
+    後続のウェーブは前のウェーブの生成結果を文脈として利用できます。
+    depends_on にリクエスト外のキーが含まれる場合は、既存の計画書 (current_plan) を参照するものとして無視します。
+
+    Args:
+        items: target_key と depends_on を持つ生成カードのリスト
+        max_chunk_size: 1チャンク（=1回のLLM呼び出し）あたりの最大項目数
+
+    Returns:
+        List[List[List[Any]]]: waves[ウェーブ][チャンク][項目]
+
+    Raises:
+        ValueError: target_key の重複、または循環依存がある場合
+    """
+    by_key: Dict[str, Any] = {}
+    for item in items:
+        if item.target_key in by_key:
+            raise ValueError(f"Duplicate target_key in batch: {item.target_key}")
+        by_key[item.target_key] = item
+
+    # Kahnのアルゴリズムで、入次数0の項目から順にウェーブへ割り当てる（入力順は維持）
+    deps = {
+        key: {dep for dep in (getattr(item, "depends_on", None) or []) if dep in by_key and dep != key}
+        for key, item in by_key.items()
+    }
+    chunk_size = max(1, max_chunk_size)
+    waves: List[List[List[Any]]] = []
+    done: set = set()
+
+    while len(done) < len(by_key):
+        ready = [key for key in by_key if key not in done and deps[key] <= done]
+        if not ready:
+            cyclic = sorted(key for key in by_key if key not in done)
+            raise ValueError(f"Circular dependency between batch items: {cyclic}")
+
+        wave_items = [by_key[key] for key in ready]
+        waves.append([wave_items[i:i + chunk_size] for i in range(0, len(wave_items), chunk_size)])
+        done.update(ready)
+
+    return waves
@@ -1,12 +1,94 @@
 import logging
 from datetime import date
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
 
 # 定数定義をインポート（ハードコーディングを解消）
 from app.core.constants import PATIENT_FIELD_LABELS, CHECKBOX_TEXT_PAIRS
+from app.schemas.mapping_spec import COMPILED_RULES
 
 logger = logging.getLogger(__name__)
 
+# カテゴリの自動判定（プレフィックスベース）。どれにも当てはまらなければ「心身機能・構造」
+_CATEGORY_PREFIXES: Tuple[Tuple[Tuple[str, ...], str], ...] = (
+    (("header_", "main_"), "基本情報"),
+    (("func_basic_",), "基本動作"),
+    (("nutrition_",), "栄養状態"),
+    (("social_",), "社会保障サービス"),
+    (("goal_p_",), "目標（参加）"),
+    (("goal_a_",), "目標（活動）"),
+    (("goal_s_",), "目標（環境・対応）"),
+)
+_DEFAULT_CATEGORY = "心身機能・構造"
+
+
+class _FieldRoute(NamedTuple):
+    """フラットなキー1つの振り分け先（事実情報のカテゴリ・ラベルと、ADLスコアの格納先）。"""
+    category: Optional[str]
+    label: Optional[str]
+    adl_group: Optional[str]
+    adl_item: Optional[str]
+
+
+def _category_for(key: str) -> str:
+    for prefixes, category in _CATEGORY_PREFIXES:
+        if key.startswith(prefixes):
+            return category
+    return _DEFAULT_CATEGORY
+
+
+def _build_route(key: str) -> _FieldRoute:
+    category = label = adl_group = adl_item = None
+
+    # チェックボックス+テキストのペアになっているキーは、ペアとしてまとめて処理するため個別には出力しない
+    # (例: func_pain_chk があっても、ここでは処理せず func_pain_txt とセットで扱う)
+    if key not in _PAIRED_KEYS:
+        label = PATIENT_FIELD_LABELS.get(key)
+        if label:
+            category = _category_for(key)
+
+    # ADLスコア (FIM/BI) の現在値
+    # 例: adl_eating_fim_current_val -> Eating
+    if "_val" in key:
+        if "fim_current_val" in key:
+            adl_group = "FIM(現在値)"
+            adl_item = key.replace("adl_", "").replace("_fim_current_val", "").replace("_", " ").title()
+        elif "bi_current_val" in key:
+            adl_group = "BI(現在値)"
+            adl_item = key.replace("adl_", "").replace("_bi_current_val", "").replace("_", " ").title()
+
+    return _FieldRoute(category, label if category else None, adl_group, adl_item)
+
+
+_PAIRED_KEYS = frozenset(CHECKBOX_TEXT_PAIRS) | frozenset(CHECKBOX_TEXT_PAIRS.values())
+
+# キー -> 振り分け先 の表。定数に定義されたキーは起動時に、それ以外（ラベルのないADLスコアなど）は初出時に登録する
+_FIELD_ROUTES: Dict[str, _FieldRoute] = {key: _build_route(key) for key in PATIENT_FIELD_LABELS}
+
+# ラベルが定義されているチェックボックス+テキストのペア (チェックボックスのキー, テキストのキー, ラベル)
+_CHECKBOX_ROUTES: Tuple[Tuple[str, str, str], ...] = tuple(
+    (chk_key, txt_key, PATIENT_FIELD_LABELS[chk_key])
+    for chk_key, txt_key in CHECKBOX_TEXT_PAIRS.items()
+    if PATIENT_FIELD_LABELS.get(chk_key)
+)
+
+
+def _route_for(key: str) -> _FieldRoute:
+    route = _FIELD_ROUTES.get(key)
+    if route is None:
+        route = _FIELD_ROUTES[key] = _build_route(key)
+    return route
+
+
+# 構造化データから直接事実情報を構築するためのルール列（対応表の順）
+# (値の取り出し関数, 振り分け先, ペア項目ならそのキー)。事実情報に現れないキーのルールは含めない
+_FACT_RULES: Tuple[Tuple[Callable[[Any], Any], _FieldRoute, Optional[str]], ...] = tuple(
+    (rule.get, route, rule.key if rule.key in _PAIRED_KEYS else None)
+    for rule in COMPILED_RULES
+    for route in (_route_for(rule.key),)
+    if route.category is not None or route.adl_group is not None or rule.key in _PAIRED_KEYS
+)
+
+
 def format_value(value: Any) -> Optional[str]:
     """
     値を人間が読みやすい形に整形する。
@@ -20,21 +102,9 @@ def format_value(value: Any) -> Optional[str]:
         return value.strftime("%Y-%m-%d")
     return str(value)
 
-def prepare_patient_facts(flat_patient_data: Dict[str, Any], therapist_notes: str = "") -> Dict[str, Any]:
-    """
-    プロンプトに渡すための患者の事実情報を整形する。
-    DBのフラットなデータを、カテゴリごとの構造化データに変換します。
-
-    Args:
-        flat_patient_data: Pydanticモデルからexport_to_mapping_format()等で変換された辞書
-        therapist_notes: 療法士の申し送り事項（自由記述）
-
-    Returns:
-        Dict[str, Any]: LLMのコンテキストとして使用する辞書
-    """
-    
+def _empty_facts(therapist_notes: str) -> Dict[str, Any]:
     # 出力構造の初期化
-    facts = {
+    return {
         "基本情報": {},
         "心身機能・構造": {},
         "基本動作": {},
@@ -47,90 +117,47 @@ def prepare_patient_facts(flat_patient_data: Dict[str, Any], therapist_notes: st
         "担当者からの所見": therapist_notes if therapist_notes else "特になし",
     }
 
-    # 1. 基本情報の固定フィールド処理
-    facts["基本情報"]["氏名"] = flat_patient_data.get("name", "匿名")
-    
-    if "age" in flat_patient_data and flat_patient_data["age"] is not None:
-         facts["基本情報"]["年齢"] = f"{flat_patient_data['age']}歳"
-    
-    if "gender" in flat_patient_data:
-        facts["基本情報"]["性別"] = flat_patient_data.get("gender")
 
-    # 2. 汎用的なマッピング処理
-    for key, value in flat_patient_data.items():
-        formatted_value = format_value(value)
-        
-        # 値がない、または「なし」相当の場合はスキップ
-        if formatted_value is None:
+def _route_items(facts: Dict[str, Any], items: Iterable[Tuple[str, Any]]) -> None:
+    """
+    (フラットキー, 値) の列を振り分け表に従って1回の走査で格納します（カテゴリ別の項目 + ADLスコア）。
+    """
+    adl = facts["ADL評価"]
+    for key, value in items:
+        if value is None:
             continue
+        route = _route_for(key)
 
-        # チェックボックス+テキストのペアになっているキーは、後続のステップで処理するためここではスキップ
-        # (例: func_pain_chk があっても、ここでは処理せず func_pain_txt とセットで扱う)
-        if key in CHECKBOX_TEXT_PAIRS or key in CHECKBOX_TEXT_PAIRS.values():
-            continue
+        if route.category is not None:
+            # 値がない、または「なし」相当の場合はスキップ
+            formatted_value = format_value(value)
+            if formatted_value is not None:
+                facts[route.category][route.label] = formatted_value
 
-        # 定数ファイルに定義されているラベルを取得
-        jp_name = PATIENT_FIELD_LABELS.get(key)
-        if not jp_name:
-            continue
+        if route.adl_group is not None:
+            adl[route.adl_group][route.adl_item] = f"{value}点"
 
-        # カテゴリの自動判定（プレフィックスベース）
-        category = "心身機能・構造" # デフォルト
-        
-        if key.startswith(("header_", "main_")):
-            category = "基本情報"
-        elif key.startswith("func_basic_"):
-            category = "基本動作"
-        elif key.startswith("nutrition_"):
-            category = "栄養状態"
-        elif key.startswith("social_"):
-            category = "社会保障サービス"
-        elif key.startswith("goal_p_"):
-            category = "目標（参加）"
-        elif key.startswith("goal_a_"):
-            category = "目標（活動）"
-        elif key.startswith("goal_s_"):
-            category = "目標（環境・対応）"
-
-        # 辞書への格納
-        if category in facts:
-            facts[category][jp_name] = formatted_value
-
-    # 3. チェックボックス + 詳細テキストのペア項目の処理
-    # (例: 「疼痛」にチェックがあれば、その詳細テキストを表示する)
-    for chk_key, txt_key in CHECKBOX_TEXT_PAIRS.items():
-        jp_name = PATIENT_FIELD_LABELS.get(chk_key)
-        if not jp_name:
-            continue
 
-        is_checked = flat_patient_data.get(chk_key)
+def _apply_checkbox_pairs(facts: Dict[str, Any], lookup: Callable[[str], Any]) -> None:
+    """
+    チェックボックス + 詳細テキストのペア項目の処理
+    (例: 「疼痛」にチェックがあれば、その詳細テキストを表示する)
+    """
+    for chk_key, txt_key, jp_name in _CHECKBOX_ROUTES:
+        is_checked = lookup(chk_key)
         # 文字列の 'true' や 'on' も考慮してBoolean判定
         is_truly_checked = str(is_checked).lower() in ["true", "1", "on"]
 
         if is_truly_checked:
-            txt_value = flat_patient_data.get(txt_key)
+            txt_value = lookup(txt_key)
             if not txt_value or txt_value.strip() == "特記なし":
                 facts["心身機能・構造"][jp_name] = "あり（詳細は不明）"
             else:
                 facts["心身機能・構造"][jp_name] = txt_value
 
-    # 4. ADLスコア (FIM/BI) の抽出処理
-    for key, value in flat_patient_data.items():
-        if value is not None and "_val" in key:
-            val_str = str(value)
-            
-            # FIMの処理
-            if "fim_current_val" in key:
-                # 例: adl_eating_fim_current_val -> Eating
-                item_name = key.replace("adl_", "").replace("_fim_current_val", "").replace("_", " ").title()
-                facts["ADL評価"]["FIM(現在値)"][item_name] = f"{val_str}点"
-            
-            # BIの処理
-            elif "bi_current_val" in key:
-                item_name = key.replace("adl_", "").replace("_bi_current_val", "").replace("_", " ").title()
-                facts["ADL評価"]["BI(現在値)"][item_name] = f"{val_str}点"
-
-    # 5. 不要な空カテゴリのクリーンアップ
+
+def _finalize(facts: Dict[str, Any]) -> Dict[str, Any]:
+    # 不要な空カテゴリのクリーンアップ
     final_facts = {k: v for k, v in facts.items() if v}
     
     # ADLカテゴリ内の空チェック
@@ -145,4 +172,84 @@ def prepare_patient_facts(flat_patient_data: Dict[str, Any], therapist_notes: st
         if not adl:
             del final_facts["ADL評価"]
 
-    return final_facts
\ No newline at end of file
+    return final_facts
+
+
+def prepare_patient_facts(flat_patient_data: Dict[str, Any], therapist_notes: str = "") -> Dict[str, Any]:
+    """
+    プロンプトに渡すための患者の事実情報を整形する。
+    DBのフラットなデータを、カテゴリごとの構造化データに変換します。
+    キーごとのカテゴリ・ラベル・ADLスコアの格納先は振り分け表 (_FIELD_ROUTES) から引くため、
+    入力の走査は1回で済みます。
+
+    Args:
+        flat_patient_data: Pydanticモデルからexport_to_mapping_format()等で変換された辞書
+        therapist_notes: 療法士の申し送り事項（自由記述）
+
+    Returns:
+        Dict[str, Any]: LLMのコンテキストとして使用する辞書
+    """
+    facts = _empty_facts(therapist_notes)
+
+    # 1. 基本情報の固定フィールド処理
+    facts["基本情報"]["氏名"] = flat_patient_data.get("name", "匿名")
+    
+    if "age" in flat_patient_data and flat_patient_data["age"] is not None:
+         facts["基本情報"]["年齢"] = f"{flat_patient_data['age']}歳"
+    
+    if "gender" in flat_patient_data:
+        facts["基本情報"]["性別"] = flat_patient_data.get("gender")
+
+    # 2. 振り分け表による1回の走査
+    _route_items(facts, flat_patient_data.items())
+
+    # 3. チェックボックス + 詳細テキストのペア項目
+    _apply_checkbox_pairs(facts, flat_patient_data.get)
+
+    return _finalize(facts)
+
+
+def prepare_patient_facts_from_schema(patient_data: Any, therapist_notes: str = "") -> Dict[str, Any]:
+    """
+    構造化データ (PatientExtractionSchema) から、フラットな辞書を作らずに直接事実情報を構築する。
+    対応表 (mapping_spec) から値を順に取り出して振り分けるため、
+    prepare_patient_facts(patient_data.export_to_mapping_format()) と同じ結果（項目の順序を含む）になります。
+
+    Args:
+        patient_data: PatientExtractionSchema のインスタンス
+        therapist_notes: 療法士の申し送り事項（自由記述）
+
+    Returns:
+        Dict[str, Any]: LLMのコンテキストとして使用する辞書
+    """
+    facts = _empty_facts(therapist_notes)
+
+    # 1. 基本情報の固定フィールド処理（対応表は常に name / age / gender を出力する）
+    basic = patient_data.basic
+    facts["基本情報"]["氏名"] = basic.name
+    if basic.age is not None:
+        facts["基本情報"]["年齢"] = f"{basic.age}歳"
+    facts["基本情報"]["性別"] = basic.gender
+
+    # 2. コンパイル済みのルールによる1回の走査（ペア項目の値はここで控えておく）
+    adl = facts["ADL評価"]
+    paired: Dict[str, Any] = {}
+    for get, route, paired_key in _FACT_RULES:
+        value = get(patient_data)
+        if paired_key is not None:
+            paired[paired_key] = value
+        if value is None:
+            continue
+
+        if route.category is not None:
+            formatted_value = format_value(value)
+            if formatted_value is not None:
+                facts[route.category][route.label] = formatted_value
+
+        if route.adl_group is not None:
+            adl[route.adl_group][route.adl_item] = f"{value}点"
+
+    # 3. チェックボックス + 詳細テキストのペア項目
+    _apply_checkbox_pairs(facts, paired.get)
+
+    return _finalize(facts)
\ No newline at end of file
@@ -0,0 +1,114 @@
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from app.schemas.legacy_schemas import RehabPlanSchema
+from app.usecases.utils.fact_snapshot import THERAPIST_NOTES_KEY
+
+# 生成項目 (RehabPlanSchema のフィールド) が参照する事実情報のフラットキー（前方一致）
+# export_to_mapping_format() のキー体系に合わせて定義します。
+# 「FIMが〇点だったら？」のようなシミュレーションでは、変化したキーに依存する項目だけを再生成します。
+_BASIC = ("age", "gender", "header_disease_name", "header_treatment_details", "header_onset_date")
+_ADL = ("adl_", "func_basic_")
+
+FIELD_FACT_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    # --- 現状評価（リスク・禁忌） ---
+    "main_risks_txt": _BASIC + (
+        "main_", "func_risk_", "func_consciousness_", "func_respiratory_", "func_circulatory_",
+    ) + _ADL,
+    "main_contraindications_txt": _BASIC + ("main_", "func_risk_", "func_circulatory_"),
+
+    # --- 現状評価（機能障害） ---
+    "func_pain_txt": ("func_pain_",),
+    "func_rom_limitation_txt": ("func_rom_limitation_",),
+    "func_muscle_weakness_txt": ("func_muscle_weakness_",),
+    "func_swallowing_disorder_txt": ("func_swallowing_disorder_", "nutrition_swallowing_", "nutrition_method_"),
+    "func_behavioral_psychiatric_disorder_txt": ("func_behavioral_psychiatric_disorder_",),
+    "func_nutritional_disorder_txt": ("func_nutritional_disorder_", "nutrition_"),
+    "func_excretory_disorder_txt": ("func_excretory_disorder_",),
+    "func_pressure_ulcer_txt": ("func_pressure_ulcer_",),
+    "func_contracture_deformity_txt": ("func_contracture_deformity_",),
+    "func_motor_muscle_tone_abnormality_txt": ("func_motor_",),
+    "func_disorientation_txt": ("func_disorientation_",),
+    "func_memory_disorder_txt": ("func_memory_disorder_", "func_higher_brain_memory_"),
+
+    # --- ADL詳細 ---
+    "adl_equipment_and_assistance_details_txt": _ADL,
+
+    # --- 目標 ---
+    "goals_1_month_txt": _BASIC + _ADL + ("goal_a_", "goals_", THERAPIST_NOTES_KEY),
+    "goals_at_discharge_txt": _BASIC + _ADL + ("goal_a_", "goal_p_", "goals_", "social_", THERAPIST_NOTES_KEY),
+
+    # --- 治療方針 ---
+    "policy_treatment_txt": _BASIC + _ADL + ("main_", "header_therapy_", THERAPIST_NOTES_KEY),
+    "policy_content_txt": _BASIC + _ADL + ("header_therapy_", "func_", THERAPIST_NOTES_KEY),
+
+    # --- 対応方針 ---
+    "goal_a_action_plan_txt": _ADL + ("goal_a_", THERAPIST_NOTES_KEY),
+    "goal_s_env_action_plan_txt": ("goal_s_env_", "social_", "goal_p_residence_"),
+    "goal_p_action_plan_txt": ("goal_p_", THERAPIST_NOTES_KEY),
+    "goal_s_psychological_action_plan_txt": (
+        "goal_s_psychological_", "goal_s_disability_acceptance_", THERAPIST_NOTES_KEY,
+    ),
+    "goal_s_3rd_party_action_plan_txt": ("goal_s_3rd_party_", "social_"),
+}
+
+# 項目単位の再生成で、整合性確保のために文脈として渡す他の生成項目
+# 計画書全体ではなく、内容が矛盾しやすい項目だけに絞ってプロンプトを小さく保ちます。
+_GOALS = ("goals_1_month_txt", "goals_at_discharge_txt")
+
+RELATED_PLAN_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "main_risks_txt": ("main_contraindications_txt",),
+    "main_contraindications_txt": ("main_risks_txt",),
+    "adl_equipment_and_assistance_details_txt": ("goals_1_month_txt",),
+    "goals_1_month_txt": ("goals_at_discharge_txt", "adl_equipment_and_assistance_details_txt"),
+    "goals_at_discharge_txt": ("goals_1_month_txt",),
+    "policy_treatment_txt": ("main_risks_txt", "main_contraindications_txt") + _GOALS,
+    "policy_content_txt": ("main_contraindications_txt", "policy_treatment_txt") + _GOALS,
+    "goal_a_action_plan_txt": ("goals_1_month_txt", "adl_equipment_and_assistance_details_txt", "policy_content_txt"),
+    "goal_s_env_action_plan_txt": ("goals_at_discharge_txt",),
+    "goal_p_action_plan_txt": ("goals_at_discharge_txt",),
+    "goal_s_psychological_action_plan_txt": ("goals_at_discharge_txt",),
+    "goal_s_3rd_party_action_plan_txt": ("goals_at_discharge_txt", "goal_s_env_action_plan_txt"),
+}
+
+# 生成順（スキーマ定義順）を保つためのフィールド一覧
+GENERATED_FIELDS: List[str] = list(RehabPlanSchema.model_fields.keys())
+
+
+def depends_on(field: str, fact_key: str) -> bool:
+    """生成項目 field が事実情報のフラットキー fact_key に依存しているかを判定する。"""
+    return fact_key.startswith(FIELD_FACT_DEPENDENCIES.get(field, ()))
+
+
+def select_facts_for_field(field: str, flat_patient_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    生成項目 field が依存する事実情報だけを残したフラットな患者データを返す。
+    依存関係が未定義の項目（任意のキー）の場合は、全ての事実情報を返します。
+    """
+    if field not in FIELD_FACT_DEPENDENCIES:
+        return dict(flat_patient_data)
+    return {key: value for key, value in flat_patient_data.items() if depends_on(field, key)}
+
+
+def select_related_plan(field: str, current_plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    生成項目 field の整合性確認に必要な、計画書の他項目だけを返す（空の項目は除外）。
+    """
+    return {
+        key: current_plan[key]
+        for key in RELATED_PLAN_FIELDS.get(field, ())
+        if current_plan.get(key)
+    }
+
+
+def affected_fields(changed_fact_keys: Iterable[str]) -> List[str]:
+    """
+    変化した事実情報のキー集合から、再生成が必要な生成項目を返す。
+
+    Returns:
+        List[str]: 影響を受ける生成項目（RehabPlanSchema の定義順）
+    """
+    changed: Set[str] = set(changed_fact_keys)
+    return [
+        field for field in GENERATED_FIELDS
+        if any(depends_on(field, key) for key in changed)
+    ]
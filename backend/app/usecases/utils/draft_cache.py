@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+CacheKey = Tuple[str, str]
+
+
+class DraftCache:
+    """
+    先読み生成した計画書ドラフトを短時間だけ保持するキャッシュ。
+
+    キーは (hash_id, 患者データの内容ハッシュ (facts_content_hash)) で、患者データが変わっていれば一致しません。
+    取り出したドラフトはキャッシュから削除されます（同じドラフトを二重に使わない）。
+    生成中の先読みタスクも登録でき、同じ事実情報での生成要求はその完了を待って結果を受け取れます。
+
+    Attributes:
+        ttl_sec (float): ドラフトの有効期間（秒）。
+        max_entries (int): 保持するドラフト数の上限（古いものから破棄）。
+    """
+
+    def __init__(self, ttl_sec: float = 300.0, max_entries: int = 64):
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._pending: Dict[CacheKey, asyncio.Task] = {}
+
+    def put(self, hash_id: str, key: str, raw_data: Dict[str, Any]) -> None:
+        """ドラフトを登録する。"""
+        self._entries[(hash_id, key)] = (time.monotonic() + self.ttl_sec, raw_data)
+        self._entries.move_to_end((hash_id, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, hash_id: str, key: str) -> Optional[Dict[str, Any]]:
+        """有効期限内のドラフトがあれば取り出して返す。"""
+        entry = self._entries.pop((hash_id, key), None)
+        if entry is None:
+            return None
+        expires_at, raw_data = entry
+        return raw_data if expires_at > time.monotonic() else None
+
+    def register_pending(self, hash_id: str, key: str, task: asyncio.Task) -> None:
+        """生成中の先読みタスクを登録する（完了・キャンセル時に自動で登録解除）。"""
+        self._pending[(hash_id, key)] = task
+        task.add_done_callback(lambda _: self._pending.pop((hash_id, key), None))
+
+    async def claim(self, hash_id: str, key: str, wait_pending: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        一致するドラフトを取得する。生成中の先読みがあり wait_pending が True の場合は完了を待つ。
+
+        Returns:
+            Optional[Dict[str, Any]]: ドラフト（raw_data形式）。なければ None。
+        """
+        cached = self.pop(hash_id, key)
+        if cached is not None or not wait_pending:
+            return cached
+
+        task = self._pending.get((hash_id, key))
+        if task is None:
+            return None
+        try:
+            # 待っている側がキャンセルされても、先読み自体は止めない
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            return None
+        except Exception:
+            return None
+        return self.pop(hash_id, key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+@lru_cache()
+def get_draft_cache() -> DraftCache:
+    """
+    アプリケーション全体で共有するドラフトキャッシュを返します。
+    有効期間は環境変数 PLAN_PREFETCH_TTL_SEC で指定します (default: 300)。
+    """
+    return DraftCache(ttl_sec=float(os.getenv("PLAN_PREFETCH_TTL_SEC", "300")))
@@ -0,0 +1,52 @@
+from typing import Any, Dict, Iterable, Set, Tuple
+
+from app.schemas.mapping_spec import iter_flat_items
+from app.usecases.utils.context_builder import format_value
+
+# 療法士の申し送り事項をスナップショット上で扱うための疑似キー
+THERAPIST_NOTES_KEY = "therapist_notes"
+
+
+def _snapshot_items(items: Iterable[Tuple[str, Any]], therapist_notes: str) -> Dict[str, str]:
+    snapshot = {}
+    for key, value in items:
+        formatted = format_value(value)
+        if formatted is not None:
+            snapshot[key] = formatted
+
+    if therapist_notes:
+        snapshot[THERAPIST_NOTES_KEY] = therapist_notes
+
+    return snapshot
+
+
+def build_fact_snapshot(flat_patient_data: Dict[str, Any], therapist_notes: str = "") -> Dict[str, str]:
+    """
+    差分検出用に、フラットな患者データを「LLMから見える値」の辞書に正規化する。
+
+    prepare_patient_facts と同じ format_value で整形し、表示されない値（None, 空文字, False）は
+    キーごと除外します。JSONとしてそのまま保存できる形式（値は全て文字列）になります。
+
+    Args:
+        flat_patient_data: export_to_mapping_format() の出力
+        therapist_notes: 療法士の申し送り事項
+
+    Returns:
+        Dict[str, str]: フラットキー -> 整形済みの値
+    """
+    return _snapshot_items(flat_patient_data.items(), therapist_notes)
+
+
+def build_fact_snapshot_from_schema(patient_data: Any, therapist_notes: str = "") -> Dict[str, str]:
+    """
+    構造化データ (PatientExtractionSchema) から、フラットな辞書を作らずに直接スナップショットを構築する。
+    build_fact_snapshot(patient_data.export_to_mapping_format()) と同じ結果になります。
+    """
+    return _snapshot_items(iter_flat_items(patient_data), therapist_notes)
+
+
+def diff_fact_snapshots(old: Dict[str, str], new: Dict[str, str]) -> Set[str]:
+    """
+    2つのスナップショットを比較し、値が変化した（追加・削除を含む）フラットキーの集合を返す。
+    """
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
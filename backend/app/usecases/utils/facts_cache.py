@@ -0,0 +1,132 @@
+import copy
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core import json_codec
+from app.usecases.utils import serializers
+from app.usecases.utils.context_builder import prepare_patient_facts_from_schema
+from app.usecases.utils.fact_snapshot import build_fact_snapshot_from_schema
+
+# (入力の種類, 内容ハッシュ, シリアライズ形式)
+CacheKey = Tuple[str, str, str]
+
+_KIND_SCHEMA = "schema"  # PatientExtractionSchema から事実情報を構築したもの
+_KIND_RAW = "raw"        # 辞書をそのまま事実情報として使うもの（カスタム生成・一括生成）
+
+
+def facts_content_hash(patient_data: Any, therapist_notes: str = "") -> str:
+    """
+    患者データ（と申し送り事項）の内容から、安定したハッシュ値を計算する。
+
+    キーの順序やインスタンスに依存しないため、同じ内容の患者データであれば
+    リクエストやプロセスをまたいでも同じ値になります。
+    事実情報キャッシュ・ドラフトキャッシュの照合キーや、計画書に保存する facts_hash として使用します。
+
+    Args:
+        patient_data: PatientExtractionSchema などの Pydantic モデル、または患者データの辞書
+        therapist_notes: 療法士の申し送り事項
+
+    Returns:
+        str: SHA-256 の16進文字列（64文字）
+    """
+    content = patient_data.model_dump(mode="json") if isinstance(patient_data, BaseModel) else patient_data
+    canonical = json_codec.dumps_bytes({"patient": content, "therapist_notes": therapist_notes or ""}, sort_keys=True)
+    return hashlib.sha256(canonical).hexdigest()
+
+
+@dataclass(frozen=True)
+class PreparedFacts:
+    """
+    構築済みの事実情報。キャッシュで共有されるため、呼び出し元で変更しないこと。
+
+    Attributes:
+        facts_hash (str): 入力内容のハッシュ値（facts_content_hash）
+        facts (Dict[str, Any]): LLMのコンテキストとして使用する辞書
+        facts_str (str): facts をシリアライズしたプロンプト埋め込み用の文字列
+        snapshot (Optional[Dict[str, str]]): 差分生成用のスナップショット（辞書入力の場合は None）
+    """
+    facts_hash: str
+    facts: Dict[str, Any]
+    facts_str: str
+    snapshot: Optional[Dict[str, str]] = None
+
+
+class FactsCache:
+    """
+    患者データの内容ハッシュをキーに、構築済みの事実情報とそのシリアライズ結果を保持するLRUキャッシュ。
+
+    同じ患者データで生成・カスタム生成・一括生成を繰り返す場合に、
+    事実情報の構築とシリアライズを省略します。上限を超えると最も古く使われたものから破棄します。
+
+    Attributes:
+        max_entries (int): 保持する事実情報の数の上限。
+        hits (int): キャッシュヒット数。
+        misses (int): キャッシュミス数。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, PreparedFacts]" = OrderedDict()
+
+    def prepare(self, patient_data: Any, therapist_notes: str = "", fmt: Optional[str] = None) -> PreparedFacts:
+        """
+        事実情報を構築して返す（同じ内容の患者データであればキャッシュから返す）。
+
+        PatientExtractionSchema は context_builder で事実情報に整形し、スナップショットも作成します。
+        辞書はそのまま事実情報として扱います（カスタム生成・一括生成の簡易版と同じ）。
+        キャッシュはリクエストをまたいで共有されるため、辞書は複製してから保持します（呼び出し元の変更の影響を受けない）。
+
+        Args:
+            patient_data: PatientExtractionSchema（氏名置換済み）、または患者データの辞書
+            therapist_notes: 療法士の申し送り事項
+            fmt: シリアライズ形式（省略時は serializers の既定形式）
+
+        Returns:
+            PreparedFacts: 構築済みの事実情報
+        """
+        is_schema = isinstance(patient_data, BaseModel)
+        fmt = fmt or serializers.DEFAULT_CONTEXT_FORMAT
+        facts_hash = facts_content_hash(patient_data, therapist_notes)
+        key = (_KIND_SCHEMA if is_schema else _KIND_RAW, facts_hash, fmt)
+
+        cached = self._entries.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return cached
+
+        self.misses += 1
+        if is_schema:
+            facts = prepare_patient_facts_from_schema(patient_data, therapist_notes)
+            snapshot = build_fact_snapshot_from_schema(patient_data, therapist_notes)
+        else:
+            facts, snapshot = copy.deepcopy(patient_data), None
+        prepared = PreparedFacts(facts_hash, facts, serializers.serialize_context(facts, fmt), snapshot)
+
+        self._entries[key] = prepared
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return prepared
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+@lru_cache()
+def get_facts_cache() -> FactsCache:
+    """
+    アプリケーション全体で共有する事実情報キャッシュを返します。
+    上限は環境変数 FACTS_CACHE_MAX_ENTRIES で指定します (default: 256)。
+    """
+    return FactsCache(max_entries=int(os.getenv("FACTS_CACHE_MAX_ENTRIES", "256")))
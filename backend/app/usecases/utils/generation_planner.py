@@ -0,0 +1,139 @@
+import os
+from typing import Dict, List, Optional, Type
+
+from pydantic import BaseModel, create_model
+
+from app.adapters.llm.capabilities import ModelCapability
+from app.schemas.legacy_schemas import GENERATION_GROUPS
+
+# 1項目あたりの出力トークン数の目安（所要時間の見積もり用）
+EST_OUTPUT_TOKENS_PER_FIELD = 150
+
+# 生成グループごとの思考トークンの予算（0 は思考させない）
+# 事実情報の要約が中心の現状評価は思考を省き、推論が必要な目標・治療計画にだけ予算を割り当てる
+GROUP_THINKING_BUDGETS: Dict[str, int] = {
+    "CurrentAssessment": 0,
+    "Goals": 1024,
+    "ComprehensiveTreatmentPlan": 1024,
+}
+
+
+def _subset_schema(name: str, sources: List[Type[BaseModel]], fields: List[str]) -> Type[BaseModel]:
+    """元のスキーマの Field 定義（description）を保ったまま、指定項目だけのスキーマを作成する。"""
+    definitions = {}
+    for field in fields:
+        for source in sources:
+            if field in source.model_fields:
+                definitions[field] = (str, source.model_fields[field])
+                break
+    return create_model(name, **definitions)
+
+
+def chunk_schema(schema: Type[BaseModel], limit: int) -> List[Type[BaseModel]]:
+    """
+    スキーマの項目数が limit（モデルの max_schema_fields）を超える場合に、limit 項目ずつのスキーマに分割する。
+    超えない場合は元のスキーマだけを返します。
+    """
+    limit = max(1, limit)
+    fields = list(schema.model_fields)
+    if len(fields) <= limit:
+        return [schema]
+    return [
+        _subset_schema(f"{schema.__name__}Part{i // limit + 1}", [schema], fields[i:i + limit])
+        for i in range(0, len(fields), limit)
+    ]
+
+
+def plan_generation_stages(
+    groups: List[Type[BaseModel]],
+    capability: ModelCapability,
+    prompt_tokens: int = 0,
+) -> List[List[Type[BaseModel]]]:
+    """
+    モデルの性能プロファイルに合わせて、生成グループを「ステージ」に再構成する。
+
+    ステージは順番に実行され、前のステージの結果が次のステージの文脈になります。
+    同じステージ内のスキーマは互いの結果を参照しないため、並列に生成できます。
+
+    - 1グループの項目数が max_schema_fields を超える場合: 項目を分割し、同じステージで並列生成
+    - merge_groups が有効な場合: 上限と context_window に収まる範囲で連続するグループを1回にまとめる
+    - それ以外: 元のグループをそのまま1ステージ1呼び出しで生成
+
+    Args:
+        groups: GENERATION_GROUPS（依存関係順）
+        capability: 使用するモデルの性能プロファイル
+        prompt_tokens: 事実情報などプロンプト本体の推定トークン数（統合可否の判定に使用）
+
+    Returns:
+        List[List[Type[BaseModel]]]: stages[ステージ][並列に生成するスキーマ]
+    """
+    limit = max(1, capability.max_schema_fields)
+
+    if capability.merge_groups:
+        # 連続するグループを上限内でまとめる（出力を含めてコンテキストに収まることも確認）
+        merged: List[List[Type[BaseModel]]] = []
+        for group in groups:
+            if merged:
+                candidate = merged[-1] + [group]
+                n_fields = sum(len(g.model_fields) for g in candidate)
+                required = prompt_tokens + n_fields * EST_OUTPUT_TOKENS_PER_FIELD
+                if n_fields <= limit and required <= capability.context_window:
+                    merged[-1] = candidate
+                    continue
+            merged.append([group])
+        groups = [
+            bundle[0] if len(bundle) == 1 else _subset_schema(
+                "".join(g.__name__ for g in bundle), bundle,
+                [field for g in bundle for field in g.model_fields],
+            )
+            for bundle in merged
+        ]
+
+    return [chunk_schema(group, limit) for group in groups]
+
+
+def estimate_stage_seconds(stages: List[List[Type[BaseModel]]], capability: ModelCapability, parallelism: int) -> float:
+    """
+    出力速度 (decode_tps) から生成全体のおおよその所要時間を見積もる（ログ・比較用）。
+    並列数は LLMScheduler の同時実行数で頭打ちになります。
+    """
+    total = 0.0
+    slots = max(1, parallelism)
+    for stage in stages:
+        longest = max(len(schema.model_fields) for schema in stage)
+        rounds = -(-len(stage) // slots)
+        total += rounds * longest * EST_OUTPUT_TOKENS_PER_FIELD / capability.decode_tps
+    return round(total, 1)
+
+
+def _parse_budget_overrides(value: str) -> Dict[str, int]:
+    overrides: Dict[str, int] = {}
+    for item in value.split(","):
+        name, sep, budget = item.partition("=")
+        if sep and name.strip() and budget.strip().lstrip("-").isdigit():
+            overrides[name.strip()] = int(budget)
+    return overrides
+
+
+def thinking_budget_for(schema: Type[BaseModel]) -> Optional[int]:
+    """
+    スキーマ（分割・統合後のものを含む）の思考トークンの予算を返す。
+
+    スキーマに含まれる項目の元の生成グループのうち、最大の予算を採用します。
+    環境変数 LLM_THINKING_BUDGETS（例: "CurrentAssessment=0,Goals=2048"）で
+    グループごとの予算を上書きできます。負の値は予算なし（モデルの既定動作）を表します。
+
+    Returns:
+        Optional[int]: 予算（トークン数）。None は予算を設けない。
+    """
+    budgets = {**GROUP_THINKING_BUDGETS, **_parse_budget_overrides(os.getenv("LLM_THINKING_BUDGETS", ""))}
+    fields = set(schema.model_fields)
+    matched = [
+        budgets[group.__name__]
+        for group in GENERATION_GROUPS
+        if group.__name__ in budgets and fields & set(group.model_fields)
+    ]
+    if not matched:
+        return None
+    budget = max(matched)
+    return None if budget < 0 else budget
@@ -0,0 +1,234 @@
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.adapters.llm.capabilities import get_model_capability
+from app.usecases.utils.dependency_map import RELATED_PLAN_FIELDS
+from app.usecases.utils.generation_planner import EST_OUTPUT_TOKENS_PER_FIELD, thinking_budget_for
+from app.usecases.utils.prompt_manager import load_prompt
+from app.usecases.utils.prompts import group_prompt_variables, schema_prompt_savings
+from app.usecases.utils.serializers import serialize_context
+from app.usecases.utils.token_counter import estimate_tokens_for
+
+logger = logging.getLogger(__name__)
+
+# 事実情報のカテゴリごとの優先度（大きいほど最後まで残す）。PROTECTED_PRIORITY 以上は削らない
+PROTECTED_PRIORITY = 100
+FACT_CATEGORY_PRIORITIES: Dict[str, int] = {
+    "基本情報": PROTECTED_PRIORITY,
+    "担当者からの所見": 90,
+    "心身機能・構造": 80,
+    "ADL評価": 80,
+    "基本動作": 70,
+    "目標（参加）": 60,
+    "目標（活動）": 60,
+    "目標（環境・対応）": 50,
+    "栄養状態": 40,
+    "社会保障サービス": 30,
+}
+DEFAULT_FACT_PRIORITY = 50
+
+# 生成済みの計画（文脈）の優先度。生成する項目と整合性を取る必要がある項目は事実情報の大半より優先する
+RELATED_PLAN_PRIORITY = 75
+PLAN_PRIORITY = 35
+
+# 推定誤差に備えて、コンテキスト長のうち使わずに残す割合
+SAFETY_MARGIN = 0.05
+
+SECTION_FACTS = "facts"
+SECTION_PLAN = "plan"
+
+
+@dataclass
+class BudgetReport:
+    """
+    1回のLLM呼び出しのプロンプト予算の割り当て結果。
+
+    Attributes:
+        model (Optional[str]): 予算の算出に使用したモデル名。
+        context_window (int): コンテキスト長（入力+出力のトークン数の上限）。
+        reserved_output (int): 出力（思考を含む）のために確保したトークン数。
+        prompt_budget (int): プロンプトに使えるトークン数。
+        prompt_tokens (int): 削減後のプロンプトの推定トークン数。
+        sections (Dict[str, int]): セクションごとの推定トークン数（facts, plan, schema, instructions）。
+        trimmed (Dict[str, List[str]]): 予算に収めるために削った項目（facts は "カテゴリ/ラベル"）。
+        over_budget (bool): 削れる項目を全て削っても予算を超えている場合に True。
+        schema_saved_tokens (int): 出力形式のセクションで、スキーマ全体を埋め込む場合より削減できたトークン数。
+    """
+    model: Optional[str]
+    context_window: int
+    reserved_output: int
+    prompt_budget: int
+    prompt_tokens: int
+    sections: Dict[str, int]
+    trimmed: Dict[str, List[str]] = field(default_factory=dict)
+    over_budget: bool = False
+    schema_saved_tokens: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def context_window_for(client: Any) -> int:
+    """
+    LLMクライアントが実際に使うコンテキスト長を返す。
+    num_ctx を指定して実行するクライアント (Ollama) はその値、それ以外はモデルの性能プロファイルの値です。
+    """
+    num_ctx = getattr(client, "num_ctx", None)
+    if isinstance(num_ctx, int) and num_ctx > 0:
+        return num_ctx
+    return get_model_capability(getattr(client, "model_name", None)).context_window
+
+
+def _trim_candidates(
+    facts: Optional[Dict[str, Any]],
+    plan: Dict[str, Any],
+    related_plan_fields: Set[str],
+) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    削る順に並べた (セクション, キー, サブキー) の一覧。
+    優先度の低いものから、同じ優先度では後ろにあるものから削ります。
+    """
+    candidates: List[Tuple[int, int, Tuple[str, str, Optional[str]]]] = []
+    position = 0
+    for category, value in (facts or {}).items():
+        priority = FACT_CATEGORY_PRIORITIES.get(category, DEFAULT_FACT_PRIORITY)
+        if priority >= PROTECTED_PRIORITY:
+            continue
+        for label in (value if isinstance(value, dict) else [None]):
+            candidates.append((priority, -position, (SECTION_FACTS, category, label)))
+            position += 1
+    for key in plan:
+        priority = RELATED_PLAN_PRIORITY if key in related_plan_fields else PLAN_PRIORITY
+        candidates.append((priority, -position, (SECTION_PLAN, key, None)))
+        position += 1
+    return [item for _, _, item in sorted(candidates)]
+
+
+def _item_tokens(
+    facts: Optional[Dict[str, Any]],
+    plan: Dict[str, Any],
+    item: Tuple[str, str, Optional[str]],
+    model_name: Optional[str],
+) -> int:
+    """削る候補1件をシリアライズした場合の推定トークン数（削ったときに減るトークン数の目安）。"""
+    section, key, label = item
+    if section == SECTION_PLAN:
+        entry = {key: plan[key]}
+    elif label is None:
+        entry = {key: facts[key]}
+    else:
+        entry = {label: facts[key][label]}
+    return estimate_tokens_for(serialize_context(entry), model_name)
+
+
+def _remove(facts: Dict[str, Any], plan: Dict[str, Any], item: Tuple[str, str, Optional[str]]) -> str:
+    section, key, label = item
+    if section == SECTION_PLAN:
+        plan.pop(key, None)
+        return key
+    if label is None:
+        facts.pop(key, None)
+        return key
+    facts[key].pop(label, None)
+    if not facts[key]:
+        del facts[key]
+    return f"{key}/{label}"
+
+
+def fit_group_prompt(
+    group_schema: Type[BaseModel],
+    facts_str: str,
+    generated_plan_so_far: Dict[str, Any],
+    client: Any,
+    facts: Optional[Dict[str, Any]] = None,
+    suffix: str = "",
+) -> Tuple[str, BudgetReport]:
+    """
+    計画書生成（グループ単位）のプロンプトを、クライアントのコンテキスト長に収まるように構築する。
+
+    コンテキスト長から出力分（項目数 x 目安トークン数 + 思考の予算）を差し引いた残りをプロンプトの予算とし、
+    超える場合は優先度の低い事実情報・生成済みの計画から、各項目の推定トークン数の合計が超過分に達するまで削り、
+    プロンプトを構築し直して確認します（推定との誤差でまだ超える場合は、残りの超過分について繰り返します）。
+    コンテキスト長を超えたプロンプトは先頭（役割や事実情報）から黙って切り捨てられるため、それを防ぐためのものです。
+    トークン数はモデルごとに補正した推定値 (estimate_tokens_for) で計算します。
+
+    Args:
+        group_schema: 生成するスキーマ
+        facts_str: シリアライズ済みの事実情報
+        generated_plan_so_far: 文脈として渡す生成済みの計画
+        client: 呼び出し先のLLMクライアント（コンテキスト長とモデル名の取得に使用）
+        facts: 事実情報の辞書。指定した場合のみ事実情報も削減の対象になる
+        suffix: プロンプトの末尾に追加する文字列（予算の計算に含める）
+
+    Returns:
+        Tuple[str, BudgetReport]: プロンプトと予算の割り当て結果
+    """
+    model_name = getattr(client, "model_name", None)
+    model_name = model_name if isinstance(model_name, str) else None
+    # スキーマをAPIで渡すクライアントでは、プロンプトに出力形式の一覧を載せない
+    schema_enforced = getattr(client, "enforces_schema", False) is True
+
+    context_window = context_window_for(client)
+    reserved_output = (
+        len(group_schema.model_fields) * EST_OUTPUT_TOKENS_PER_FIELD + (thinking_budget_for(group_schema) or 0)
+    )
+    prompt_budget = int(context_window * (1 - SAFETY_MARGIN)) - reserved_output
+
+    working_facts = facts
+    plan = dict(generated_plan_so_far)
+
+    def render() -> Tuple[str, Dict[str, str], int]:
+        current_facts_str = facts_str if working_facts is facts else serialize_context(working_facts)
+        variables = group_prompt_variables(group_schema, current_facts_str, plan, schema_enforced)
+        prompt = load_prompt("plan_generation", **variables) + suffix
+        return prompt, variables, estimate_tokens_for(prompt, model_name)
+
+    prompt, variables, prompt_tokens = render()
+    trimmed: Dict[str, List[str]] = {}
+
+    if prompt_tokens > prompt_budget:
+        related = {key for name in group_schema.model_fields for key in RELATED_PLAN_FIELDS.get(name, ())}
+        candidates = _trim_candidates(facts, plan, related)
+        costs = [_item_tokens(facts, plan, item, model_name) for item in candidates]
+        if facts is not None:
+            working_facts = {k: dict(v) if isinstance(v, dict) else v for k, v in facts.items()}
+        index = 0
+        while prompt_tokens > prompt_budget and index < len(candidates):
+            overflow = prompt_tokens - prompt_budget
+            saved = 0
+            while saved < overflow and index < len(candidates):
+                item = candidates[index]
+                trimmed.setdefault(item[0], []).append(_remove(working_facts, plan, item))
+                saved += costs[index]
+                index += 1
+            prompt, variables, prompt_tokens = render()
+
+    section_tokens = {
+        SECTION_FACTS: estimate_tokens_for(variables["patient_facts"], model_name),
+        SECTION_PLAN: estimate_tokens_for(variables["generated_plan"], model_name),
+        "schema": estimate_tokens_for(variables["schema_section"], model_name),
+    }
+    section_tokens["instructions"] = max(0, prompt_tokens - sum(section_tokens.values()))
+
+    report = BudgetReport(
+        model=model_name,
+        context_window=context_window,
+        reserved_output=reserved_output,
+        prompt_budget=prompt_budget,
+        prompt_tokens=prompt_tokens,
+        sections=section_tokens,
+        trimmed=trimmed,
+        over_budget=prompt_tokens > prompt_budget,
+        schema_saved_tokens=schema_prompt_savings(group_schema, schema_enforced)["saved_tokens"],
+    )
+    if report.over_budget:
+        logger.warning(
+            f"Prompt for {group_schema.__name__} exceeds the context budget even after trimming: "
+            f"{prompt_tokens} > {prompt_budget} tokens (window={context_window})"
+        )
+    elif trimmed:
+        logger.info(f"Prompt for {group_schema.__name__} trimmed to fit the context budget: {trimmed}")
+    return prompt, report
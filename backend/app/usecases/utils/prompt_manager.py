@@ -1,7 +1,11 @@
 import logging
+import os
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
 from string import Template
-from typing import Any
+from typing import Any, Dict, FrozenSet, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -10,9 +14,137 @@ logger = logging.getLogger(__name__)
 # 構成: backend/app/usecases/utils/templates/*.txt
 PROMPT_DIR = Path(__file__).parent / "templates"
 
+# テンプレートファイルの更新を確認する間隔（秒）。0 なら毎回確認、負の値なら再読み込みしない
+PROMPT_RELOAD_INTERVAL_SEC = float(os.getenv("PROMPT_RELOAD_INTERVAL_SEC", "2"))
+
+
+class PromptTemplateError(ValueError):
+    """テンプレートのプレースホルダーに対応する変数が渡されていない場合に送出される例外。"""
+
+    def __init__(self, template_name: str, missing: FrozenSet[str]):
+        super().__init__(f"Template '{template_name}' is missing variables: {', '.join(sorted(missing))}")
+        self.template_name = template_name
+        self.missing = missing
+
+
+class CompiledPrompt:
+    """
+    読み込み・解析済みのテンプレート。
+
+    Attributes:
+        name (str): テンプレートファイル名（例: plan_generation.txt）
+        template (Template): 解析済みの string.Template
+        placeholders (FrozenSet[str]): テンプレート内のプレースホルダー名 ($variable / ${variable})
+        mtime_ns (int): 読み込み時点のファイルの更新時刻
+    """
+
+    def __init__(self, name: str, content: str, mtime_ns: int):
+        self.name = name
+        self.template = Template(content)
+        self.placeholders: FrozenSet[str] = frozenset(self.template.get_identifiers())
+        self.mtime_ns = mtime_ns
+
+    def render(self, **kwargs: Any) -> str:
+        """
+        変数を展開します。
+
+        Raises:
+            PromptTemplateError: プレースホルダーに対応する変数が不足している場合
+        """
+        missing = self.placeholders - kwargs.keys()
+        if missing:
+            raise PromptTemplateError(self.name, frozenset(missing))
+        # 変数はすべて揃っているため、残るのは "$100" のようなプレースホルダーではない "$" だけ
+        return self.template.safe_substitute(**kwargs)
+
+
+class PromptRegistry:
+    """
+    テンプレートを起動時に一括で読み込み・解析し、メモリから提供するレジストリ。
+
+    ファイルの更新時刻を一定間隔で確認し、変更されていれば読み込み直して差し替えます。
+    差し替えは解析済みのテンプレートごと行うため、読み込み途中の内容が使われることはありません。
+    読み込みに失敗した場合（保存途中など）は直前のテンプレートを使い続けます。
+    """
+
+    def __init__(self, directory: Path = PROMPT_DIR, reload_interval_sec: float = PROMPT_RELOAD_INTERVAL_SEC):
+        self.directory = directory
+        self.reload_interval_sec = reload_interval_sec
+        self._templates: Dict[str, CompiledPrompt] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        for path in sorted(directory.glob("*.txt")):
+            self._load(path.name)
+        logger.info(f"Loaded {len(self._templates)} prompt templates from {directory}")
+
+    def _load(self, filename: str) -> Optional[CompiledPrompt]:
+        path = self.directory / filename
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+            content = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        compiled = CompiledPrompt(filename, content, mtime_ns)
+        with self._lock:
+            self._templates[filename] = compiled
+            self._checked_at[filename] = time.monotonic()
+        return compiled
+
+    def _reload_if_changed(self, filename: str, current: CompiledPrompt) -> CompiledPrompt:
+        if self.reload_interval_sec < 0:
+            return current
+        now = time.monotonic()
+        if now - self._checked_at.get(filename, 0.0) < self.reload_interval_sec:
+            return current
+        self._checked_at[filename] = now
+
+        try:
+            mtime_ns = (self.directory / filename).stat().st_mtime_ns
+            if mtime_ns == current.mtime_ns:
+                return current
+            reloaded = self._load(filename)
+        except Exception as e:
+            logger.error(f"Failed to reload prompt template '{filename}', keeping previous version: {e}")
+            return current
+        if reloaded is None:
+            logger.error(f"Prompt template '{filename}' was removed, keeping previous version")
+            return current
+        logger.info(f"Reloaded prompt template '{filename}'")
+        return reloaded
+
+    def get(self, template_name: str) -> CompiledPrompt:
+        """
+        解析済みのテンプレートを返します（ファイルが更新されていれば読み込み直します）。
+
+        Raises:
+            FileNotFoundError: テンプレートファイルが見つからない場合
+        """
+        filename = template_name if template_name.endswith(".txt") else f"{template_name}.txt"
+        current = self._templates.get(filename)
+        if current is None:
+            # 起動後に追加されたテンプレート
+            current = self._load(filename)
+            if current is None:
+                # 開発者がパス構成を間違えた場合に気づきやすいようログを出力
+                logger.error(f"Prompt template not found at: {self.directory / filename}")
+                raise FileNotFoundError(f"Template '{filename}' not found in {self.directory}")
+            return current
+        return self._reload_if_changed(filename, current)
+
+    def render(self, template_name: str, **kwargs: Any) -> str:
+        return self.get(template_name).render(**kwargs)
+
+
+@lru_cache()
+def get_prompt_registry() -> PromptRegistry:
+    """アプリケーション全体で共有するテンプレートレジストリを返します。"""
+    return PromptRegistry()
+
+
 def load_prompt(template_name: str, **kwargs: Any) -> str:
     """
-    指定されたテンプレートファイルを読み込み、変数を展開して返します。
+    指定されたテンプレートを取得し、変数を展開して返します。
+    テンプレートはレジストリにキャッシュされた解析済みのものを使用します。
 
     Args:
         template_name (str): テンプレートファイル名（拡張子 .txt は省略可）
@@ -23,29 +155,10 @@ def load_prompt(template_name: str, **kwargs: Any) -> str:
 
     Raises:
         FileNotFoundError: テンプレートファイルが見つからない場合
+        PromptTemplateError: テンプレート内の変数に対応する値が渡されていない場合
     """
-    # 拡張子がない場合は .txt を付与して補完
-    if not template_name.endswith(".txt"):
-        filename = f"{template_name}.txt"
-    else:
-        filename = template_name
-
-    template_path = PROMPT_DIR / filename
-
     try:
-        if not template_path.exists():
-            # 開発者がパス構成を間違えた場合に気づきやすいようログを出力
-            logger.error(f"Prompt template not found at: {template_path}")
-            raise FileNotFoundError(f"Template '{filename}' not found in {PROMPT_DIR}")
-
-        with open(template_path, "r", encoding="utf-8") as f:
-            template_content = f.read()
-
-        # string.Template を使用して変数を置換 ($variable 形式)
-        # safe_substitute を使うことで、万が一コード側から渡す変数が不足していても
-        # エラーにならず、プレースホルダー($variable)がそのまま残るためデバッグしやすい。
-        return Template(template_content).safe_substitute(**kwargs)
-
+        return get_prompt_registry().render(template_name, **kwargs)
     except Exception as e:
         logger.error(f"Error loading prompt template '{template_name}': {e}")
         raise
\ No newline at end of file
@@ -1,9 +1,12 @@
-import json
-from typing import Any, Dict, Type, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Type, Optional
 from pydantic import BaseModel
 
+from app.core import json_codec
 # 先ほど作成したマネージャーをインポート
 from app.usecases.utils.prompt_manager import load_prompt
+from app.usecases.utils.serializers import serialize_context
+from app.usecases.utils.token_counter import estimate_tokens
 
 # FIMのガイドライン定数は、変数としてテンプレートに渡すためにここに定義します
 FIM_GUIDELINES = """
@@ -17,21 +20,92 @@ FIM_GUIDELINES = """
     ・1点：全介助（25%未満しか行えない）
 """
 
+# スキーマをAPIで渡すクライアントでは、プロンプトに項目の一覧を載せずにこの一文だけを入れる
+SCHEMA_ENFORCED_NOTE = "出力のJSONスキーマ（各項目の説明を含む）はAPIで指定しています。スキーマの項目名と説明に従って出力してください。"
+
+
+def _json_types(prop: Dict[str, Any]) -> str:
+    types: List[str] = [prop["type"]] if "type" in prop else [
+        option["type"] for option in prop.get("anyOf", []) if "type" in option
+    ]
+    return "|".join(types) or "any"
+
+
+@lru_cache(maxsize=256)
+def render_schema_fields(schema: Type[BaseModel]) -> str:
+    """
+    スキーマをプロンプト用の簡潔な項目一覧に変換する（1行1項目の "- キー (型): 説明"）。
+
+    model_json_schema() をインデント付きでそのまま埋め込むと、括弧やキー名 ("description" など) の
+    繰り返しでトークンを消費するため、モデルが必要とする項目名・型・説明だけを残します。
+    """
+    json_schema = schema.model_json_schema()
+    required = set(json_schema.get("required", []))
+    lines = []
+    for name, prop in json_schema.get("properties", {}).items():
+        type_str = _json_types(prop) + ("" if name in required else ", 任意")
+        description = " ".join((prop.get("description") or "").split())
+        lines.append(f"- {name} ({type_str}): {description}" if description else f"- {name} ({type_str})")
+    return "以下のキーを持つJSONオブジェクトを出力してください。\n" + "\n".join(lines)
+
+
+def render_schema_section(schema: Type[BaseModel], schema_enforced: bool = False) -> str:
+    """
+    プロンプトに埋め込む出力形式のセクションを返す。
+
+    Args:
+        schema: 出力のスキーマ
+        schema_enforced: クライアントがスキーマ（説明を含む）をAPIでモデルに渡す場合は True。
+            同じ説明文を二重に送らないよう、項目の一覧を省略します。
+    """
+    return SCHEMA_ENFORCED_NOTE if schema_enforced else render_schema_fields(schema)
+
+
+@lru_cache(maxsize=128)
+def _schema_section_tokens(schema: Type[BaseModel], schema_enforced: bool) -> Tuple[int, int]:
+    # スキーマのクラスごとに1回だけ計算する（model_json_schema() の生成は呼び出しのたびに行うと重い）
+    legacy = estimate_tokens(json_codec.dumps(schema.model_json_schema(), indent=True))
+    current = estimate_tokens(render_schema_section(schema, schema_enforced))
+    return legacy, current
+
+
+def schema_prompt_savings(schema: Type[BaseModel], schema_enforced: bool = False) -> Dict[str, int]:
+    """
+    従来の埋め込み方（インデント付きの model_json_schema()）と比べた、出力形式セクションの推定トークン数。
+    計算結果はスキーマのクラスごとにキャッシュします。
+    """
+    legacy, current = _schema_section_tokens(schema, schema_enforced)
+    return {"legacy_tokens": legacy, "tokens": current, "saved_tokens": legacy - current}
+
+
+def group_prompt_variables(
+    group_schema: Type[BaseModel],
+    patient_facts_str: str,
+    generated_plan_so_far: Dict[str, Any],
+    schema_enforced: bool = False,
+) -> Dict[str, str]:
+    """
+    計画書生成（グループ単位）用のテンプレートに渡す変数を準備する（セクションごとのトークン数の計測にも使用）
+    """
+    return {
+        "patient_facts": patient_facts_str,
+        "generated_plan": serialize_context(generated_plan_so_far),
+        "fim_guidelines": FIM_GUIDELINES,
+        "schema_section": render_schema_section(group_schema, schema_enforced),
+    }
+
+
 def build_group_prompt(
     group_schema: Type[BaseModel],
     patient_facts_str: str,
     generated_plan_so_far: Dict[str, Any],
+    schema_enforced: bool = False,
 ) -> str:
     """
     計画書生成（グループ単位）用のプロンプトを構築する
     """
     # テンプレートに渡す変数を辞書として準備
-    variables = {
-        "patient_facts": patient_facts_str,
-        "generated_plan": json.dumps(generated_plan_so_far, indent=2, ensure_ascii=False, default=str),
-        "fim_guidelines": FIM_GUIDELINES,
-        "schema_json": json.dumps(group_schema.model_json_schema(), indent=2, ensure_ascii=False)
-    }
+    variables = group_prompt_variables(group_schema, patient_facts_str, generated_plan_so_far, schema_enforced)
 
     # テンプレートファイル 'plan_generation.txt' を読み込んで変数を展開
     return load_prompt("plan_generation", **variables)
@@ -55,7 +129,7 @@ def build_regeneration_prompt(
 
     variables = {
         "patient_facts": patient_facts_str,
-        "generated_plan": json.dumps(generated_plan_so_far, indent=2, ensure_ascii=False, default=str),
+        "generated_plan": serialize_context(generated_plan_so_far),
         "rag_context": rag_text,
         "item_label": item_key_to_regenerate,
         "current_text": current_text,
@@ -0,0 +1,184 @@
+from typing import Any, Dict, List, Tuple
+
+from app.core.constants import CHECKBOX_TEXT_PAIRS, PATIENT_FIELD_LABELS
+from app.usecases.utils.dependency_map import GENERATED_FIELDS
+
+# 算定病名のキーワードごとの定型文（LLMを使わない暫定ドラフト用）
+# 上から順に評価し、最初に一致したものを使用します。
+DIAGNOSIS_PHRASES: List[Tuple[Tuple[str, ...], Dict[str, str]]] = [
+    (("脳梗塞", "脳出血", "くも膜下", "脳卒中"), {
+        "risks": "再発予防のため、血圧変動や神経症状の変化に留意する。",
+        "contraindications": "過度な血圧上昇を伴う高負荷の運動は避ける。",
+        "policy": "麻痺側の機能回復を促し、基本動作とADLの再獲得を図る。",
+    }),
+    (("骨折", "人工骨頭", "人工関節", "THA", "TKA"), {
+        "risks": "術部の疼痛、脱臼、転倒に留意する。",
+        "contraindications": "医師の指示に基づく荷重制限・禁忌肢位を守る。",
+        "policy": "疼痛に配慮しながら、荷重と歩行能力の改善を図る。",
+    }),
+    (("心不全", "心筋梗塞", "狭心症"), {
+        "risks": "運動時の息切れ、血圧・脈拍の変化、体重増加に留意する。",
+        "contraindications": "自覚症状やバイタルサインの基準を超える運動は中止する。",
+        "policy": "運動耐容能の改善と、再発を防ぐ生活習慣の獲得を図る。",
+    }),
+    (("肺炎", "COPD", "呼吸不全"), {
+        "risks": "SpO2の低下、呼吸困難感、誤嚥に留意する。",
+        "contraindications": "SpO2の基準を下回る負荷の運動は避ける。",
+        "policy": "呼吸機能と持久力の改善を図り、離床と活動量の拡大を進める。",
+    }),
+    (("廃用",), {
+        "risks": "起立性低血圧、易疲労、転倒に留意する。",
+        "contraindications": "疲労の蓄積を避け、段階的に負荷を上げる。",
+        "policy": "離床時間を延ばし、筋力・持久力の回復とADLの再獲得を図る。",
+    }),
+]
+
+DEFAULT_PHRASES = {
+    "risks": "転倒、体調の変化に留意する。",
+    "contraindications": "医師の指示に従い、過負荷を避ける。",
+    "policy": "心身機能の改善と、基本動作・ADLの自立度向上を図る。",
+}
+
+_FIM_CURRENT_SUFFIX = "_fim_current_val"
+
+# 目標（参加）の住居の選択値（goal_p_residence_slct）。旧形式の英語の値と、画面から入力される日本語の値
+HOME_RESIDENCE_VALUES = {"home_detached", "home_apartment", "自宅", "戸建", "マンション"}
+FACILITY_RESIDENCE_VALUES = {"facility", "施設"}
+
+
+def _diagnosis_phrases(disease_name: str) -> Dict[str, str]:
+    for keywords, phrases in DIAGNOSIS_PHRASES:
+        if any(keyword in disease_name for keyword in keywords):
+            return phrases
+    return DEFAULT_PHRASES
+
+
+def _discharge_goal(flat_patient_data: Dict[str, Any]) -> str:
+    """住居の選択に応じた退院時の目標。自宅が選択されている場合に限り自宅退院とする。"""
+    residence = str(flat_patient_data.get("goal_p_residence_slct") or "").strip()
+    if residence in HOME_RESIDENCE_VALUES:
+        return "ADLの自立度を高め、自宅への退院を目指す。"
+    if residence in FACILITY_RESIDENCE_VALUES:
+        return "ADLの自立度を高め、施設での生活へ円滑に移行する。"
+    other = str(flat_patient_data.get("goal_p_residence_other_txt") or "").strip()
+    if residence and other:
+        return f"ADLの自立度を高め、退院先（{other}）での生活へ円滑に移行する。"
+    return "ADLの自立度を高め、退院後の生活の場へ円滑に移行する。"
+
+
+def _fim_level(score: int) -> str:
+    """FIMの点数から介助量の区分を返す。"""
+    if score >= 6:
+        return "自立"
+    if score == 5:
+        return "見守り"
+    if score >= 3:
+        return "一部介助"
+    return "全介助"
+
+
+def _fim_items(flat_patient_data: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """FIM(現在値)を (項目名, 点数) のリストで返す。"""
+    items = []
+    for key, value in flat_patient_data.items():
+        if not key.endswith(_FIM_CURRENT_SUFFIX) or value in (None, ""):
+            continue
+        try:
+            score = int(value)
+        except (TypeError, ValueError):
+            continue
+        label = PATIENT_FIELD_LABELS.get(key, key).replace("(FIM現在)", "")
+        items.append((label, score))
+    return items
+
+
+def _bullets(lines: List[str]) -> str:
+    return "\n".join(f"・{line}" for line in lines)
+
+
+def build_rule_based_draft(flat_patient_data: Dict[str, Any], facts: Dict[str, Any]) -> Dict[str, str]:
+    """
+    LLMを使わず、事実情報から決定的に計画書の暫定ドラフトを作成する（数ミリ秒で完了）。
+
+    チェックボックス+詳細テキストのペア、FIMの点数区分、算定病名ごとの定型文を組み合わせます。
+    LLMによる生成が完了するまでの「すぐに使える下書き」として利用し、後で項目ごとに置き換えます。
+
+    Args:
+        flat_patient_data: export_to_mapping_format() の出力
+        facts: prepare_patient_facts() の出力
+
+    Returns:
+        Dict[str, str]: 全ての生成項目 (RehabPlanSchema のフィールド) を含む暫定ドラフト
+    """
+    draft: Dict[str, str] = {}
+    functions = facts.get("心身機能・構造", {})
+
+    # --- 機能障害: チェックの有無と詳細テキスト ---
+    for chk_key, txt_key in CHECKBOX_TEXT_PAIRS.items():
+        label = PATIENT_FIELD_LABELS.get(chk_key)
+        draft[txt_key] = functions.get(label, "特記事項なし") if label else "特記事項なし"
+
+    # --- リスク・禁忌: 算定病名の定型文 + 危険因子 ---
+    disease_name = str(flat_patient_data.get("header_disease_name_txt") or "")
+    phrases = _diagnosis_phrases(disease_name)
+    risk_factors = [
+        PATIENT_FIELD_LABELS[key] for key, value in flat_patient_data.items()
+        if key.startswith("func_risk_") and key.endswith("_chk") and key != "func_risk_factors_chk"
+        and value is True and key in PATIENT_FIELD_LABELS
+    ]
+    risks = [phrases["risks"]]
+    if risk_factors:
+        risks.append(f"危険因子（{'、'.join(risk_factors)}）の管理に留意する。")
+    draft["main_risks_txt"] = _bullets(risks)
+    draft["main_contraindications_txt"] = _bullets([phrases["contraindications"]])
+
+    # --- ADL: FIMの点数区分 ---
+    fim_items = _fim_items(flat_patient_data)
+    assisted = [(label, score) for label, score in fim_items if score <= 5]
+    if fim_items:
+        draft["adl_equipment_and_assistance_details_txt"] = _bullets(
+            [f"{label}：{_fim_level(score)}（FIM {score}点）" for label, score in fim_items]
+        )
+    else:
+        draft["adl_equipment_and_assistance_details_txt"] = "ADL評価の入力待ち"
+
+    assisted_labels = "、".join(label for label, _ in assisted[:4])
+    if assisted:
+        draft["goals_1_month_txt"] = f"{assisted_labels}の介助量を軽減し、自立度の向上を目指す。"
+    else:
+        draft["goals_1_month_txt"] = "現在のADL自立度を維持し、活動量の拡大を目指す。"
+
+    draft["goals_at_discharge_txt"] = _discharge_goal(flat_patient_data)
+
+    # --- 治療方針 ---
+    therapies = [
+        name for key, name in (("header_therapy_pt_chk", "PT"), ("header_therapy_ot_chk", "OT"), ("header_therapy_st_chk", "ST"))
+        if flat_patient_data.get(key)
+    ]
+    draft["policy_treatment_txt"] = phrases["policy"]
+    contents = [f"{'・'.join(therapies)}による個別訓練" if therapies else "個別訓練"]
+    contents.append("筋力・関節可動域の維持改善訓練")
+    if assisted:
+        contents.append(f"{assisted_labels}の動作訓練")
+    draft["policy_content_txt"] = _bullets(contents)
+
+    # --- 対応方針 ---
+    draft["goal_a_action_plan_txt"] = (
+        f"{assisted_labels}について、介助方法を統一して反復練習を行う。" if assisted
+        else "自立している動作を病棟生活でも継続できるよう支援する。"
+    )
+    draft["goal_s_env_action_plan_txt"] = "退院先の住環境を確認し、必要に応じて福祉用具・住宅改修を検討する。"
+    draft["goal_p_action_plan_txt"] = "本人・家族の希望を確認し、退院後の役割や活動の再開を支援する。"
+    draft["goal_s_psychological_action_plan_txt"] = "本人の不安や意欲に配慮し、目標を共有しながら訓練を進める。"
+    care_level = next(
+        (PATIENT_FIELD_LABELS[key] for key, value in flat_patient_data.items()
+         if key.startswith("social_care_level_care_num") and value),
+        None,
+    )
+    draft["goal_s_3rd_party_action_plan_txt"] = (
+        f"{care_level}の認定に基づき、介護保険サービスの利用を調整する。" if care_level
+        else "家族への介助指導を行い、必要な介護サービスの利用を検討する。"
+    )
+
+    # 生成項目の定義順に揃える
+    return {field: draft.get(field, "") for field in GENERATED_FIELDS}
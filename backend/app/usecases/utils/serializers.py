@@ -0,0 +1,100 @@
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core import json_codec
+from app.usecases.utils.token_counter import estimate_tokens
+
+# プロンプトに埋め込むコンテキスト（事実情報・生成済みの計画）のシリアライズ形式
+FORMAT_JSON_PRETTY = "json"        # インデント付きJSON（従来の形式）
+FORMAT_JSON_MIN = "json_min"       # 空白を除いたJSON
+FORMAT_KEY_VALUE = "kv"            # 1行1項目の "key: value" 形式（トップレベルのカテゴリは見出し行）
+
+# 既定の形式。token_countsで比較すると kv が最も小さいが、
+# 生成結果の妥当性（スキーマ通りのJSONが返るか）を実機で確認するまでは、内容が完全に同じ json_min を既定とする
+DEFAULT_CONTEXT_FORMAT = os.getenv("PROMPT_CONTEXT_FORMAT", FORMAT_JSON_MIN)
+
+
+def _json_pretty(data: Any) -> str:
+    return json_codec.dumps(data, indent=True)
+
+
+def _json_min(data: Any) -> str:
+    return json_codec.dumps(data)
+
+
+def _scalar(value: Any) -> str:
+    if isinstance(value, str):
+        # 改行を含む値（療法士の申し送りなど）も1行に収める
+        return value.replace("\r\n", "\n").replace("\n", "\\n")
+    if isinstance(value, (list, tuple, dict)):
+        return _json_min(value)
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _kv_lines(data: Dict[str, Any], prefix: str, lines: List[str]) -> None:
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            _kv_lines(value, f"{path}.", lines)
+        else:
+            lines.append(f"{path}: {_scalar(value)}")
+
+
+def _key_value(data: Any) -> str:
+    """
+    ネストした辞書を1行1項目の形式に変換します。
+    トップレベルのカテゴリは "# カテゴリ" の見出し行とし、それより深い階層はドット区切りのキーで表します。
+
+        # 基本情報
+        氏名: テスト太郎
+        # ADL評価
+        FIM(現在値).Eating: 5点
+    """
+    if not isinstance(data, dict):
+        return _scalar(data)
+
+    lines: List[str] = []
+    for key, value in data.items():
+        if isinstance(value, dict):
+            if not value:
+                continue
+            lines.append(f"# {key}")
+            _kv_lines(value, "", lines)
+        else:
+            lines.append(f"{key}: {_scalar(value)}")
+    return "\n".join(lines)
+
+
+SERIALIZERS: Dict[str, Callable[[Any], str]] = {
+    FORMAT_JSON_PRETTY: _json_pretty,
+    FORMAT_JSON_MIN: _json_min,
+    FORMAT_KEY_VALUE: _key_value,
+}
+
+
+def serialize_context(data: Any, fmt: Optional[str] = None) -> str:
+    """
+    プロンプトに埋め込むコンテキストを文字列に変換します。
+
+    Args:
+        data: 事実情報や生成済みの計画などの辞書
+        fmt: シリアライズ形式（省略時は環境変数 PROMPT_CONTEXT_FORMAT、既定 json_min）
+
+    Returns:
+        str: シリアライズした文字列
+
+    Raises:
+        ValueError: 未対応の形式が指定された場合
+    """
+    fmt = fmt or DEFAULT_CONTEXT_FORMAT
+    serializer = SERIALIZERS.get(fmt)
+    if serializer is None:
+        raise ValueError(f"Unknown context format: '{fmt}' (expected one of {', '.join(SERIALIZERS)})")
+    return serializer(data)
+
+
+def token_counts(data: Any) -> Dict[str, int]:
+    """各シリアライズ形式の推定トークン数を返します（形式の比較用）。"""
+    return {fmt: estimate_tokens(serializer(data)) for fmt, serializer in SERIALIZERS.items()}
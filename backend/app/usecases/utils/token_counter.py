@@ -0,0 +1,104 @@
+import math
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+# 日本語（ひらがな・カタカナ・漢字・全角記号）はおおよそ1文字1トークン、
+# それ以外（英数字・記号・空白）はおおよそ4文字1トークンとして概算します。
+_CJK_PATTERN = re.compile(r"[　-ヿ㐀-䶿一-鿿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    プロンプトのトークン数を概算する（モデル固有のトークナイザを使わない簡易推定）。
+
+    プロンプト構築方法の比較など、相対的な削減量の計測を目的としています。
+
+    Args:
+        text: 対象の文字列
+
+    Returns:
+        int: 推定トークン数
+    """
+    if not text:
+        return 0
+    cjk_chars = len(_CJK_PATTERN.findall(text))
+    other_chars = len(text) - cjk_chars
+    return cjk_chars + (other_chars + 3) // 4
+
+
+class TokenCalibrator:
+    """
+    LLMの応答に含まれる実際のプロンプトトークン数と estimate_tokens の比から、
+    モデルごとに推定値を補正する係数を学習する（指数移動平均）。
+
+    モデル固有のトークナイザを読み込まずに、コンテキスト長の予算管理に使える精度の推定値を得るためのものです。
+    プレフィックスキャッシュなどで実際の値が大きく外れる観測は無視します。
+
+    Attributes:
+        alpha (float): 新しい観測の重み。
+        default_ratio (float): 観測がないモデルの補正係数。
+    """
+
+    # 補正係数として受け入れる範囲（これを外れる観測は外れ値として無視する）
+    MIN_RATIO = 0.5
+    MAX_RATIO = 3.0
+
+    def __init__(self, alpha: float = 0.2, default_ratio: float = 1.0):
+        self.alpha = alpha
+        self.default_ratio = default_ratio
+        self._ratios: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def ratio(self, model_name: Optional[str]) -> float:
+        """モデルの補正係数（実際のトークン数 / 推定トークン数）を返す。"""
+        return self._ratios.get(model_name or "", self.default_ratio)
+
+    def observe(self, model_name: Optional[str], text: str, actual_tokens: Any) -> None:
+        """
+        実際のプロンプトトークン数を記録する（LLMクライアントが応答を受け取るたびに呼び出す）。
+
+        Args:
+            model_name: モデル名
+            text: 送信したプロンプト
+            actual_tokens: 応答に含まれるプロンプトのトークン数（取得できない場合は None）
+        """
+        estimated = estimate_tokens(text)
+        if not model_name or not isinstance(actual_tokens, int) or actual_tokens <= 0 or estimated <= 0:
+            return
+        observed = actual_tokens / estimated
+        if not self.MIN_RATIO <= observed <= self.MAX_RATIO:
+            return
+        with self._lock:
+            previous = self._ratios.get(model_name)
+            self._ratios[model_name] = (
+                observed if previous is None else previous + self.alpha * (observed - previous)
+            )
+            self._samples[model_name] = self._samples.get(model_name, 0) + 1
+
+    def estimate(self, text: str, model_name: Optional[str]) -> int:
+        """補正係数を掛けたトークン数の推定値を返す。"""
+        return math.ceil(estimate_tokens(text) * self.ratio(model_name))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """モデルごとの補正係数と観測数（メトリクス表示用）。"""
+        with self._lock:
+            return {
+                model: {"ratio": round(ratio, 3), "samples": self._samples.get(model, 0)}
+                for model, ratio in self._ratios.items()
+            }
+
+
+@lru_cache()
+def get_token_calibrator() -> TokenCalibrator:
+    """アプリケーション全体で共有するトークン数の補正器を返します。"""
+    return TokenCalibrator()
+
+
+def estimate_tokens_for(text: str, model_name: Optional[str]) -> int:
+    """
+    モデルごとの補正係数を反映したトークン数の推定値を返す（プロンプトの予算管理用）。
+    """
+    return get_token_calibrator().estimate(text, model_name)
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.adapters.llm.host_pool import NoHostAvailableError, OllamaHostPool
+from app.adapters.llm.ollama_client import OllamaClient
+
+HOSTS = ["http://ollama-1:11434", "http://ollama-2:11434", "http://ollama-3:11434"]
+
+
+def _stand_in(url, loaded=()):
+    """Ollamaサーバーの代わりに応答するクライアント"""
+    client = MagicMock(name=url)
+    client.ps.return_value = MagicMock(models=[MagicMock(model=name, name=name) for name in loaded])
+    client.chat.return_value = MagicMock(message=MagicMock(content=f"from {url}"))
+    return client
+
+
+def test_least_outstanding_prefers_loaded_model():
+    """モデルがロード済みのホストを優先し、混雑したら空いているホストへ分散すること"""
+    clients = {HOSTS[0]: _stand_in(HOSTS[0]), HOSTS[1]: _stand_in(HOSTS[1], loaded=["qwen3:0.6b"]),
+               HOSTS[2]: _stand_in(HOSTS[2])}
+    pool = OllamaHostPool(HOSTS, client_factory=clients.__getitem__, cold_penalty=2)
+    for host in pool.hosts:
+        pool.probe(host)
+
+    with pool.lease("qwen3:0.6b") as first, pool.lease("qwen3:0.6b") as second, \
+         pool.lease("qwen3:0.6b") as third:
+        assert first.url == HOSTS[1]
+        assert second.url == HOSTS[1]
+        # ロード済みホストの実行中が cold_penalty に達したら、未ロードのホストへ
+        assert third.url in (HOSTS[0], HOSTS[2])
+
+    snapshot = pool.snapshot()
+    assert snapshot["healthy_hosts"] == 3
+    assert all(host["in_flight"] == 0 for host in snapshot["hosts"])
+    assert snapshot["hosts"][1]["total_requests"] == 2
+
+
+def test_unhealthy_and_draining_hosts_are_skipped():
+    clients = {url: _stand_in(url) for url in HOSTS[:2]}
+    clients[HOSTS[0]].ps.side_effect = ConnectionError("Failed to connect to Ollama")
+    pool = OllamaHostPool(HOSTS[:2], client_factory=clients.__getitem__)
+
+    pool.probe(pool.hosts[0])
+    with pool.lease("m") as host:
+        assert host.url == HOSTS[1]
+
+    # ドレイン中のホストには割り当てない（全ホストがドレイン中なら例外）
+    pool.set_draining(HOSTS[1])
+    with pool.lease("m") as host:
+        assert host.url == HOSTS[0]
+    pool.set_draining(HOSTS[0])
+    with pytest.raises(NoHostAvailableError):
+        with pool.lease("m"):
+            pass
+
+    # 復旧したホストはヘルスチェックで割り当て対象に戻る
+    clients[HOSTS[0]].ps.side_effect = None
+    pool.probe(pool.hosts[0])
+    pool.set_draining(HOSTS[0], False)
+    assert pool.snapshot()["hosts"][0]["healthy"] is True
+
+
+@pytest.mark.asyncio
+async def test_ollama_client_fails_over_to_another_host():
+    """接続できないホストを除外して、別のホストで生成されること"""
+    clients = {url: _stand_in(url) for url in HOSTS[:2]}
+    clients[HOSTS[0]].chat.side_effect = ConnectionError("Failed to connect to Ollama")
+
+    with patch.dict(os.environ, {"OLLAMA_BASE_URLS": ",".join(HOSTS[:2]), "OLLAMA_ENABLE_THINKING": "false",
+                                 "OLLAMA_HEALTH_CHECK_INTERVAL_SEC": "0"}), \
+         patch("app.adapters.llm.ollama_client.Client", side_effect=lambda host: clients[host]):
+        client = OllamaClient()
+
+    assert await client.generate_text("prompt") == f"from {HOSTS[1]}"
+    hosts = client.host_pool.snapshot()["hosts"]
+    assert hosts[0]["healthy"] is False
+    assert hosts[0]["failures"] == 1
+    assert hosts[1]["latency_ewma_sec"] is not None
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from pydantic import BaseModel, Field
+
+from app.adapters.llm.json_repair import PartialJSONError, parse_llm_json, repair_json
+
+
+class GroupSchema(BaseModel):
+    risks: str = Field(description="リスク")
+    goals: str = Field(description="目標")
+    policy: str = Field(description="方針")
+
+
+@pytest.mark.parametrize("text, expected", [
+    # コードフェンスと思考タグ
+    ('<think>考え中 {"x": 1}</think>\n```json\n{"a": "b"}\n```', {"a": "b"}),
+    # 末尾カンマ
+    ('{"a": [1, 2,], "b": "c",}', {"a": [1, 2], "b": "c"}),
+    # 括弧が閉じていない
+    ('{"a": "b", "c": {"d": "e"', {"a": "b", "c": {"d": "e"}}),
+    # 文字列の途中で切れた項目は捨てる
+    ('{"a": "b", "c": "途中で切', {"a": "b"}),
+    # 値が出力される前に切れた項目も捨てる
+    ('{"a": "b", "c":', {"a": "b"}),
+    # JSONの後ろの説明文は無視する
+    ('以下が結果です。{"a": "b"} 以上です。', {"a": "b"}),
+])
+def test_repair_json(text, expected):
+    assert repair_json(text) == expected
+
+
+def test_parse_llm_json_salvages_complete_fields():
+    """切れた出力から完全な項目だけを取り出し、不足項目を例外で伝えること"""
+    text = '{"risks": "転倒", "goals": "歩行自立", "policy": "段階的に'
+
+    with pytest.raises(PartialJSONError) as exc:
+        parse_llm_json(text, GroupSchema)
+
+    assert exc.value.partial == {"risks": "転倒", "goals": "歩行自立"}
+    assert exc.value.missing == ["policy"]
+
+
+def test_parse_llm_json_repairs_without_missing_fields():
+    text = '```json\n{"risks": "転倒", "goals": "歩行自立", "policy": "段階的",}\n```'
+    assert parse_llm_json(text, GroupSchema) == {"risks": "転倒", "goals": "歩行自立", "policy": "段階的"}
+
+
+def test_parse_llm_json_invalid_value_is_missing():
+    """型が合わない値は取り出さず、不足項目として扱うこと"""
+    with pytest.raises(PartialJSONError) as exc:
+        parse_llm_json('{"risks": "転倒", "goals": ["a"], "policy": null', GroupSchema)
+    assert exc.value.partial == {"risks": "転倒"}
+    assert exc.value.missing == ["goals", "policy"]
+
+
+def test_parse_llm_json_validates_well_formed_json():
+    """JSONとして正しくても、必須項目が欠けていれば不足項目として伝え、スキーマ外の項目は除くこと"""
+    with pytest.raises(PartialJSONError) as exc:
+        parse_llm_json('{"risks": "転倒", "goals": "歩行自立", "extra": "x"}', GroupSchema)
+    assert exc.value.partial == {"risks": "転倒", "goals": "歩行自立"}
+    assert exc.value.missing == ["policy"]
+
+    with pytest.raises(PartialJSONError) as exc:
+        parse_llm_json('{"risks": 1}', GroupSchema)
+    assert exc.value.partial == {}
+    assert exc.value.missing == ["risks", "goals", "policy"]
+
+    text = '{"risks": "転倒", "goals": "歩行自立", "policy": "段階的", "extra": "x"}'
+    assert parse_llm_json(text, GroupSchema) == {"risks": "転倒", "goals": "歩行自立", "policy": "段階的"}
+
+
+def test_parse_llm_json_nothing_salvageable():
+    with pytest.raises(json.JSONDecodeError):
+        parse_llm_json('{"risks": "途中', GroupSchema)
@@ -0,0 +1,155 @@
+import os
+
+import pytest
+from google.genai import errors
+from unittest.mock import MagicMock, patch
+from pydantic import BaseModel
+
+from app.adapters.llm.gemini_client import GeminiClient
+from app.adapters.llm.key_pool import (
+    QUOTA_WINDOW_SEC,
+    AllKeysRateLimitedError,
+    ApiKeyPool,
+    parse_quota_ids,
+    parse_retry_delay,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _pool(keys, clock, **kwargs):
+    return ApiKeyPool("test", keys, client_factory=lambda key: key, clock=clock, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_balances_by_remaining_quota():
+    """残りクォータが多いキーから順に使われること"""
+    clock = _Clock()
+    pool = _pool(["key-aaaa", "key-bbbb"], clock, rpm_limit=2)
+
+    used = []
+    for _ in range(4):
+        key = await pool.acquire()
+        pool.release(key)
+        used.append(key.client)
+        clock.now += 1
+
+    assert sorted(used) == ["key-aaaa", "key-aaaa", "key-bbbb", "key-bbbb"]
+    # 全キーが上限に達し、解除まで max_wait_sec を超える場合は例外
+    pool.max_wait_sec = 1
+    with pytest.raises(AllKeysRateLimitedError):
+        await pool.acquire()
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_key_cools_down_and_learns_quota():
+    """429 を受けたキーはクールダウンし、残りのキーが使われ続けること"""
+    clock = _Clock()
+    pool = _pool(["key-aaaa", "key-bbbb"], clock)
+
+    first = await pool.acquire()
+    pool.release(first)
+    pool.report_rate_limited(first)
+
+    for _ in range(3):
+        key = await pool.acquire()
+        pool.release(key)
+        assert key is not first
+
+    clock.now += 61
+    snapshot = pool.snapshot()
+    assert snapshot["available_keys"] == 2
+    assert snapshot["keys"][0]["rate_limited"] == 1
+    assert snapshot["keys"][0]["rpm_limit"] == 1
+
+
+def test_learned_quota_recovers_after_cooldown():
+    """学習した上限はクールダウン解除後の時間窓ごとに2倍に戻り、設定された上限で学習値が破棄されること"""
+    clock = _Clock()
+    pool = _pool(["key-aaaa"], clock, rpm_limit=10, default_cooldown_sec=60)
+    key = pool.keys[0]
+    key._recent.extend([clock.now] * 3)
+
+    pool.report_rate_limited(key)
+    assert key.effective_rpm_limit(clock.now) == 2
+
+    clock.now += 60 + QUOTA_WINDOW_SEC
+    assert key.effective_rpm_limit(clock.now) == 4
+    clock.now += 2 * QUOTA_WINDOW_SEC
+    assert key.effective_rpm_limit(clock.now) == 10
+    assert key.learned_rpm_limit is None
+
+    # 設定がない場合は、一定の時間窓の経過後に上限なしへ戻る
+    pool = _pool(["key-bbbb"], clock)
+    key = pool.keys[0]
+    pool.report_rate_limited(key)
+    assert key.effective_rpm_limit(clock.now) == 1
+    clock.now += 60 + 5 * QUOTA_WINDOW_SEC
+    assert key.effective_rpm_limit(clock.now) is None
+
+
+def test_does_not_learn_quota_from_retry_delay_or_other_quotas():
+    """retryDelay のある 429 や、トークン数・1日の上限による 429 からは RPM を学習しないこと"""
+    clock = _Clock()
+    pool = _pool(["key-aaaa"], clock)
+    key = pool.keys[0]
+
+    pool.report_rate_limited(key, retry_after_sec=30)
+    pool.report_rate_limited(key, quota_ids=["GenerateContentInputTokensPerModelPerMinute-FreeTier"])
+    pool.report_rate_limited(key, quota_ids=["GenerateRequestsPerDayPerProjectPerModel-FreeTier"])
+    assert key.learned_rpm_limit is None
+    assert key.rate_limited == 3
+
+    pool.report_rate_limited(key, quota_ids=["GenerateRequestsPerMinutePerProjectPerModel-FreeTier"])
+    assert key.learned_rpm_limit == 1
+
+
+def test_parse_retry_delay():
+    details = {"error": {"code": 429, "details": [
+        {"@type": "type.googleapis.com/google.rpc.QuotaFailure"},
+        {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "31s"},
+    ]}}
+    assert parse_retry_delay(details) == 31.0
+    assert parse_retry_delay({"error": {"code": 429}}) is None
+
+
+def test_parse_quota_ids():
+    details = {"error": {"code": 429, "details": [
+        {"@type": "type.googleapis.com/google.rpc.QuotaFailure", "violations": [
+            {"quotaMetric": "generativelanguage.googleapis.com/generate_content_free_tier_requests",
+             "quotaId": "GenerateRequestsPerMinutePerProjectPerModel-FreeTier"},
+        ]},
+    ]}}
+    assert parse_quota_ids(details) == ["GenerateRequestsPerMinutePerProjectPerModel-FreeTier"]
+    assert parse_quota_ids({"error": {"code": 429}}) == []
+
+
+class _Schema(BaseModel):
+    name: str
+
+
+@pytest.mark.asyncio
+async def test_gemini_client_retries_429_with_another_key():
+    """GeminiClient が 429 を受けたら別のキーで再試行すること"""
+    rate_limited = MagicMock()
+    rate_limited.models.generate_content.side_effect = errors.ClientError(
+        429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "details": [{"retryDelay": "10s"}]}}
+    )
+    healthy = MagicMock()
+    healthy.models.generate_content.return_value = MagicMock(text='{"name": "ok"}')
+    clients = {"key-1111": rate_limited, "key-2222": healthy}
+
+    with patch.dict(os.environ, {"GEMINI_API_KEYS": "key-1111,key-2222"}), \
+         patch("app.adapters.llm.gemini_client.genai.Client", side_effect=lambda api_key: clients[api_key]):
+        client = GeminiClient()
+
+    assert await client.generate_json("prompt", _Schema) == {"name": "ok"}
+    states = {key["key"]: key for key in client.key_pool.snapshot()["keys"]}
+    assert states["...1111"]["available"] is False
+    assert states["...2222"]["total_requests"] == 1
@@ -0,0 +1,66 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.adapters.llm.capabilities import get_model_capability
+from app.adapters.llm.router import DEFAULT_ROUTE, LLMRouter, parse_routes
+from app.schemas.legacy_schemas import CurrentAssessment, Goals
+from app.usecases.plan_generation import PlanGenerationUseCase
+
+
+def test_parse_routes():
+    routes = parse_routes("short=ollama:qwen3:1.7b, narrative=gemini:gemini-2.5-flash")
+    assert routes["short"].provider == "ollama"
+    assert routes["short"].model_name == "qwen3:1.7b"
+    assert routes["narrative"].model_name == "gemini-2.5-flash"
+    assert parse_routes("") == {}
+
+    with pytest.raises(ValueError):
+        parse_routes("short=qwen3")
+
+
+def test_split_by_field_complexity():
+    """短い所見と考察が混在するスキーマが、振り分け先ごとに分割されること"""
+    router = LLMRouter(parse_routes("short=ollama:qwen3:1.7b"))
+
+    parts = dict((route.name, list(schema.model_fields)) for route, schema in router.split(CurrentAssessment))
+
+    assert set(parts) == {DEFAULT_ROUTE, "short"}
+    assert parts[DEFAULT_ROUTE] == ["main_risks_txt", "main_contraindications_txt"]
+    assert len(parts["short"]) == 12
+    assert all(field.startswith("func_") for field in parts["short"])
+    # 全項目が同じ振り分け先なら元のスキーマのまま
+    assert router.split(Goals) == [(router.route_for_field("goals_1_month_txt"), Goals)]
+
+
+@pytest.mark.asyncio
+async def test_routed_generation_records_stats():
+    """振り分け先のクライアントで生成され、経路ごとの統計が記録されること"""
+    async def fake_generate_json(prompt, schema):
+        return {key: "生成" for key in schema.model_fields}
+
+    default_client = MagicMock(model_name="gemini-2.5-flash")
+    default_client.generate_json = AsyncMock(side_effect=fake_generate_json)
+    small_client = MagicMock(model_name="qwen3:1.7b")
+    small_client.generate_json = AsyncMock(side_effect=fake_generate_json)
+    router = LLMRouter(parse_routes("short=ollama:qwen3:1.7b"))
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=default_client), \
+         patch("app.usecases.plan_generation.get_llm_router", return_value=router), \
+         patch("app.adapters.llm.router.create_llm_client", return_value=small_client):
+        usecase = PlanGenerationUseCase(AsyncMock())
+        plan = await usecase._generate_groups("{}")
+
+    assert len(plan) == 24
+    short_schemas = [call.args[1] for call in small_client.generate_json.await_args_list]
+    assert all(field.startswith("func_") for schema in short_schemas for field in schema.model_fields)
+    # 振り分け先のモデルの上限 (qwen3:1.7b は3項目) を超える呼び出しがないこと
+    limit = get_model_capability("qwen3:1.7b").max_schema_fields
+    assert max(len(schema.model_fields) for schema in short_schemas) <= limit
+    assert len(short_schemas) == 4
+
+    stats = router.snapshot()["stats"]
+    assert stats["short"]["fields"] == 12
+    assert stats["short"]["calls"] == 4
+    assert stats["short"]["cost_usd"] == 0.0
+    assert stats[DEFAULT_ROUTE]["fields"] == 12
+    assert stats[DEFAULT_ROUTE]["cost_usd"] > 0
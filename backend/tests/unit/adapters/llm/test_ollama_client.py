@@ -1,11 +1,14 @@
+import asyncio
 import os
 import json
+import threading
 import pytest
 from unittest.mock import MagicMock, patch, ANY
 from pydantic import BaseModel, Field
 
 # テスト対象クラス
 from app.adapters.llm.ollama_client import OllamaClient
+from app.adapters.llm.thinking import capture_thinking, thinking_scope
 
 # ----------------------------------------------------------------
 # テスト用データの定義
@@ -69,8 +72,8 @@ async def test_init_config(mock_ollama_lib): # 引数にフィクチャを追加
 
 
 @pytest.mark.asyncio
-async def test_generate_text_with_thinking(mock_ollama_lib, capsys):
-    """generate_text: Thinking有効時のストリーミング表示と回答取得"""
+async def test_generate_text_with_thinking(mock_ollama_lib):
+    """generate_text: Thinking有効時の思考の記録と回答取得"""
     # インスタンスのモックを取得
     mock_instance = mock_ollama_lib.return_value
 
@@ -89,13 +92,14 @@ async def test_generate_text_with_thinking(mock_ollama_lib, capsys):
 
     # 実行
     prompt = "Question?"
-    result = await client.generate_text(prompt)
+    with capture_thinking() as channel, thinking_scope("Goals"):
+        result = await client.generate_text(prompt)
+        await asyncio.sleep(0)
 
     # 検証
     assert result == "The answer is 42."
-
-    captured = capsys.readouterr()
-    assert "Hm, I think..." in captured.out
+    assert channel.summary()["Goals"]["text"] == "Hm, I think..."
+    assert channel.summary()["Goals"]["tokens"] == 2
     
     # メソッド呼び出し検証
     mock_instance.chat.assert_called_with(
@@ -103,7 +107,7 @@ async def test_generate_text_with_thinking(mock_ollama_lib, capsys):
         messages=[{"role": "user", "content": prompt}],
         format=None,
         stream=True,
-        options={"temperature": 0.7}
+        options={"temperature": 0.7, "num_ctx": 8192}
     )
 
 
@@ -167,4 +171,74 @@ async def test_generate_json_decode_error(mock_ollama_lib):
     mock_instance.chat.return_value = mock_response
 
     with pytest.raises(json.JSONDecodeError):
-        await client.generate_json("test", SampleSchema)
\ No newline at end of file
+        await client.generate_json("test", SampleSchema)
+
+def test_stream_stops_when_cancel_event_is_set(mock_ollama_lib):
+    """呼び出し元がキャンセルされたら、残りのストリームを受け取らずに打ち切ること"""
+    mock_instance = mock_ollama_lib.return_value
+    cancel_event = threading.Event()
+    consumed = []
+
+    def chunks():
+        for text in ["a", "b", "c"]:
+            consumed.append(text)
+            if text == "a":
+                cancel_event.set()
+            yield create_mock_chunk(content=text)
+
+    mock_instance.chat.return_value = chunks()
+
+    with patch.dict(os.environ, {"OLLAMA_ENABLE_THINKING": "true"}):
+        client = OllamaClient()
+        with pytest.raises(asyncio.CancelledError):
+            client._run_chat_stream(
+                messages=[{"role": "user", "content": "q"}], cancel_event=cancel_event
+            )
+
+    assert consumed == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_thinking_budget_switches_to_answer_mode(mock_ollama_lib):
+    """思考が予算を超えたらストリームを打ち切り、思考なしで回答を生成させること"""
+    mock_instance = mock_ollama_lib.return_value
+
+    with patch.dict(os.environ, {"OLLAMA_ENABLE_THINKING": "true"}):
+        client = OllamaClient()
+
+    answer = MagicMock()
+    answer.message.content = "answer"
+    mock_instance.chat.side_effect = [
+        iter([create_mock_chunk(thinking=t) for t in ["a", "b", "c", "d"]]),
+        answer,
+    ]
+
+    with capture_thinking() as channel, thinking_scope("Goals", budget=2):
+        result = await client.generate_text("q")
+        await asyncio.sleep(0)
+
+    assert result == "answer"
+    _, kwargs = mock_instance.chat.call_args
+    assert kwargs["think"] is False
+    assert kwargs["messages"][-1] == {"role": "assistant", "content": "", "thinking": "ab"}
+    assert channel.summary()["Goals"]["budget_exceeded"] is True
+
+
+@pytest.mark.asyncio
+async def test_zero_thinking_budget_disables_thinking(mock_ollama_lib):
+    """予算0のグループでは思考させずに一括で回答を取得すること"""
+    mock_instance = mock_ollama_lib.return_value
+
+    with patch.dict(os.environ, {"OLLAMA_ENABLE_THINKING": "true"}):
+        client = OllamaClient()
+
+    mock_response = MagicMock()
+    mock_response.message.content = "answer"
+    mock_instance.chat.return_value = mock_response
+
+    with thinking_scope("CurrentAssessment", budget=0):
+        assert await client.generate_text("q") == "answer"
+
+    _, kwargs = mock_instance.chat.call_args
+    assert kwargs["stream"] is False
+    assert kwargs["think"] is False
\ No newline at end of file
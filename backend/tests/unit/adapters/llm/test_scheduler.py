@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+
+from app.adapters.llm.scheduler import LLMScheduler, Priority
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    """同時実行数が上限を超えないこと"""
+    scheduler = LLMScheduler(max_concurrency=2)
+    running = 0
+    peak = 0
+
+    async def job():
+        nonlocal running, peak
+        async with scheduler.slot(Priority.BATCH):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(job() for _ in range(6)))
+
+    assert peak == 2
+    assert scheduler.snapshot()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_overtakes_batch():
+    """待機中は一括生成より対話的な生成が先にスロットを獲得すること"""
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+    gate = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot(Priority.BATCH):
+            await gate.wait()
+
+    async def job(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    holder_task = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    batch_tasks = [asyncio.create_task(job(f"batch{i}", Priority.BATCH)) for i in range(2)]
+    await asyncio.sleep(0)
+    interactive_task = asyncio.create_task(job("interactive", Priority.INTERACTIVE))
+    await asyncio.sleep(0)
+
+    assert scheduler.snapshot()["waiting"] == {"batch": 2, "interactive": 1}
+
+    gate.set()
+    await asyncio.gather(holder_task, interactive_task, *batch_tasks)
+
+    assert order == ["interactive", "batch0", "batch1"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_releases_queue():
+    """待機中にキャンセルされたリクエストがスロットを占有し続けないこと"""
+    scheduler = LLMScheduler(max_concurrency=1)
+    gate = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot():
+            await gate.wait()
+
+    async def waiter():
+        async with scheduler.slot():
+            pass
+
+    holder_task = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    waiter_task = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+
+    waiter_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter_task
+
+    gate.set()
+    await holder_task
+
+    snapshot = scheduler.snapshot()
+    assert snapshot["active"] == 0
+    assert snapshot["waiting"] == {}
+    assert not scheduler.is_busy()
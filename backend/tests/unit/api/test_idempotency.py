@@ -0,0 +1,150 @@
+import asyncio
+import datetime
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy.dialects import postgresql
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.api import idempotency
+from app.api.idempotency import REPLAYED_HEADER, request_fingerprint, run_idempotent
+from app.infrastructure.repositories.idempotency_repository import IdempotencyRepository
+
+
+class _Result(BaseModel):
+    value: int
+
+
+def _request(body: bytes = b'{"a": 1}'):
+    request = MagicMock()
+    request.method = "POST"
+    request.url.path = "/plans/generate/h1"
+    request.url.query = ""
+    request.body = AsyncMock(return_value=body)
+    request.is_disconnected = AsyncMock(return_value=False)
+    return request
+
+
+def _fingerprint(request) -> str:
+    return request_fingerprint("POST", request.url.path, "", request.body.return_value)
+
+
+class _Session:
+    async def __aenter__(self):
+        return MagicMock(rollback=AsyncMock())
+
+    async def __aexit__(self, *args):
+        return False
+
+
+@pytest.fixture
+def repo():
+    repo = MagicMock()
+    repo.complete = AsyncMock()
+    repo.release = AsyncMock()
+    with patch.object(idempotency, "AsyncSessionLocal", _Session), \
+         patch.object(idempotency, "IdempotencyRepository", return_value=repo):
+        yield repo
+    idempotency._jobs.clear()
+
+
+@pytest.mark.asyncio
+async def test_retry_attaches_to_running_job(repo):
+    """実行中のジョブと同じキーの再送は、ジョブを再実行せずに同じ結果を受け取ること"""
+    calls = 0
+
+    async def claim(key, fingerprint):
+        # 2回目の獲得は、他のリクエストが処理中の状態として扱われる
+        return SimpleNamespace(request_fingerprint=fingerprint, status="in_progress"), calls == 0
+
+    async def job(session):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    repo.claim = AsyncMock(side_effect=claim)
+    first, second = await asyncio.gather(
+        run_idempotent(_request(), "k1", job, _Result, status_code=201),
+        run_idempotent(_request(), "k1", job, _Result, status_code=201),
+    )
+
+    assert calls == 1
+    assert json.loads(first.body) == json.loads(second.body) == {"value": 42}
+    assert first.status_code == second.status_code == 201
+    repo.complete.assert_awaited_once_with("k1", 201, {"value": 42})
+    assert "k1" not in idempotency._jobs
+
+
+@pytest.mark.asyncio
+async def test_completed_key_replays_stored_response(repo):
+    """完了済みのキーは、ジョブを実行せずに保存済みの結果を返すこと"""
+    request = _request()
+    record = SimpleNamespace(
+        request_fingerprint=_fingerprint(request), status="completed",
+        response_status=201, response_body={"value": 7},
+    )
+    repo.claim = AsyncMock(return_value=(record, False))
+    job = AsyncMock()
+
+    response = await run_idempotent(request, "k2", job, _Result, status_code=201)
+
+    job.assert_not_called()
+    assert response.status_code == 201
+    assert json.loads(response.body) == {"value": 7}
+    assert response.headers[REPLAYED_HEADER] == "true"
+
+
+@pytest.mark.asyncio
+async def test_key_reused_for_different_request_is_rejected(repo):
+    record = SimpleNamespace(request_fingerprint="other", status="completed")
+    repo.claim = AsyncMock(return_value=(record, False))
+
+    with pytest.raises(HTTPException) as exc:
+        await run_idempotent(_request(), "k3", AsyncMock(), _Result)
+    assert exc.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_in_progress_on_other_worker_returns_409(repo):
+    request = _request()
+    record = SimpleNamespace(request_fingerprint=_fingerprint(request), status="in_progress")
+    repo.claim = AsyncMock(return_value=(record, False))
+
+    with pytest.raises(HTTPException) as exc:
+        await run_idempotent(request, "k4", AsyncMock(), _Result)
+    assert exc.value.status_code == 409
+    assert "Retry-After" in exc.value.headers
+
+
+@pytest.mark.asyncio
+async def test_failed_job_releases_key(repo):
+    """ジョブが失敗した場合はキーを解放し、例外を呼び出し元へ伝えること"""
+    repo.claim = AsyncMock(return_value=(SimpleNamespace(), True))
+    job = AsyncMock(side_effect=RuntimeError("LLM failed"))
+
+    with pytest.raises(RuntimeError):
+        await run_idempotent(_request(), "k5", job, _Result)
+    repo.release.assert_awaited_once_with("k5")
+    repo.complete.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_takeover_compares_timestamps_with_db_clock():
+    """期限切れ・放棄の判定と更新時刻が、アプリの時計ではなくDBの now() で行われること"""
+    db = MagicMock()
+    db.scalar = AsyncMock(side_effect=[None, SimpleNamespace(key="k1")])
+    db.commit = AsyncMock()
+
+    record, claimed = await IdempotencyRepository(db).claim("k1", "fp")
+
+    assert claimed and record.key == "k1"
+    takeover = db.scalar.await_args_list[1].args[0].compile(dialect=postgresql.dialect())
+    sql = str(takeover)
+    assert "idempotency_keys.created_at < now() -" in sql
+    assert "idempotency_keys.updated_at < now() -" in sql
+    assert "created_at=now()" in sql and "updated_at=now()" in sql
+    assert not any(isinstance(value, datetime.datetime) for value in takeover.params.values())
@@ -0,0 +1,104 @@
+import json
+from typing import Dict, List, Optional
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.api.json_io import ORJSONResponse, install_openapi_schemas, json_body, json_body_openapi
+from app.core import json_codec
+from app.main import app as main_app
+
+
+class _Item(BaseModel):
+    label: str
+
+
+class _Body(BaseModel):
+    name: str
+    scores: Dict[str, int] = {}
+    note: Optional[str] = None
+    items: List[_Item] = []
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+
+    @app.post("/echo", openapi_extra=json_body_openapi(_Body))
+    async def echo(body: _Body = Depends(json_body(_Body))):
+        return ORJSONResponse({"name": body.name, "total": sum(body.scores.values()), 1: "int key"})
+
+    @app.post("/echo/untyped")
+    async def echo_untyped(body: _Body = Depends(json_body(_Body, untyped=True))):
+        return {"name": body.name}
+
+    install_openapi_schemas(app)
+    return TestClient(app)
+
+
+def test_json_body_validates_bytes_and_reports_errors_like_fastapi():
+    """ボディをバイト列から検証し、エラーは通常のボディと同じ 422 (loc が body から始まる) になること"""
+    client = _client()
+
+    res = client.post("/echo", json={"name": "患者", "scores": {"eating": 5, "grooming": 4}})
+    assert res.status_code == 200
+    assert res.json() == {"name": "患者", "total": 9, "1": "int key"}
+    assert "患者".encode("utf-8") in res.content  # ASCIIエスケープしない
+
+    res = client.post("/echo", json={"scores": {"eating": "x"}})
+    assert res.status_code == 422
+    locs = {tuple(error["loc"]) for error in res.json()["detail"]}
+    assert locs == {("body", "name"), ("body", "scores", "eating")}
+
+    for path in ("/echo", "/echo/untyped"):
+        res = client.post(path, content=b"{broken", headers={"Content-Type": "application/json"})
+        assert res.status_code == 422
+        assert res.json()["detail"][0]["type"] == "json_invalid"
+    assert client.post("/echo/untyped", json={"name": "x"}).json() == {"name": "x"}
+
+    document = client.get("/openapi.json").json()
+    body = document["paths"]["/echo"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert body == {"$ref": "#/components/schemas/_Body"}
+    components = document["components"]["schemas"]
+    assert components["_Body"]["required"] == ["name"]
+    assert components["_Body"]["properties"]["items"]["items"] == {"$ref": "#/components/schemas/_Item"}
+    assert "_Item" in components
+
+
+def test_openapi_has_no_dangling_refs():
+    """json_body で受け取るボディのネストしたモデルも components/schemas から参照でき、#/$defs の参照が残らないこと"""
+    document = main_app.openapi()
+    text = json.dumps(document)
+    assert "#/$defs" not in text
+
+    components = document["components"]["schemas"]
+    refs = {ref.rsplit("/", 1)[-1] for ref in _refs(document)}
+    assert refs <= set(components)
+    assert {"PatientExtractionSchema", "AdlSchema", "SignatureSchema", "BatchGenerateItem", "PlanBulkGenerate"} <= refs
+
+
+def _refs(node):
+    if isinstance(node, dict):
+        if isinstance(node.get("$ref"), str):
+            yield node["$ref"]
+        for value in node.values():
+            yield from _refs(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _refs(value)
+
+
+def test_codec_matches_standard_json_output():
+    """標準の json.dumps (ensure_ascii=False) と同じ文字列になり、パースエラーは json の例外として捕捉できること"""
+    data = {"基本情報": {"氏名": "テスト", "年齢": "80歳"}, "scores": [1, 2.5, None, True], "空": {}}
+
+    assert json_codec.dumps(data) == json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    assert json_codec.dumps(data, indent=True) == json.dumps(data, ensure_ascii=False, indent=2)
+    assert json_codec.loads(json_codec.dumps_bytes(data)) == data
+
+    try:
+        json_codec.loads("{broken")
+    except json.JSONDecodeError:
+        pass
+    else:
+        raise AssertionError("JSONDecodeError was not raised")
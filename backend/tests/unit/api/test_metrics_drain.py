@@ -0,0 +1,36 @@
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+
+from app.adapters.llm.host_pool import OllamaHostPool
+from app.api.v1.endpoints.metrics import router
+
+HOST = "http://ollama-drain:11434"
+
+
+def test_drain_waits_for_in_flight_requests():
+    """wait_sec を指定すると、実行中のリクエストが完了するまで待ってから応答すること"""
+    pool = OllamaHostPool([HOST], client_factory=lambda url: MagicMock(name=url))
+    host = pool.hosts[0]
+    app = FastAPI()
+    app.include_router(router, prefix="/metrics")
+    client = TestClient(app)
+
+    host.in_flight = 1
+    res = client.post("/metrics/ollama/hosts/drain", params={"host": HOST})
+    assert res.json() == {"host": HOST, "draining": True, "in_flight": 1, "drained": False}
+
+    # 待機の上限を過ぎても実行中なら drained=false
+    res = client.post("/metrics/ollama/hosts/drain", params={"host": HOST, "wait_sec": 0.05})
+    assert res.json()["drained"] is False
+
+    timer = threading.Timer(0.2, lambda: setattr(host, "in_flight", 0))
+    timer.start()
+    res = client.post("/metrics/ollama/hosts/drain", params={"host": HOST, "wait_sec": 5})
+    timer.join()
+    assert res.json() == {"host": HOST, "draining": True, "in_flight": 0, "drained": True}
+
+    assert client.post("/metrics/ollama/hosts/drain", params={"host": "http://unknown:11434"}).status_code == 404
+    assert client.post("/metrics/ollama/hosts/drain", params={"host": HOST, "draining": False}).json()["drained"] is False
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+
+from app.adapters.llm.scheduler import LLMScheduler
+from app.api import request_control
+from app.api.request_control import apply_request_deadline, run_cancellable
+from app.core.request_context import DeadlineExceeded, remaining, set_deadline, with_deadline
+
+
+def _request(disconnect_after: float = None):
+    """is_disconnected() が指定秒数後に True を返すリクエストのスタブ"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    request = MagicMock()
+    request.url.path = "/test"
+
+    async def is_disconnected():
+        return disconnect_after is not None and loop.time() - started >= disconnect_after
+
+    request.is_disconnected = is_disconnected
+    return request
+
+
+def test_deadline_header_reaches_endpoint():
+    """X-Request-Timeout-Ms ヘッダーの締め切りがエンドポイント内から参照できること"""
+    app = FastAPI()
+
+    @app.get("/remaining", dependencies=[Depends(apply_request_deadline)])
+    async def read_remaining():
+        return {"remaining": remaining()}
+
+    client = TestClient(app)
+    left = client.get("/remaining", headers={"X-Request-Timeout-Ms": "5000"}).json()["remaining"]
+    assert 0 < left <= 5
+    assert client.get("/remaining", headers={"X-Request-Timeout-Ms": "abc"}).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_waiting_llm_call_and_releases_slot():
+    """締め切りを過ぎたら、スロット待ちの処理が打ち切られ、待機列から外れること"""
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def occupy():
+        async with scheduler.slot():
+            await asyncio.sleep(0.2)
+
+    holder = asyncio.create_task(occupy())
+    await asyncio.sleep(0)
+
+    async def waiting_call():
+        async with scheduler.slot():
+            return "never"
+
+    set_deadline(0.05)
+    with pytest.raises(DeadlineExceeded):
+        await with_deadline(waiting_call(), "LLM call")
+    set_deadline(None)
+
+    assert scheduler.snapshot()["waiting"] == {}
+    await holder
+    assert scheduler.snapshot()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_work(monkeypatch):
+    """クライアントが切断したら処理をキャンセルし、499 を返すこと"""
+    monkeypatch.setattr(request_control, "DISCONNECT_POLL_INTERVAL", 0.01)
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(HTTPException) as exc_info:
+        await run_cancellable(_request(disconnect_after=0.03), work())
+
+    assert exc_info.value.status_code == 499
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_newer_request_supersedes_in_flight_one(monkeypatch):
+    """同じキーの新しいリクエストが来たら、古い処理はキャンセルされて 409 になること"""
+    monkeypatch.setattr(request_control, "DISCONNECT_POLL_INTERVAL", 0.01)
+
+    async def work(result):
+        await asyncio.sleep(0.05)
+        return result
+
+    first = asyncio.create_task(run_cancellable(_request(), work("first"), supersede_key="generate:h1"))
+    await asyncio.sleep(0.01)
+    second = await run_cancellable(_request(), work("second"), supersede_key="generate:h1")
+
+    assert second == "second"
+    with pytest.raises(HTTPException) as exc_info:
+        await first
+    assert exc_info.value.status_code == 409
+    assert "generate:h1" not in request_control._in_flight
@@ -0,0 +1,113 @@
+import random
+import typing
+from datetime import date
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel
+
+from app.core import json_codec
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.schemas.mapping_spec import FLAT_KEYS, from_flat, to_flat
+from app.usecases.utils.context_builder import prepare_patient_facts, prepare_patient_facts_from_schema
+from app.usecases.utils.fact_snapshot import build_fact_snapshot, build_fact_snapshot_from_schema
+
+# 対応表 (mapping_spec) を導入する前の手書きの export_to_mapping_format の出力。
+# tools/seeder のダミー患者、空の患者、ランダムな患者（seed 0-7）について生成したもので、
+# keys はキーの順序、cases[].values はその順序での値（日付は ISO 形式の文字列）
+_GOLDEN = json_codec.loads((Path(__file__).parent / "mapping_format_golden.json").read_bytes())
+
+
+def _random_value(annotation, rng: random.Random):
+    """フィールドの型に応じたランダムな値（約3割は None）"""
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    base = args[0] if args else annotation
+    if rng.random() < 0.3 and type(None) in typing.get_args(annotation):
+        return None
+    if typing.get_origin(base) is typing.Literal:
+        return rng.choice(typing.get_args(base))
+    if isinstance(base, type) and issubclass(base, BaseModel):
+        return _random_model(base, rng)
+    if base is bool:
+        return rng.random() < 0.5
+    if base is int:
+        return rng.randint(0, 7)
+    if base is float:
+        return round(rng.uniform(10, 40), 1)
+    if base is date:
+        return date(2026, rng.randint(1, 12), rng.randint(1, 28))
+    return rng.choice(["", "特記なし", "右膝に痛みあり", "自宅復帰\n屋内歩行自立"])
+
+
+def _random_model(model: typing.Type[BaseModel], rng: random.Random) -> BaseModel:
+    return model.model_validate({
+        name: _random_value(field.annotation, rng) for name, field in model.model_fields.items()
+    })
+
+
+@pytest.mark.parametrize("case", _GOLDEN["cases"], ids=lambda case: case["case"])
+def test_compiled_spec_matches_legacy_export(case):
+    """対応表による変換が、従来の手書きの実装と同じ結果（キー順を含む）になること"""
+    patient = PatientExtractionSchema.model_validate(case["patient"])
+
+    flat = patient.export_to_mapping_format()
+    assert list(flat) == _GOLDEN["keys"]
+    assert FLAT_KEYS == tuple(_GOLDEN["keys"])
+    assert json_codec.loads(json_codec.dumps(list(flat.values()))) == case["values"]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_facts_from_schema_match_flat(seed):
+    """事実情報・スナップショットをフラットな辞書を経由せずに構築しても同じになること"""
+    patient = _random_model(PatientExtractionSchema, random.Random(seed))
+    flat = to_flat(patient)
+
+    direct = prepare_patient_facts_from_schema(patient, "申し送り")
+    via_flat = prepare_patient_facts(flat, "申し送り")
+    assert direct == via_flat
+    assert [list(v) if isinstance(v, dict) else v for v in direct.values()] == \
+        [list(v) if isinstance(v, dict) else v for v in via_flat.values()]
+    assert build_fact_snapshot_from_schema(patient, "申し送り") == build_fact_snapshot(flat, "申し送り")
+
+
+def test_empty_patient_facts_match_flat():
+    patient = PatientExtractionSchema(
+        basic={}, medical={}, function={}, basic_movement={},
+        adl={}, nutrition={}, social={}, goals={}, signature={}
+    )
+    assert prepare_patient_facts_from_schema(patient) == prepare_patient_facts(patient.export_to_mapping_format())
+
+
+# フラット形式にキーがない（旧スキーマではまとめて管理されていた）ため、逆変換で復元できないBI
+_BI_WITHOUT_FLAT_KEYS = ("dressing_lower", "transfer_toilet", "transfer_tub")
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_flat_round_trip(seed):
+    """フラット形式 -> 構造化 -> フラット形式で値が変わらず、構造化データもフラット形式が持つ範囲で復元されること"""
+    patient = _random_model(PatientExtractionSchema, random.Random(seed))
+    flat = to_flat(patient)
+
+    restored = PatientExtractionSchema.from_mapping_format(flat)
+    assert to_flat(restored) == flat
+
+    expected = patient.model_dump()
+    for field in _BI_WITHOUT_FLAT_KEYS:
+        expected["adl"][field].update(bi_start=None, bi_current=None)
+    assert restored.model_dump() == expected
+
+
+def test_from_flat_reads_checkbox_strings_and_ignores_derived_keys():
+    """文字列のチェック値を解釈し、集計値・表示用の値は書き戻さないこと"""
+    nested = from_flat({
+        "name": "hash_ms",
+        "social_care_level_support_chk": "on",
+        "social_care_level_support_num1_slct": "true",
+        "social_care_level_support_num2_slct": False,
+        "func_risk_factors_chk": True,
+        "age_display": "80歳",
+    })
+
+    assert nested["basic"] == {"name": "hash_ms"}
+    assert nested["social"] == {"care_level": "support_1"}
+    assert nested["function"] == {} and nested["signature"] == {}
@@ -0,0 +1,13 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.schemas import PlanUpdate
+
+
+def test_plan_update_status_is_optional_but_not_nullable():
+    """status は省略できるが、明示的な null は拒否されること（NOT NULL 列に書き込まれないように）"""
+    assert "status" not in PlanUpdate(raw_data={}).model_dump(exclude_unset=True)
+    assert PlanUpdate(raw_data={}, status="final").status == "final"
+
+    with pytest.raises(ValidationError):
+        PlanUpdate.model_validate_json('{"raw_data": {}, "status": null}')
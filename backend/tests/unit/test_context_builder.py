@@ -20,4 +20,26 @@ def test_prepare_patient_facts_basic():
     assert result["基本情報"]["氏名"] == "テスト太郎"
     assert result["基本情報"]["年齢"] == "82歳"
     assert result["心身機能・構造"]["疼痛"] == "右膝に痛みあり"
-    assert result["ADL評価"]["FIM(現在値)"]["Eating"] == "7点"
\ No newline at end of file
+    assert result["ADL評価"]["FIM(現在値)"]["Eating"] == "7点"
+
+def test_prepare_patient_facts_routing():
+    """カテゴリ・ペア項目・ADLスコアが振り分け表どおりに格納されること"""
+    input_data = {
+        "name": "テスト太郎",
+        "func_basic_rolling_chk": True,
+        "func_rom_limitation_chk": "on",
+        "func_rom_limitation_txt": "特記なし",
+        "func_muscle_weakness_txt": "チェックなしの詳細",
+        "adl_toileting_bi_current_val": 10,
+        "adl_custom_item_fim_current_val": 0,
+        "adl_eating_fim_start_val": 3,
+        "unknown_key": "無視される",
+    }
+
+    result = prepare_patient_facts(input_data)
+
+    assert result["基本動作"] == {"寝返り(評価)": "あり"}
+    assert result["心身機能・構造"]["関節可動域制限"] == "あり（詳細は不明）"
+    assert "筋力低下" not in result["心身機能・構造"]
+    assert result["ADL評価"] == {"FIM(現在値)": {"Custom Item": "0点"}, "BI(現在値)": {"Toileting": "10点"}}
+    assert result["担当者からの所見"] == "特になし"
\ No newline at end of file
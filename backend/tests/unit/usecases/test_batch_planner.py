@@ -0,0 +1,86 @@
+from dataclasses import replace
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.schemas.schemas import BatchGenerateItem
+from app.usecases.plan_generation import PlanGenerationUseCase
+from app.usecases.utils.batch_planner import plan_batch_waves
+
+
+def _item(key, *deps):
+    return BatchGenerateItem(target_key=key, prompt=f"{key}を生成", depends_on=list(deps))
+
+
+def _keys(waves):
+    return [[[item.target_key for item in chunk] for chunk in wave] for wave in waves]
+
+
+def test_waves_follow_dependencies_and_chunk_size():
+    """依存関係順にウェーブへ分割され、各ウェーブがチャンクサイズ以下に分割されること"""
+    items = [
+        _item("policy", "goal_1m", "goal_discharge"),
+        _item("goal_1m"),
+        _item("goal_discharge"),
+        _item("risk"),
+        _item("action", "policy", "outside_key"),
+    ]
+
+    waves = plan_batch_waves(items, max_chunk_size=2)
+
+    assert _keys(waves) == [
+        [["goal_1m", "goal_discharge"], ["risk"]],
+        [["policy"]],
+        [["action"]],
+    ]
+
+
+def test_circular_dependency_is_rejected():
+    """循環依存は ValueError になること"""
+    with pytest.raises(ValueError, match="Circular"):
+        plan_batch_waves([_item("a", "b"), _item("b", "a")])
+
+
+@pytest.mark.asyncio
+async def test_execute_batch_passes_earlier_waves_as_context():
+    """前のウェーブの生成結果が後続ウェーブのプロンプトに文脈として含まれること"""
+    async def fake_generate_json(prompt, schema):
+        return {key: f"{key}の生成結果" for key in schema.model_fields}
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(side_effect=fake_generate_json)
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client):
+        usecase = PlanGenerationUseCase(AsyncMock())
+        result = await usecase.execute_batch(
+            patient_data={"age": 80},
+            items=[_item("policy", "goal_1m"), _item("goal_1m")],
+            current_plan={"risk": "既存のリスク"},
+        )
+
+    assert result == {"goal_1m": "goal_1mの生成結果", "policy": "policyの生成結果"}
+    first_prompt = mock_llm_client.generate_json.await_args_list[0].args[0]
+    second_prompt = mock_llm_client.generate_json.await_args_list[1].args[0]
+    assert "既存のリスク" in first_prompt
+    assert "goal_1mの生成結果" in second_prompt
+
+
+@pytest.mark.asyncio
+async def test_execute_batch_chunks_by_model_capability():
+    """1チャンクの項目数がモデルの max_schema_fields を超えないこと"""
+    async def fake_generate_json(prompt, schema):
+        return {key: f"{key}の生成結果" for key in schema.model_fields}
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(side_effect=fake_generate_json)
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client):
+        usecase = PlanGenerationUseCase(AsyncMock())
+        usecase.capability = replace(usecase.capability, max_schema_fields=2)
+        result = await usecase.execute_batch(
+            patient_data={"age": 80}, items=[_item("a"), _item("b"), _item("c")]
+        )
+
+    assert set(result) == {"a", "b", "c"}
+    field_counts = [len(call.args[1].model_fields) for call in mock_llm_client.generate_json.await_args_list]
+    assert sorted(field_counts) == [1, 2]
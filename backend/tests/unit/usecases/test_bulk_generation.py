@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.schemas.schemas import PlanCreate
+from app.usecases.bulk_generation import BulkPlanGenerationUseCase
+
+
+def _minimal_state(name="テスト"):
+    return {
+        "basic": {"name": name, "age": 80, "gender": "男"},
+        "medical": {}, "function": {}, "basic_movement": {}, "adl": {},
+        "nutrition": {}, "social": {}, "goals": {}, "signature": {},
+    }
+
+
+@pytest.mark.asyncio
+async def test_bulk_generation_streams_progress_and_bulk_inserts():
+    """
+    正常系 + 一部失敗:
+    latest_state がある患者のみ生成され、保存は1回のバルクINSERTで行われること
+    """
+    mock_patient_repo = AsyncMock()
+    mock_patient_repo.get_latest_states.return_value = {
+        "p1": _minimal_state(),
+        "p2": _minimal_state(),
+    }
+
+    created = []
+    for i, hid in enumerate(["p1", "p2"], start=1):
+        plan = MagicMock()
+        plan.hash_id = hid
+        plan.plan_id = i
+        created.append(plan)
+    mock_plan_repo = AsyncMock()
+    mock_plan_repo.bulk_create.return_value = created
+
+    mock_generator = MagicMock()
+    mock_generator.generate_plan_create = AsyncMock(
+        side_effect=lambda hash_id, **_: PlanCreate(hash_id=hash_id, raw_data={"goals_1_month_txt": "歩行自立"})
+    )
+
+    with patch("app.usecases.bulk_generation.PatientRepository", return_value=mock_patient_repo), \
+         patch("app.usecases.bulk_generation.PlanRepository", return_value=mock_plan_repo), \
+         patch("app.usecases.bulk_generation.PlanGenerationUseCase", return_value=mock_generator):
+
+        usecase = BulkPlanGenerationUseCase(AsyncMock())
+        events = [e async for e in usecase.run(["p1", "p2", "p_missing", "p1"], max_concurrency=2)]
+
+    assert events[0] == {"event": "start", "total": 3, "max_concurrency": 2}
+
+    progress = [e for e in events if e["event"] == "progress"]
+    assert len(progress) == 3
+    assert {e["hash_id"]: e["status"] for e in progress} == {
+        "p1": "succeeded", "p2": "succeeded", "p_missing": "failed"
+    }
+
+    summary = events[-1]
+    assert summary["event"] == "summary"
+    assert summary["succeeded"] == 2
+    assert summary["failed"] == 1
+    assert summary["plan_ids"] == {"p1": 1, "p2": 2}
+    assert summary["failures"] == [{"hash_id": "p_missing", "error": "latest_state not found"}]
+    assert summary["throughput_per_min"] > 0
+
+    # 保存は1回のバルクINSERTのみ
+    mock_plan_repo.bulk_create.assert_awaited_once()
+    saved = mock_plan_repo.bulk_create.call_args.args[0]
+    assert [p.hash_id for p in saved] == ["p1", "p2"]
+    assert mock_generator.generate_plan_create.await_count == 2
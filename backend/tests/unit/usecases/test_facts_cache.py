@@ -0,0 +1,64 @@
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.usecases.utils.context_builder import prepare_patient_facts_from_schema
+from app.usecases.utils.facts_cache import FactsCache, facts_content_hash
+
+
+def _patient(age=80):
+    return PatientExtractionSchema.model_validate({
+        "basic": {"name": "hash_fc", "age": age, "gender": "男"},
+        "medical": {}, "function": {}, "basic_movement": {}, "adl": {},
+        "nutrition": {}, "social": {}, "goals": {}, "signature": {},
+    })
+
+
+def test_content_hash_is_stable_and_sensitive_to_changes():
+    """同じ内容なら別インスタンス・キー順でも同じハッシュになり、値や申し送りが変われば変わること"""
+    assert facts_content_hash(_patient()) == facts_content_hash(_patient())
+    assert facts_content_hash({"a": 1, "b": 2}) == facts_content_hash({"b": 2, "a": 1})
+    assert len(facts_content_hash(_patient())) == 64
+
+    assert facts_content_hash(_patient(age=81)) != facts_content_hash(_patient())
+    assert facts_content_hash(_patient(), "自宅は2階建て") != facts_content_hash(_patient())
+
+
+def test_prepare_reuses_facts_for_same_content():
+    """同じ内容の患者データでは、構築済みの事実情報がそのまま返されること"""
+    cache = FactsCache()
+    first = cache.prepare(_patient(), "申し送り")
+    second = cache.prepare(_patient(), "申し送り")
+
+    assert second is first
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+    assert first.facts == prepare_patient_facts_from_schema(_patient(), "申し送り")
+    assert first.snapshot["age"] == "80"
+
+    # シリアライズ形式が違えば別エントリ、辞書入力はそのまま事実情報として扱う
+    assert cache.prepare(_patient(), "申し送り", fmt="kv").facts_str != first.facts_str
+    raw = cache.prepare({"basic": {"age": 80}})
+    assert raw.facts == {"basic": {"age": 80}} and raw.snapshot is None
+
+
+def test_prepare_copies_raw_dict():
+    """辞書入力は複製して保持し、呼び出し元が後から変更してもキャッシュ済みの事実情報は変わらないこと"""
+    cache = FactsCache()
+    patient_data = {"basic": {"age": 80}}
+    prepared = cache.prepare(patient_data)
+
+    patient_data["basic"]["age"] = 90
+    assert prepared.facts == {"basic": {"age": 80}}
+    assert cache.prepare({"basic": {"age": 80}}).facts == {"basic": {"age": 80}}
+
+
+def test_prepare_evicts_least_recently_used():
+    """上限を超えると、最も古く使われたものから破棄されること"""
+    cache = FactsCache(max_entries=2)
+    cache.prepare(_patient(age=70))
+    cache.prepare(_patient(age=71))
+    cache.prepare(_patient(age=70))  # 70 を最近使ったものにする
+    cache.prepare(_patient(age=72))  # 71 が破棄される
+
+    assert cache.stats()["entries"] == 2
+    cache.prepare(_patient(age=70))
+    assert cache.hits == 2
+    cache.prepare(_patient(age=71))
+    assert cache.misses == 4
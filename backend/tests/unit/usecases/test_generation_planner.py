@@ -0,0 +1,85 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.adapters.llm.capabilities import DEFAULT_CAPABILITY, get_model_capability
+from app.schemas.legacy_schemas import GENERATION_GROUPS, RehabPlanSchema
+from app.usecases.plan_generation import PlanGenerationUseCase
+from app.usecases.utils.generation_planner import plan_generation_stages, thinking_budget_for
+
+
+def _fields(stages):
+    return [[list(schema.model_fields) for schema in stage] for stage in stages]
+
+
+def test_capability_lookup_uses_longest_prefix(monkeypatch):
+    """モデル名の最長一致でプロファイルが選ばれ、未知のモデルは既定値になること"""
+    monkeypatch.delenv("LLM_MAX_SCHEMA_FIELDS", raising=False)
+    assert get_model_capability("qwen3:0.6b").max_schema_fields == 1
+    assert get_model_capability("qwen3:14b") == get_model_capability("qwen3")
+    assert get_model_capability("gemini-2.5-flash-lite").merge_groups is True
+    assert get_model_capability("unknown-model") == DEFAULT_CAPABILITY
+    assert get_model_capability(None) == DEFAULT_CAPABILITY
+
+    monkeypatch.setenv("LLM_MAX_SCHEMA_FIELDS", "5")
+    assert get_model_capability("qwen3:0.6b").max_schema_fields == 5
+
+
+def test_default_capability_keeps_original_groups():
+    """既定値では従来どおり GENERATION_GROUPS を1グループ1呼び出しで生成すること"""
+    stages = plan_generation_stages(GENERATION_GROUPS, DEFAULT_CAPABILITY)
+    assert [stage for stage in stages] == [[group] for group in GENERATION_GROUPS]
+
+
+def test_small_model_generates_per_field_in_parallel():
+    """小さなモデルでは各グループが1項目ずつの並列呼び出しに分割されること"""
+    stages = plan_generation_stages(GENERATION_GROUPS, get_model_capability("qwen3:0.6b"))
+
+    assert len(stages) == len(GENERATION_GROUPS)
+    for stage, group in zip(stages, GENERATION_GROUPS):
+        assert _fields([stage]) == [[[field] for field in group.model_fields]]
+        # 元の Field 定義（description）が引き継がれていること
+        first = stage[0]
+        field = next(iter(first.model_fields))
+        assert first.model_fields[field].description == group.model_fields[field].description
+
+
+def test_large_model_merges_all_groups():
+    """大きなクラウドモデルでは全項目が1回の呼び出しにまとめられること"""
+    stages = plan_generation_stages(GENERATION_GROUPS, get_model_capability("gemini-2.5-flash"))
+    assert len(stages) == 1 and len(stages[0]) == 1
+    assert set(stages[0][0].model_fields) == set(RehabPlanSchema.model_fields)
+
+
+@pytest.mark.asyncio
+async def test_generation_follows_model_capability(monkeypatch):
+    """クライアントのモデル名に応じて、LLM呼び出し回数が変わること"""
+    monkeypatch.delenv("LLM_MAX_SCHEMA_FIELDS", raising=False)
+
+    async def fake_generate_json(prompt, schema):
+        return {key: "生成" for key in schema.model_fields}
+
+    mock_llm_client = MagicMock(model_name="qwen3:1.7b")
+    mock_llm_client.generate_json = AsyncMock(side_effect=fake_generate_json)
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client):
+        usecase = PlanGenerationUseCase(AsyncMock())
+        plan = await usecase._generate_groups("{}")
+
+    # 14項目 -> 5呼び出し, 2項目 -> 1呼び出し, 8項目 -> 3呼び出し
+    assert mock_llm_client.generate_json.await_count == 9
+    assert set(plan) == set(RehabPlanSchema.model_fields)
+
+
+def test_thinking_budget_follows_original_groups(monkeypatch):
+    """分割・統合後のスキーマでも、元の生成グループの思考予算が適用されること"""
+    monkeypatch.delenv("LLM_THINKING_BUDGETS", raising=False)
+    current, goals, plan = GENERATION_GROUPS
+    assert thinking_budget_for(current) == 0
+    assert thinking_budget_for(goals) == 1024
+
+    merged = plan_generation_stages(GENERATION_GROUPS, get_model_capability("gemini-2.5-flash"))[0][0]
+    assert thinking_budget_for(merged) == 1024
+
+    monkeypatch.setenv("LLM_THINKING_BUDGETS", "Goals=256,ComprehensiveTreatmentPlan=-1")
+    assert thinking_budget_for(goals) == 256
+    assert thinking_budget_for(plan) is None
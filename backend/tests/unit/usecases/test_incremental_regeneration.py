@@ -0,0 +1,145 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.usecases.plan_generation import PlanGenerationUseCase
+from app.usecases.utils.dependency_map import FIELD_FACT_DEPENDENCIES, GENERATED_FIELDS, affected_fields
+from app.usecases.utils.fact_snapshot import build_fact_snapshot, diff_fact_snapshots
+
+
+def _patient(**sections):
+    base = {
+        "basic": {"name": "テスト太郎", "age": 80, "gender": "男"},
+        "medical": {}, "function": {}, "basic_movement": {}, "adl": {},
+        "nutrition": {}, "social": {}, "goals": {}, "signature": {},
+    }
+    base.update(sections)
+    return PatientExtractionSchema.model_validate(base)
+
+
+def test_dependency_map_covers_all_generated_fields():
+    """全ての生成項目に依存関係が定義されていること"""
+    assert set(FIELD_FACT_DEPENDENCIES) == set(GENERATED_FIELDS)
+
+
+def test_snapshot_diff_detects_changes():
+    """値の変更・追加・削除（Falseへの変更）が差分として検出されること"""
+    old = build_fact_snapshot({"func_pain_chk": True, "age": 80, "gender": None})
+    new = build_fact_snapshot({"func_pain_chk": False, "age": 81, "gender": "男"})
+
+    assert diff_fact_snapshots(old, new) == {"func_pain_chk", "age", "gender"}
+    assert diff_fact_snapshots(old, old) == set()
+
+
+def test_affected_fields_for_pain_change():
+    """疼痛の変更は疼痛の記述と訓練内容にのみ影響すること"""
+    assert affected_fields({"func_pain_chk"}) == ["func_pain_txt", "policy_content_txt"]
+
+
+@pytest.mark.asyncio
+async def test_incremental_regenerates_only_stale_fields():
+    """
+    FIMの点数だけを変えた場合、ADLに依存する項目のみが1回のLLM呼び出しで再生成されること
+    """
+    old_data = _patient(adl={"eating": {"fim_current": 3}})
+    new_data = _patient(adl={"eating": {"fim_current": 6}})
+    current_plan = {field: "旧" for field in GENERATED_FIELDS}
+
+    expected_stale = affected_fields({"adl_eating_fim_current_val"})
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(
+        return_value={field: "新" for field in expected_stale}
+    )
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client):
+        usecase = PlanGenerationUseCase(AsyncMock())
+        result = await usecase.execute_incremental(
+            hash_id="hash_sim", old_patient_data=old_data,
+            new_patient_data=new_data, current_plan=current_plan
+        )
+
+    assert result["changed_fact_keys"] == ["adl_eating_fim_current_val"]
+    assert result["stale_fields"] == expected_stale
+    assert "func_pain_txt" not in result["stale_fields"]
+    assert mock_llm_client.generate_json.await_count == 1
+
+    # 動的スキーマには古くなった項目のみが含まれる
+    schema = mock_llm_client.generate_json.call_args.args[1]
+    assert list(schema.model_fields) == expected_stale
+
+    assert result["plan"]["func_pain_txt"] == "旧"
+    assert all(result["plan"][field] == "新" for field in expected_stale)
+
+
+@pytest.mark.asyncio
+async def test_incremental_no_change_skips_llm():
+    """事実情報が変わらない場合はLLMを呼び出さないこと"""
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock()
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client):
+        usecase = PlanGenerationUseCase(AsyncMock())
+        result = await usecase.execute_incremental(
+            hash_id="hash_sim", old_patient_data=_patient(),
+            new_patient_data=_patient(), current_plan={"func_pain_txt": "旧"}
+        )
+
+    assert result["stale_fields"] == []
+    assert result["plan"] == {"func_pain_txt": "旧"}
+    mock_llm_client.generate_json.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_delta_reuses_unchanged_fields_from_previous_plan():
+    """
+    前回の計画書のスナップショットと比較し、変化した入力に依存する項目だけを修正して保存すること
+    """
+    old_data = _patient(adl={"eating": {"fim_current": 3}})
+    new_data = _patient(adl={"eating": {"fim_current": 6}})
+    old_snapshot = build_fact_snapshot(PlanGenerationUseCase._export_flat("hash_delta", old_data))
+
+    previous_plan = MagicMock(
+        plan_id=1,
+        raw_data={field: "前回" for field in GENERATED_FIELDS},
+        facts_snapshot=old_snapshot,
+    )
+    expected_stale = affected_fields({"adl_eating_fim_current_val"})
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(return_value={field: "修正" for field in expected_stale})
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client), \
+         patch("app.usecases.plan_generation.PlanRepository") as MockRepo:
+        repo = MockRepo.return_value
+        repo.get_latest = AsyncMock(return_value=previous_plan)
+        repo.create = AsyncMock(side_effect=lambda plan_in: MagicMock(plan_id=2, plan_in=plan_in))
+
+        usecase = PlanGenerationUseCase(AsyncMock())
+        created = await usecase.execute_delta(hash_id="hash_delta", patient_data=new_data)
+
+    # 修正対象だけを含む1回のLLM呼び出しで、前回の記載が修正指示として渡されること
+    assert mock_llm_client.generate_json.await_count == 1
+    prompt, schema = mock_llm_client.generate_json.await_args.args
+    assert set(schema.model_fields) == set(expected_stale)
+    assert "前回の計画書の記載" in prompt
+
+    saved = created.plan_in
+    for field in GENERATED_FIELDS:
+        assert saved.raw_data[field] == ("修正" if field in expected_stale else "前回")
+    assert saved.facts_snapshot["adl_eating_fim_current_val"] == "6"
+
+
+@pytest.mark.asyncio
+async def test_delta_falls_back_to_full_generation_without_snapshot():
+    """前回の計画書がない場合は全項目生成にフォールバックすること"""
+    with patch("app.usecases.plan_generation.get_llm_client"), \
+         patch("app.usecases.plan_generation.PlanRepository") as MockRepo:
+        MockRepo.return_value.get_latest = AsyncMock(return_value=None)
+        usecase = PlanGenerationUseCase(AsyncMock())
+        usecase.execute = AsyncMock(return_value="full")
+
+        result = await usecase.execute_delta(hash_id="hash_new", patient_data=_patient())
+
+    assert result == "full"
+    usecase.execute.assert_awaited_once()
@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.usecases.plan_generation import PlanGenerationUseCase
+from app.usecases.utils.dependency_map import GENERATED_FIELDS
+from app.usecases.utils.token_counter import estimate_tokens
+
+
+def test_estimate_tokens_counts_japanese_per_char():
+    """日本語は1文字1トークン、英数字は4文字1トークンで概算されること"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("疼痛あり") == 4
+    assert estimate_tokens("abcdefgh") == 2
+
+
+@pytest.mark.asyncio
+async def test_item_regeneration_uses_minimal_context():
+    """
+    対象項目に関係する事実情報・関連項目だけがプロンプトに含まれ、
+    従来の全データ埋め込みよりもプロンプトが小さくなること
+    """
+    patient_data = PatientExtractionSchema.model_validate({
+        "basic": {"name": "テスト太郎", "age": 80, "gender": "男"},
+        "medical": {}, "function": {}, "basic_movement": {},
+        "adl": {"eating": {"fim_current": 5}},
+        "nutrition": {}, "social": {}, "goals": {}, "signature": {},
+    })
+    current_plan = {field: f"{field}の内容" for field in GENERATED_FIELDS}
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_text = AsyncMock(return_value=" 書き直した疼痛の記載 \n")
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client):
+        usecase = PlanGenerationUseCase(AsyncMock())
+        result = await usecase.execute_item_regeneration(
+            patient_data=patient_data,
+            target_key="func_pain_txt",
+            current_text="疼痛なし",
+            instruction="簡潔に",
+            current_plan=current_plan,
+            rag_context="疼痛評価にはNRSを用いる",
+            benchmark=True,
+        )
+
+    assert result["result"] == "書き直した疼痛の記載"
+    prompt = mock_llm_client.generate_text.await_args.args[0]
+    assert "疼痛なし" in prompt and "簡潔に" in prompt and "NRS" in prompt
+    # 依存しない事実情報・計画書項目、実名は含まれない
+    assert "テスト太郎" not in prompt
+    assert "Eating" not in prompt
+    assert "goals_1_month_txtの内容" not in prompt
+
+    metrics = result["metrics"]
+    assert metrics["prompt_tokens"] < metrics["baseline_prompt_tokens"]
+    assert 0 < metrics["reduction_ratio"] < 1
+
+
+@pytest.mark.asyncio
+async def test_item_regeneration_skips_baseline_without_benchmark():
+    """benchmark でない場合は、比較用の従来のプロンプトを組み立てないこと"""
+    patient_data = PatientExtractionSchema.model_validate({
+        "basic": {}, "medical": {}, "function": {}, "basic_movement": {},
+        "adl": {}, "nutrition": {}, "social": {}, "goals": {}, "signature": {},
+    })
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_text = AsyncMock(return_value="書き直した文章")
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client):
+        usecase = PlanGenerationUseCase(AsyncMock())
+        with patch.object(usecase, "_build_custom_prompt") as build_custom_prompt:
+            result = await usecase.execute_item_regeneration(
+                patient_data=patient_data, target_key="func_pain_txt", current_text="", instruction="簡潔に",
+            )
+
+    build_custom_prompt.assert_not_called()
+    assert list(result["metrics"]) == ["prompt_tokens"]
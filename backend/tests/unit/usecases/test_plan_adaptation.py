@@ -0,0 +1,111 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.usecases.plan_adaptation import PlanAdaptationUseCase, build_edit_schema, parse_plan_text
+from app.usecases.utils.dependency_map import GENERATED_FIELDS
+
+
+def _record(social_vector=(0.1, 0.2)):
+    return MagicMock(diagnosis_code="I63", age=80, total_fim_admission=60,
+                     social_vector=list(social_vector) if social_vector else None)
+
+
+def _patient():
+    return PatientExtractionSchema.model_validate({
+        "basic": {"name": "テスト太郎", "age": 80, "gender": "男"},
+        "medical": {}, "function": {}, "basic_movement": {},
+        "adl": {"eating": {"fim_current": 5}},
+        "nutrition": {}, "social": {}, "goals": {}, "signature": {},
+    })
+
+
+def test_parse_plan_text_sections():
+    """自由記述の過去計画書から、見出しに対応する項目が取り出されること"""
+    text = "【長期目標】自宅での生活が可能となる。\n【短期目標】杖歩行が見守りで可能となる。\n【備考】なし"
+    assert parse_plan_text(text) == {
+        "goals_at_discharge_txt": "自宅での生活が可能となる。",
+        "goals_1_month_txt": "杖歩行が見守りで可能となる。",
+    }
+    assert parse_plan_text(None) == {}
+
+
+def test_edit_schema_makes_reference_fields_optional():
+    """下書きにある項目は任意、ない項目は必須になること"""
+    schema = build_edit_schema(["goals_1_month_txt"])
+    assert schema.model_fields["goals_1_month_txt"].is_required() is False
+    assert schema.model_fields["func_pain_txt"].is_required() is True
+
+
+@pytest.mark.asyncio
+async def test_adaptation_keeps_reference_and_applies_edits():
+    """類似患者の計画書を下書きに、LLMが返した項目だけが置き換えられて保存されること"""
+    reference_raw = {field: f"参考:{field}" for field in GENERATED_FIELDS}
+    neighbour = MagicMock(hash_id="neighbour_1", plan_text=None)
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(
+        return_value={"goals_1_month_txt": "食事が見守りで可能となる。", "func_pain_txt": None}
+    )
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client), \
+         patch("app.usecases.plan_generation.PlanRepository") as MockGenRepo, \
+         patch("app.usecases.plan_adaptation.PlanRepository") as MockPlanRepo, \
+         patch("app.usecases.plan_adaptation.PatientRepository") as MockPatientRepo:
+        MockPatientRepo.return_value.get = AsyncMock(return_value=_record())
+        MockPatientRepo.return_value.search_similar_patients = AsyncMock(return_value=[neighbour])
+        MockPlanRepo.return_value.get_latest = AsyncMock(return_value=MagicMock(raw_data=reference_raw))
+        MockGenRepo.return_value.create = AsyncMock(side_effect=lambda plan_in: MagicMock(plan_in=plan_in))
+
+        usecase = PlanAdaptationUseCase(AsyncMock())
+        result = await usecase.execute("hash_target", _patient())
+
+    search = MockPatientRepo.return_value.search_similar_patients
+    assert search.await_args.args[1]["diagnosis_code"] == "I63"
+    search_kwargs = search.await_args.kwargs
+    assert search_kwargs["exclude_hash_id"] == "hash_target"
+    assert search_kwargs["with_plan_only"] is True
+
+    prompt = mock_llm_client.generate_json.await_args.args[0]
+    assert "参考:main_risks_txt" in prompt
+    assert "テスト太郎" not in prompt
+
+    assert result["mode"] == "adapt"
+    assert result["reference_hash_id"] == "neighbour_1"
+    assert result["edited_fields"] == ["goals_1_month_txt"]
+    saved = result["plan"].plan_in.raw_data
+    assert saved["goals_1_month_txt"] == "食事が見守りで可能となる。"
+    assert saved["func_pain_txt"] == "参考:func_pain_txt"
+    assert result["metrics"]["adapt_output_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_adaptation_falls_back_without_reference():
+    """条件に合う類似患者が見つからない場合は、フィルタを外さずに通常の全項目生成を行うこと"""
+    with patch("app.usecases.plan_generation.get_llm_client"), \
+         patch("app.usecases.plan_adaptation.PatientRepository") as MockPatientRepo:
+        MockPatientRepo.return_value.get = AsyncMock(return_value=_record())
+        MockPatientRepo.return_value.search_similar_patients = AsyncMock(return_value=[])
+
+        usecase = PlanAdaptationUseCase(AsyncMock())
+        usecase.generator.execute = AsyncMock(return_value="full_plan")
+        result = await usecase.execute("hash_target", _patient())
+
+    assert result["mode"] == "full"
+    assert result["plan"] == "full_plan"
+    MockPatientRepo.return_value.search_similar_patients.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_find_reference_plan_without_vector():
+    """社会背景ベクトルがない場合は検索せず、下書きなしを返すこと"""
+    with patch("app.usecases.plan_generation.get_llm_client"), \
+         patch("app.usecases.plan_adaptation.PatientRepository") as MockPatientRepo:
+        MockPatientRepo.return_value.search_similar_patients = AsyncMock(return_value=[MagicMock()])
+        usecase = PlanAdaptationUseCase(AsyncMock())
+
+        for record in (None, _record(social_vector=None)):
+            MockPatientRepo.return_value.get = AsyncMock(return_value=record)
+            assert await usecase.find_reference_plan("hash_target", _patient()) == (None, {})
+
+    MockPatientRepo.return_value.search_similar_patients.assert_not_awaited()
@@ -116,4 +116,28 @@ async def test_plan_generation_error_handling():
         with pytest.raises(RuntimeError) as excinfo:
             await usecase.execute("hash_err", patient_data)
         
-        assert "Failed to generate plan part" in str(excinfo.value)
\ No newline at end of file
+        assert "Failed to generate plan part" in str(excinfo.value)
+
+@pytest.mark.asyncio
+async def test_partial_json_requests_only_missing_fields():
+    """
+    JSONが途中で切れた場合:
+    取り出せた項目は残し、不足した項目だけを追加で生成するか
+    """
+    from app.adapters.llm.json_repair import PartialJSONError
+    from app.schemas.legacy_schemas import Goals
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(side_effect=[
+        PartialJSONError({"goals_1_month_txt": "歩行自立"}, ["goals_at_discharge_txt"]),
+        {"goals_at_discharge_txt": "自宅退院"},
+    ])
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client):
+        usecase = PlanGenerationUseCase(AsyncMock())
+        result = await usecase._generate_json("prompt", Goals)
+
+    assert result == {"goals_1_month_txt": "歩行自立", "goals_at_discharge_txt": "自宅退院"}
+    follow_up_prompt, follow_up_schema = mock_llm_client.generate_json.await_args.args
+    assert list(follow_up_schema.model_fields) == ["goals_at_discharge_txt"]
+    assert "goals_at_discharge_txt" in follow_up_prompt
\ No newline at end of file
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.adapters.llm.scheduler import LLMScheduler, Priority
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.usecases.plan_generation import PlanGenerationUseCase
+from app.usecases.prefetch import DraftPrefetcher
+from app.usecases.utils.draft_cache import DraftCache
+
+LATEST_STATE = {
+    "basic": {"name": "テスト太郎", "age": 80, "gender": "男"},
+    "medical": {}, "function": {}, "basic_movement": {}, "adl": {},
+    "nutrition": {}, "social": {}, "goals": {}, "signature": {},
+}
+
+
+def _prefetcher(cache, scheduler, enabled=True):
+    prefetcher = DraftPrefetcher(cache, scheduler, enabled=enabled, poll_interval=0.01)
+    prefetcher._load_patient_data = AsyncMock(
+        side_effect=lambda hash_id: PatientExtractionSchema.model_validate(LATEST_STATE)
+    )
+    return prefetcher
+
+
+def test_draft_cache_expires_and_pops_once():
+    """ドラフトは1回だけ取り出せ、有効期限切れのものは返されないこと"""
+    cache = DraftCache(ttl_sec=60)
+    cache.put("h1", "k", {"a": 1})
+    assert cache.pop("h1", "other") is None
+    assert cache.pop("h1", "k") == {"a": 1}
+    assert cache.pop("h1", "k") is None
+
+    expired = DraftCache(ttl_sec=-1)
+    expired.put("h1", "k", {"a": 1})
+    assert expired.pop("h1", "k") is None
+
+
+def test_schedule_is_skipped_when_disabled_or_busy():
+    """無効時やスケジューラ混雑時は先読みを開始しないこと"""
+    scheduler = LLMScheduler(max_concurrency=1)
+    assert _prefetcher(DraftCache(), scheduler, enabled=False).schedule("h1") is False
+
+    scheduler._active = 1
+    assert _prefetcher(DraftCache(), scheduler).schedule("h1") is False
+
+
+@pytest.mark.asyncio
+async def test_generate_reuses_prefetched_draft():
+    """先読み中・先読み済みのドラフトが、同じ事実情報の生成要求でそのまま返されること"""
+    cache = DraftCache()
+    scheduler = LLMScheduler(max_concurrency=2)
+
+    async def slow_generate_json(prompt, schema):
+        await asyncio.sleep(0.01)
+        return {key: "先読み" for key in schema.model_fields}
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(side_effect=slow_generate_json)
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client), \
+         patch("app.usecases.plan_generation.get_llm_scheduler", return_value=scheduler), \
+         patch("app.usecases.plan_generation.get_draft_cache", return_value=cache):
+        prefetcher = _prefetcher(cache, scheduler)
+        assert prefetcher.schedule("hash_pf") is True
+        await asyncio.sleep(0)
+
+        # 先読みの完了を待って結果を受け取る（LLMの追加呼び出しなし）
+        usecase = PlanGenerationUseCase(AsyncMock())
+        plan_in = await usecase.generate_plan_create(
+            "hash_pf", PatientExtractionSchema.model_validate(LATEST_STATE)
+        )
+        calls_after_prefetch = mock_llm_client.generate_json.await_count
+
+        # 先読み結果は1回だけ使われ、次の要求は通常どおり生成される
+        await usecase.generate_plan_create("hash_pf", PatientExtractionSchema.model_validate(LATEST_STATE))
+
+    assert calls_after_prefetch == 3
+    assert mock_llm_client.generate_json.await_count == 6
+    assert set(plan_in.raw_data.values()) == {"先読み"}
+
+
+@pytest.mark.asyncio
+async def test_prefetch_is_preempted_by_interactive_requests():
+    """優先度の高い要求が待機し始めたら、先読みが中断されること"""
+    cache = DraftCache()
+    scheduler = LLMScheduler(max_concurrency=1)
+    started = asyncio.Event()
+
+    async def blocking_generate_json(prompt, schema):
+        started.set()
+        await asyncio.sleep(10)
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(side_effect=blocking_generate_json)
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client), \
+         patch("app.usecases.plan_generation.get_llm_scheduler", return_value=scheduler):
+        prefetcher = _prefetcher(cache, scheduler)
+        prefetcher.schedule("hash_pf")
+        task = prefetcher._tasks["hash_pf"]
+        await asyncio.wait_for(started.wait(), timeout=1)
+
+        # 画面からの生成がスロット待ちになる
+        async def interactive():
+            async with scheduler.slot(Priority.INTERACTIVE):
+                return "done"
+
+        assert await asyncio.wait_for(interactive(), timeout=1) == "done"
+        await asyncio.wait_for(task, timeout=1)
+
+    assert cache.pop("hash_pf", "any") is None
+    assert scheduler.snapshot()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_running_prefetch():
+    """患者を閉じると実行中の先読みが中断されること"""
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def blocking_generate_json(prompt, schema):
+        await asyncio.sleep(10)
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(side_effect=blocking_generate_json)
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client), \
+         patch("app.usecases.plan_generation.get_llm_scheduler", return_value=scheduler):
+        prefetcher = _prefetcher(DraftCache(), scheduler)
+        prefetcher.schedule("hash_pf")
+        task = prefetcher._tasks["hash_pf"]
+        await asyncio.sleep(0.02)
+
+        assert prefetcher.cancel("hash_pf") is True
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert scheduler.snapshot()["active"] == 0
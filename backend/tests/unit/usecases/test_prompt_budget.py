@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.schemas.legacy_schemas import Goals
+from app.usecases.utils import prompt_budget
+from app.usecases.utils.prompt_budget import fit_group_prompt
+from app.usecases.utils.serializers import serialize_context
+from app.usecases.utils.token_counter import TokenCalibrator, estimate_tokens
+
+FACTS = {
+    "基本情報": {"氏名": "hash_pb", "年齢": "80歳"},
+    "心身機能・構造": {"疼痛": "右膝に痛みあり" * 20},
+    "社会保障サービス": {"介護保険": "要介護2" * 20},
+    "栄養状態": {"BMI": "18.5" * 40},
+    "担当者からの所見": "自宅は2階建て。",
+}
+PLAN = {
+    "main_risks_txt": "転倒に注意する。" * 40,
+    "goals_at_discharge_txt": "自宅で歩いて生活できる。" * 40,
+}
+
+
+def test_calibrator_learns_ratio_and_ignores_outliers():
+    """実際のトークン数との比を学習し、範囲外の観測は無視すること"""
+    calibrator = TokenCalibrator(alpha=0.5)
+    text = "計画書" * 10
+    assert calibrator.estimate(text, "m") == estimate_tokens(text)
+
+    calibrator.observe("m", text, estimate_tokens(text) * 2)
+    assert calibrator.ratio("m") == 2.0
+    calibrator.observe("m", text, estimate_tokens(text) * 100)  # 外れ値
+    calibrator.observe("m", text, None)
+    assert calibrator.ratio("m") == 2.0
+    assert calibrator.estimate(text, "m") == estimate_tokens(text) * 2
+    assert calibrator.snapshot() == {"m": {"ratio": 2.0, "samples": 1}}
+
+
+def test_prompt_fits_without_trimming_in_large_window():
+    """コンテキスト長に余裕があれば何も削らず、セクションごとの内訳を報告すること"""
+    client = SimpleNamespace(model_name="gemini-2.5-flash", num_ctx=None)
+    prompt, report = fit_group_prompt(Goals, serialize_context(FACTS), PLAN, client, facts=FACTS)
+
+    assert report.trimmed == {} and not report.over_budget
+    assert report.context_window == 1_048_576
+    assert set(report.sections) == {"facts", "plan", "schema", "instructions"}
+    assert "社会保障サービス" in prompt and "main_risks_txt" in prompt
+
+
+def test_lowest_priority_sections_are_trimmed_first():
+    """予算を超える場合は優先度の低い文脈・事実情報から削り、基本情報は残すこと"""
+    _, full = fit_group_prompt(
+        Goals, serialize_context(FACTS), PLAN, SimpleNamespace(model_name="x", num_ctx=1_000_000), facts=FACTS
+    )
+    # 出力分を差し引いた予算が、全体より少しだけ小さくなるコンテキスト長
+    window = int((full.prompt_tokens - 50 + full.reserved_output) / 0.95) + 1
+    prompt, report = fit_group_prompt(
+        Goals, serialize_context(FACTS), PLAN, SimpleNamespace(model_name="x", num_ctx=window), facts=FACTS
+    )
+
+    assert report.prompt_tokens <= report.prompt_budget < full.prompt_tokens
+    # 最も優先度の低い事実情報から削られる
+    assert report.trimmed == {"facts": ["社会保障サービス/介護保険"]}
+    assert "main_risks_txt" in prompt and "hash_pb" in prompt
+
+    tiny = SimpleNamespace(model_name="x", num_ctx=full.reserved_output + 200)
+    with patch.object(prompt_budget, "load_prompt", wraps=prompt_budget.load_prompt) as load_prompt:
+        prompt, report = fit_group_prompt(Goals, serialize_context(FACTS), PLAN, tiny, facts=FACTS)
+    assert report.over_budget
+    # 項目ごとに構築し直さず、推定トークン数でまとめて削ってから1回だけ構築し直す
+    assert load_prompt.call_count == 2
+    # 生成項目 (Goals) と関連の薄い計画の項目は、関連する項目や主要な事実情報より先に削られる
+    assert report.trimmed["facts"][:2] == ["社会保障サービス/介護保険", "栄養状態/BMI"]
+    assert report.trimmed["plan"] == ["main_risks_txt", "goals_at_discharge_txt"]
+    assert "hash_pb" in prompt
@@ -0,0 +1,74 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.schemas.legacy_schemas import Goals
+from app.usecases.utils.prompt_manager import PromptRegistry, PromptTemplateError
+from app.usecases.utils.prompts import SCHEMA_ENFORCED_NOTE, build_group_prompt, schema_prompt_savings
+
+
+def _write(path, content, mtime_ns):
+    path.write_text(content, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_render_validates_placeholders(tmp_path):
+    """プレースホルダーに対応する変数が不足していれば例外になること"""
+    _write(tmp_path / "greeting.txt", "こんにちは ${name} さん。料金は $$100 です。", 1_000_000_000)
+    registry = PromptRegistry(tmp_path, reload_interval_sec=-1)
+
+    assert registry.render("greeting", name="テスト") == "こんにちは テスト さん。料金は $100 です。"
+    with pytest.raises(PromptTemplateError) as exc_info:
+        registry.render("greeting.txt")
+    assert exc_info.value.missing == {"name"}
+    with pytest.raises(FileNotFoundError):
+        registry.get("unknown")
+
+
+def test_reloads_when_file_changes(tmp_path):
+    """ファイルの更新時刻が変われば読み込み直し、変わらなければメモリから返すこと"""
+    path = tmp_path / "greeting.txt"
+    _write(path, "v1 $name", 1_000_000_000)
+    registry = PromptRegistry(tmp_path, reload_interval_sec=0)
+    first = registry.get("greeting")
+
+    assert registry.get("greeting") is first
+
+    _write(path, "v2 $name $title", 2_000_000_000)
+    reloaded = registry.get("greeting")
+    assert reloaded is not first
+    assert reloaded.placeholders == {"name", "title"}
+
+    # 読み込めなくなった場合は直前のテンプレートを使い続ける
+    path.unlink()
+    assert registry.get("greeting") is reloaded
+
+
+def test_group_prompt_fills_all_placeholders():
+    prompt = build_group_prompt(Goals, '{"age": 80}', {})
+    assert "${" not in prompt
+    assert '"age": 80' in prompt
+
+
+def test_group_prompt_renders_compact_schema_once():
+    """出力形式は項目の一覧で埋め込み、スキーマをAPIで渡すクライアントでは一覧を省略すること"""
+    description = Goals.model_fields["goals_1_month_txt"].description
+
+    prompt = build_group_prompt(Goals, '{"age": 80}', {})
+    assert "- goals_1_month_txt (string): " in prompt
+    assert prompt.count(description) == 1
+    assert '"properties"' not in prompt
+
+    enforced = build_group_prompt(Goals, '{"age": 80}', {}, schema_enforced=True)
+    assert description not in enforced
+    assert SCHEMA_ENFORCED_NOTE in enforced
+
+    savings = schema_prompt_savings(Goals, schema_enforced=True)
+    assert savings["saved_tokens"] == savings["legacy_tokens"] - savings["tokens"] > 0
+
+    # スキーマごとにキャッシュし、返した辞書を書き換えてもキャッシュは変わらない
+    savings["saved_tokens"] = 0
+    with patch.object(Goals, "model_json_schema") as model_json_schema:
+        assert schema_prompt_savings(Goals, schema_enforced=True)["saved_tokens"] > 0
+    model_json_schema.assert_not_called()
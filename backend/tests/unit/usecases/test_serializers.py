@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from app.usecases.utils.serializers import FORMAT_JSON_MIN, FORMAT_KEY_VALUE, serialize_context, token_counts
+
+FACTS = {
+    "基本情報": {"氏名": "patient_001", "年齢": "82歳"},
+    "ADL評価": {"FIM(現在値)": {"Eating": "5点", "Toileting": "4点"}},
+    "目標（参加）": {},
+    "担当者からの所見": "自宅は2階建て。\n妻と二人暮らし。",
+}
+
+
+def test_key_value_format():
+    """トップレベルのカテゴリは見出し、深い階層はドット区切りで1行1項目になること"""
+    assert serialize_context(FACTS, FORMAT_KEY_VALUE) == "\n".join([
+        "# 基本情報",
+        "氏名: patient_001",
+        "年齢: 82歳",
+        "# ADL評価",
+        "FIM(現在値).Eating: 5点",
+        "FIM(現在値).Toileting: 4点",
+        "担当者からの所見: 自宅は2階建て。\\n妻と二人暮らし。",
+    ])
+
+
+def test_minified_json_is_lossless_and_smaller():
+    assert json.loads(serialize_context(FACTS, FORMAT_JSON_MIN)) == FACTS
+
+    counts = token_counts(FACTS)
+    assert counts["kv"] <= counts["json_min"] < counts["json"]
+
+    with pytest.raises(ValueError):
+        serialize_context(FACTS, "yaml")
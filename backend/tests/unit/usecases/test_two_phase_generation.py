@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.usecases.two_phase_generation import TwoPhasePlanGenerationUseCase
+from app.usecases.utils.context_builder import prepare_patient_facts
+from app.usecases.utils.dependency_map import GENERATED_FIELDS
+from app.usecases.utils.rule_based_draft import build_rule_based_draft
+
+
+def _patient():
+    return PatientExtractionSchema.model_validate({
+        "basic": {"name": "テスト太郎", "age": 80, "gender": "男"},
+        "medical": {}, "function": {}, "basic_movement": {},
+        "adl": {"eating": {"fim_current": 6}, "toileting": {"fim_current": 2}},
+        "nutrition": {}, "social": {}, "goals": {}, "signature": {},
+    })
+
+
+def test_rule_based_draft_fills_all_fields_deterministically():
+    """暫定ドラフトが全項目を埋め、FIMの点数区分や病名の定型文を反映すること"""
+    flat = _patient().export_to_mapping_format()
+    flat["header_disease_name_txt"] = "左大腿骨頸部骨折"
+    flat["func_pain_chk"] = True
+    flat["func_pain_txt"] = "右膝の荷重時痛"
+
+    draft = build_rule_based_draft(flat, prepare_patient_facts(flat))
+
+    assert list(draft) == GENERATED_FIELDS
+    assert all(draft.values())
+    assert draft["func_pain_txt"] == "右膝の荷重時痛"
+    assert draft["func_rom_limitation_txt"] == "特記事項なし"
+    assert "荷重制限" in draft["main_contraindications_txt"]
+    assert "トイレ動作：全介助（FIM 2点）" in draft["adl_equipment_and_assistance_details_txt"]
+    assert "トイレ動作" in draft["goals_1_month_txt"] and "食事" not in draft["goals_1_month_txt"]
+    assert draft == build_rule_based_draft(flat, prepare_patient_facts(flat))
+    assert "自宅" not in draft["goals_at_discharge_txt"]
+
+
+@pytest.mark.parametrize("residence, other, check, expected", [
+    ("自宅", None, True, "ADLの自立度を高め、自宅への退院を目指す。"),
+    ("home_apartment", None, None, "ADLの自立度を高め、自宅への退院を目指す。"),
+    ("facility", None, True, "ADLの自立度を高め、施設での生活へ円滑に移行する。"),
+    ("other", "娘宅", True, "ADLの自立度を高め、退院先（娘宅）での生活へ円滑に移行する。"),
+    ("other", None, True, "ADLの自立度を高め、退院後の生活の場へ円滑に移行する。"),
+    (None, None, True, "ADLの自立度を高め、退院後の生活の場へ円滑に移行する。"),
+])
+def test_rule_based_draft_reads_residence_selection(residence, other, check, expected):
+    """住居の選択が自宅の場合に限り自宅退院を目標にし、施設・その他・チェックのみでは自宅としないこと"""
+    flat = _patient().export_to_mapping_format()
+    assert "goal_p_residence_slct" in flat
+    flat.update(goal_p_residence_slct=residence, goal_p_residence_other_txt=other, goal_p_residence_chk=check)
+
+    draft = build_rule_based_draft(flat, prepare_patient_facts(flat))
+    assert draft["goals_at_discharge_txt"] == expected
+
+
+@pytest.mark.asyncio
+async def test_provisional_then_llm_upgrade():
+    """暫定ドラフトを provisional で保存し、LLMの結果をスキーマ単位で反映して final にすること"""
+    async def fake_generate_json(prompt, schema):
+        return {key: "LLM" for key in schema.model_fields}
+
+    mock_llm_client = MagicMock()
+    mock_llm_client.generate_json = AsyncMock(side_effect=fake_generate_json)
+
+    with patch("app.usecases.plan_generation.get_llm_client", return_value=mock_llm_client), \
+         patch("app.usecases.two_phase_generation.PlanRepository") as MockRepo:
+        repo = MockRepo.return_value
+        repo.create = AsyncMock(side_effect=lambda plan_in: MagicMock(plan_id=7, plan_in=plan_in))
+        repo.merge_raw_data = AsyncMock()
+
+        usecase = TwoPhasePlanGenerationUseCase(AsyncMock())
+        provisional = await usecase.create_provisional("hash_tp", _patient())
+        await usecase.upgrade(provisional.plan_id, "hash_tp", _patient())
+
+    assert provisional.plan_in.status == "provisional"
+    assert set(provisional.plan_in.raw_data) == set(GENERATED_FIELDS)
+
+    merges = repo.merge_raw_data.await_args_list
+    # 3スキーマ分の途中反映 + 最後の確定
+    assert len(merges) == 4
+    assert all(call.args[0] == 7 for call in merges)
+    final = merges[-1]
+    assert final.kwargs["status"] == "final"
+    assert set(final.args[1].values()) == {"LLM"}
+    assert final.kwargs["facts_snapshot"]
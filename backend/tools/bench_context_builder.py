@@ -0,0 +1,150 @@
+"""
+prepare_patient_facts の振り分け表による実装と、従来の実装（キーごとに判定を繰り返す）を比較するマイクロベンチマーク。
+構造化データからの変換（フラットな辞書の作成を含む経路と、対応表から直接構築する経路）も比較します。
+
+使い方 (backend ディレクトリで実行):
+    python tools/bench_context_builder.py [--number 2000]
+"""
+import argparse
+import os
+import sys
+import timeit
+from typing import Any, Dict
+
+# ----------------------------------------------------------------
+# パス設定: backendディレクトリをインポートパスに追加
+# ----------------------------------------------------------------
+current_dir = os.path.dirname(os.path.abspath(__file__))  # .../backend/tools
+backend_dir = os.path.dirname(current_dir)                # .../backend
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+from app.core.constants import CHECKBOX_TEXT_PAIRS, PATIENT_FIELD_LABELS
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.usecases.utils.context_builder import format_value, prepare_patient_facts, prepare_patient_facts_from_schema
+from tools.seeder import DUMMY_PATIENTS
+
+
+def legacy_prepare_patient_facts(flat_patient_data: Dict[str, Any], therapist_notes: str = "") -> Dict[str, Any]:
+    """振り分け表を導入する前の実装（比較用）。"""
+    facts = {
+        "基本情報": {},
+        "心身機能・構造": {},
+        "基本動作": {},
+        "ADL評価": {"FIM(現在値)": {}, "BI(現在値)": {}},
+        "栄養状態": {},
+        "社会保障サービス": {},
+        "目標（参加）": {},
+        "目標（活動）": {},
+        "目標（環境・対応）": {},
+        "担当者からの所見": therapist_notes if therapist_notes else "特になし",
+    }
+
+    facts["基本情報"]["氏名"] = flat_patient_data.get("name", "匿名")
+    if "age" in flat_patient_data and flat_patient_data["age"] is not None:
+        facts["基本情報"]["年齢"] = f"{flat_patient_data['age']}歳"
+    if "gender" in flat_patient_data:
+        facts["基本情報"]["性別"] = flat_patient_data.get("gender")
+
+    for key, value in flat_patient_data.items():
+        formatted_value = format_value(value)
+        if formatted_value is None:
+            continue
+        if key in CHECKBOX_TEXT_PAIRS or key in CHECKBOX_TEXT_PAIRS.values():
+            continue
+        jp_name = PATIENT_FIELD_LABELS.get(key)
+        if not jp_name:
+            continue
+
+        category = "心身機能・構造"
+        if key.startswith(("header_", "main_")):
+            category = "基本情報"
+        elif key.startswith("func_basic_"):
+            category = "基本動作"
+        elif key.startswith("nutrition_"):
+            category = "栄養状態"
+        elif key.startswith("social_"):
+            category = "社会保障サービス"
+        elif key.startswith("goal_p_"):
+            category = "目標（参加）"
+        elif key.startswith("goal_a_"):
+            category = "目標（活動）"
+        elif key.startswith("goal_s_"):
+            category = "目標（環境・対応）"
+        if category in facts:
+            facts[category][jp_name] = formatted_value
+
+    for chk_key, txt_key in CHECKBOX_TEXT_PAIRS.items():
+        jp_name = PATIENT_FIELD_LABELS.get(chk_key)
+        if not jp_name:
+            continue
+        is_checked = flat_patient_data.get(chk_key)
+        if str(is_checked).lower() in ["true", "1", "on"]:
+            txt_value = flat_patient_data.get(txt_key)
+            if not txt_value or txt_value.strip() == "特記なし":
+                facts["心身機能・構造"][jp_name] = "あり（詳細は不明）"
+            else:
+                facts["心身機能・構造"][jp_name] = txt_value
+
+    for key, value in flat_patient_data.items():
+        if value is not None and "_val" in key:
+            val_str = str(value)
+            if "fim_current_val" in key:
+                item_name = key.replace("adl_", "").replace("_fim_current_val", "").replace("_", " ").title()
+                facts["ADL評価"]["FIM(現在値)"][item_name] = f"{val_str}点"
+            elif "bi_current_val" in key:
+                item_name = key.replace("adl_", "").replace("_bi_current_val", "").replace("_", " ").title()
+                facts["ADL評価"]["BI(現在値)"][item_name] = f"{val_str}点"
+
+    final_facts = {k: v for k, v in facts.items() if v}
+    if "ADL評価" in final_facts:
+        adl = final_facts["ADL評価"]
+        if not adl.get("FIM(現在値)"):
+            del adl["FIM(現在値)"]
+        if not adl.get("BI(現在値)"):
+            del adl["BI(現在値)"]
+        if not adl:
+            del final_facts["ADL評価"]
+    return final_facts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prepare_patient_facts")
+    parser.add_argument("--number", type=int, default=2000, help="calls per patient")
+    args = parser.parse_args()
+
+    samples = []
+    models = []
+    for patient in DUMMY_PATIENTS:
+        model = PatientExtractionSchema.model_validate(patient["extraction_data"])
+        model.basic.name = patient["hash_id"]
+        models.append(model)
+        samples.append(model.export_to_mapping_format())
+
+    # 結果（項目の順序を含む）が同じであることを確認してから計測する
+    for flat in samples:
+        new, old = prepare_patient_facts(flat, "申し送り"), legacy_prepare_patient_facts(flat, "申し送り")
+        assert new == old and list(new) == list(old), "Outputs differ from the legacy implementation"
+
+    print(f"{len(samples)} patients, {sum(len(flat) for flat in samples) // len(samples)} flat keys on average")
+    results = {}
+    for name, func in (("legacy", legacy_prepare_patient_facts), ("routed", prepare_patient_facts)):
+        elapsed = min(timeit.repeat(lambda: [func(flat, "申し送り") for flat in samples], number=args.number, repeat=5))
+        results[name] = elapsed / (args.number * len(samples)) * 1e6
+        print(f"{name:<8} {results[name]:8.1f} us/call")
+    print(f"speedup  {results['legacy'] / results['routed']:8.2f}x")
+
+    print()
+    print("From PatientExtractionSchema:")
+    for name, func in (
+        ("export+legacy", lambda m: legacy_prepare_patient_facts(m.export_to_mapping_format(), "申し送り")),
+        ("export+routed", lambda m: prepare_patient_facts(m.export_to_mapping_format(), "申し送り")),
+        ("direct", lambda m: prepare_patient_facts_from_schema(m, "申し送り")),
+    ):
+        assert all(func(m) == legacy_prepare_patient_facts(flat, "申し送り") for m, flat in zip(models, samples))
+        elapsed = min(timeit.repeat(lambda: [func(m) for m in models], number=args.number, repeat=5))
+        print(f"{name:<14} {elapsed / (args.number * len(models)) * 1e6:8.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
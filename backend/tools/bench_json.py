@@ -0,0 +1,112 @@
+"""
+APIのJSON処理（リクエストボディの解析とレスポンスの生成）を、標準の json と orjson / model_validate_json で比較するマイクロベンチマーク。
+
+- リクエスト: json.loads + model_validate（FastAPI の既定）と、json_body の2つの経路
+  （バイト列からの model_validate_json と、orjson.loads + model_validate (untyped=True)）
+- レスポンス: JSONResponse（json.dumps）と ORJSONResponse、参考として Pydantic の dump_json
+  （新しい FastAPI が response_model のあるルートで使う経路）
+
+使い方 (backend ディレクトリで実行):
+    python tools/bench_json.py [--number 500] [--rows 200]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+# ----------------------------------------------------------------
+# パス設定: backendディレクトリをインポートパスに追加
+# ----------------------------------------------------------------
+current_dir = os.path.dirname(os.path.abspath(__file__))  # .../backend/tools
+backend_dir = os.path.dirname(current_dir)                # .../backend
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.api.json_io import FASTAPI_DUMPS_RESPONSE_MODELS, ORJSONResponse
+from app.core import json_codec
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.schemas.schemas import PlanCreate, PlanRead, TemplateCreate
+from tools.seeder import DUMMY_PATIENTS
+
+
+def univer_snapshot(rows: int, cols: int = 20) -> Dict[str, Any]:
+    """Univer のワークブックのスナップショットに近い形のダミーデータ（セルごとに値とスタイルID）。"""
+    cell_data = {
+        str(r): {str(c): {"v": f"R{r}C{c} テキスト", "s": f"style_{c % 7}", "t": 1} for c in range(cols)}
+        for r in range(rows)
+    }
+    return {
+        "id": "workbook-01",
+        "name": "様式23",
+        "sheetOrder": ["sheet-01"],
+        "styles": {f"style_{i}": {"ff": "Meiryo", "fs": 10 + i, "bd": {"b": {"s": 1}}} for i in range(7)},
+        "sheets": {"sheet-01": {"id": "sheet-01", "name": "計画書", "rowCount": rows, "columnCount": cols,
+                                "cellData": cell_data}},
+    }
+
+
+def _time(func: Callable[[], Any], number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def _report(title: str, results: List[Tuple[str, float]]) -> None:
+    print(title)
+    baseline = results[0][1]
+    for name, us in results:
+        print(f"  {name:<22} {us:10.1f} us/call  ({baseline / us:5.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON request parsing and response rendering")
+    parser.add_argument("--number", type=int, default=500, help="calls per measurement")
+    parser.add_argument("--rows", type=int, default=200, help="rows of the dummy template snapshot")
+    args = parser.parse_args()
+
+    patient = PatientExtractionSchema.model_validate(DUMMY_PATIENTS[0]["extraction_data"])
+    raw_data = {key: value for key, value in patient.export_to_mapping_format().items() if value is not None}
+    raw_data = json.loads(json.dumps(raw_data, default=str))
+
+    bodies: List[Tuple[str, type, bytes]] = [
+        ("PatientExtractionSchema", PatientExtractionSchema, patient.model_dump_json().encode()),
+        ("PlanCreate (raw_data)", PlanCreate,
+         json.dumps({"hash_id": "bench", "raw_data": raw_data}, ensure_ascii=False).encode()),
+        ("TemplateCreate (Univer)", TemplateCreate,
+         json.dumps({"name": "bench", "data": univer_snapshot(args.rows)}, ensure_ascii=False).encode()),
+    ]
+
+    print(f"FastAPI dumps response models via Pydantic: {FASTAPI_DUMPS_RESPONSE_MODELS}")
+    print()
+    for title, model, body in bodies:
+        # 結果が同じであることを確認してから計測する
+        assert model.model_validate(json.loads(body)) == model.model_validate_json(body)
+        _report(f"Request: {title} ({len(body) // 1024} KiB)", [
+            ("json.loads+validate", _time(lambda: model.model_validate(json.loads(body)), args.number)),
+            ("model_validate_json", _time(lambda: model.model_validate_json(body), args.number)),
+            ("orjson.loads+validate", _time(lambda: model.model_validate(json_codec.loads(body)), args.number)),
+        ])
+    print()
+
+    plan = PlanRead(plan_id=1, hash_id="bench", created_at=datetime.now(), raw_data=raw_data)
+    responses: List[Tuple[str, BaseModel]] = [
+        ("PlanRead (raw_data)", plan),
+        ("TemplateCreate (Univer)", TemplateCreate(name="bench", data=univer_snapshot(args.rows))),
+    ]
+    for title, obj in responses:
+        adapter = TypeAdapter(type(obj))
+        content = adapter.dump_python(obj, mode="json")
+        assert json.loads(JSONResponse(content).body) == json.loads(ORJSONResponse(content).body)
+        _report(f"Response: {title} ({len(ORJSONResponse(content).body) // 1024} KiB)", [
+            ("JSONResponse", _time(lambda: JSONResponse(adapter.dump_python(obj, mode="json")), args.number)),
+            ("ORJSONResponse", _time(lambda: ORJSONResponse(adapter.dump_python(obj, mode="json")), args.number)),
+            ("pydantic dump_json", _time(lambda: adapter.dump_json(obj), args.number)),
+        ])
+
+
+if __name__ == "__main__":
+    main()
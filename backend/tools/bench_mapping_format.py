@@ -0,0 +1,55 @@
+"""
+export_to_mapping_format（対応表 mapping_spec による変換）と、旧フラット形式からの逆変換
+(from_mapping_format) の所要時間を計測するマイクロベンチマーク。
+従来の手書きの実装との一致は tests/unit/schemas/test_mapping_spec.py のゴールデンデータで検証しています。
+
+使い方 (backend ディレクトリで実行):
+    python tools/bench_mapping_format.py [--number 2000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+# ----------------------------------------------------------------
+# パス設定: backendディレクトリをインポートパスに追加
+# ----------------------------------------------------------------
+current_dir = os.path.dirname(os.path.abspath(__file__))  # .../backend/tools
+backend_dir = os.path.dirname(current_dir)                # .../backend
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.schemas.mapping_spec import to_flat
+from tools.seeder import DUMMY_PATIENTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark export_to_mapping_format")
+    parser.add_argument("--number", type=int, default=2000, help="calls per patient")
+    args = parser.parse_args()
+
+    models = []
+    for patient in DUMMY_PATIENTS:
+        model = PatientExtractionSchema.model_validate(patient["extraction_data"])
+        model.basic.name = patient["hash_id"]
+        models.append(model)
+
+    # 逆変換で値が変わらないことを確認してから計測する
+    samples = []
+    for model in models:
+        flat = to_flat(model)
+        assert to_flat(PatientExtractionSchema.from_mapping_format(flat)) == flat, "Round trip changed the flat data"
+        samples.append(flat)
+
+    print(f"{len(models)} patients, {len(samples[0])} flat keys")
+    for name, func, inputs in (
+        ("compiled", to_flat, models),
+        ("inverse", PatientExtractionSchema.from_mapping_format, samples),
+    ):
+        elapsed = min(timeit.repeat(lambda: [func(x) for x in inputs], number=args.number, repeat=5))
+        print(f"{name:<9} {elapsed / (args.number * len(inputs)) * 1e6:8.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+プロンプトに埋め込むコンテキストのシリアライズ形式ごとのトークン数を比較するツール。
+
+使い方 (backend ディレクトリで実行):
+    python tools/bench_prompt_formats.py              # トークン数の比較のみ
+    python tools/bench_prompt_formats.py --generate   # 実際にLLMで生成し、出力の妥当性も比較
+
+--generate は LLM_PROVIDER などの環境変数で設定されたLLMを呼び出します。
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# ----------------------------------------------------------------
+# パス設定: backendディレクトリをインポートパスに追加
+# ----------------------------------------------------------------
+current_dir = os.path.dirname(os.path.abspath(__file__))  # .../backend/tools
+backend_dir = os.path.dirname(current_dir)                # .../backend
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+from app.schemas.extraction_schemas import PatientExtractionSchema
+from app.schemas.legacy_schemas import GENERATION_GROUPS
+from app.usecases.utils import serializers
+from app.usecases.utils.context_builder import prepare_patient_facts
+from app.usecases.utils.dependency_map import GENERATED_FIELDS
+from app.usecases.utils.prompts import build_group_prompt
+from app.usecases.utils.token_counter import estimate_tokens
+from tools.seeder import DUMMY_PATIENTS
+
+# 生成済みの計画として埋め込むダミーの文章（1項目あたり）
+SAMPLE_PLAN_TEXT = "右上下肢の筋力低下により、移乗動作に軽介助を要する。転倒に注意して段階的に練習を進める。"
+
+
+def sample_facts():
+    for patient in DUMMY_PATIENTS:
+        schema = PatientExtractionSchema.model_validate(patient["extraction_data"])
+        flat = schema.export_to_mapping_format()
+        flat["name"] = patient["hash_id"]
+        yield patient["hash_id"], prepare_patient_facts(flat, "自宅は2階建て。\n妻と二人暮らし。")
+
+
+def group_prompt_tokens(facts, fmt):
+    """
+    全グループのプロンプトの合計トークン数。
+    後のグループほど生成済みの計画が長くなるため、その分も含めて計測します。
+    """
+    serializers.DEFAULT_CONTEXT_FORMAT = fmt
+    facts_str = serializers.serialize_context(facts)
+    plan_so_far = {}
+    total = 0
+    for group in GENERATION_GROUPS:
+        total += estimate_tokens(build_group_prompt(group, facts_str, plan_so_far))
+        plan_so_far.update({field: SAMPLE_PLAN_TEXT for field in group.model_fields})
+    return total
+
+
+def compare_tokens():
+    formats = list(serializers.SERIALIZERS)
+    print(f"{'patient':<14}" + "".join(f"{fmt + ' facts':>16}{fmt + ' prompts':>18}" for fmt in formats))
+    totals = {fmt: 0 for fmt in formats}
+    for hash_id, facts in sample_facts():
+        facts_tokens = serializers.token_counts(facts)
+        row = f"{hash_id:<14}"
+        for fmt in formats:
+            prompt_tokens = group_prompt_tokens(facts, fmt)
+            totals[fmt] += prompt_tokens
+            row += f"{facts_tokens[fmt]:>16}{prompt_tokens:>18}"
+        print(row)
+
+    baseline = totals[serializers.FORMAT_JSON_PRETTY]
+    print()
+    for fmt in formats:
+        print(f"{fmt:<10} total prompt tokens: {totals[fmt]:>8} ({(totals[fmt] - baseline) / baseline:+.1%} vs json)")
+
+
+async def compare_validity():
+    """各形式で実際に生成し、全項目が空でない文字列で返ったかを比較します。"""
+    from app.usecases.plan_generation import PlanGenerationUseCase
+
+    print()
+    for fmt in serializers.SERIALIZERS:
+        serializers.DEFAULT_CONTEXT_FORMAT = fmt
+        usecase = PlanGenerationUseCase(db=None)
+        valid = 0
+        total = 0
+        for hash_id, facts in sample_facts():
+            plan = await usecase._generate_groups(serializers.serialize_context(facts))
+            filled = sum(1 for field in GENERATED_FIELDS if isinstance(plan.get(field), str) and plan[field].strip())
+            valid += filled
+            total += len(GENERATED_FIELDS)
+            print(f"  [{fmt}] {hash_id}: {filled}/{len(GENERATED_FIELDS)} fields")
+        print(f"{fmt:<10} valid fields: {valid}/{total} ({valid / total:.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt context serialization formats")
+    parser.add_argument("--generate", action="store_true", help="call the configured LLM and compare output validity")
+    args = parser.parse_args()
+
+    compare_tokens()
+    if args.generate:
+        asyncio.run(compare_validity())
+
+
+if __name__ == "__main__":
+    main()